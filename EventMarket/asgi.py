@@ -13,4 +13,14 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'EventMarket.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Поток занятости площадок (SSE) обслуживается мимо Django — долгие
+# соединения не держат запрос, middleware и поток обработчика (venues/live.py)
+from venues import live  # noqa: E402
+
+
+async def application(scope, receive, send):
+    if live.match(scope):
+        return await live.stream(scope, receive, send)
+    return await django_application(scope, receive, send)
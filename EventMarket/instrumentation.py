@@ -0,0 +1,327 @@
+# EventMarket/instrumentation.py
+"""
+Инструментирование SQL-запросов на уровне HTTP-запроса.
+
+Middleware вешает ``connection.execute_wrapper`` на все подключения к БД и
+для каждого запроса собирает: количество SQL, суммарное время в БД,
+повторяющиеся запросы (по отпечатку) и самые медленные statements.
+
+Результат отдаётся тремя путями:
+    * заголовок ``Server-Timing`` (видно во вкладке Network браузера);
+    * одна структурированная строка в логгер ``EventMarket.queries`` на
+      уровне INFO — только если логгер включён (в settings он выключен,
+      ``propagate=False``: строка на каждый запрос нужна не всем);
+    * агрегированные метрики в формате Prometheus (``metrics_view``) —
+      только сотрудникам, по токену (``Authorization: Bearer …``) или с
+      адресов из ``METRICS_ALLOWED_IPS``.
+
+Накладные расходы меряют бенчмарки ``read.request_plain`` и
+``read.request_instrumented`` (``benchmark_marketplace --only read.request_``):
+view из пяти SQL без middleware и с ним, без строки лога — её цена
+зависит от обработчика (синхронная запись в консоль — ещё ~0.15 мс).
+
+Настройки (все необязательные) — словарь ``QUERY_INSTRUMENTATION`` в settings.
+"""
+import heapq
+import json
+import logging
+import random
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+logger = logging.getLogger('EventMarket.queries')
+
+DEFAULTS = {
+    'ENABLED': True,
+    'SAMPLE_RATE': 1.0,          # доля запросов, которые инструментируем (0.0–1.0)
+    'SLOW_QUERIES': 3,           # сколько самых медленных SQL класть в лог
+    'DUPLICATE_THRESHOLD': 2,    # с какого числа повторов отпечаток считается дублем
+    'SERVER_TIMING': True,
+    'LOG': True,
+    'METRICS_TOKEN': None,       # токен для сборщика Prometheus; None — без токена
+    'METRICS_ALLOWED_IPS': (),   # REMOTE_ADDR, которым endpoint открыт без входа
+}
+
+# Границы бакетов гистограммы «SQL-запросов на HTTP-запрос»
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250)
+# Границы бакетов гистограммы «время в БД на HTTP-запрос», секунды
+DB_TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+def get_config():
+    config = dict(DEFAULTS)
+    config.update(getattr(settings, 'QUERY_INSTRUMENTATION', {}))
+    return config
+
+
+# ────────────────────────────────────────────────
+# Отпечатки запросов
+# ────────────────────────────────────────────────
+
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r'IN \((?:\?, )*\?\)')
+_SPACE_RE = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(sql):
+    """
+    Нормализованный вид SQL: литералы заменены на ``?``, списки IN свёрнуты.
+
+    Django почти всегда передаёт параметры отдельно (``%s``), поэтому
+    нормализация нужна в основном для raw SQL и списков ``IN (%s, %s, ...)``.
+    Тексты запросов от запроса к запросу повторяются, и регулярные
+    выражения на длинном SQL — самая дорогая часть ``summary``: результат кэшируется.
+    """
+    sql = sql.replace('%s', '?')
+    sql = _LITERAL_RE.sub('?', sql)
+    sql = _IN_LIST_RE.sub('IN (...)', sql)
+    return _SPACE_RE.sub(' ', sql).strip()
+
+
+# ────────────────────────────────────────────────
+# Сбор статистики в рамках одного запроса
+# ────────────────────────────────────────────────
+
+class QueryCollector:
+    """
+    Обёртка для ``connection.execute_wrapper``.
+
+    На горячем пути — только ``perf_counter`` и добавление кортежа в список;
+    отпечатки и сортировка считаются один раз в ``summary()``.
+    """
+
+    def __init__(self):
+        self.queries = []        # (sql, alias, duration)
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append(
+                (sql, context['connection'].alias, time.perf_counter() - start)
+            )
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def total_time(self):
+        return sum(duration for _sql, _alias, duration in self.queries)
+
+    def duplicates(self, threshold=2):
+        """Отпечатки, которые встретились не меньше ``threshold`` раз (типичный N+1)."""
+        by_sql = Counter(sql for sql, _alias, _duration in self.queries)
+        counts = Counter()
+        for sql, n in by_sql.items():
+            counts[fingerprint(sql)] += n
+        return [(fp, n) for fp, n in counts.most_common() if n >= threshold]
+
+    def slowest(self, n=3):
+        return heapq.nlargest(n, self.queries, key=lambda q: q[2])
+
+    def summary(self, config=None):
+        config = config or get_config()
+        return {
+            'queries': self.count,
+            'db_time_ms': round(self.total_time * 1000, 3),
+            'duplicates': [
+                {'sql': fp, 'count': n}
+                for fp, n in self.duplicates(config['DUPLICATE_THRESHOLD'])
+            ],
+            'slowest': [
+                {'sql': sql, 'db': alias, 'ms': round(duration * 1000, 3)}
+                for sql, alias, duration in self.slowest(config['SLOW_QUERIES'])
+            ],
+        }
+
+
+# ────────────────────────────────────────────────
+# Агрегированные метрики (формат Prometheus)
+# ────────────────────────────────────────────────
+
+class MetricsRegistry:
+    """
+    Счётчики и гистограммы в памяти процесса.
+
+    Метки — только имя view (ограниченное множество), чтобы не раздувать
+    кардинальность путями с UUID.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clear()
+
+    def _clear(self):
+        self.requests = Counter()
+        self.queries = Counter()
+        self.db_seconds = Counter()
+        self.duplicates = Counter()
+        self.query_hist = {}
+        self.time_hist = {}
+
+    def reset(self):
+        with self._lock:
+            self._clear()
+
+    @staticmethod
+    def _observe(hist, view, value, buckets):
+        row = hist.get(view)
+        if row is None:
+            row = hist[view] = [0] * (len(buckets) + 1)
+        for i, bound in enumerate(buckets):
+            if value <= bound:
+                row[i] += 1
+                break
+        else:
+            row[-1] += 1
+
+    def observe(self, view, count, db_seconds, duplicates):
+        with self._lock:
+            self.requests[view] += 1
+            self.queries[view] += count
+            self.db_seconds[view] += db_seconds
+            self.duplicates[view] += duplicates
+            self._observe(self.query_hist, view, count, QUERY_COUNT_BUCKETS)
+            self._observe(self.time_hist, view, db_seconds, DB_TIME_BUCKETS)
+
+    @staticmethod
+    def _label(view):
+        return view.replace('\\', '\\\\').replace('"', '\\"')
+
+    def _render_histogram(self, lines, name, hist, sums, buckets):
+        lines.append(f'# TYPE {name} histogram')
+        for view, row in sorted(hist.items()):
+            label = self._label(view)
+            cumulative = 0
+            for bound, n in zip(buckets, row):
+                cumulative += n
+                lines.append(f'{name}_bucket{{view="{label}",le="{bound}"}} {cumulative}')
+            cumulative += row[-1]
+            lines.append(f'{name}_bucket{{view="{label}",le="+Inf"}} {cumulative}')
+            lines.append(f'{name}_sum{{view="{label}"}} {sums[view]}')
+            lines.append(f'{name}_count{{view="{label}"}} {cumulative}')
+
+    def render(self):
+        with self._lock:
+            lines = []
+            for name, help_text, values in (
+                ('eventmarket_http_requests_total', 'Инструментированные HTTP-запросы', self.requests),
+                ('eventmarket_db_duplicate_queries_total', 'Повторяющиеся SQL (N+1)', self.duplicates),
+            ):
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} counter')
+                for view, value in sorted(values.items()):
+                    lines.append(f'{name}{{view="{self._label(view)}"}} {value}')
+            self._render_histogram(
+                lines, 'eventmarket_db_queries_per_request',
+                self.query_hist, self.queries, QUERY_COUNT_BUCKETS,
+            )
+            self._render_histogram(
+                lines, 'eventmarket_db_seconds_per_request',
+                self.time_hist, self.db_seconds, DB_TIME_BUCKETS,
+            )
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+def metrics_allowed(request, config=None):
+    """Метрики раскрывают view и их SQL-нагрузку — наружу они не отдаются."""
+    config = config or get_config()
+    token = config['METRICS_TOKEN']
+    if token and constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return True
+    if request.META.get('REMOTE_ADDR') in config['METRICS_ALLOWED_IPS']:
+        return True
+    user = getattr(request, 'user', None)
+    return bool(user is not None and user.is_active and user.is_staff)
+
+
+def metrics_view(request):
+    """Текстовый endpoint для Prometheus."""
+    if not metrics_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        registry.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
+
+
+# ────────────────────────────────────────────────
+# Middleware
+# ────────────────────────────────────────────────
+
+class QueryInstrumentationMiddleware:
+    """
+    Считает SQL каждого (сэмплированного) запроса и отдаёт статистику.
+
+    Подключать как можно выше в ``MIDDLEWARE``, чтобы учитывать и запросы
+    сессий / аутентификации.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        config = get_config()
+        if not config['ENABLED'] or random.random() >= config['SAMPLE_RATE']:
+            return self.get_response(request)
+
+        collector = QueryCollector()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(collector))
+            response = self.get_response(request)
+        total = time.perf_counter() - started
+
+        self.report(request, response, collector, total, config)
+        return response
+
+    @staticmethod
+    def view_name(request):
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return 'unresolved'
+        return match.view_name or match._func_path
+
+    def report(self, request, response, collector, total, config):
+        view = self.view_name(request)
+        summary = collector.summary(config)
+        registry.observe(
+            view,
+            summary['queries'],
+            collector.total_time,
+            sum(d['count'] for d in summary['duplicates']),
+        )
+
+        if config['SERVER_TIMING']:
+            timing = (
+                f'db;dur={summary["db_time_ms"]};desc="{summary["queries"]} queries", '
+                f'total;dur={round(total * 1000, 3)}'
+            )
+            existing = response.get('Server-Timing')
+            response['Server-Timing'] = f'{existing}, {timing}' if existing else timing
+
+        if config['LOG'] and logger.isEnabledFor(logging.INFO):
+            summary.update({
+                'method': request.method,
+                'path': request.path,
+                'view': view,
+                'status': response.status_code,
+                'total_ms': round(total * 1000, 3),
+            })
+            logger.info(json.dumps(summary, ensure_ascii=False))
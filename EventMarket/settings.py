@@ -42,10 +42,14 @@ INSTALLED_APPS = [
     'venues',
     'bookings',
     'hires',
-    'payments'
+    'payments',
+    'reviews',
+    'archive',
+    'core',
 ]
 
 MIDDLEWARE = [
+    'EventMarket.instrumentation.QueryInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -131,4 +135,152 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
-AUTH_USER_MODEL = 'users.BaseUser'
\ No newline at end of file
+AUTH_USER_MODEL = 'users.BaseUser'
+
+
+# Кэш. LocMem — свой у каждого процесса; с несколькими процессами
+# сюда ставится общий (Redis, Memcached)
+
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+}
+
+# Сессии и пользователь с правами — из кэша (users/backends.py): страница
+# админки не делает запросов на аутентификацию. Только с общим кэшем: в
+# кэше процесса выход, блокировка пользователя и снятие прав остальные
+# процессы увидели бы лишь через AUTH_CACHE_TTL / срок сессии
+
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+if CACHES['default']['BACKEND'] in PROCESS_LOCAL_CACHES:
+    SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+    AUTHENTICATION_BACKENDS = ['django.contrib.auth.backends.ModelBackend']
+else:
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+    AUTHENTICATION_BACKENDS = ['users.backends.CachedModelBackend']
+AUTH_CACHE_TTL = 5 * 60     # секунд
+
+
+# Время жизни удержания слота при бронировании (bookings.Booking.place_hold)
+
+BOOKING_HOLD_TTL = 15 * 60  # секунд
+
+# Насколько вперёд проверяется бесконечная серия броней (bookings.Booking.objects.is_available)
+
+BOOKING_RECURRENCE_HORIZON = 2 * 365 * 24 * 60 * 60  # секунд
+
+# Через сколько неоплаченный платёж считается брошенным (core/transitions.py)
+
+PAYMENT_PENDING_TTL = 24 * 60 * 60  # секунд
+
+# Секрет для подписи вебхуков платёжного провайдера (payments/webhooks.py)
+
+PAYMENT_WEBHOOK_SECRET = 'django-insecure-webhook-secret'
+
+# Событие провайдера для ещё не известного нам платежа откладывается (payments/webhooks.py):
+# пауза удваивается от BASE до MAX; событие старше MAX_AGE закрывается как unknown_payment
+
+PAYMENT_EVENT_RETRY_BASE = 30                    # секунд
+PAYMENT_EVENT_RETRY_MAX = 60 * 60                # секунд
+PAYMENT_EVENT_RETRY_MAX_AGE = 7 * 24 * 60 * 60   # секунд
+
+
+# Календарные ленты iCalendar (events/calendar.py)
+
+CALENDAR_FEED_PAST_DAYS = 90                 # сколько дней прошлого попадает в ленту
+CALENDAR_FEED_ETAG_TTL = 60                  # секунд; столько лента может отставать от БД
+CALENDAR_FEED_CACHE_TTL = 60 * 60            # секунд; тело ленты кэшируется по ETag
+CALENDAR_FEED_CACHE_MAX_BYTES = 256 * 1024   # большие ленты не кэшируются
+
+
+# Фасетный поиск площадок (venues/facets.py)
+
+VENUE_FACETS_IN_MEMORY = True   # False — счётчики одним запросом к БД
+VENUE_FACETS_TTL = 5 * 60       # секунд; полная перестройка индекса в памяти процесса
+
+
+# Правила цены площадок (venues/pricing.py)
+
+VENUE_PRICING_CACHE_SIZE = 20000    # площадок со скомпилированными правилами в памяти процесса
+VENUE_PRICING_TTL = 5 * 60          # секунд; после — правила площадки перечитываются
+
+
+# Рекомендации площадок (venues/recommendations.py, команда refresh_recommendations)
+
+VENUE_RECOMMENDATIONS_TOP_N = 20                # соседей на площадку и площадок на тематику
+VENUE_RECOMMENDATIONS_MAX_RENTER_VENUES = 200   # арендаторы с большим числом площадок не учитываются
+
+
+# Кэш «slug / короткий код → pk» в памяти процесса (core/lookup.py)
+
+LOOKUP_CACHE_SIZE = 10000   # записей на кэш
+
+
+# Архив завершённых мероприятий (archive/archiver.py)
+
+ARCHIVE_AFTER_DAYS = 180    # завершённые / отменённые мероприятия старше — в архив
+
+
+# Каскадное удаление силами БД (core/deletion.py)
+
+DELETE_BATCH_SIZE = 5000    # строк в одном DELETE (своя транзакция вне админки)
+
+
+# Справочники городов и специализаций (core/dimensions.py)
+
+DIMENSION_CACHE_TTL = 60 * 60   # секунд; изменения записей сбрасывают кэш сразу
+DIMENSION_BATCH_SIZE = 5000     # строк в одном UPDATE при переносе и слиянии
+
+
+# Журнал изменений броней, наймов и платежей (core/outbox.py)
+
+OUTBOX_CONSUMERS = {}           # имя потребителя → обработчик пачки, напр. 'core.outbox.log_entries'
+OUTBOX_BATCH_SIZE = 1000        # записей в одной пачке потребителю
+OUTBOX_RETENTION = 7 * 24 * 60 * 60  # секунд; прочитанные записи хранятся для перечитывания
+
+
+# Занятость площадок в реальном времени по SSE (venues/live.py, EventMarket/asgi.py)
+
+VENUE_LIVE_BACKEND = 'venues.live.LocalBroadcast'  # несколько воркеров — 'venues.live.PostgresBroadcast'
+VENUE_LIVE_RELAY = True         # процесс сам читает изменения броней из журнала (core/outbox.py)
+VENUE_LIVE_DAYS = 60            # дней вперёд в снимке занятости
+VENUE_LIVE_KEEPALIVE = 25       # секунд между пингами соединений
+VENUE_LIVE_QUEUE = 64           # сообщений в очереди соединения; переполнение — новый снимок
+
+
+# Рейтинги по отзывам (reviews/ratings.py): сглаживание к средней оценке
+
+RATING_PRIOR_MEAN = 4.0     # априорная средняя оценка
+RATING_PRIOR_WEIGHT = 5     # «вес» априорной оценки в отзывах
+
+
+# Инструментирование SQL-запросов (EventMarket/instrumentation.py)
+
+QUERY_INSTRUMENTATION = {
+    'ENABLED': True,
+    'SAMPLE_RATE': 1.0,
+    'SLOW_QUERIES': 3,
+    # /metrics/ — сотрудникам, по токену или с адресов сборщика
+    'METRICS_TOKEN': None,
+    'METRICS_ALLOWED_IPS': (),
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        # строка на каждый HTTP-запрос (EventMarket/instrumentation.py) —
+        # по умолчанию выключена; развёртывание включает её уровнем 'INFO'
+        # и своим обработчиком (файл, сборщик логов)
+        'EventMarket.queries': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
@@ -0,0 +1,213 @@
+# EventMarket/testing.py
+"""
+Общие помощники для тестов и бенчмарков.
+
+``build_marketplace`` создаёт связанный набор данных по всем приложениям
+(пользователи, площадки, мероприятия, брони, наймы, платежи) через
+``bulk_create`` — количество строк растёт линейно от ``scale``.
+
+``admin_pages`` перечисляет changelist и форму изменения для каждой
+зарегистрированной ModelAdmin, ``measure_page`` — открывает страницу
+и возвращает число SQL-запросов и время ответа.
+
+``cached_auth`` включает сессии и пользователя из кэша (users/backends.py),
+как в settings с общим ``CACHES``: тесты идут в одном процессе, и кэш
+процесса для них общий.
+"""
+import itertools
+import random
+import time
+from datetime import date, datetime, time as dtime, timedelta
+from decimal import Decimal
+
+from django.contrib import admin
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from bookings.models import Booking
+from core import dimensions
+from core.models import City, Specialty
+from events.models import Event
+from hires.models import Hire
+from payments.models import Payment
+from reviews.models import Review
+from users.models import BaseUser, Owner, Renter, Specialist
+from venues.models import Venue, VenueImage
+
+CITIES = ['Москва', 'Санкт-Петербург', 'Казань', 'Екатеринбург', 'Новосибирск']
+SPECIALTIES = ['фотограф', 'ведущий', 'диджей', 'декоратор', 'кейтеринг']
+
+_sequence = itertools.count()
+
+cached_auth = override_settings(
+    SESSION_ENGINE='django.contrib.sessions.backends.cached_db',
+    AUTHENTICATION_BACKENDS=['users.backends.CachedModelBackend'],
+)
+
+
+def build_marketplace(scale=1, seed=0):
+    """
+    Создаёт ``scale`` «порций» данных. Одна порция:
+    2 владельца, 3 площадки (по 2 фото), 4 арендатора, 2 специалиста,
+    6 мероприятий, 6 броней, 6 наймов и 12 платежей.
+
+    Возвращает словарь со списками созданных объектов.
+    """
+    rng = random.Random(seed)
+    batch = next(_sequence)
+    tz = timezone.get_current_timezone()
+
+    def make_users(prefix, n):
+        users = [
+            BaseUser(email=f'{prefix}-{batch}-{i}@example.com')
+            for i in range(n)
+        ]
+        for user in users:
+            user.set_unusable_password()
+        return BaseUser.objects.bulk_create(users)
+
+    # справочники в кэше могли пережить откат транзакции предыдущего теста
+    for model in (City, Specialty):
+        dimensions.invalidate(model)
+    cities = dimensions.resolve(City, CITIES)
+    specialties = dimensions.resolve(Specialty, SPECIALTIES)
+
+    owners = Owner.objects.bulk_create([
+        Owner(user=user, inn=f'77{rng.randrange(10**8):08d}', verified=rng.random() < 0.5,
+              rating=Decimal(rng.randint(300, 500)) / 100)
+        for user in make_users('owner', 2 * scale)
+    ])
+    renters = Renter.objects.bulk_create([
+        Renter(user=user) for user in make_users('renter', 4 * scale)
+    ])
+    specialists = Specialist.objects.bulk_create([
+        Specialist(user=user, specialty_id=specialties[rng.choice(SPECIALTIES)], city_id=cities[rng.choice(CITIES)],
+                   rating=Decimal(rng.randint(300, 500)) / 100)
+        for user in make_users('specialist', 2 * scale)
+    ])
+
+    venues = Venue.objects.bulk_create([
+        Venue(
+            owner=rng.choice(owners),
+            name=f'Лофт {batch}-{i}',
+            slug=f'loft-{batch}-{i}',
+            address=f'ул. Примерная, {i + 1}',
+            city_id=cities[rng.choice(CITIES)],
+            capacity_min=10,
+            capacity_max=rng.choice([30, 50, 100, 300]),
+            area_sq_m=rng.randint(50, 800),
+            price_per_hour=Decimal(rng.randint(20, 200) * 100),
+            price_per_day=Decimal(rng.randint(20, 200) * 1000),
+            status=rng.choice(['draft', 'published', 'published', 'moderation']),
+            is_verified=rng.random() < 0.7,
+        )
+        for i in range(3 * scale)
+    ])
+    VenueImage.objects.bulk_create([
+        VenueImage(venue=venue, image=f'venues/2026/01/{venue.slug}-{n}.jpg', order=n)
+        for venue in venues for n in range(2)
+    ])
+
+    today = date.today()
+    events = Event.objects.bulk_create([
+        Event(
+            renter=rng.choice(renters),
+            title=f'Мероприятие {batch}-{i}',
+            date=today + timedelta(days=rng.randint(-60, 120)),
+            start_time=dtime(18, 0),
+            end_time=dtime(23, 0),
+            theme=rng.choice(Event.THEME_CHOICES)[0],
+            expected_guests=rng.randint(10, 200),
+            status=rng.choice(['planned', 'active', 'completed']),
+        )
+        for i in range(6 * scale)
+    ])
+
+    def period(event):
+        start = datetime.combine(event.date, event.start_time, tzinfo=tz)
+        return start, start + timedelta(hours=5)
+
+    bookings = Booking.objects.bulk_create([
+        Booking(
+            event=event,
+            venue=rng.choice(venues),
+            renter=event.renter,
+            start_datetime=period(event)[0],
+            end_datetime=period(event)[1],
+            total_price=Decimal(rng.randint(10, 100) * 1000),
+            status=rng.choice(['pending', 'confirmed', 'completed']),
+        )
+        for event in events
+    ])
+    hires = Hire.objects.bulk_create([
+        Hire(
+            event=event,
+            specialist=rng.choice(specialists),
+            renter=event.renter,
+            start_datetime=period(event)[0],
+            end_datetime=period(event)[1],
+            total_price=Decimal(rng.randint(5, 50) * 1000),
+            status=rng.choice(['pending', 'confirmed', 'completed']),
+        )
+        for event in events
+    ])
+
+    now = timezone.now()
+    payments = []
+    for target in itertools.chain(bookings, hires):
+        status = rng.choice(['pending', 'succeeded', 'succeeded', 'failed'])
+        payments.append(Payment(
+            booking=target if isinstance(target, Booking) else None,
+            hire=target if isinstance(target, Hire) else None,
+            payer=target.renter,
+            amount=target.total_price,
+            status=status,
+            paid_at=now if status == 'succeeded' else None,
+        ))
+    payments = Payment.objects.bulk_create(payments)
+
+    # отзывы — без пересчёта рейтингов, как и любая массовая загрузка
+    reviews = Review.objects.bulk_create([
+        Review(
+            booking=target if isinstance(target, Booking) else None,
+            hire=target if isinstance(target, Hire) else None,
+            author=target.renter,
+            owner_id=target.venue.owner_id if isinstance(target, Booking) else None,
+            specialist=target.specialist if isinstance(target, Hire) else None,
+            score=rng.randint(1, 5),
+        )
+        for target in itertools.chain(bookings, hires)
+        if target.status == 'completed'
+    ])
+
+    return {
+        'owners': owners, 'renters': renters, 'specialists': specialists,
+        'venues': venues, 'events': events, 'bookings': bookings,
+        'hires': hires, 'payments': payments, 'reviews': reviews,
+    }
+
+
+def admin_pages(site=admin.site):
+    """
+    Пары ``(имя, url)``: changelist и форма изменения (первого объекта)
+    для каждой зарегистрированной модели.
+    """
+    for model, model_admin in sorted(site._registry.items(), key=lambda item: item[0]._meta.label):
+        opts = model._meta
+        prefix = f'{site.name}:{opts.app_label}_{opts.model_name}'
+        yield f'{opts.label_lower}:changelist', reverse(f'{prefix}_changelist')
+        obj = model._default_manager.order_by('pk').first()
+        if obj is not None:
+            yield f'{opts.label_lower}:change', reverse(f'{prefix}_change', args=[obj.pk])
+
+
+def measure_page(client, url):
+    """Открывает страницу; возвращает ``(status_code, число SQL, секунды)``."""
+    with CaptureQueriesContext(connection) as ctx:
+        started = time.perf_counter()
+        response = client.get(url)
+        elapsed = time.perf_counter() - started
+    return response.status_code, len(ctx.captured_queries), elapsed
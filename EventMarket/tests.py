@@ -0,0 +1,149 @@
+import json
+import logging
+
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from archive import archiver
+from payments import ledger
+from users.models import BaseUser
+
+from .instrumentation import QueryCollector, fingerprint, logger, registry
+from .testing import admin_pages, build_marketplace, cached_auth, measure_page
+
+
+class FingerprintTests(TestCase):
+    def test_literals_and_in_lists_are_normalized(self):
+        a = fingerprint("SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'x'")
+        b = fingerprint("SELECT *  FROM t WHERE id IN (%s) AND name = 'yy'")
+        self.assertEqual(a, b)
+        self.assertEqual(a, 'SELECT * FROM t WHERE id IN (...) AND name = ?')
+
+
+class QueryCollectorTests(TestCase):
+    def test_counts_and_duplicates(self):
+        collector = QueryCollector()
+        with connection.execute_wrapper(collector):
+            with connection.cursor() as cursor:
+                for i in range(3):
+                    cursor.execute('SELECT %s', [i])
+                cursor.execute('SELECT 1, 2')
+        self.assertEqual(collector.count, 4)
+        self.assertEqual(collector.duplicates(), [('SELECT ?', 3)])
+        summary = collector.summary()
+        self.assertEqual(summary['queries'], 4)
+        self.assertEqual(len(summary['slowest']), 3)
+
+
+@override_settings(QUERY_INSTRUMENTATION={'LOG': False})
+class QueryInstrumentationMiddlewareTests(TestCase):
+    def setUp(self):
+        registry.reset()
+
+    def test_server_timing_header_and_metrics(self):
+        response = self.client.get('/admin/login/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('db;dur=', response['Server-Timing'])
+
+        self.assertEqual(self.client.get('/metrics/').status_code, 403)
+        with self.settings(QUERY_INSTRUMENTATION={'LOG': False, 'METRICS_TOKEN': 's3cret'}):
+            self.assertEqual(self.client.get('/metrics/', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+            metrics = self.client.get('/metrics/', HTTP_AUTHORIZATION='Bearer s3cret').content.decode()
+        self.assertIn('eventmarket_http_requests_total{view="admin:login"} 1', metrics)
+        self.assertIn('eventmarket_db_queries_per_request_count{view="admin:login"} 1', metrics)
+
+    @override_settings(QUERY_INSTRUMENTATION={'SAMPLE_RATE': 0.0})
+    def test_sampled_out_requests_are_not_instrumented(self):
+        response = self.client.get('/admin/login/')
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(QUERY_INSTRUMENTATION={'LOG': True})
+    def test_structured_log_line(self):
+        # по умолчанию логгер выключен — развёртывание включает его само
+        self.assertFalse(logger.isEnabledFor(logging.INFO))
+        with self.assertLogs('EventMarket.queries', 'INFO') as logs:
+            self.client.get('/admin/login/')
+        payload = json.loads(logs.records[0].getMessage())
+        self.assertEqual(payload['view'], 'admin:login')
+        self.assertEqual(payload['status'], 200)
+        self.assertIn('db_time_ms', payload)
+
+
+
+@cached_auth
+class AdminQueryBudgetTests(TestCase):
+    """
+    Каждая страница админки укладывается в фиксированное число SQL,
+    не зависящее от количества строк. Новая ModelAdmin без бюджета
+    или N+1 в list_display / list_filter / __str__ роняют тест.
+    """
+
+    # label модели: (changelist, форма изменения)
+    BUDGETS = {
+        'archive.archivedevent': (5, 4),
+        'auth.group':          (5, 3),
+        'bookings.booking':    (9, 7),
+        'core.city':           (5, 3),
+        'core.outboxconsumer': (5, 3),
+        'core.outboxentry':    (4, 3),
+        'core.specialty':      (5, 3),
+        'events.event':        (8, 5),
+        'hires.hire':          (9, 8),
+        'payments.ledgeraccount': (5, 3),
+        'payments.ledgerentry': (4, 3),
+        'payments.payment':    (7, 9),
+        'payments.paymentevent': (5, 3),
+        'reviews.review':      (8, 9),
+        'users.baseuser':      (7, 3),
+        'users.owner':         (5, 3),
+        'users.renter':        (5, 3),
+        'users.specialist':    (7, 3),
+        'venues.venue':        (9, 6),
+        'venues.venueimage':   (6, 4),
+    }
+
+    SMALL_SCALE = 1
+    LARGE_SCALE = 20     # > list_per_page строк в самых больших changelist
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = BaseUser.objects.create_superuser('admin@example.com', 'password')
+
+    def setUp(self):
+        self.client.force_login(self.admin_user)
+
+    def measure_all(self):
+        return {name: measure_page(self.client, url) for name, url in admin_pages()}
+
+    def assertWithinBudget(self, results):
+        for name, (status, queries, _elapsed) in results.items():
+            label, page = name.rsplit(':', 1)
+            budget = self.BUDGETS[label][0 if page == 'changelist' else 1]
+            with self.subTest(page=name):
+                self.assertEqual(status, 200)
+                self.assertLessEqual(queries, budget, f'{name}: {queries} SQL при бюджете {budget}')
+
+    def test_every_registered_admin_has_budget(self):
+        from django.contrib import admin
+        labels = {model._meta.label_lower for model in admin.site._registry}
+        self.assertEqual(labels, set(self.BUDGETS))
+
+    def test_query_count_does_not_grow_with_rows(self):
+        build_marketplace(self.SMALL_SCALE)
+        ledger.backfill()
+        # в архив — все завершённые мероприятия, чтобы была форма архивного
+        archiver.archive_events(archiver.cutoff_date(-365))
+        self.measure_all()              # прогрев кэшей ContentType и т.п.
+        small = self.measure_all()
+        self.assertWithinBudget(small)
+
+        build_marketplace(self.LARGE_SCALE, seed=1)
+        ledger.backfill()
+        archiver.archive_events(archiver.cutoff_date(-365))
+        large = self.measure_all()
+        self.assertWithinBudget(large)
+
+        for name, (_status, queries, _elapsed) in small.items():
+            if name.endswith(':changelist'):
+                with self.subTest(page=name):
+                    self.assertEqual(large[name][1], queries)
@@ -0,0 +1,80 @@
+# archive/admin.py
+import json
+
+from django.contrib import admin, messages
+from django.utils.html import format_html
+
+from core import lookup
+from core.admin import ShortIdSearchMixin
+
+from . import archiver
+from .models import ArchivedEvent, ArchivedRow
+
+
+class ArchivedRowInline(admin.TabularInline):
+    """Архивные брони / наймы / платежи / отзывы — только просмотр."""
+    model = ArchivedRow
+    fields = ['table_name', 'object_id', 'data_pretty']
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description='Данные')
+    def data_pretty(self, obj):
+        return format_html(
+            '<pre style="margin: 0; white-space: pre-wrap;">{}</pre>',
+            json.dumps(obj.data, ensure_ascii=False, indent=1),
+        )
+
+
+@admin.register(ArchivedEvent)
+class ArchivedEventAdmin(ShortIdSearchMixin, admin.ModelAdmin):
+    list_display = [
+        'short_id',
+        'title',
+        'date',
+        'status',
+        'bookings',
+        'hires',
+        'payments',
+        'paid_total',
+        'archived_at',
+    ]
+    list_display_links = ['short_id', 'title']
+    list_filter = ['status']
+    search_fields = ['title']
+    ordering = ['-date']
+    # строк в архиве много — точный COUNT(*) не нужен
+    show_full_result_count = False
+
+    readonly_fields = [
+        'id', 'renter_id', 'title', 'date', 'status',
+        'bookings', 'hires', 'payments', 'reviews', 'paid_total', 'archived_at', 'data',
+    ]
+    inlines = [ArchivedRowInline]
+    actions = ['restore_selected']
+
+    @admin.display(description='ID', ordering='id')
+    def short_id(self, obj):
+        return lookup.short_id(obj.id)
+
+    @admin.action(description='Вернуть из архива')
+    def restore_selected(self, request, queryset):
+        errors = []
+        restored = archiver.restore(queryset.values_list('pk', flat=True), errors)
+        if restored:
+            self.message_user(request, f"Восстановлено мероприятий: {restored}", messages.SUCCESS)
+        for pk, error in errors:
+            self.message_user(request, f"Мероприятие {lookup.short_id(pk)} осталось в архиве: {error}", messages.ERROR)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,231 @@
+# archive/archiver.py
+"""
+Перенос завершённых мероприятий в архив.
+
+Мероприятие ``completed`` / ``cancelled`` старше ``ARCHIVE_AFTER_DAYS``
+дней без платежей в ``pending`` переносится вместе со своим графом:
+брони, наймы, их платежи и отзывы. Каждая пачка — одна транзакция из
+нескольких ``WITH moved AS (DELETE ... RETURNING to_jsonb(...)) INSERT``:
+строки уходят из горячих таблиц и ложатся в ``ArchivedRow`` целиком,
+на месте мероприятия остаётся надгробие ``ArchivedEvent`` с итогами.
+Мероприятия пачки берутся ``FOR UPDATE SKIP LOCKED``, поэтому
+архивировать можно в несколько процессов.
+
+Что остаётся как было:
+
+* проводки леджера (ссылаются на платёж по id, без FK) и балансы;
+* агрегаты рейтингов — ``recompute_ratings`` учитывает архивные отзывы.
+
+``restore`` возвращает граф обратно (``jsonb_populate_record``) — например,
+из админки по требованию; мероприятие, граф которого нарушает ограничения
+БД, остаётся в архиве. Эффект на горячий набор показывает
+``table_sizes``: живые и мёртвые строки, размер таблиц и индексов.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import GeneratedField
+from django.utils import timezone
+
+from bookings.models import Booking
+from events.models import Event
+from hires.models import Hire
+from payments.models import Payment
+from reviews.models import Review
+
+from .models import ArchivedEvent, ArchivedRow
+
+EVENT_STATUSES = ('completed', 'cancelled')
+
+# Порядок восстановления: сначала родители
+MODELS = [Booking, Hire, Payment, Review]
+
+HOT_MODELS = [Event, *MODELS]
+
+
+def _table(model):
+    return connection.ops.quote_name(model._meta.db_table)
+
+
+def cutoff_date(days=None):
+    if days is None:
+        days = getattr(settings, 'ARCHIVE_AFTER_DAYS', 180)
+    return timezone.now().date() - timedelta(days=days)
+
+
+def _eligible_sql():
+    event, booking, hire, payment = _table(Event), _table(Booking), _table(Hire), _table(Payment)
+    return f'''
+        SELECT e.id FROM {event} e
+        WHERE e.status = ANY(%(statuses)s) AND e.date < %(cutoff)s
+          AND NOT EXISTS (
+              SELECT 1 FROM {booking} b JOIN {payment} p ON p.booking_id = b.id
+              WHERE b.event_id = e.id AND p.status = 'pending')
+          AND NOT EXISTS (
+              SELECT 1 FROM {hire} h JOIN {payment} p ON p.hire_id = h.id
+              WHERE h.event_id = e.id AND p.status = 'pending')
+    '''
+
+
+def eligible_count(cutoff):
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT count(*) FROM ({_eligible_sql()}) e',
+                       {'statuses': list(EVENT_STATUSES), 'cutoff': cutoff})
+        return cursor.fetchone()[0]
+
+
+def _moves():
+    """``(таблица, DELETE ... RETURNING event_id, object_id, data)`` — от листьев к корню."""
+    booking, hire, payment, review = _table(Booking), _table(Hire), _table(Payment), _table(Review)
+    via = {
+        'booking': f'USING {booking} t WHERE x.booking_id = t.id AND t.event_id = ANY(%(ids)s)',
+        'hire': f'USING {hire} t WHERE x.hire_id = t.id AND t.event_id = ANY(%(ids)s)',
+    }
+    moves = []
+    for model in (Review, Payment):
+        for parent in ('booking', 'hire'):
+            moves.append((model, f'DELETE FROM {_table(model)} x {via[parent]} '
+                                 f'RETURNING t.event_id, x.id::text, to_jsonb(x)'))
+    for model in (Booking, Hire):
+        moves.append((model, f'DELETE FROM {_table(model)} x WHERE x.event_id = ANY(%(ids)s) '
+                             f'RETURNING x.event_id, x.id::text, to_jsonb(x)'))
+    return moves
+
+
+def archive_batch(cutoff, batch_size=500):
+    """Переносит одну пачку мероприятий; возвращает их число."""
+    archived_event, archived_row = _table(ArchivedEvent), _table(ArchivedRow)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f'{_eligible_sql()} ORDER BY e.date LIMIT %(limit)s FOR UPDATE OF e SKIP LOCKED',
+            {'statuses': list(EVENT_STATUSES), 'cutoff': cutoff, 'limit': batch_size},
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+        if not ids:
+            return 0
+        params = {'ids': ids}
+        # FK архивных строк на надгробие отложенный (DEFERRABLE INITIALLY
+        # DEFERRED), поэтому надгробия вставляются последними — сразу с итогами
+        for model, delete in _moves():
+            cursor.execute(f'''
+                WITH moved (event_id, object_id, data) AS ({delete})
+                INSERT INTO {archived_row} (event_id, table_name, object_id, data)
+                SELECT event_id, %(table)s, object_id, data FROM moved
+            ''', {**params, 'table': model._meta.db_table})
+        cursor.execute(f'''
+            WITH moved AS (DELETE FROM {_table(Event)} e WHERE e.id = ANY(%(ids)s) RETURNING e.*)
+            INSERT INTO {archived_event} (id, renter_id, title, date, status,
+                                          bookings, hires, payments, reviews, paid_total, data, archived_at)
+            SELECT e.id, e.renter_id, e.title, e.date, e.status,
+                   coalesce(c.bookings, 0), coalesce(c.hires, 0), coalesce(c.payments, 0),
+                   coalesce(c.reviews, 0), coalesce(c.paid_total, 0), to_jsonb(e), now()
+            FROM moved e LEFT JOIN (
+                SELECT event_id,
+                       count(*) FILTER (WHERE table_name = %(booking)s) AS bookings,
+                       count(*) FILTER (WHERE table_name = %(hire)s) AS hires,
+                       count(*) FILTER (WHERE table_name = %(payment)s) AS payments,
+                       count(*) FILTER (WHERE table_name = %(review)s) AS reviews,
+                       sum((data ->> 'amount')::numeric) FILTER (
+                           WHERE table_name = %(payment)s AND data ->> 'status' = 'succeeded') AS paid_total
+                FROM {archived_row} WHERE event_id = ANY(%(ids)s)
+                GROUP BY event_id
+            ) c ON c.event_id = e.id
+        ''', {
+            **params, 'booking': Booking._meta.db_table, 'hire': Hire._meta.db_table,
+            'payment': Payment._meta.db_table, 'review': Review._meta.db_table,
+        })
+    return len(ids)
+
+
+def archive_events(cutoff, batch_size=500, max_batches=None):
+    """Архивирует пачками до конца (или ``max_batches`` пачек); возвращает число мероприятий."""
+    total = batches = 0
+    while max_batches is None or batches < max_batches:
+        archived = archive_batch(cutoff, batch_size)
+        if not archived:
+            break
+        total += archived
+        batches += 1
+    return total
+
+
+def _insert_columns(model):
+    return [
+        field.column for field in model._meta.concrete_fields
+        if not isinstance(field, GeneratedField)
+    ]
+
+
+def restore(event_ids, errors=None):
+    """
+    Возвращает мероприятия с их графом в горячие таблицы и удаляет
+    надгробия; возвращает число восстановленных мероприятий.
+
+    Каждое мероприятие — в своей точке сохранения: граф, который уже не
+    помещается в горячие таблицы (удалена площадка, появился NOT NULL),
+    остаётся в архиве, а ``(id, текст ошибки)`` добавляется в ``errors``.
+    """
+    event_ids = list(event_ids)
+    archived_event, archived_row = _table(ArchivedEvent), _table(ArchivedRow)
+    q = connection.ops.quote_name
+    sources = [(Event, f'SELECT data FROM {archived_event} WHERE id = %(id)s')]
+    sources += [
+        (model, f'SELECT data FROM {archived_row} WHERE event_id = %(id)s AND table_name = %(table)s')
+        for model in MODELS
+    ]
+    restored = 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT id FROM {archived_event} WHERE id = ANY(%s) ORDER BY id FOR UPDATE', [event_ids]
+        )
+        for (pk,) in cursor.fetchall():
+            try:
+                with transaction.atomic():
+                    for model, source in sources:
+                        columns = ', '.join(q(column) for column in _insert_columns(model))
+                        cursor.execute(f'''
+                            INSERT INTO {_table(model)} ({columns})
+                            SELECT r.{columns.replace(', ', ', r.')}
+                            FROM ({source}) a, jsonb_populate_record(NULL::{_table(model)}, a.data) r
+                        ''', {'id': pk, 'table': model._meta.db_table})
+                    # FK отложены до COMMIT — проверяются здесь, пока точка сохранения открыта
+                    connection.check_constraints()
+                    cursor.execute(f'DELETE FROM {archived_row} WHERE event_id = %s', [pk])
+                    cursor.execute(f'DELETE FROM {archived_event} WHERE id = %s', [pk])
+            except IntegrityError as exc:
+                if errors is not None:
+                    errors.append((pk, str(exc).splitlines()[0]))
+            else:
+                restored += 1
+    return restored
+
+
+# ────────────────────────────────────────────────
+# Отчёт о размерах
+# ────────────────────────────────────────────────
+
+def table_sizes(models=None):
+    """
+    ``[(таблица, живых строк, мёртвых строк, байт таблицы, байт индексов)]``
+    по статистике PostgreSQL (``pg_stat_user_tables``).
+    """
+    models = models or [*HOT_MODELS, ArchivedEvent, ArchivedRow]
+    tables = [model._meta.db_table for model in models]
+    with connection.cursor() as cursor:
+        cursor.execute('''
+            SELECT t.name, coalesce(s.n_live_tup, 0), coalesce(s.n_dead_tup, 0),
+                   pg_table_size(c.oid), pg_indexes_size(c.oid)
+            FROM unnest(%s::text[]) WITH ORDINALITY t (name, n)
+            JOIN pg_class c ON c.oid = to_regclass(quote_ident(t.name))
+            LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+            ORDER BY t.n
+        ''', [tables])
+        return cursor.fetchall()
+
+
+def vacuum(models=None):
+    """``VACUUM (ANALYZE)`` горячих таблиц: освобождённое место переиспользуется, статистика свежая."""
+    with connection.cursor() as cursor:
+        for model in models or HOT_MODELS:
+            cursor.execute(f'VACUUM (ANALYZE) {_table(model)}')
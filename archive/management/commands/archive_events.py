@@ -0,0 +1,60 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from archive.archiver import archive_events, cutoff_date, eligible_count, restore, table_sizes, vacuum
+
+
+def _mb(size):
+    return f'{size / 1024 / 1024:,.1f} МБ'
+
+
+class Command(BaseCommand):
+    help = (
+        "Переносит завершённые и отменённые мероприятия старше ARCHIVE_AFTER_DAYS "
+        "вместе с бронями, наймами, платежами и отзывами в архив"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, default=None,
+                            help="по умолчанию ARCHIVE_AFTER_DAYS")
+        parser.add_argument('--batch-size', type=int, default=500, help="мероприятий в транзакции")
+        parser.add_argument('--max-batches', type=int, default=None)
+        parser.add_argument('--dry-run', action='store_true', help="только посчитать, что попадёт в архив")
+        parser.add_argument('--vacuum', action='store_true',
+                            help="VACUUM (ANALYZE) горячих таблиц после переноса")
+        parser.add_argument('--restore', nargs='+', metavar='EVENT_ID', default=None,
+                            help="вернуть мероприятия из архива")
+
+    def report(self, title, sizes):
+        self.stdout.write(title)
+        for table, live, dead, heap, indexes in sizes:
+            self.stdout.write(
+                f"  {table:24} строк {live:>12,}  мёртвых {dead:>10,}  "
+                f"таблица {_mb(heap):>12}  индексы {_mb(indexes):>12}"
+            )
+
+    def handle(self, *args, **options):
+        if options['restore']:
+            errors = []
+            restored = restore(options['restore'], errors)
+            self.stdout.write(f"Восстановлено мероприятий: {restored}")
+            for pk, error in errors:
+                self.stderr.write(f"Осталось в архиве {pk}: {error}")
+            return
+
+        cutoff = cutoff_date(options['older_than_days'])
+        if options['dry_run']:
+            self.stdout.write(f"К архивации (до {cutoff}): {eligible_count(cutoff):,} мероприятий")
+            return
+
+        self.report("До:", table_sizes())
+        started = time.perf_counter()
+        archived = archive_events(cutoff, options['batch_size'], options['max_batches'])
+        self.stdout.write(
+            f"В архив перенесено мероприятий: {archived:,} (до {cutoff}) "
+            f"за {time.perf_counter() - started:.1f} с"
+        )
+        if options['vacuum']:
+            vacuum()
+        self.report("После:", table_sizes())
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.9 on 2026-10-19 03:03
+
+import django.db.models.deletion
+import django.db.models.functions.datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedEvent',
+            fields=[
+                ('id', models.UUIDField(primary_key=True, serialize=False, verbose_name='id мероприятия')),
+                ('renter_id', models.UUIDField(db_index=True, verbose_name='id организатора')),
+                ('title', models.CharField(max_length=200, verbose_name='название мероприятия')),
+                ('date', models.DateField(verbose_name='дата проведения')),
+                ('status', models.CharField(choices=[('draft', 'черновик'), ('planned', 'запланировано'), ('active', 'идёт подготовка'), ('ongoing', 'проходит сейчас'), ('completed', 'завершено'), ('cancelled', 'отменено')], max_length=20, verbose_name='статус')),
+                ('bookings', models.PositiveIntegerField(default=0, verbose_name='броней')),
+                ('hires', models.PositiveIntegerField(default=0, verbose_name='наймов')),
+                ('payments', models.PositiveIntegerField(default=0, verbose_name='платежей')),
+                ('reviews', models.PositiveIntegerField(default=0, verbose_name='отзывов')),
+                ('paid_total', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='оплачено')),
+                ('data', models.JSONField(verbose_name='строка мероприятия')),
+                ('archived_at', models.DateTimeField(db_default=django.db.models.functions.datetime.Now(), verbose_name='перенесено в архив')),
+            ],
+            options={
+                'verbose_name': 'архивное мероприятие',
+                'verbose_name_plural': 'архивные мероприятия',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedRow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('table_name', models.CharField(max_length=63, verbose_name='таблица')),
+                ('object_id', models.CharField(max_length=64, verbose_name='id строки')),
+                ('data', models.JSONField(verbose_name='строка')),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rows', to='archive.archivedevent', verbose_name='мероприятие')),
+            ],
+            options={
+                'verbose_name': 'архивная строка',
+                'verbose_name_plural': 'архивные строки',
+                'constraints': [models.UniqueConstraint(fields=('table_name', 'object_id'), name='archived_row_object_uniq')],
+            },
+        ),
+    ]
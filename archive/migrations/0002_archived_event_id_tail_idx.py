@@ -0,0 +1,22 @@
+# Generated by Django 5.2.9 on 2026-10-19 03:07
+
+import django.db.models.functions.comparison
+import django.db.models.functions.text
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Индекс по «хвосту» id строится CONCURRENTLY — таблица не блокируется на запись
+    atomic = False
+
+    dependencies = [
+        ('archive', '0001_initial'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='archivedevent',
+            index=models.Index(django.db.models.functions.text.Right(django.db.models.functions.comparison.Cast('id', models.TextField()), 8), name='archived_event_id_tail_idx'),
+        ),
+    ]
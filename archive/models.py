@@ -0,0 +1,69 @@
+# archive/models.py
+from django.db import models
+from django.db.models.functions import Now
+from django.utils.translation import gettext_lazy as _
+
+from core.ids import tail_index
+from events.models import Event
+
+
+class ArchivedEvent(models.Model):
+    """
+    «Надгробие» мероприятия, перенесённого в архив (``archive/archiver.py``):
+    ключевые поля и итоги, чтобы найти его без разбора архивных строк.
+    Сама строка мероприятия — в ``data``.
+    """
+    id = models.UUIDField(_("id мероприятия"), primary_key=True)
+    renter_id = models.UUIDField(_("id организатора"), db_index=True)
+    title = models.CharField(_("название мероприятия"), max_length=200)
+    date = models.DateField(_("дата проведения"))
+    status = models.CharField(_("статус"), max_length=20, choices=Event.STATUS_CHOICES)
+
+    bookings = models.PositiveIntegerField(_("броней"), default=0)
+    hires = models.PositiveIntegerField(_("наймов"), default=0)
+    payments = models.PositiveIntegerField(_("платежей"), default=0)
+    reviews = models.PositiveIntegerField(_("отзывов"), default=0)
+    paid_total = models.DecimalField(_("оплачено"), max_digits=12, decimal_places=2, default=0)
+
+    data = models.JSONField(_("строка мероприятия"))
+    archived_at = models.DateTimeField(_("перенесено в архив"), db_default=Now())
+
+    class Meta:
+        verbose_name = _("архивное мероприятие")
+        verbose_name_plural = _("архивные мероприятия")
+        ordering = ['-date']
+        indexes = [
+            # короткий код в админке (core/lookup.py)
+            tail_index('archived_event_id_tail_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.title} ({self.date}) — архив"
+
+
+class ArchivedRow(models.Model):
+    """
+    Строка брони / найма / платежа / отзыва архивного мероприятия —
+    целиком, как ``to_jsonb`` строки таблицы (большие значения PostgreSQL
+    хранит сжатыми в TOAST).
+    """
+    event = models.ForeignKey(
+        ArchivedEvent,
+        on_delete=models.CASCADE,
+        related_name='rows',
+        verbose_name=_("мероприятие")
+    )
+    table_name = models.CharField(_("таблица"), max_length=63)
+    object_id = models.CharField(_("id строки"), max_length=64)
+    data = models.JSONField(_("строка"))
+
+    class Meta:
+        verbose_name = _("архивная строка")
+        verbose_name_plural = _("архивные строки")
+        constraints = [
+            # заодно индекс для выборок «все архивные строки таблицы»
+            models.UniqueConstraint(fields=['table_name', 'object_id'], name='archived_row_object_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.table_name} {self.object_id}"
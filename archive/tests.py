@@ -0,0 +1,118 @@
+import uuid
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from bookings.models import Booking
+from events.models import Event
+from EventMarket.testing import build_marketplace
+from hires.models import Hire
+from payments import ledger
+from payments.models import Payment
+from reviews import ratings
+from reviews.models import Review
+from users.models import BaseUser
+
+from . import archiver
+from .models import ArchivedEvent, ArchivedRow
+
+
+def snapshot(event_ids):
+    """Графы мероприятий как словари полей — для сравнения до и после."""
+    return {
+        model._meta.label: list(queryset.order_by('pk').values())
+        for model, queryset in [
+            (Event, Event.objects.filter(pk__in=event_ids)),
+            (Booking, Booking.objects.filter(event__in=event_ids)),
+            (Hire, Hire.objects.filter(event__in=event_ids)),
+            (Payment, Payment.objects.filter(booking__event__in=event_ids)
+                | Payment.objects.filter(hire__event__in=event_ids)),
+            (Review, Review.objects.filter(booking__event__in=event_ids)
+                | Review.objects.filter(hire__event__in=event_ids)),
+        ]
+    }
+
+
+class ArchiveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        build_marketplace(4)
+        ledger.backfill()
+        old = timezone.now().date() - timedelta(days=400)
+        events = list(Event.objects.order_by('pk')[:8])
+        cls.old_ids = [event.pk for event in events]
+        Event.objects.filter(pk__in=cls.old_ids).update(status='completed', date=old)
+        Payment.objects.filter(status='pending').update(status='failed')
+        # у одного старого мероприятия платёж ещё не завершён — остаётся в горячих таблицах
+        cls.in_flight = events[0].pk
+        Payment.objects.filter(booking__event=cls.in_flight).update(status='pending')
+        cls.cutoff = archiver.cutoff_date()
+
+    def test_archive_moves_graph_and_restore_brings_it_back(self):
+        moved = [pk for pk in self.old_ids if pk != self.in_flight]
+        before = snapshot(moved)
+        paid = sum(row['amount'] for row in before['payments.Payment'] if row['status'] == 'succeeded')
+
+        self.assertEqual(archiver.archive_events(self.cutoff, batch_size=3), len(moved))
+        self.assertEqual(archiver.archive_batch(self.cutoff), 0)
+
+        self.assertFalse(Event.objects.filter(pk__in=moved).exists())
+        self.assertTrue(Event.objects.filter(pk=self.in_flight).exists())
+        self.assertTrue(all(rows == [] for rows in snapshot(moved).values()))
+        self.assertEqual(ArchivedEvent.objects.count(), len(moved))
+        self.assertEqual(
+            sum(ArchivedEvent.objects.values_list('bookings', flat=True)), len(before['bookings.Booking'])
+        )
+        self.assertEqual(ArchivedRow.objects.filter(table_name='payments_payment').count(),
+                         len(before['payments.Payment']))
+        self.assertEqual(sum(ArchivedEvent.objects.values_list('paid_total', flat=True)), paid)
+
+        # леджер и рейтинги не замечают переноса
+        self.assertEqual(ledger.verify_shard(0, 1), ([], []))
+        for kind in ratings.PROFILES:
+            ratings.recompute_shard(kind, 0, 1)
+        archiver.restore(moved)
+        for kind in ratings.PROFILES:
+            self.assertEqual(ratings.recompute_shard(kind, 0, 1), 0)
+
+        self.assertEqual(snapshot(moved), before)
+        self.assertFalse(ArchivedEvent.objects.exists())
+        self.assertFalse(ArchivedRow.objects.exists())
+
+    def test_restore_skips_graphs_that_violate_constraints(self):
+        moved = [pk for pk in self.old_ids if pk != self.in_flight]
+        archiver.archive_events(self.cutoff)
+        broken_fk, broken_null, *intact = moved
+        row = ArchivedRow.objects.filter(event_id=broken_fk, table_name=Booking._meta.db_table).first()
+        row.data['venue_id'] = str(uuid.uuid4())
+        row.save(update_fields=['data'])
+        tombstone = ArchivedEvent.objects.get(pk=broken_null)
+        tombstone.data['title'] = None
+        tombstone.save(update_fields=['data'])
+
+        self.client.force_login(BaseUser.objects.create_superuser('staff@example.com', 'password'))
+        response = self.client.post('/admin/archive/archivedevent/', {
+            'action': 'restore_selected', '_selected_action': moved,
+        }, follow=True)
+        self.assertEqual(response.status_code, 200)
+        levels = sorted((m.level_tag, str(m)) for m in response.context['messages'])
+        self.assertEqual([level for level, _text in levels], ['error', 'error', 'success'])
+        self.assertIn(f"Восстановлено мероприятий: {len(intact)}", levels[-1][1])
+        self.assertEqual(set(ArchivedEvent.objects.values_list('pk', flat=True)), {broken_fk, broken_null})
+        self.assertEqual(Event.objects.filter(pk__in=moved).count(), len(intact))
+        self.assertFalse(Booking.objects.filter(event=broken_fk).exists())
+
+    def test_command_reports_table_sizes(self):
+        out = StringIO()
+        call_command('archive_events', '--dry-run', stdout=out)
+        self.assertIn(f"{len(self.old_ids) - 1:,} мероприятий", out.getvalue())
+
+        out = StringIO()
+        call_command('archive_events', stdout=out)
+        self.assertIn('После:', out.getvalue())
+        self.assertIn(f"{Event._meta.db_table}", out.getvalue())
+        tables = {table for table, *_sizes in archiver.table_sizes()}
+        self.assertIn(ArchivedRow._meta.db_table, tables)
@@ -4,11 +4,15 @@ from django.utils.html import format_html
 from django.urls import reverse
 from django.utils import timezone
 
+from core import lookup
+from core.admin import DatabaseCascadeDeleteMixin, ShortIdSearchMixin
+from users.filters import ProfileListFilter
+
 from .models import Booking
 
 
 @admin.register(Booking)
-class BookingAdmin(admin.ModelAdmin):
+class BookingAdmin(ShortIdSearchMixin, DatabaseCascadeDeleteMixin, admin.ModelAdmin):
     list_display = [
         'short_id',
         'event_title',
@@ -27,20 +31,20 @@ class BookingAdmin(admin.ModelAdmin):
         'status',
         'created_at',
         'venue',
-        'renter',
+        ('renter', ProfileListFilter),
     ]
     
     search_fields = [
         'event__title',
         'venue__name',
         'renter__user__email',
-        'renter__user__first_name',
-        'renter__user__last_name',
     ]
     
     date_hierarchy = 'start_datetime'
     
-    readonly_fields = ['created_at', 'updated_at', 'duration_hours']
+    readonly_fields = ['created_at', 'updated_at', 'duration_hours', 'recurrence_until', 'series_ends_at']
+    
+    autocomplete_fields = ['event', 'venue', 'renter']
     
     fieldsets = (
         (None, {
@@ -49,8 +53,12 @@ class BookingAdmin(admin.ModelAdmin):
         ('Период и длительность', {
             'fields': ('start_datetime', 'end_datetime', 'duration_hours')
         }),
+        ('Повторение', {
+            'fields': ('recurrence', 'recurrence_exdates', ('recurrence_until', 'series_ends_at')),
+            'classes': ('collapse',)
+        }),
         ('Финансы и статус', {
-            'fields': ('total_price', 'status')
+            'fields': ('total_price', 'status', 'hold_expires_at')
         }),
         ('Служебная информация', {
             'fields': ('created_at', 'updated_at'),
@@ -66,7 +74,7 @@ class BookingAdmin(admin.ModelAdmin):
     
     @admin.display(description='ID', ordering='id')
     def short_id(self, obj):
-        return str(obj.id)[:8].upper()
+        return lookup.short_id(obj.id)
     
     @admin.display(description='Мероприятие')
     def event_title(self, obj):
@@ -0,0 +1,348 @@
+# bookings/batch.py
+"""
+Пакетное бронирование площадок и специалистов (корпоративные заявки).
+
+Заявка — таблица строк: мероприятие арендатора, площадка *или*
+специалист, начало и окончание, необязательная цена. Конфликты
+проверяются не строкой за строкой, а множеством:
+
+* ссылки (slug / id площадки, email / id специалиста, id мероприятия)
+  разрешаются тремя запросами ``IN``;
+* строки площадок и специалистов блокируются в порядке pk — как в
+  ``BookingManager.place_hold``, поэтому параллельный checkout не займёт
+  проверенный слот;
+* корректные строки уходят одним ``COPY`` во временную таблицу, и один
+  запрос (``UNION ALL`` двух соединений по пересечению периодов) находит
+  все конфликты с БД: с занятыми слотами площадок (``booking_venue_slot_idx``)
+  и с наймами специалиста (``hire_specialist_slot_idx``); серии броней
+  (core/recurrence.py) в строки не развёрнуты — их занятия сверяются в
+  Python, по одному запросу на заявку;
+* пересечения строк заявки между собой разбираются после этого, по
+  порядку строк: строка конфликтует только с более ранними строками,
+  которые действительно будут созданы (``_overlaps``);
+* цена строки без ``price`` — по правилам цены площадки
+  (``venues/pricing.py``), правила всех площадок заявки — одной загрузкой;
+* строки без конфликтов создаются ``bulk_create`` в той же транзакции —
+  брони и наймы со статусом ``pending`` (заявка держит слот до решения).
+
+Результат — отчёт по каждой строке (``REPORT_COLUMNS``).
+"""
+import uuid
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from events.models import Event
+from hires.models import BLOCKING_STATUSES as HIRE_BLOCKING_STATUSES, Hire
+from users.models import Specialist
+from venues import pricing
+from venues.models import Venue
+
+from .models import BLOCKING_STATUSES, Booking
+
+COLUMNS = ['event', 'venue', 'specialist', 'start', 'end', 'price']
+
+REPORT_COLUMNS = ['line', 'result', 'kind', 'target', 'start', 'end', 'created_id', 'problems']
+
+RESULTS = ['created', 'valid', 'conflict', 'invalid']
+
+# Тексты конфликтов по коду; {} — бронь, найм или строка, с которой пересёкся слот
+PROBLEMS = {
+    'venue_busy': "площадка занята (бронь {})",
+    'specialist_busy': "специалист занят (найм {})",
+    'overlaps_line': "пересекается со строкой {}",   # только с принятой строкой
+}
+
+
+class BatchError(ValueError):
+    pass
+
+
+@dataclass
+class Row:
+    line: int
+    data: dict
+    kind: str = None            # 'venue' | 'specialist'
+    event_id: object = None
+    target_id: object = None    # id площадки или специалиста
+    start: object = None
+    end: object = None
+    price: Decimal = None
+    problems: list = field(default_factory=list)     # строка некорректна
+    conflicts: list = field(default_factory=list)    # слот занят
+    created_id: object = None
+
+    @property
+    def result(self):
+        if self.created_id is not None:
+            return 'created'
+        if self.problems:
+            return 'invalid'
+        return 'conflict' if self.conflicts else 'valid'
+
+    def report(self):
+        return [
+            self.line, self.result, self.kind or '', self.data.get(self.kind or '', ''),
+            self.data.get('start', ''), self.data.get('end', ''),
+            '' if self.created_id is None else self.created_id, '; '.join(self.problems + self.conflicts),
+        ]
+
+
+@dataclass
+class Report:
+    rows: list
+
+    def counts(self):
+        counts = dict.fromkeys(RESULTS, 0)
+        for row in self.rows:
+            counts[row.result] += 1
+        return counts
+
+
+# ────────────────────────────────────────────────
+# Разбор строк
+# ────────────────────────────────────────────────
+
+def _value(data, key):
+    return (data.get(key) or '').strip()
+
+
+def _datetime(value):
+    parsed = parse_datetime(value)
+    if parsed is not None and timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _price(value):
+    """Цена строки → ``(Decimal, None)`` или ``(None, причина)``: она должна поместиться в ``total_price``."""
+    field = Booking._meta.get_field('total_price')
+    try:
+        price = Decimal(value.replace(' ', '').replace(',', '.'))
+    except InvalidOperation:
+        return None, "цена — число"
+    if not price.is_finite():
+        return None, "цена — число"
+    if price < 0:
+        return None, "цена не может быть отрицательной"
+    if price != price.quantize(Decimal(1).scaleb(-field.decimal_places)):
+        return None, f"у цены не больше {field.decimal_places} знаков после запятой"
+    if price >= Decimal(10) ** (field.max_digits - field.decimal_places):
+        return None, "цена слишком большая"
+    return price, None
+
+
+def parse(records, first_line=2):
+    """Словари колонок ``COLUMNS`` (``csv.DictReader``, JSON) → ``Row``; ошибки формата — в ``problems``."""
+    rows = []
+    for line, data in enumerate(records, start=first_line):
+        data = {key: str(value if value is not None else '').strip() for key, value in data.items() if key}
+        row = Row(line, data)
+        venue, specialist = _value(data, 'venue'), _value(data, 'specialist')
+        if bool(venue) == bool(specialist):
+            row.problems.append("нужна либо площадка, либо специалист")
+        else:
+            row.kind = 'venue' if venue else 'specialist'
+        start, end = _datetime(_value(data, 'start')), _datetime(_value(data, 'end'))
+        if start is None or end is None:
+            row.problems.append("начало и окончание — дата и время ISO 8601")
+        elif end <= start:
+            row.problems.append("окончание раньше начала")
+        else:
+            row.start, row.end = start, end
+        if _value(data, 'price'):
+            row.price, problem = _price(_value(data, 'price'))
+            if problem:
+                row.problems.append(problem)
+        rows.append(row)
+    return rows
+
+
+def _uuids(values):
+    result = set()
+    for value in values:
+        try:
+            result.add(uuid.UUID(value))
+        except ValueError:
+            pass
+    return result
+
+
+def resolve(rows, renter):
+    """Ссылки строк → id; три запроса на всю заявку (и до двух — правила цены площадок)."""
+    refs = {'event': set(), 'venue': set(), 'specialist': set()}
+    for row in rows:
+        refs['event'].add(_value(row.data, 'event'))
+        if row.kind:
+            refs[row.kind].add(_value(row.data, row.kind))
+
+    events = {
+        str(pk): pk for pk in
+        Event.objects.filter(pk__in=_uuids(refs['event']), renter=renter).values_list('pk', flat=True)
+    }
+    venues = {}
+    for pk, slug in Venue.objects.filter(
+        Q(slug__in=refs['venue']) | Q(pk__in=_uuids(refs['venue'])), status='published',
+    ).values_list('pk', 'slug'):
+        venues[str(pk)] = venues[slug] = pk
+    tariffs = pricing.tariffs(set(venues.values()))
+    specialists = {}
+    for pk, email in Specialist.objects.filter(
+        Q(user__email__in=refs['specialist']) | Q(pk__in=_uuids(refs['specialist']))
+    ).values_list('pk', 'user__email'):
+        specialists[str(pk)] = specialists[email] = pk
+
+    for row in rows:
+        row.event_id = events.get(_value(row.data, 'event'))
+        if row.event_id is None:
+            row.problems.append("мероприятие не найдено у арендатора")
+        if row.kind is None:
+            continue
+        ref = _value(row.data, row.kind)
+        target = (venues if row.kind == 'venue' else specialists).get(ref)
+        if target is None:
+            row.problems.append("площадка не найдена или не опубликована" if row.kind == 'venue'
+                                else "специалист не найден")
+            continue
+        row.target_id = target
+        if row.price is None and row.kind == 'venue' and row.start is not None:
+            row.price = tariffs[target].quote(row.start, row.end)
+
+
+# ────────────────────────────────────────────────
+# Проверка конфликтов
+# ────────────────────────────────────────────────
+
+def _conflicts(rows, now):
+    """Конфликты с БД: один COPY во временную таблицу и один запрос; ``[(строка, код, id)]``."""
+    q = connection.ops.quote_name
+    bookings, hires = q(Booking._meta.db_table), q(Hire._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'CREATE TEMP TABLE batch_slots (line int, venue_id uuid, specialist_id uuid, '
+            'starts timestamptz, ends timestamptz) ON COMMIT DROP'
+        )
+        with cursor.cursor.copy('COPY batch_slots FROM STDIN') as copy:
+            for row in rows:
+                copy.write_row([
+                    row.line,
+                    row.target_id if row.kind == 'venue' else None,
+                    row.target_id if row.kind == 'specialist' else None,
+                    row.start, row.end,
+                ])
+        cursor.execute('ANALYZE batch_slots')
+        overlap = '{0}.start_datetime < s.ends AND {0}.end_datetime > s.starts'
+        cursor.execute(f'''
+            SELECT s.line, 'venue_busy', b.id::text
+            FROM batch_slots s JOIN {bookings} b ON b.venue_id = s.venue_id AND {overlap.format('b')}
+            WHERE b.status = ANY(%(booking_statuses)s) AND b.recurrence = ''
+              AND (b.status <> 'pending' OR b.hold_expires_at IS NULL OR b.hold_expires_at > %(now)s)
+            UNION ALL
+            SELECT s.line, 'specialist_busy', h.id::text
+            FROM batch_slots s JOIN {hires} h ON h.specialist_id = s.specialist_id AND {overlap.format('h')}
+            WHERE h.status = ANY(%(hire_statuses)s)
+            ORDER BY 1, 2, 3
+        ''', {
+            'booking_statuses': list(BLOCKING_STATUSES),
+            'hire_statuses': list(HIRE_BLOCKING_STATUSES),
+            'now': now,
+        })
+        return cursor.fetchall()
+
+
+def _series_conflicts(rows, now):
+    """Занятия серий площадок против строк заявки: ``[(строка, код, id)]``."""
+    venue_rows = [row for row in rows if row.kind == 'venue']
+    if not venue_rows:
+        return []
+    by_venue = {}
+    for row in venue_rows:
+        by_venue.setdefault(row.target_id, []).append(row)
+    start, end = min(row.start for row in venue_rows), max(row.end for row in venue_rows)
+    series = (
+        Booking.objects.filter(venue_id__in=by_venue).exclude(recurrence='').blocking(now)
+        .overlapping(start, end).order_by()
+        .only('venue_id', 'start_datetime', 'end_datetime', 'recurrence', 'recurrence_exdates')
+    )
+    conflicts = []
+    for booking in series:
+        for row in by_venue[booking.venue_id]:
+            if next(booking.occurrences(row.start, row.end), None) is not None:
+                conflicts.append((row.line, 'venue_busy', str(booking.pk)))
+    return sorted(conflicts)
+
+
+def _overlaps(rows):
+    """
+    Пересечения строк заявки: по порядку строк, только с уже принятыми —
+    строка, отклонённая из-за БД или соседки, следующих не выбивает.
+    Принятые слоты одной цели не пересекаются, поэтому держатся
+    отсортированными, и пересекающиеся находятся двумя ``bisect``.
+    """
+    accepted = {}   # (вид, цель) → (начала, окончания, строки)
+    conflicts = []
+    for row in sorted(rows, key=lambda row: row.line):
+        if row.conflicts:
+            continue
+        starts, ends, lines = accepted.setdefault((row.kind, row.target_id), ([], [], []))
+        first, last = bisect_right(ends, row.start), bisect_left(starts, row.end)
+        if first < last:
+            conflicts += [(row.line, 'overlaps_line', str(line)) for line in sorted(lines[first:last])]
+            continue
+        starts.insert(first, row.start)
+        ends.insert(first, row.end)
+        lines.insert(first, row.line)
+    return conflicts
+
+
+def book(renter, records, dry_run=False, first_line=2):
+    """
+    Заявка арендатора ``renter`` → ``Report``. Строки без проблем создаются
+    (при ``dry_run`` — только проверяются), остальные остаются в отчёте
+    с причинами. Всё — одна транзакция.
+    """
+    rows = parse(records, first_line)
+    if not rows:
+        raise BatchError("В заявке нет строк")
+    resolve(rows, renter)
+    now = timezone.now()
+    with transaction.atomic():
+        candidates = [row for row in rows if not row.problems]
+        # тот же порядок блокировок, что у place_hold: сначала площадки
+        for model, kind in ((Venue, 'venue'), (Specialist, 'specialist')):
+            ids = sorted({row.target_id for row in candidates if row.kind == kind})
+            if ids:
+                list(model.objects.select_for_update().filter(pk__in=ids).order_by('pk').values_list('pk'))
+        if candidates:
+            by_line = {row.line: row for row in candidates}
+            for line, code, other in _conflicts(candidates, now) + _series_conflicts(candidates, now):
+                by_line[line].conflicts.append(PROBLEMS[code].format(other))
+            for line, code, other in _overlaps(candidates):
+                by_line[line].conflicts.append(PROBLEMS[code].format(other))
+
+        valid = [row for row in candidates if not row.conflicts]
+        if valid and not dry_run:
+            _create(renter, valid)
+    return Report(rows)
+
+
+def _create(renter, rows):
+    bookings = [row for row in rows if row.kind == 'venue']
+    hires = [row for row in rows if row.kind == 'specialist']
+    created = Booking.objects.bulk_create([
+        Booking(event_id=row.event_id, venue_id=row.target_id, renter=renter, start_datetime=row.start,
+                end_datetime=row.end, total_price=row.price, status='pending')
+        for row in bookings
+    ])
+    created += Hire.objects.bulk_create([
+        Hire(event_id=row.event_id, specialist_id=row.target_id, renter=renter, start_datetime=row.start,
+             end_datetime=row.end, total_price=row.price, status='pending')
+        for row in hires
+    ])
+    for row, obj in zip(bookings + hires, created):
+        row.created_id = obj.pk
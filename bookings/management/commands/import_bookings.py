@@ -0,0 +1,54 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bookings.batch import COLUMNS, REPORT_COLUMNS, RESULTS, BatchError, book
+from users.models import Renter
+
+
+class Command(BaseCommand):
+    help = (
+        "Пакетное бронирование площадок и специалистов из CSV корпоративной заявки "
+        f"(колонки: {', '.join(COLUMNS)}); конфликты проверяются одним запросом на весь файл"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV-файл заявки")
+        parser.add_argument('--renter', required=True, help="email арендатора")
+        parser.add_argument('--delimiter', default=',')
+        parser.add_argument('--encoding', default='utf-8')
+        parser.add_argument('--report', default=None, help="куда записать CSV с результатом по строкам")
+        parser.add_argument('--dry-run', action='store_true', help="только проверить, ничего не создавать")
+
+    def handle(self, *args, **options):
+        renter = Renter.objects.filter(user__email__iexact=options['renter']).first()
+        if renter is None:
+            raise CommandError(f"Нет арендатора {options['renter']}")
+
+        started = time.perf_counter()
+        with open(options['path'], newline='', encoding=options['encoding']) as fh:
+            reader = csv.DictReader(fh, delimiter=options['delimiter'])
+            missing = {'event', 'start', 'end'} - set(reader.fieldnames or ())
+            if missing:
+                raise CommandError(f"В файле нет колонок: {', '.join(sorted(missing))}")
+            try:
+                report = book(renter, reader, dry_run=options['dry_run'])
+            except BatchError as exc:
+                raise CommandError(exc)
+        elapsed = time.perf_counter() - started
+
+        if options['report']:
+            with open(options['report'], 'w', newline='', encoding='utf-8') as fh:
+                writer = csv.writer(fh)
+                writer.writerow(REPORT_COLUMNS)
+                writer.writerows(row.report() for row in report.rows)
+
+        rows = len(report.rows)
+        self.stdout.write(
+            f"Строк: {rows:,} за {elapsed:.1f} с ({rows / elapsed if elapsed else 0:,.0f} записей/с)"
+            + (" — проверка без записи" if options['dry_run'] else "")
+        )
+        counts = report.counts()
+        for result in RESULTS:
+            self.stdout.write(f"  {result:10} {counts[result]:,}")
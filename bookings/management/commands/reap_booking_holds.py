@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from bookings.models import Booking
+
+
+class Command(BaseCommand):
+    help = "Отменяет истёкшие удержания броней пачками (set-based UPDATE)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--max-batches', type=int, default=None,
+                            help="остановиться после N пачек (по умолчанию — пока есть что отменять)")
+        parser.add_argument('--sleep', type=float, default=0.0,
+                            help="пауза между пачками, секунды")
+
+    def handle(self, *args, **options):
+        # Граница фиксируется один раз: удержания, истекающие во время прогона, — в следующий раз
+        now = timezone.now()
+        total = batches = 0
+        while options['max_batches'] is None or batches < options['max_batches']:
+            with transaction.atomic():
+                reaped = Booking.objects.reap_expired_holds(options['batch_size'], now=now)
+            if not reaped:
+                break
+            total += reaped
+            batches += 1
+            if options['sleep']:
+                time.sleep(options['sleep'])
+        self.stdout.write(f"Отменено удержаний: {total} (пачек: {batches})")
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.9 on 2026-10-19 02:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0003_initial'),
+        ('events', '0001_initial'),
+        ('users', '0001_initial'),
+        ('venues', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='hold_expires_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='удержание до'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('status__in', ('pending', 'confirmed'))), fields=['venue', 'start_datetime', 'end_datetime'], name='booking_venue_slot_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('hold_expires_at__isnull', False), ('status', 'pending')), fields=['hold_expires_at'], name='booking_hold_expiry_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.9 on 2026-10-19 02:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0004_booking_hold'),
+        ('events', '0001_initial'),
+        ('users', '0001_initial'),
+        ('venues', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['status', 'end_datetime'], name='bookings_bo_status_9cc3ac_idx'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.9 on 2026-10-19 04:23
+
+import core.recurrence
+import django.contrib.postgres.fields
+import django.db.models.functions.comparison
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Серии броней: правило в строке брони, окончание серии — генерируемая
+    # колонка STORED (одна перезапись таблицы); индекс серий площадки
+    # строится CONCURRENTLY
+    atomic = False
+
+    dependencies = [
+        ('bookings', '0006_booking_uuid7_ids'),
+        ('events', '0003_event_period'),
+        ('users', '0004_specialist_dimensions'),
+        ('venues', '0003_venue_city_dimension'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='recurrence',
+            field=models.CharField(blank=True, db_default='', default='', help_text='например FREQ=WEEKLY;BYDAY=TU,TH;COUNT=24', max_length=200, validators=[core.recurrence.validate_rule], verbose_name='повторение (RRULE)'),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='recurrence_exdates',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.DateTimeField(), blank=True, db_default=[], default=list, size=None, verbose_name='отменённые занятия'),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='recurrence_until',
+            field=models.DateField(blank=True, editable=False, null=True, verbose_name='последнее занятие'),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='series_ends_at',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(recurrence='', then=models.F('end_datetime')), default=models.Func(models.Value('UTC'), models.Func(models.Func(models.Value('UTC'), models.F('end_datetime'), function='timezone', output_field=models.DateTimeField()), models.Func(models.F('recurrence_until'), django.db.models.functions.comparison.Cast(models.Func(models.Value('UTC'), models.F('start_datetime'), function='timezone', output_field=models.DateTimeField()), models.DateField()), arg_joiner=' - ', output_field=models.IntegerField(), template='(%(expressions)s)'), arg_joiner=" + interval '1 day' * ", output_field=models.DateTimeField(), template='(%(expressions)s)'), function='timezone', output_field=models.DateTimeField()), output_field=models.DateTimeField()), output_field=models.DateTimeField(verbose_name='окончание серии')),
+        ),
+        AddIndexConcurrently(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('status__in', ('pending', 'confirmed')), models.Q(('recurrence', ''), _negated=True)), fields=['venue', 'series_ends_at'], name='booking_venue_series_idx'),
+        ),
+    ]
@@ -1,13 +1,174 @@
-from django.db import models
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.postgres.fields import ArrayField
+from django.db import models, transaction
+from django.db.models import Case, F, Func, Q, When
+from django.db.models.functions import Cast
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
-import uuid
 
+from core import recurrence as rrule
+from core.ids import tail_index, uuid7
+
+
+# Статусы, которые занимают слот площадки (pending — только пока жива бронь-удержание)
+BLOCKING_STATUSES = ('pending', 'confirmed')
+
+
+def get_hold_ttl():
+    """Время жизни удержания слота; settings.BOOKING_HOLD_TTL — timedelta или секунды"""
+    ttl = getattr(settings, 'BOOKING_HOLD_TTL', timedelta(minutes=15))
+    return ttl if isinstance(ttl, timedelta) else timedelta(seconds=ttl)
+
+
+class BookingConflict(ValueError):
+    """Слот площадки уже занят подтверждённой бронью или живым удержанием"""
+
+
+# Окончание серии: последнее занятие — окончание первого, сдвинутое в местном
+# времени на (recurrence_until − дата первого) дней; без recurrence_until
+# (бесконечная серия) — NULL. Все функции неизменяемы — годится для генерируемой колонки
+_LOCAL_START_DATE = Cast(rrule.local_timestamp(F('start_datetime'), settings.TIME_ZONE), models.DateField())
+SERIES_ENDS_AT = Case(
+    When(recurrence='', then=F('end_datetime')),
+    default=rrule.local_timestamp(
+        Func(
+            rrule.local_timestamp(F('end_datetime'), settings.TIME_ZONE),
+            Func(F('recurrence_until'), _LOCAL_START_DATE, template='(%(expressions)s)', arg_joiner=' - ',
+                 output_field=models.IntegerField()),
+            template='(%(expressions)s)', arg_joiner=" + interval '1 day' * ",
+            output_field=models.DateTimeField(),
+        ),
+        settings.TIME_ZONE,
+    ),
+    output_field=models.DateTimeField(),
+)
+
+
+class BookingQuerySet(models.QuerySet):
+    def blocking(self, now=None):
+        """
+        Брони, которые занимают слот на момент ``now``.
+
+        Истёкшее удержание (pending с hold_expires_at <= now) считается свободным
+        прямо в предикате — ждать, пока его отменит reap_booking_holds, не нужно.
+        pending без hold_expires_at — заявка, созданная вручную, она слот держит.
+        """
+        now = now or timezone.now()
+        return self.filter(
+            Q(status='confirmed')
+            | Q(status='pending', hold_expires_at__isnull=True)
+            | Q(status='pending', hold_expires_at__gt=now)
+        )
+
+    def overlapping(self, start, end):
+        """
+        Брони, пересекающие [start, end), и серии, не закончившиеся к
+        ``start`` (``booking_venue_series_idx``); какие занятия серии
+        попадают в окно, скажет ``occurrences``. У ветки серий нет общего
+        с первой условия ``start_datetime < end`` — иначе планировщик
+        вынесет его за OR и прочитает всю историю площадки.
+        """
+        return self.filter(
+            Q(start_datetime__lt=end, end_datetime__gt=start)
+            | (~Q(recurrence='') & (Q(series_ends_at__isnull=True) | Q(series_ends_at__gt=start)))
+        )
+
+    def occurrences(self, start, end):
+        """``(бронь, начало, окончание)`` занятий в окне [start, end); серии разворачиваются лениво."""
+        for booking in self.overlapping(start, end):
+            for occurrence in booking.occurrences(start, end):
+                yield booking, *occurrence
+
+    def expired_holds(self, now=None):
+        return self.filter(status='pending', hold_expires_at__lte=now or timezone.now())
+
+
+def get_recurrence_horizon():
+    """Насколько вперёд проверяется бесконечная серия; settings.BOOKING_RECURRENCE_HORIZON — timedelta или секунды"""
+    horizon = getattr(settings, 'BOOKING_RECURRENCE_HORIZON', timedelta(days=2 * 365))
+    return horizon if isinstance(horizon, timedelta) else timedelta(seconds=horizon)
+
+
+class BookingManager(models.Manager.from_queryset(BookingQuerySet)):
+    def is_available(self, venue, start, end, now=None, exclude=None, recurrence='', recurrence_exdates=()):
+        """
+        Свободен ли слот [start, end); с ``recurrence`` — все занятия серии
+        (бесконечной — на ``BOOKING_RECURRENCE_HORIZON`` вперёд). Занятость
+        читается одним запросом, серии разворачиваются только в проверяемом
+        промежутке, занятия сравниваются одним проходом слиянием.
+        """
+        span_end = end
+        if recurrence:
+            last = rrule.last_date(recurrence, start)
+            first = timezone.localtime(start, timezone.get_default_timezone()).date()
+            span_end += timedelta(days=(last - first).days) if last is not None else get_recurrence_horizon()
+        qs = (
+            self.filter(venue=venue).blocking(now).overlapping(start, span_end).order_by()
+            .only('start_datetime', 'end_datetime', 'recurrence', 'recurrence_exdates')
+        )
+        if exclude is not None:
+            qs = qs.exclude(pk=exclude)
+        if not recurrence:
+            return next(qs.occurrences(start, end), None) is None
+        wanted = rrule.occurrences(recurrence, start, end, start, span_end, recurrence_exdates)
+        busy = rrule.merged(*(booking.occurrences(start, span_end) for booking in qs))
+        return rrule.collision(wanted, busy) is None
+
+    def place_hold(self, *, event, venue, renter, start, end, ttl=None, **extra_fields):
+        """
+        Создаёт бронь-удержание (pending) на ``ttl``.
 
-class Booking(models.Model):
+        Удержания одной площадки сериализуются блокировкой строки Venue,
+        поэтому два одновременных checkout не займут один слот.
+        """
+        from venues.models import Venue
+
+        now = timezone.now()
+        with transaction.atomic(using=self.db):
+            Venue.objects.using(self.db).select_for_update().only('pk').get(pk=getattr(venue, 'pk', venue))
+            if not self.is_available(venue, start, end, now=now,
+                                     recurrence=extra_fields.get('recurrence', ''),
+                                     recurrence_exdates=extra_fields.get('recurrence_exdates', ())):
+                raise BookingConflict(_("Слот уже занят"))
+            return self.create(
+                event=event,
+                venue_id=getattr(venue, 'pk', venue),
+                renter=renter,
+                start_datetime=start,
+                end_datetime=end,
+                status='pending',
+                hold_expires_at=now + (ttl or get_hold_ttl()),
+                **extra_fields,
+            )
+
+    def reap_expired_holds(self, batch_size=1000, now=None):
+        """
+        Отменяет одну пачку истёкших удержаний (не больше ``batch_size``);
+        возвращает число строк.
+
+        SKIP LOCKED — строки, которые сейчас подтверждает checkout, пропускаются.
+        """
+        now = now or timezone.now()
+        # id пачки читаются отдельно: подзапрос с LIMIT ... SKIP LOCKED внутри
+        # UPDATE планировщик может перевыполнять (nested loop), и каждый
+        # повтор вернул бы новые строки — пачка вышла бы больше batch_size
+        with transaction.atomic(using=self.db):
+            pks = list(
+                self.expired_holds(now)
+                .order_by('hold_expires_at')
+                .select_for_update(skip_locked=True)
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            return self.filter(pk__in=pks).update(status='cancelled', hold_expires_at=None, updated_at=now)
+
+
+class Booking(rrule.RecurringMixin, models.Model):
     """
-    Бронирование площадки под мероприятие
+    Бронирование площадки под мероприятие (или серия занятий — core/recurrence.py)
     """
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     event = models.ForeignKey(
         'events.Event',
         on_delete=models.CASCADE,
@@ -50,6 +211,14 @@ class Booking(models.Model):
         ('completed', _("завершено")),
     ]
 
+    # Допустимые переходы статусов (см. core/transitions.py)
+    STATUS_TRANSITIONS = {
+        'pending':   ['confirmed', 'cancelled'],
+        'confirmed': ['completed', 'cancelled'],
+        'cancelled': [],
+        'completed': [],
+    }
+
     status = models.CharField(
         _("статус"),
         max_length=20,
@@ -58,21 +227,98 @@ class Booking(models.Model):
         db_index=True
     )
 
+    # Удержание слота на время checkout: pending-бронь после этого момента слот не занимает
+    hold_expires_at = models.DateTimeField(_("удержание до"), null=True, blank=True)
+
+    # Повторение: строка — первое занятие, остальные разворачиваются из правила на лету
+    recurrence = models.CharField(
+        _("повторение (RRULE)"),
+        max_length=200,
+        blank=True,
+        default='',
+        db_default='',
+        validators=[rrule.validate_rule],
+        help_text="например FREQ=WEEKLY;BYDAY=TU,TH;COUNT=24",
+    )
+    recurrence_exdates = ArrayField(
+        models.DateTimeField(),
+        verbose_name=_("отменённые занятия"),
+        blank=True,
+        default=list,
+        db_default=[],
+    )
+    # Дата последнего занятия (пересчитывается в save()); NULL — серия бесконечна
+    recurrence_until = models.DateField(_("последнее занятие"), null=True, blank=True, editable=False)
+    series_ends_at = models.GeneratedField(
+        expression=SERIES_ENDS_AT,
+        output_field=models.DateTimeField(_("окончание серии")),
+        db_persist=True,
+    )
+
     created_at = models.DateTimeField(_("создано"), auto_now_add=True)
     updated_at = models.DateTimeField(_("обновлено"), auto_now=True)
 
+    objects = BookingManager()
+
     class Meta:
         verbose_name = _("бронирование")
         verbose_name_plural = _("бронирования")
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['status']),
+            models.Index(fields=['status', 'end_datetime']),
             models.Index(fields=['event', 'venue']),
+            # проверка занятости слота: только статусы, которые его держат
+            models.Index(
+                fields=['venue', 'start_datetime', 'end_datetime'],
+                condition=Q(status__in=BLOCKING_STATUSES),
+                name='booking_venue_slot_idx',
+            ),
+            # серии площадки: отбор кандидатов до развёртывания
+            models.Index(
+                fields=['venue', 'series_ends_at'],
+                condition=Q(status__in=BLOCKING_STATUSES) & ~Q(recurrence=''),
+                name='booking_venue_series_idx',
+            ),
+            # reap_booking_holds
+            models.Index(
+                fields=['hold_expires_at'],
+                condition=Q(status='pending', hold_expires_at__isnull=False),
+                name='booking_hold_expiry_idx',
+            ),
+            # короткий код в админке (core/lookup.py)
+            tail_index('booking_id_tail_idx'),
         ]
 
     def __str__(self):
         return f"Бронь {self.id} — {self.venue.name} ({self.event.date})"
 
+    def first_period(self):
+        return self.start_datetime, self.end_datetime
+
+    @property
+    def is_hold(self):
+        return self.status == 'pending' and self.hold_expires_at is not None
+
+    @property
+    def is_hold_expired(self):
+        return self.is_hold and self.hold_expires_at <= timezone.now()
+
+    def confirm(self):
+        """
+        Подтверждает бронь после успешной оплаты.
+
+        Условный UPDATE: удержание, которое уже истекло, подтвердить нельзя —
+        слот мог достаться другому. Возвращает True, если бронь подтверждена.
+        """
+        now = timezone.now()
+        updated = Booking.objects.filter(pk=self.pk, status='pending').filter(
+            Q(hold_expires_at__isnull=True) | Q(hold_expires_at__gt=now)
+        ).update(status='confirmed', hold_expires_at=None, updated_at=now)
+        if updated:
+            self.status, self.hold_expires_at, self.updated_at = 'confirmed', None, now
+        return bool(updated)
+
     @property
     def duration_hours(self):
         """Примерное количество часов (можно использовать для расчётов)"""
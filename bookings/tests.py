@@ -1,3 +1,225 @@
+import csv
+import os
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
 from django.test import TestCase
+from django.utils import timezone
+
+from EventMarket.testing import build_marketplace
+from hires.models import Hire
+from venues import pricing
+
+from . import batch
+from .models import Booking, BookingConflict
+
+
+class BookingHoldTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        data = build_marketplace(1)
+        cls.event = data['events'][0]
+        cls.venue = data['venues'][0]
+        cls.renter = data['renters'][0]
+        cls.start = timezone.now() + timedelta(days=365)
+        cls.end = cls.start + timedelta(hours=4)
+
+    def hold(self, start=None, end=None, **kwargs):
+        return Booking.objects.place_hold(
+            event=self.event, venue=self.venue, renter=self.renter,
+            start=start or self.start, end=end or self.end, **kwargs
+        )
+
+    def test_live_hold_blocks_overlapping_slot(self):
+        self.hold()
+        with self.assertRaises(BookingConflict):
+            self.hold(start=self.start + timedelta(hours=1))
+        # соседний слот свободен
+        self.hold(start=self.end, end=self.end + timedelta(hours=2))
+
+    def test_expired_hold_frees_slot_without_reaper(self):
+        expired = self.hold(ttl=timedelta(seconds=-1))
+        self.assertTrue(expired.is_hold_expired)
+        self.assertTrue(Booking.objects.is_available(self.venue, self.start, self.end))
+        self.hold()
+
+    def test_confirm_only_live_hold(self):
+        live = self.hold()
+        self.assertTrue(live.confirm())
+        self.assertEqual(live.status, 'confirmed')
+        self.assertIsNone(live.hold_expires_at)
+
+        expired = self.hold(start=self.end, end=self.end + timedelta(hours=1), ttl=timedelta(seconds=-1))
+        self.assertFalse(expired.confirm())
+        expired.refresh_from_db()
+        self.assertEqual(expired.status, 'pending')
+
+    def test_reaper_cancels_expired_holds_in_batches(self):
+        for hours in range(5):
+            self.hold(
+                start=self.start + timedelta(hours=10 * hours),
+                end=self.start + timedelta(hours=10 * hours + 1),
+                ttl=timedelta(seconds=-1),
+            )
+        live = self.hold()
+
+        out = StringIO()
+        call_command('reap_booking_holds', batch_size=2, stdout=out)
+        self.assertIn('Отменено удержаний: 5 (пачек: 3)', out.getvalue())
+        self.assertEqual(Booking.objects.filter(status='cancelled', hold_expires_at__isnull=True).count(), 5)
+        live.refresh_from_db()
+        self.assertEqual(live.status, 'pending')
+
+    def test_reaper_batch_never_exceeds_batch_size(self):
+        for hours in range(5):
+            self.hold(
+                start=self.start + timedelta(hours=10 * hours),
+                end=self.start + timedelta(hours=10 * hours + 1),
+                ttl=timedelta(seconds=-1),
+            )
+        batches = [Booking.objects.reap_expired_holds(batch_size=2) for _ in range(4)]
+        self.assertEqual(batches, [2, 2, 1, 0])
+
+
+class BookingRecurrenceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        data = build_marketplace(1)
+        cls.event = data['events'][0]
+        cls.venue = data['venues'][0]
+        cls.renter = data['renters'][0]
+        cls.start = timezone.now().replace(microsecond=0) + timedelta(days=365)
+
+    def weekly(self, **kwargs):
+        return Booking.objects.create(
+            event=self.event, venue=self.venue, renter=self.renter, status='confirmed',
+            start_datetime=self.start, end_datetime=self.start + timedelta(hours=2),
+            recurrence='FREQ=WEEKLY;COUNT=104', **kwargs,
+        )
+
+    def free(self, start, hours=1, **kwargs):
+        return Booking.objects.is_available(self.venue, start, start + timedelta(hours=hours), **kwargs)
+
+    def test_series_is_one_row_checked_as_virtual_slots(self):
+        series = self.weekly()
+        series.refresh_from_db()
+        last = self.start + timedelta(weeks=103)
+        self.assertEqual(series.recurrence_until, timezone.localtime(last).date())
+        self.assertEqual(series.series_ends_at, last + timedelta(hours=2))
+
+        self.assertFalse(self.free(self.start + timedelta(weeks=60, hours=1)))
+        self.assertTrue(self.free(self.start + timedelta(weeks=60, days=1)))
+        self.assertTrue(self.free(self.start + timedelta(weeks=104)))
+        # серия-кандидат сверяется со всеми занятиями, и с занятиями другой серии
+        self.assertFalse(self.free(self.start + timedelta(weeks=50), recurrence='FREQ=DAILY;COUNT=3'))
+        self.assertTrue(self.free(self.start + timedelta(days=1), recurrence='FREQ=WEEKLY'))
+        with self.assertRaises(BookingConflict):
+            self.hold(start=self.start + timedelta(days=3, hours=1), recurrence='FREQ=DAILY;INTERVAL=2')
+
+        # отмена одного занятия и правка правила — UPDATE одной строки
+        with self.assertNumQueries(1):
+            series.skip_occurrence(self.start + timedelta(weeks=60))
+        self.assertTrue(self.free(self.start + timedelta(weeks=60, hours=1)))
+        series.recurrence = 'FREQ=WEEKLY;COUNT=10'
+        with self.assertNumQueries(1):
+            series.save(update_fields=['recurrence'])
+        self.assertTrue(self.free(self.start + timedelta(weeks=50, hours=1)))
+
+    def hold(self, start, hours=1, **kwargs):
+        return Booking.objects.place_hold(event=self.event, venue=self.venue, renter=self.renter,
+                                          start=start, end=start + timedelta(hours=hours), **kwargs)
+
+
+class BatchBookingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        data = build_marketplace(1)
+        cls.event = data['events'][0]
+        cls.renter = cls.event.renter
+        cls.venue, cls.draft = data['venues'][:2]
+        cls.venue.status, cls.draft.status = 'published', 'draft'
+        type(cls.venue).objects.bulk_update([cls.venue, cls.draft], ['status'])
+        cls.specialist = data['specialists'][0]
+        cls.start = timezone.now().replace(microsecond=0) + timedelta(days=365)
+
+    def setUp(self):
+        pricing.cache.clear()
+
+    def slot(self, hours, length=2, **target):
+        start = self.start + timedelta(hours=hours)
+        return {'event': str(self.event.pk), 'start': start.isoformat(),
+                'end': (start + timedelta(hours=length)).isoformat(), **target}
+
+    def test_conflicts_found_in_one_pass(self):
+        Booking.objects.place_hold(event=self.event, venue=self.venue, renter=self.renter,
+                                   start=self.start, end=self.start + timedelta(hours=2))
+        Hire.objects.create(event=self.event, specialist=self.specialist, renter=self.renter,
+                            start_datetime=self.start + timedelta(hours=10),
+                            end_datetime=self.start + timedelta(hours=12), total_price=1000, status='confirmed')
+        venue, email = self.venue.slug, self.specialist.user.email
+        records = [
+            self.slot(1, venue=venue),                          # 2: занято удержанием
+            self.slot(4, venue=venue),                          # 3: создаётся
+            self.slot(5, venue=str(self.venue.pk)),             # 4: пересекается со строкой 3
+            self.slot(11, specialist=email),                    # 5: специалист нанят
+            self.slot(20, specialist=email, price='1 500,50'),  # 6: создаётся
+            self.slot(1, venue=self.draft.slug),                # 7: черновик
+            {**self.slot(30, venue=venue), 'end': 'завтра'},    # 8: дата
+        ]
+        # 13 + два запроса правил цены площадок (в кэше процесса их ещё нет)
+        with self.assertNumQueries(15):
+            report = batch.book(self.renter, records)
+
+        results = {row.line: row.result for row in report.rows}
+        self.assertEqual(results, {2: 'conflict', 3: 'created', 4: 'conflict', 5: 'conflict',
+                                   6: 'created', 7: 'invalid', 8: 'invalid'})
+        self.assertIn('пересекается со строкой 3', report.rows[2].report()[-1])
+        self.assertNotIn('строкой 2', report.rows[2].report()[-1])
+        booking = Booking.objects.get(pk=report.rows[1].created_id)
+        self.assertEqual((booking.status, booking.total_price), ('pending', self.venue.price_per_hour * 2))
+        self.assertEqual(Hire.objects.get(pk=report.rows[4].created_id).total_price, Decimal('1500.50'))
+
+    def test_rejected_line_does_not_block_later_lines(self):
+        Booking.objects.place_hold(event=self.event, venue=self.venue, renter=self.renter,
+                                   start=self.start, end=self.start + timedelta(hours=2))
+        venue = self.venue.slug
+        records = [
+            self.slot(1, length=4, venue=venue),    # 2: занято удержанием
+            self.slot(3, venue=venue),              # 3: пересекается только со строкой 2 — создаётся
+            self.slot(4, venue=venue),              # 4: пересекается со строкой 3
+            self.slot(5, venue=venue),              # 5: строка 4 отклонена — создаётся
+        ]
+        report = batch.book(self.renter, records)
+        self.assertEqual({row.line: row.result for row in report.rows},
+                         {2: 'conflict', 3: 'created', 4: 'conflict', 5: 'created'})
+        self.assertEqual(report.rows[2].conflicts, ['пересекается со строкой 3'])
+
+    def test_prices_that_do_not_fit_are_reported(self):
+        venue = self.venue.slug
+        prices = ['1e12', 'NaN', 'Infinity', '-500', '10.005', 'много', '99999999,99']
+        records = [self.slot(4 * n, venue=venue, price=price) for n, price in enumerate(prices)]
+        report = batch.book(self.renter, records)
+        self.assertEqual([row.result for row in report.rows], ['invalid'] * 6 + ['created'])
+        self.assertEqual([row.problems for row in report.rows[:6]], [
+            ["цена слишком большая"], ["цена — число"], ["цена — число"],
+            ["цена не может быть отрицательной"], ["у цены не больше 2 знаков после запятой"],
+            ["цена — число"],
+        ])
+        self.assertEqual(Booking.objects.get(pk=report.rows[6].created_id).total_price, Decimal('99999999.99'))
 
-# Create your tests here.
+    def test_dry_run_command_writes_report(self):
+        path = os.path.join(self.enterContext(tempfile.TemporaryDirectory()), 'batch.csv')
+        with open(path, 'w', newline='') as fh:
+            writer = csv.DictWriter(fh, batch.COLUMNS)
+            writer.writeheader()
+            writer.writerows(self.slot(hours, venue=self.venue.slug) for hours in (0, 1, 3))
+        out = StringIO()
+        call_command('import_bookings', path, renter=self.renter.user.email, dry_run=True,
+                     report=path + '.report', stdout=out)
+        self.assertEqual(Booking.objects.filter(start_datetime__gte=self.start).count(), 0)
+        with open(path + '.report', newline='') as fh:
+            self.assertEqual([row['result'] for row in csv.DictReader(fh)], ['valid', 'conflict', 'valid'])
+        self.assertIn('valid      2', out.getvalue())
@@ -0,0 +1,106 @@
+# core/admin.py
+from django.contrib import admin
+from django.db.models import QuerySet
+
+from . import deletion, dimensions, lookup
+from .models import City, OutboxConsumer, OutboxEntry, Specialty
+
+
+class ShortIdSearchMixin:
+    """
+    К обычному поиску по ``search_fields`` добавляются совпадения по
+    короткому коду («ID» в списке, 8 символов) или полному UUID, у моделей
+    с целочисленным pk — по номеру с решёткой (``#123``). Код проверяется
+    по индексу первичного ключа (``core/lookup.py``); строка, похожая на
+    код, может быть и значением поля (номер события провайдера), поэтому
+    результаты объединяются, а не заменяют друг друга.
+    """
+
+    def get_search_results(self, request, queryset, search_term):
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        q = lookup.short_id_q(self.model, search_term)
+        if q is not None:
+            results |= queryset.filter(q)
+        return results, may_have_duplicates
+
+
+class DatabaseCascadeDeleteMixin:
+    """
+    Удаление через ``core/deletion.py``: страница подтверждения показывает
+    число строк по моделям (несколько ``COUNT``) вместо списка всех
+    зависимых объектов, а само удаление идёт пачками с ``ON DELETE`` в БД.
+    """
+
+    def get_deleted_objects(self, objs, request):
+        queryset = objs if isinstance(objs, QuerySet) else self.model._base_manager.filter(
+            pk__in=[obj.pk for obj in objs]
+        )
+        summary, _graph = deletion.collect(queryset)
+        perms_needed = set()
+        for model in summary.deleted:
+            admin = self.admin_site._registry.get(model)
+            if admin is not None and not admin.has_delete_permission(request):
+                perms_needed.add(model._meta.verbose_name)
+        model_count = {model._meta.verbose_name_plural: count for model, count in summary.deleted.items() if count}
+        protected = [f"{model._meta.verbose_name_plural}: {count}"
+                     for model, count in summary.protected.items() if count]
+        return summary.lines(), model_count, perms_needed, protected
+
+    def delete_model(self, request, obj):
+        deletion.delete(self.model._base_manager.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        deletion.delete(queryset)
+
+
+class DimensionListFilter(admin.RelatedFieldListFilter):
+    """
+    Фильтр по ссылке на справочник (город, специализация): список берётся
+    из кэша ``core/dimensions.py`` — без запросов и без ``SELECT DISTINCT``.
+    """
+
+    def field_choices(self, field, request, model_admin):
+        return list(dimensions.names(field.related_model).items())
+
+
+@admin.register(City, Specialty)
+class DimensionAdmin(admin.ModelAdmin):
+    list_display = ['name', 'key', 'id']
+    search_fields = ['name', 'key']
+    readonly_fields = ['key']
+    ordering = ['name']
+
+
+@admin.register(OutboxEntry)
+class OutboxEntryAdmin(admin.ModelAdmin):
+    """
+    Журнал изменений — только просмотр, записи пишут триггеры (``core/outbox.py``)
+    """
+    list_display = ['id', 'topic', 'op', 'object_id', 'txid', 'created_at']
+    list_filter = ['topic', 'op']
+    search_fields = ['=object_id']
+    ordering = ['-txid', '-id']
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(OutboxConsumer)
+class OutboxConsumerAdmin(admin.ModelAdmin):
+    """
+    Потребители журнала и их позиции — только просмотр (``core.outbox.seek``)
+    """
+    list_display = ['name', 'txid', 'entry_id', 'updated_at']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,17 @@
+from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
+
+
+class CoreConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'core'
+
+    def ready(self):
+        from . import dimensions
+        from .models import City, Specialty
+
+        # справочники читаются из кэша; изменение записи сбрасывает его
+        for model in (City, Specialty):
+            label = model._meta.label_lower
+            post_save.connect(dimensions.dimension_changed, sender=model, dispatch_uid=f'{label}.saved')
+            post_delete.connect(dimensions.dimension_changed, sender=model, dispatch_uid=f'{label}.deleted')
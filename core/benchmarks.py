@@ -0,0 +1,514 @@
+# core/benchmarks.py
+"""
+Набор бенчмарков ключевых путей чтения и записи.
+
+Бенчмарк — функция одного аргумента ``ctx`` (``Context``: id «типичных»
+объектов, выбранных из текущей БД), зарегистрированная декоратором
+``@benchmark``. Пишущие бенчмарки выполняются в транзакции, которая
+откатывается, поэтому прогон не меняет данные.
+
+Запуск — командой ``benchmark_marketplace``, результат — JSON, который
+можно сравнить с предыдущим прогоном (``--compare``).
+"""
+import statistics
+import subprocess
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, time as dtime, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from bookings.models import Booking
+from events import calendar
+from events.models import Event
+from EventMarket.instrumentation import QueryInstrumentationMiddleware
+from hires.models import Hire
+from payments import ledger
+from payments.models import Payment
+from users.models import Owner, Specialist
+from venues import facets, pricing, recommendations
+from venues.models import Venue
+
+from . import lookup, recurrence
+from .ids import uuid7
+
+BENCHMARKS = {}
+
+
+@dataclass
+class Benchmark:
+    name: str
+    func: object
+    writes: bool = False
+
+
+def benchmark(name, writes=False):
+    def decorator(func):
+        BENCHMARKS[name] = Benchmark(name, func, writes)
+        return func
+    return decorator
+
+
+@dataclass
+class Context:
+    """«Типичные» объекты для бенчмарков; выбираются дешёвыми запросами по индексам."""
+    venue_id: object = None
+    city: int = None        # id core.City
+    event_id: object = None
+    renter_id: object = None
+    owner_id: object = None
+    specialist_id: object = None
+    extra: dict = field(default_factory=dict)
+
+    @classmethod
+    def sample(cls):
+        ctx = cls()
+        # брони смещены к популярным площадкам — площадка случайной брони обычно «горячая»
+        booking = (
+            Booking.objects.order_by('pk')
+            .values('venue_id', 'event_id', 'renter_id', 'venue__owner_id', 'venue__city')
+            .first()
+        )
+        if booking:
+            ctx.venue_id = booking['venue_id']
+            ctx.event_id = booking['event_id']
+            ctx.renter_id = booking['renter_id']
+            ctx.owner_id = booking['venue__owner_id']
+            ctx.city = booking['venue__city']
+        ctx.specialist_id = Hire.objects.order_by('pk').values_list('specialist_id', flat=True).first()
+        ctx.extra['booking_id'] = Payment.objects.filter(booking__isnull=False).values_list(
+            'booking_id', flat=True).order_by('booking_id').first()
+        ctx.extra['hire_id'] = Payment.objects.filter(hire__isnull=False).values_list(
+            'hire_id', flat=True).order_by('hire_id').first()
+        # страница поиска с ценами — до тысячи опубликованных площадок
+        ctx.extra['venue_ids'] = list(Venue.objects.filter(status='published').order_by('pk')
+                                      .values_list('pk', flat=True)[:1000])
+        return ctx
+
+
+# ────────────────────────────────────────────────
+# Чтение
+# ────────────────────────────────────────────────
+
+@benchmark('read.venue_search')
+def venue_search(ctx):
+    list(Venue.objects.filter(city=ctx.city, status='published').order_by('-created_at')[:20])
+
+
+@benchmark('read.venue_facets')
+def venue_facets(ctx):
+    facets.index.ensure_fresh()
+    facets.index.counts({'city': {ctx.city}, 'verified': {True}})
+
+
+@benchmark('read.venue_facets_db')
+def venue_facets_db(ctx):
+    facets.db_counts({'city': {ctx.city}, 'verified': {True}})
+
+
+def _quote_period():
+    start = timezone.make_aware(datetime.combine(timezone.localdate() + timedelta(days=30), dtime(10)))
+    return start, start + timedelta(days=3, hours=8)
+
+
+@benchmark('read.venue_quotes_cold')
+def venue_quotes_cold(ctx):
+    # правила всех площадок компилируются заново: два запроса на пачку
+    pricing.cache.clear()
+    pricing.quote_many(ctx.extra['venue_ids'], *_quote_period())
+
+
+@benchmark('cpu.venue_quotes_warm')
+def venue_quotes_warm(ctx):
+    pricing.quote_many(ctx.extra['venue_ids'], *_quote_period())
+
+
+@benchmark('read.venue_similar')
+def venue_similar(ctx):
+    recommendations.similar(ctx.venue_id)
+
+
+def _five_queries(request):
+    with connection.cursor() as cursor:
+        for i in range(5):
+            cursor.execute('SELECT %s', [i])
+    return HttpResponse()
+
+
+# строка лога не в счёт: её цена — цена обработчика (консоль, файл, очередь)
+_WITHOUT_LOG = override_settings(QUERY_INSTRUMENTATION={**settings.QUERY_INSTRUMENTATION, 'LOG': False})
+
+
+@benchmark('read.request_plain')
+@_WITHOUT_LOG
+def request_plain(ctx):
+    _five_queries(RequestFactory().get('/'))
+
+
+@benchmark('read.request_instrumented')
+@_WITHOUT_LOG
+def request_instrumented(ctx):
+    # тот же view через QueryInstrumentationMiddleware; разница медиан с
+    # read.request_plain — накладные расходы инструментирования на запрос
+    QueryInstrumentationMiddleware(_five_queries)(RequestFactory().get('/'))
+
+
+@benchmark('read.venue_availability_month')
+def venue_availability(ctx):
+    start = timezone.now()
+    end = start + timedelta(days=30)
+    list(
+        Booking.objects.filter(venue_id=ctx.venue_id)
+        .blocking()
+        .order_by()
+        .only('start_datetime', 'end_datetime', 'recurrence', 'recurrence_exdates')
+        .occurrences(start, end)
+    )
+
+
+@benchmark('cpu.recurrence_month_window')
+def recurrence_month_window(ctx):
+    # еженедельная серия на два года против окна в месяц ближе к её концу
+    start = timezone.make_aware(datetime.combine(timezone.localdate(), dtime(19)))
+    window = start + timedelta(days=600)
+    list(recurrence.occurrences('FREQ=WEEKLY;COUNT=104', start, start + timedelta(hours=2),
+                                window, window + timedelta(days=30)))
+
+
+@benchmark('read.upcoming_events')
+def upcoming_events(ctx):
+    list(Event.objects.upcoming().filter(status='planned').order_by('starts_at')[:50])
+
+
+@benchmark('read.events_overlapping_evening')
+def events_overlapping_evening(ctx):
+    # «что идёт в пятницу с 18 до 23»: пересечение периодов по GiST-индексу
+    today = timezone.localdate()
+    friday = today + timedelta(days=(4 - today.weekday()) % 7)
+    start = timezone.make_aware(datetime.combine(friday, dtime(18)))
+    list(Event.objects.overlapping(start, start + timedelta(hours=5)).order_by().values_list('pk', 'status'))
+
+
+@benchmark('read.event_detail')
+def event_detail(ctx):
+    event = Event.objects.select_related('renter__user').get(pk=ctx.event_id)
+    list(event.bookings.select_related('venue'))
+    list(event.hires.select_related('specialist__user'))
+
+
+@benchmark('read.event_by_short_id')
+def event_by_short_id(ctx):
+    list(Event.objects.filter(lookup.short_id_q(Event, lookup.short_id(ctx.event_id))))
+
+
+@benchmark('read.calendar_feed')
+def calendar_feed(ctx):
+    ''.join(calendar.render_feed(ctx.renter_id))
+
+
+@benchmark('read.renter_paid_total')
+def renter_paid_total(ctx):
+    Payment.objects.filter(payer_id=ctx.renter_id, status='succeeded').aggregate(total=Sum('amount'))
+
+
+@benchmark('read.owner_earnings')
+def owner_earnings(ctx):
+    Payment.objects.filter(
+        booking__venue__owner_id=ctx.owner_id, status='succeeded'
+    ).aggregate(total=Sum('amount'))
+
+
+@benchmark('read.booking_paid_total')
+def booking_paid_total(ctx):
+    Payment.objects.filter(booking_id=ctx.extra['booking_id']).succeeded().total()
+
+
+@benchmark('read.hire_paid_total')
+def hire_paid_total(ctx):
+    Payment.objects.filter(hire_id=ctx.extra['hire_id']).succeeded().total()
+
+
+@benchmark('read.payments_pending_recent')
+def payments_pending_recent(ctx):
+    list(Payment.objects.filter(status='pending').order_by('-created_at')[:100])
+
+
+@benchmark('read.payments_paid_recent')
+def payments_paid_recent(ctx):
+    list(Payment.objects.filter(paid_at__isnull=False).order_by('-paid_at')[:100])
+
+
+@benchmark('read.renter_balance')
+def renter_balance(ctx):
+    ledger.renter_summary(ctx.renter_id)
+
+
+@benchmark('read.owner_balance')
+def owner_balance(ctx):
+    ledger.earnings('owner', ctx.owner_id)
+
+
+@benchmark('read.top_owners')
+def top_owners(ctx):
+    list(Owner.objects.select_related('user').order_by('-rating', 'user_id')[:20])
+
+
+@benchmark('read.top_specialists')
+def top_specialists(ctx):
+    list(Specialist.objects.select_related('user').order_by('-rating', 'user_id')[:20])
+
+
+@benchmark('read.specialist_schedule')
+def specialist_schedule(ctx):
+    list(
+        Hire.objects.filter(specialist_id=ctx.specialist_id, end_datetime__gte=timezone.now())
+        .order_by('start_datetime')[:50]
+    )
+
+
+# ────────────────────────────────────────────────
+# Запись (откатывается)
+# ────────────────────────────────────────────────
+
+@benchmark('write.booking_with_payment', writes=True)
+def booking_with_payment(ctx):
+    start = timezone.now() + timedelta(days=400)
+    booking = Booking.objects.create(
+        event_id=ctx.event_id,
+        venue_id=ctx.venue_id,
+        renter_id=ctx.renter_id,
+        start_datetime=start,
+        end_datetime=start + timedelta(hours=4),
+        total_price=Decimal('40000.00'),
+    )
+    Payment.objects.create(booking=booking, payer_id=ctx.renter_id, amount=booking.total_price)
+
+
+@benchmark('write.recommendations_rebuild', writes=True)
+def recommendations_rebuild(ctx):
+    # полная перестройка обеих матриц — то, что делает refresh_recommendations --full
+    recommendations.rebuild_neighbors()
+    recommendations.rebuild_themes()
+
+
+@benchmark('write.payment_succeeded', writes=True)
+def payment_succeeded(ctx):
+    Payment.objects.filter(payer_id=ctx.renter_id, status='pending').update(
+        status='succeeded', paid_at=timezone.now()
+    )
+
+
+# ────────────────────────────────────────────────
+# Прогон
+# ────────────────────────────────────────────────
+
+def _run_once(bench, ctx):
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        if bench.writes:
+            with transaction.atomic():
+                bench.func(ctx)
+                transaction.set_rollback(True)
+        else:
+            bench.func(ctx)
+        elapsed = time.perf_counter() - started
+    return elapsed, len(queries.captured_queries)
+
+
+def _plan_nodes(node):
+    yield node
+    for child in node.get('Plans', ()):
+        yield from _plan_nodes(child)
+
+
+def explain(sql):
+    """Сводка ``EXPLAIN (ANALYZE, BUFFERS)`` одного запроса."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}')
+        plan = cursor.fetchone()[0]
+    plan = plan[0] if isinstance(plan, list) else plan
+    root = plan['Plan']
+    nodes = list(_plan_nodes(root))
+    return {
+        'nodes': [
+            f"{node['Node Type']} on {node['Index Name']}" if 'Index Name' in node else node['Node Type']
+            for node in nodes
+        ],
+        'execution_ms': round(plan['Execution Time'], 3),
+        'shared_hit': root.get('Shared Hit Blocks', 0),
+        'shared_read': root.get('Shared Read Blocks', 0),
+        'heap_fetches': sum(node.get('Heap Fetches', 0) for node in nodes),
+    }
+
+
+def explain_benchmark(bench, ctx):
+    """Планы всех SQL одного (читающего) бенчмарка."""
+    with CaptureQueriesContext(connection) as queries:
+        bench.func(ctx)
+    return [explain(query['sql']) for query in queries.captured_queries]
+
+
+def summarize(timings, queries):
+    timings = sorted(timings)
+    return {
+        'runs': len(timings),
+        'queries': queries,
+        'min_ms': round(timings[0], 3),
+        'median_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+        'mean_ms': round(statistics.fmean(timings), 3),
+    }
+
+
+def run(names=None, repeat=20, warmup=2, ctx=None, plans=False):
+    """
+    Возвращает ``{имя: статистика}`` для выбранных бенчмарков; с ``plans``
+    к читающим добавляются сводки EXPLAIN их запросов.
+    """
+    ctx = ctx or Context.sample()
+    results = {}
+    for name, bench in BENCHMARKS.items():
+        if names and not any(part in name for part in names):
+            continue
+        for _ in range(warmup):
+            _run_once(bench, ctx)
+        timings = []
+        queries = 0
+        for _ in range(repeat):
+            elapsed, queries = _run_once(bench, ctx)
+            timings.append(elapsed * 1000)
+        results[name] = summarize(timings, queries)
+        if plans and not bench.writes:
+            results[name]['plans'] = explain_benchmark(bench, ctx)
+    return results
+
+
+def run_admin(repeat=5):
+    """
+    Время и число SQL для changelist / формы изменения каждой ModelAdmin.
+
+    Временный суперпользователь и сессия создаются в транзакции,
+    которая откатывается.
+    """
+    from django.test import Client
+
+    from EventMarket.testing import admin_pages, measure_page
+    from users.models import BaseUser
+
+    results = {}
+    with transaction.atomic():
+        user = BaseUser.objects.create_superuser('benchmark@example.invalid', None)
+        client = Client(SERVER_NAME='localhost')
+        client.force_login(user)
+        for name, url in admin_pages():
+            measure_page(client, url)
+            timings = []
+            for _ in range(repeat):
+                _status, queries, elapsed = measure_page(client, url)
+                timings.append(elapsed * 1000)
+            results[f'admin.{name}'] = summarize(timings, queries)
+        transaction.set_rollback(True)
+    return results
+
+
+# ────────────────────────────────────────────────
+# Вставка с ключами UUIDv4 и UUIDv7
+# ────────────────────────────────────────────────
+
+def _key_rows(version, count, payers):
+    new_id = uuid.uuid4 if version == 4 else uuid7
+    now = timezone.now()
+    for i in range(count):
+        yield (new_id(), Decimal(1000 + i % 9000), 'succeeded', now, uuid.uuid4(), payers[i % len(payers)])
+
+
+def key_insert(version, rows, batch_size=100_000):
+    """
+    Загружает ``rows`` синтетических платежей с ключами UUIDv4 или v7 в
+    копию ``payments_payment`` (те же индексы, без FK) пачками ``COPY``;
+    возвращает время, WAL и размеры. Таблица удаляется после замера.
+    """
+    table = connection.ops.quote_name(f'bench_keys_v{version}')
+    payers = [uuid.uuid4() for _ in range(1000)]
+    batches = []
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {table}')
+        cursor.execute(f'CREATE TABLE {table} (LIKE {Payment._meta.db_table} INCLUDING DEFAULTS '
+                       f'INCLUDING CONSTRAINTS INCLUDING INDEXES)')
+        try:
+            cursor.execute('SELECT pg_current_wal_lsn()')
+            wal_start = cursor.fetchone()[0]
+            started = time.perf_counter()
+            for offset in range(0, rows, batch_size):
+                count = min(batch_size, rows - offset)
+                batch_started = time.perf_counter()
+                with cursor.cursor.copy(
+                    f'COPY {table} (id, amount, status, created_at, booking_id, payer_id) FROM STDIN'
+                ) as copy:
+                    for row in _key_rows(version, count, payers):
+                        copy.write_row(row)
+                batches.append(count / (time.perf_counter() - batch_started))
+            seconds = time.perf_counter() - started
+            cursor.execute(
+                'SELECT pg_wal_lsn_diff(pg_current_wal_lsn(), %s), pg_relation_size(%s), '
+                'pg_indexes_size(%s), pg_table_size(%s)',
+                [wal_start, f'bench_keys_v{version}_pkey', table, table],
+            )
+            wal, pkey, indexes, heap = cursor.fetchone()
+        finally:
+            cursor.execute(f'DROP TABLE IF EXISTS {table}')
+    return {
+        'version': version,
+        'rows': rows,
+        'seconds': round(seconds, 1),
+        'rows_per_s': round(rows / seconds),
+        'first_batch_rows_per_s': round(batches[0]),
+        'last_batch_rows_per_s': round(batches[-1]),
+        'wal_bytes': int(wal),
+        'pkey_bytes': pkey,
+        'indexes_bytes': indexes,
+        'table_bytes': heap,
+    }
+
+
+def environment():
+    """Метаданные прогона: коммит, версия PostgreSQL, оценка размеров таблиц."""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    tables = [model._meta.db_table for model in (Venue, Event, Booking, Hire, Payment)]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT relname, GREATEST(reltuples, 0)::bigint FROM pg_class WHERE relname = ANY(%s)',
+            [tables],
+        )
+        rows = dict(cursor.fetchall())
+    return {
+        'timestamp': timezone.now().isoformat(),
+        'commit': commit,
+        'server_version': connection.pg_version,
+        'rows_estimate': rows,
+    }
+
+
+def compare(current, previous):
+    """Строки ``(имя, было, стало, изменение %)`` по медиане."""
+    for name, stats in current.items():
+        old = previous.get(name)
+        if not old:
+            continue
+        before, after = old['median_ms'], stats['median_ms']
+        change = (after - before) / before * 100 if before else 0.0
+        yield name, before, after, change
@@ -0,0 +1,216 @@
+# core/deletion.py
+"""
+Каскадное удаление силами PostgreSQL.
+
+``Collector`` Django перед удалением читает в Python каждую зависимую
+строку (а страница подтверждения в админке ещё и вызывает ``__str__`` на
+каждой — с ленивыми запросами к связям). Здесь граф зависимостей обходится
+по метаданным моделей, а строки не читаются вовсе:
+
+* ``collect`` — итог по моделям: сколько строк удалится, у скольких
+  обнулится ссылка (``SET_NULL``), сколько мешает удалению (``PROTECT``);
+  один ``COUNT`` на модель, подзапросами от корня;
+* ``delete`` — удаление пачками ``DELETE ... WHERE pk IN (SELECT ... LIMIT n)``
+  от глубоких уровней графа к корню. У внешних ключей из ``DB_ON_DELETE``
+  в БД стоят ``ON DELETE CASCADE`` / ``SET NULL`` (миграция
+  ``core/0001_db_on_delete``), поэтому «листья» — изображения площадок,
+  отзывы — и обнуление ссылок платежей делает сам PostgreSQL вместе с
+  пачкой родителя; так же подхватываются строки, добавленные между пачками.
+
+Сигналы ``post_delete`` и ``Review.delete`` не вызываются — то, что от них
+зависит, ``delete`` обновляет сам: рейтинги затронутых профилей, индекс
+фасетов площадок и кэш их правил цены. Новый внешний ключ с ``CASCADE`` /
+``SET_NULL`` должен попасть и в ``DB_ON_DELETE``, и в миграцию, иначе
+``collect`` откажется обходить такой граф.
+"""
+import operator
+from dataclasses import dataclass, field
+from functools import reduce
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, models, transaction
+
+# Внешние ключи с действием ON DELETE на стороне БД
+DB_ON_DELETE = {
+    'events.Event.renter': 'CASCADE',
+    'venues.Venue.owner': 'CASCADE',
+    'venues.VenueImage.venue': 'CASCADE',
+    'venues.VenuePricingRule.venue': 'CASCADE',
+    'venues.VenueNeighbor.venue': 'CASCADE',
+    'venues.VenueNeighbor.neighbor': 'CASCADE',
+    'venues.ThemeVenue.venue': 'CASCADE',
+    'bookings.Booking.event': 'CASCADE',
+    'bookings.Booking.venue': 'CASCADE',
+    'bookings.Booking.renter': 'CASCADE',
+    'hires.Hire.event': 'CASCADE',
+    'payments.Payment.booking': 'SET NULL',
+    'payments.Payment.hire': 'SET NULL',
+    'reviews.Review.booking': 'CASCADE',
+    'reviews.Review.hire': 'CASCADE',
+    'reviews.Review.author': 'CASCADE',
+    'reviews.Review.owner': 'CASCADE',
+    'reviews.Review.specialist': 'CASCADE',
+    'archive.ArchivedRow.event': 'CASCADE',
+}
+
+_ACTIONS = {
+    models.CASCADE: 'CASCADE',
+    models.SET_NULL: 'SET NULL',
+}
+
+
+class DeletionBlocked(Exception):
+    def __init__(self, summary):
+        self.summary = summary
+        super().__init__(
+            "Удаление невозможно: " + ', '.join(f"{model._meta.verbose_name_plural}: {count}"
+                                                for model, count in summary.protected.items() if count)
+        )
+
+
+@dataclass
+class Summary:
+    deleted: dict = field(default_factory=dict)     # {модель: строк}, корень первым
+    detached: dict = field(default_factory=dict)    # {модель: строк} — ссылка станет NULL
+    protected: dict = field(default_factory=dict)   # {модель: строк} — мешают удалению
+
+    def lines(self):
+        """Строки для страницы подтверждения."""
+        lines = [f"{model._meta.verbose_name_plural}: {count}" for model, count in self.deleted.items() if count]
+        lines += [f"{model._meta.verbose_name_plural}: {count} (останутся, без ссылки)"
+                  for model, count in self.detached.items() if count]
+        return lines
+
+
+@dataclass
+class Graph:
+    root: object
+    deleted: dict       # {модель: [queryset, ...]} — по одному на путь от корня
+    detached: dict
+    protected: dict
+    depth: dict         # {модель: наибольшая глубина}
+
+    def queryset(self, model, paths=None):
+        paths = (paths or self.deleted)[model]
+        q = reduce(operator.or_, (models.Q(pk__in=qs.values('pk')) for qs in paths))
+        return model._base_manager.filter(q).order_by()
+
+
+def _label(field):
+    return f'{field.model._meta.label}.{field.name}'
+
+
+def walk(queryset):
+    """Обход графа ``on_delete`` от ``queryset``; строки не читаются."""
+    root = queryset.model
+    result = Graph(root, {root: [queryset]}, {}, {}, {root: 0})
+    pending = [(root, queryset, 0)]
+    while pending:
+        model, parents, depth = pending.pop(0)
+        for rel in model._meta.related_objects:
+            if rel.many_to_many or not rel.field.concrete:
+                continue
+            fk = rel.field
+            children = fk.model._base_manager.filter(
+                **{f'{fk.name}__in': parents.values(fk.target_field.attname)}
+            )
+            on_delete = rel.on_delete
+            if on_delete is models.DO_NOTHING:
+                continue
+            if on_delete in (models.PROTECT, models.RESTRICT):
+                result.protected.setdefault(fk.model, []).append(children)
+                continue
+            action = _ACTIONS.get(on_delete)
+            if action is None or DB_ON_DELETE.get(_label(fk)) != action:
+                raise ImproperlyConfigured(
+                    f"{_label(fk)}: нет ON DELETE {action or on_delete.__name__} в БД (core/deletion.py)"
+                )
+            if on_delete is models.SET_NULL:
+                result.detached.setdefault(fk.model, []).append(children)
+                continue
+            result.deleted.setdefault(fk.model, []).append(children)
+            result.depth[fk.model] = max(result.depth.get(fk.model, 0), depth + 1)
+            pending.append((fk.model, children, depth + 1))
+    return result
+
+
+def collect(queryset):
+    """``(Summary, Graph)``: по одному ``COUNT`` на модель графа."""
+    graph = walk(queryset)
+    summary = Summary()
+    for attr in ('deleted', 'detached', 'protected'):
+        paths = getattr(graph, attr)
+        getattr(summary, attr).update(
+            (model, graph.queryset(model, paths).count()) for model in paths
+        )
+    return summary, graph
+
+
+def _has_dependents(model):
+    return any(
+        not rel.many_to_many and rel.field.concrete and rel.on_delete is not models.DO_NOTHING
+        for rel in model._meta.related_objects
+    )
+
+
+def _delete_in_batches(queryset, batch_size):
+    model = queryset.model
+    q = connection.ops.quote_name
+    sql, params = queryset.values('pk')[:batch_size].query.sql_with_params()
+    total = 0
+    while True:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {q(model._meta.db_table)} WHERE {q(model._meta.pk.column)} IN ({sql})', params
+            )
+            deleted = cursor.rowcount
+        total += deleted
+        if deleted < batch_size:
+            return total
+
+
+def delete(queryset, batch_size=None):
+    """
+    Удаляет ``queryset`` со всем графом; возвращает ``Summary`` (что
+    было удалено). ``DeletionBlocked`` — если есть ``PROTECT``-ссылки.
+    Каждая пачка — своя транзакция (внутри внешней — точка сохранения).
+    """
+    from reviews import ratings
+    from reviews.models import Review
+    from venues import facets, pricing
+    from venues.models import Venue
+
+    batch_size = batch_size or getattr(settings, 'DELETE_BATCH_SIZE', 5000)
+    summary, graph = collect(queryset)
+    if any(summary.protected.values()):
+        raise DeletionBlocked(summary)
+
+    # Чей рейтинг пересчитать и какие площадки убрать из индекса фасетов и кэша цен —
+    # до удаления, пока строки на месте
+    profiles = {}
+    if Review in graph.deleted:
+        rows = graph.queryset(Review).values_list('owner_id', 'specialist_id').distinct()
+        for owner_id, specialist_id in rows:
+            if owner_id:
+                profiles.setdefault('owner', set()).add(owner_id)
+            if specialist_id:
+                profiles.setdefault('specialist', set()).add(specialist_id)
+    venues = list(graph.queryset(Venue).values_list('pk', flat=True)) if Venue in graph.deleted else []
+
+    # глубокие уровни первыми; «листья» удаляет БД вместе с пачкой родителя
+    for model in sorted(graph.deleted, key=graph.depth.get, reverse=True):
+        if model is graph.root or _has_dependents(model):
+            _delete_in_batches(graph.queryset(model), batch_size)
+
+    for kind, pks in profiles.items():
+        ratings.recompute_profiles(kind, pks)
+    if venues:
+        transaction.on_commit(lambda: _discard_venues(facets.index, venues))
+        transaction.on_commit(lambda: _discard_venues(pricing.cache, venues))
+    return summary
+
+
+def _discard_venues(index, pks):
+    for pk in pks:
+        index.discard(pk)
@@ -0,0 +1,229 @@
+# core/dimensions.py
+"""
+Справочники городов и специализаций (``City``, ``Specialty``).
+
+Город площадки, город и специализация специалиста — ``smallint``-ссылки
+на справочник вместо строки в каждой строке: индекс ``(city, status)``
+площадок и фасет «город» работают с целыми числами, опечатки и разные
+написания одного города («Москва», « москва ») не плодят
+отдельные значения, а список городов для фильтров берётся из кэша, а не
+``SELECT DISTINCT`` по всей таблице площадок.
+
+* ``normalize`` — ключ названия: без регистра, «ё» → «е», лишние пробелы;
+* ``names`` / ``ids`` / ``lookup`` — весь справочник из кэша
+  (``django.core.cache``, ``DIMENSION_CACHE_TTL``); сбрасывается сигналами
+  при изменении записей и самими функциями, которые пишут в обход ORM;
+* ``resolve`` — названия → id, недостающие записи создаются одним
+  ``INSERT ... ON CONFLICT DO NOTHING``;
+* ``backfill`` — перенос текстовой колонки в ссылку пачками по pk
+  (миграции ``venues/0003``, ``users/0004``);
+* ``merge`` / ``renormalize`` — слияние дублей с переносом ссылок пачками
+  (команда ``normalize_dimensions``).
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+
+
+def normalize(name):
+    return ' '.join((name or '').replace('ё', 'е').replace('Ё', 'Е').split()).lower()
+
+
+def _ttl():
+    return getattr(settings, 'DIMENSION_CACHE_TTL', 60 * 60)
+
+
+def _batch_size(batch_size):
+    return batch_size or getattr(settings, 'DIMENSION_BATCH_SIZE', 5000)
+
+
+# ────────────────────────────────────────────────
+# Кэш справочника
+# ────────────────────────────────────────────────
+
+def _cache_key(model):
+    return f'dimensions:{model._meta.label_lower}'
+
+
+def _load(model):
+    key = _cache_key(model)
+    data = cache.get(key)
+    if data is None:
+        rows = list(model.objects.order_by('name').values_list('id', 'name', 'key'))
+        data = ({pk: name for pk, name, _key in rows}, {key: pk for pk, _name, key in rows})
+        cache.set(key, data, _ttl())
+    return data
+
+
+def names(model):
+    """``{id: название}`` в алфавитном порядке."""
+    return _load(model)[0]
+
+
+def ids(model):
+    """``{ключ: id}``."""
+    return _load(model)[1]
+
+
+def lookup(model, name):
+    """id по названию в любом написании; ``None`` — такого нет."""
+    return ids(model).get(normalize(name))
+
+
+def invalidate(model):
+    cache.delete(_cache_key(model))
+
+
+def dimension_changed(sender, **kwargs):
+    invalidate(sender)
+    # другой процесс мог перечитать справочник до коммита — сбрасываем ещё раз
+    transaction.on_commit(lambda: invalidate(sender))
+
+
+# ────────────────────────────────────────────────
+# Запись
+# ────────────────────────────────────────────────
+
+def _insert(table, spellings):
+    """Добавляет недостающие записи по ``{ключ: название}``; ``{ключ: id}``."""
+    q = connection.ops.quote_name
+    keys = list(spellings)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {q(table)} (name, key) SELECT * FROM unnest(%s::text[], %s::text[]) '
+            f'ON CONFLICT DO NOTHING',
+            [[spellings[key] for key in keys], keys],
+        )
+        created = cursor.rowcount
+        cursor.execute(f'SELECT key, id FROM {q(table)} WHERE key = ANY(%s)', [keys])
+        return dict(cursor.fetchall()), created
+
+
+def _spellings(values):
+    spellings = {}
+    for value in values:
+        key = normalize(value)
+        if key:
+            spellings.setdefault(key, ' '.join(value.split()))
+    return spellings
+
+
+def resolve(model, values):
+    """
+    Названия → ``{название: id}``; недостающие записи создаются.
+    Пустые названия пропускаются. Если все названия уже есть в кэше —
+    без запросов к БД.
+    """
+    spellings = _spellings(values)
+    known = ids(model)
+    missing = {key: name for key, name in spellings.items() if key not in known}
+    by_key = dict(known)
+    if missing:
+        found, created = _insert(model._meta.db_table, missing)
+        by_key.update(found)
+        if created:
+            invalidate(model)
+    return {value: by_key[normalize(value)] for value in values if normalize(value)}
+
+
+def backfill(table, pk, source, target, dimension_table, batch_size=None):
+    """
+    ``table.target`` ← id записи справочника по тексту ``table.source``.
+
+    Различные написания читаются одним ``GROUP BY`` и нормализуются
+    в Python (тем же ``normalize``, что и при вводе), затем строки
+    обновляются пачками по диапазонам pk — каждая пачка своей транзакцией,
+    без долгих блокировок всей таблицы. Пустые значения остаются ``NULL``.
+    Возвращает число обновлённых строк.
+    """
+    q = connection.ops.quote_name
+    table, pk, source, target = q(table), q(pk), q(source), q(target)
+    batch_size = _batch_size(batch_size)
+    with connection.cursor() as cursor:
+        # самое частое написание становится названием записи
+        cursor.execute(f'SELECT {source} FROM {table} GROUP BY 1 ORDER BY count(*) DESC')
+        raw = [value for value, in cursor.fetchall() if normalize(value)]
+    if not raw:
+        return 0
+    by_key, _created = _insert(dimension_table, _spellings(raw))
+    mapping = [raw, [by_key[normalize(value)] for value in raw]]
+
+    total, last = 0, None
+    while True:
+        params = [] if last is None else [last]
+        lower = f'WHERE {pk} > %s' if params else ''
+        with transaction.atomic(), connection.cursor() as cursor:
+            # граница пачки; у последней её нет (max() для uuid в PostgreSQL нет)
+            cursor.execute(
+                f'SELECT {pk} FROM {table} {lower} ORDER BY {pk} OFFSET %s LIMIT 1', [*params, batch_size - 1]
+            )
+            row = cursor.fetchone()
+            upper = row[0] if row else None
+            where = [f't.{source} = m.raw'] + ([f't.{pk} > %s'] if params else [])
+            if upper is not None:
+                where.append(f't.{pk} <= %s')
+                params.append(upper)
+            cursor.execute(
+                f'UPDATE {table} t SET {target} = m.id '
+                f'FROM unnest(%s::text[], %s::smallint[]) m (raw, id) WHERE {" AND ".join(where)}',
+                [*mapping, *params],
+            )
+            total += cursor.rowcount
+        if upper is None:
+            return total
+        last = upper
+
+
+def merge(model, sources, target, batch_size=None):
+    """
+    Сливает записи ``sources`` (id) в ``target``: ссылки всех моделей
+    переносятся пачками по индексу внешнего ключа, затем записи удаляются.
+    Индекс фасетов площадок в других процессах подхватит перенос по
+    ``VENUE_FACETS_TTL``, как и любой массовый ``UPDATE``.
+    Возвращает ``{модель: перенесено ссылок}``.
+    """
+    q = connection.ops.quote_name
+    sources = [pk for pk in sources if pk != target]
+    batch_size = _batch_size(batch_size)
+    moved = {}
+    for rel in model._meta.related_objects:
+        if rel.many_to_many or not rel.field.concrete:
+            continue
+        fk = rel.field
+        table, column, pk = q(fk.model._meta.db_table), q(fk.column), q(fk.model._meta.pk.column)
+        count = 0
+        while True:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(
+                    f'UPDATE {table} SET {column} = %s WHERE {pk} IN '
+                    f'(SELECT {pk} FROM {table} WHERE {column} = ANY(%s) LIMIT %s)',
+                    [target, sources, batch_size],
+                )
+                updated = cursor.rowcount
+            count += updated
+            if updated < batch_size:
+                break
+        moved[fk.model] = count
+    model.objects.filter(pk__in=sources).delete()
+    invalidate(model)
+    return moved
+
+
+def renormalize(model, batch_size=None):
+    """
+    Пересчитывает ключи по текущему ``normalize``; записи с совпавшим
+    ключом сливаются в самую раннюю. Возвращает число слитых записей.
+    """
+    groups = {}
+    for pk, name, key in model.objects.order_by('pk').values_list('id', 'name', 'key'):
+        groups.setdefault(normalize(name), []).append((pk, key))
+    merged = 0
+    for key, rows in groups.items():
+        (target, old_key), *duplicates = rows
+        if duplicates:
+            merge(model, [pk for pk, _key in duplicates], target, batch_size)
+            merged += len(duplicates)
+        if old_key != key:
+            model.objects.filter(pk=target).update(key=key)
+    invalidate(model)
+    return merged
@@ -0,0 +1,72 @@
+# core/ids.py
+"""
+Первичные ключи UUIDv7 (RFC 9562).
+
+Первые 48 бит — unix-время в миллисекундах, следующие 12 — доли
+миллисекунды (метод 3 RFC: ключи одного процесса растут и внутри
+миллисекунды), остальное — случайные биты. Новые ключи поэтому
+попадают в правый край B-дерева первичного ключа: нет случайных
+расщеплений страниц по всему индексу, меньше WAL (full-page writes), и
+горячая часть индекса помещается в shared_buffers.
+
+Существующие ключи v4 не переписываются: смена pk потребовала бы
+переписать все ссылающиеся FK, а выигрыш даёт уже то, что новые вставки
+идут в одно место индекса. Старые случайные ключи со временем просто
+перестают быть «горячими».
+
+Короткий код записи (``core/lookup.py``) у v7 — последние 8 hex-символов
+(случайные биты): первые 8 у v7 — время, одинаковое для всех записей за
+~65 секунд. Код ищется по индексу ``tail_index``.
+"""
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+from django.db import models
+from django.db.models.functions import Cast, Right
+
+TAIL_LENGTH = 8
+
+_UNIX_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+_lock = threading.Lock()
+_last = 0
+
+
+def uuid7(at=None, random_bytes=None):
+    """
+    Новый UUIDv7. ``at`` — момент (datetime с часовым поясом) вместо текущего времени,
+    ``random_bytes`` — 10 байт вместо ``os.urandom`` (детерминированные
+    данные генератора).
+    """
+    global _last
+    if at is None:
+        nanoseconds = time.time_ns()
+    else:
+        # целочисленно: через float ``timestamp()`` миллисекунда может «уехать» на единицу
+        delta = at - _UNIX_EPOCH
+        nanoseconds = ((delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds) * 1000
+    milliseconds, rest = divmod(nanoseconds, 1_000_000)
+    fraction = rest * 4096 // 1_000_000
+    tail = int.from_bytes(random_bytes or os.urandom(10), 'big') & ((1 << 62) - 1)
+    value = (
+        (milliseconds & 0xFFFF_FFFF_FFFF) << 80
+        | 0x7 << 76
+        | fraction << 64
+        | 0b10 << 62
+        | tail
+    )
+    if at is None:
+        # тот же 1/4096 мс подряд — следующее значение, чтобы порядок не терялся
+        with _lock:
+            if value <= _last:
+                value = _last + 1
+            _last = value
+    return uuid.UUID(int=value)
+
+
+def tail_index(name):
+    """Индекс по последним 8 hex-символам pk — поиск по короткому коду v7."""
+    return models.Index(Right(Cast('id', models.TextField()), TAIL_LENGTH), name=name)
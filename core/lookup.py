@@ -0,0 +1,166 @@
+# core/lookup.py
+"""
+Поиск записей по короткому коду и по slug.
+
+Короткий код — 8 hex-символов UUID в верхнем регистре (колонка «ID» в
+админке): у ключей v4 — первые восемь, у UUIDv7 (``core/ids.py``) —
+последние, потому что первые у v7 — это время, общее для всех записей
+за ~65 секунд. Код ищется двумя проверками по индексам:
+
+* как префикс — это диапазон значений самого UUID (``ABCD1234`` ↔
+  ``abcd1234-0000-… .. abcd1234-ffff-…``; PostgreSQL сравнивает uuid
+  побайтно, в том же порядке, что и hex-строку), то есть ``pk BETWEEN``
+  по первичному ключу;
+* как «хвост» — по индексу выражения ``right(id::text, 8)`` (``tail_index``).
+
+Для повторных обращений (ссылки по slug, поддержка, которая открывает
+одну и ту же запись) разрешённые пары ``slug → pk`` и ``код → pk``
+держатся в ограниченном LRU-кэше процесса (``LOOKUP_CACHE_SIZE``
+записей на кэш). Кэш сам себя исправляет: объект всё равно читается по
+pk, и если его нет или slug уже другой, запись вытесняется и поиск
+повторяется по индексу.
+"""
+import re
+import threading
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import models
+from django.db.models.functions import Cast, Right
+from django.db.models.lookups import Exact
+
+SHORT_ID_LENGTH = 8
+
+_HEX = re.compile(r'[0-9a-f]{32}|[0-9a-f]{%d}' % SHORT_ID_LENGTH)
+
+
+def short_id(pk):
+    if isinstance(pk, uuid.UUID) and pk.version == 7:
+        return pk.hex[-SHORT_ID_LENGTH:].upper()
+    if isinstance(pk, int):
+        # номер с решёткой — так его и ищут (``short_id_q``)
+        return f'#{pk}'
+    return str(pk)[:SHORT_ID_LENGTH].upper()
+
+
+def _pk_field(model):
+    pk = model._meta.pk
+    # у профилей pk — OneToOne на пользователя
+    return pk.target_field if pk.is_relation else pk
+
+
+def uuid_range(code):
+    """Короткий код или полный UUID → ``(min, max)``; ``None``, если это не код."""
+    digits = code.strip().lower().replace('-', '')
+    if not _HEX.fullmatch(digits):
+        return None
+    return uuid.UUID(digits.ljust(32, '0')), uuid.UUID(digits.ljust(32, 'f'))
+
+
+def short_id_q(model, code):
+    """
+    ``Q`` для поиска по коду (UUID-pk) или по номеру с решёткой — ``#123``
+    (целочисленный pk); ``None`` — не код.
+    """
+    field = _pk_field(model)
+    if isinstance(field, models.UUIDField):
+        bounds = uuid_range(code)
+        if bounds is None:
+            return None
+        q = models.Q(pk__range=bounds)
+        digits = code.strip().lower()
+        if len(digits) == SHORT_ID_LENGTH:
+            tail = Right(Cast('pk', models.TextField()), SHORT_ID_LENGTH)
+            q |= models.Q(Exact(tail, digits))
+        return q
+    number = code.strip()
+    if isinstance(field, models.AutoField) and number.startswith('#') and number[1:].isdigit():
+        return models.Q(pk=int(number[1:]))
+    return None
+
+
+# ────────────────────────────────────────────────
+# LRU-кэш
+# ────────────────────────────────────────────────
+
+class LRUCache:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            try:
+                self.data.move_to_end(key)
+            except KeyError:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return self.data[key]
+
+    def put(self, key, value):
+        with self.lock:
+            self.data[key] = value
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def discard(self, key):
+        with self.lock:
+            self.data.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+            self.hits = self.misses = 0
+
+    def __len__(self):
+        return len(self.data)
+
+
+_size = getattr(settings, 'LOOKUP_CACHE_SIZE', 10000)
+slugs = LRUCache(_size)
+codes = LRUCache(_size)
+
+
+def _cached_get(cache, key, queryset, check, lookup):
+    pk = cache.get(key)
+    if pk is not None:
+        obj = queryset.filter(pk=pk).first()
+        if obj is not None and check(obj):
+            return obj
+        cache.discard(key)
+    obj = lookup()
+    cache.put(key, obj.pk)
+    return obj
+
+
+def get_by_slug(queryset, slug, field='slug'):
+    """Объект по уникальному slug; ``DoesNotExist``, если его нет."""
+    model = queryset.model
+    return _cached_get(
+        slugs, (model._meta.label, slug), queryset,
+        check=lambda obj: getattr(obj, field) == slug,
+        lookup=lambda: queryset.get(**{field: slug}),
+    )
+
+
+def get_by_short_id(queryset, code):
+    """
+    Объект по короткому коду; ``DoesNotExist`` — нет такого,
+    ``MultipleObjectsReturned`` — префикс неоднозначен (нужен полный UUID).
+    """
+    model = queryset.model
+    q = short_id_q(model, code)
+    if q is None:
+        raise model.DoesNotExist(f"Некорректный код: {code!r}")
+    normalized = code.strip().lower().replace('-', '')
+    return _cached_get(
+        codes, (model._meta.label, normalized), queryset,
+        check=lambda obj: (short_id(obj.pk).lower() == normalized
+                           or str(obj.pk).replace('-', '').startswith(normalized)),
+        lookup=lambda: queryset.get(q),
+    )
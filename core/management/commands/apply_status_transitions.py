@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core import transitions
+
+
+class Command(BaseCommand):
+    help = (
+        "Переводит статусы по времени пачками: мероприятия planned → ongoing → completed, "
+        "брони и наймы confirmed → completed, брошенные платежи pending → cancelled"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--only', nargs='*', default=None,
+                            help="имена переходов, например: booking.completed event.finished")
+        parser.add_argument('--sleep', type=float, default=0.0,
+                            help="пауза между пачками, секунды (снижает нагрузку на БД)")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="только посчитать строки, ничего не менять")
+        parser.add_argument('--every', type=float, default=None,
+                            help="повторять каждые N секунд (вместо запуска из cron)")
+
+    def handle(self, *args, **options):
+        selected = transitions.TIMED_TRANSITIONS
+        if options['only']:
+            known = {t.name for t in selected}
+            unknown = set(options['only']) - known
+            if unknown:
+                raise CommandError(f"Неизвестные переходы: {', '.join(sorted(unknown))}")
+            selected = [t for t in selected if t.name in options['only']]
+
+        while True:
+            self.run_once(selected, options)
+            if options['every'] is None:
+                break
+            time.sleep(options['every'])
+
+    def run_once(self, selected, options):
+        now = timezone.now()
+        if options['dry_run']:
+            for transition in selected:
+                count = transition.queryset(now).count()
+                self.stdout.write(f"{transition.name:25} {transition.source} → {transition.target}: {count}")
+            return
+
+        started = time.perf_counter()
+        totals = transitions.apply(
+            selected, now=now, batch_size=options['batch_size'], sleep=options['sleep']
+        )
+        for name, count in totals.items():
+            self.stdout.write(f"{name:25} {count}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Готово: {sum(totals.values())} строк за {time.perf_counter() - started:.1f} с"
+        ))
@@ -0,0 +1,58 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import benchmarks
+
+
+class Command(BaseCommand):
+    help = "Замеряет ключевые пути чтения и записи и сохраняет результат в JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', '-o', default='bench_output.json',
+                            help="куда записать JSON (по умолчанию bench_output.json)")
+        parser.add_argument('--repeat', type=int, default=20, help="повторов на бенчмарк")
+        parser.add_argument('--only', nargs='*', default=None,
+                            help="подстроки имён бенчмарков, например: read.venue write")
+        parser.add_argument('--admin', action='store_true',
+                            help="дополнительно замерить страницы админки")
+        parser.add_argument('--explain', action='store_true',
+                            help="сохранить сводки EXPLAIN (ANALYZE, BUFFERS) запросов читающих бенчмарков")
+        parser.add_argument('--compare', default=None,
+                            help="JSON предыдущего прогона для сравнения по медиане")
+
+    def handle(self, *args, **options):
+        ctx = benchmarks.Context.sample()
+        if ctx.venue_id is None:
+            raise CommandError("В базе нет бронирований — сначала запустите generate_marketplace")
+
+        results = benchmarks.run(
+            options['only'], repeat=options['repeat'], ctx=ctx, plans=options['explain'],
+        )
+        if options['admin']:
+            results.update(benchmarks.run_admin(repeat=max(1, options['repeat'] // 4)))
+
+        for name, stats in results.items():
+            self.stdout.write(
+                f"{name:45} median {stats['median_ms']:9.3f} ms   "
+                f"p95 {stats['p95_ms']:9.3f} ms   SQL {stats['queries']}"
+            )
+            for plan in stats.get('plans', ()):
+                self.stdout.write(
+                    f"    {' → '.join(plan['nodes'])}; {plan['execution_ms']} ms, "
+                    f"buffers hit {plan['shared_hit']} read {plan['shared_read']}, "
+                    f"heap fetches {plan['heap_fetches']}"
+                )
+
+        payload = {'meta': benchmarks.environment(), 'results': results}
+        with open(options['output'], 'w', encoding='utf-8') as fh:
+            json.dump(payload, fh, ensure_ascii=False, indent=2, default=str)
+        self.stdout.write(self.style.SUCCESS(f"Результаты записаны в {options['output']}"))
+
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as fh:
+                previous = json.load(fh)['results']
+            self.stdout.write("\nСравнение с предыдущим прогоном (медиана):")
+            for name, before, after, change in benchmarks.compare(results, previous):
+                style = self.style.ERROR if change > 10 else self.style.SUCCESS if change < -10 else str
+                self.stdout.write(style(f"{name:45} {before:9.3f} → {after:9.3f} ms  ({change:+.1f}%)"))
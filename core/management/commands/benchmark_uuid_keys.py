@@ -0,0 +1,32 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from core import benchmarks
+
+
+class Command(BaseCommand):
+    help = "Сравнивает вставку платежей с ключами UUIDv4 и UUIDv7: скорость, WAL, размер индекса pk"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10_000_000, help="строк на каждую версию")
+        parser.add_argument('--batch-size', type=int, default=100_000, help="строк в одном COPY")
+        parser.add_argument('--versions', type=int, nargs='+', choices=[4, 7], default=[4, 7])
+        parser.add_argument('--output', '-o', default=None, help="куда записать JSON")
+
+    def handle(self, *args, **options):
+        results = []
+        for version in options['versions']:
+            stats = benchmarks.key_insert(version, options['rows'], options['batch_size'])
+            results.append(stats)
+            self.stdout.write(
+                f"v{version}: {stats['rows']} строк за {stats['seconds']} с "
+                f"({stats['rows_per_s']}/с; первая пачка {stats['first_batch_rows_per_s']}/с, "
+                f"последняя {stats['last_batch_rows_per_s']}/с), "
+                f"WAL {stats['wal_bytes'] / 2**20:.0f} МБ, pk {stats['pkey_bytes'] / 2**20:.0f} МБ, "
+                f"индексы {stats['indexes_bytes'] / 2**20:.0f} МБ, таблица {stats['table_bytes'] / 2**20:.0f} МБ"
+            )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as fh:
+                json.dump({'meta': benchmarks.environment(), 'results': results}, fh, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Результаты записаны в {options['output']}"))
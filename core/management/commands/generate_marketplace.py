@@ -0,0 +1,76 @@
+import dataclasses
+import multiprocessing
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+
+from core.synthetic import Plan, dimension_ids, phases, reserve_hire_ids, run_task, _worker
+from reviews.ratings import PROFILES, recompute_shard
+
+
+class Command(BaseCommand):
+    help = (
+        "Генерирует синтетические связанные данные по всей схеме "
+        "(пользователи, площадки, мероприятия, брони, наймы, платежи) через COPY"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100_000,
+                            help="примерное общее число строк (по умолчанию 100 000)")
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help="число параллельных процессов")
+        parser.add_argument('--seed', type=int, default=0,
+                            help="seed генератора; один seed = одинаковые данные")
+        parser.add_argument('--tag', default=None,
+                            help="префикс для email / slug (по умолчанию s<seed>)")
+        parser.add_argument('--no-analyze', action='store_true',
+                            help="не запускать ANALYZE после загрузки")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError("Генератор использует COPY и работает только с PostgreSQL")
+
+        workers = max(1, options['workers'])
+        plan = Plan.for_rows(options['rows'], seed=options['seed'], tag=options['tag'])
+        with transaction.atomic():
+            plan = dataclasses.replace(plan, hire_id_base=reserve_hire_ids(plan.hires), **dimension_ids())
+
+        self.stdout.write(
+            f"План: {plan.total_rows:,} строк — арендаторов {plan.renters:,}, владельцев {plan.owners:,}, "
+            f"специалистов {plan.specialists:,}, площадок {plan.venues:,}, мероприятий {plan.events:,}, "
+            f"броней {plan.bookings:,}, наймов {plan.hires:,}, платежей {plan.payments:,}; воркеров: {workers}"
+        )
+
+        started = time.perf_counter()
+        total = 0
+        for index in range(len(phases(plan))):
+            phase_started = time.perf_counter()
+            tasks = [(plan, index, shard, workers) for shard in range(workers)]
+            if workers == 1:
+                written = run_task(*tasks[0])
+            else:
+                # дочерние процессы не должны делить сокет с родителем
+                connections.close_all()
+                with multiprocessing.get_context('fork').Pool(workers) as pool:
+                    written = sum(pool.map(_worker, tasks))
+            total += written
+            elapsed = time.perf_counter() - phase_started
+            self.stdout.write(
+                f"  фаза {index + 1}: {written:,} строк за {elapsed:.1f} с "
+                f"({written / max(elapsed, 1e-9):,.0f} строк/с)"
+            )
+
+        # COPY обходит инкрементальный пересчёт рейтингов — считаем разом
+        for kind in PROFILES:
+            recompute_shard(kind, 0, 1)
+
+        if not options['no_analyze']:
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Готово: {total:,} строк за {elapsed:.1f} с ({total / max(elapsed, 1e-9):,.0f} строк/с)"
+        ))
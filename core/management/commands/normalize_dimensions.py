@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import dimensions
+from core.models import City, Specialty
+
+MODELS = {'city': City, 'specialty': Specialty}
+
+
+class Command(BaseCommand):
+    help = (
+        "Нормализует справочники городов и специализаций: пересчитывает ключи и сливает "
+        "дубли, переносит ссылки пачками (--merge СПб Питер --into Санкт-Петербург)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('dimensions', nargs='*', metavar='DIMENSION',
+                            help=f"справочники: {', '.join(MODELS)} (по умолчанию все)")
+        parser.add_argument('--merge', nargs='+', default=[], metavar='NAME',
+                            help="названия, которые слить в --into")
+        parser.add_argument('--into', default=None, metavar='NAME', help="запись, в которую сливать")
+        parser.add_argument('--batch-size', type=int, default=None, help="строк в одном UPDATE")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        unknown = set(options['dimensions']) - set(MODELS)
+        if unknown:
+            raise CommandError(f"Неизвестные справочники: {', '.join(sorted(unknown))}")
+        options['dimensions'] = options['dimensions'] or list(MODELS)
+        if options['merge'] or options['into']:
+            if not (options['merge'] and options['into']) or len(options['dimensions']) != 1:
+                raise CommandError("--merge и --into задаются вместе и для одного справочника")
+            self._merge(MODELS[options['dimensions'][0]], options['merge'], options['into'], batch_size)
+            return
+        for name in options['dimensions']:
+            model = MODELS[name]
+            merged = dimensions.renormalize(model, batch_size)
+            self.stdout.write(f"{model._meta.verbose_name_plural}: слито дублей — {merged}")
+
+    def _merge(self, model, names, into, batch_size):
+        target = dimensions.lookup(model, into)
+        if target is None:
+            raise CommandError(f"Нет записи «{into}» ({model._meta.verbose_name_plural})")
+        sources = [dimensions.lookup(model, name) for name in names]
+        unknown = [name for name, pk in zip(names, sources) if pk is None]
+        if unknown:
+            raise CommandError(f"Нет записей: {', '.join(unknown)}")
+        moved = dimensions.merge(model, sources, target, batch_size)
+        for related, count in moved.items():
+            self.stdout.write(f"{related._meta.verbose_name_plural}: перенесено ссылок — {count}")
+        self.stdout.write(self.style.SUCCESS(f"Слито в «{into}»: {', '.join(names)}"))
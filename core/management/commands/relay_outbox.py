@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import outbox
+
+
+class Command(BaseCommand):
+    help = (
+        "Доставляет журнал изменений броней, наймов и платежей потребителям из "
+        "OUTBOX_CONSUMERS пачками; с --every работает постоянно и просыпается по NOTIFY"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('consumers', nargs='*', metavar='CONSUMER',
+                            help="потребители из OUTBOX_CONSUMERS (по умолчанию все)")
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--every', type=float, default=None,
+                            help="работать постоянно; без уведомлений проверять журнал каждые N секунд")
+        parser.add_argument('--no-prune', action='store_true',
+                            help="не удалять записи, прочитанные всеми потребителями")
+
+    def handle(self, *args, **options):
+        handlers = outbox.consumers()
+        unknown = set(options['consumers']) - set(handlers)
+        if unknown:
+            raise CommandError(f"Неизвестные потребители: {', '.join(sorted(unknown))}")
+        if options['consumers']:
+            handlers = {name: handlers[name] for name in options['consumers']}
+        if not handlers:
+            raise CommandError("Потребители не настроены (OUTBOX_CONSUMERS)")
+
+        if options['every'] is not None:
+            outbox.listen()
+        while True:
+            self.run_once(handlers, options)
+            if options['every'] is None:
+                break
+            outbox.wait(options['every'])
+
+    def run_once(self, handlers, options):
+        for name, handler in handlers.items():
+            started = time.perf_counter()
+            delivered = outbox.drain(name, handler, options['batch_size'])
+            if delivered:
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"{name}: доставлено записей: {delivered} за {elapsed:.2f} с "
+                    f"({delivered / max(elapsed, 1e-9):,.0f} записей/с)"
+                )
+        if not options['no_prune']:
+            pruned = outbox.prune()
+            if pruned:
+                self.stdout.write(f"Удалено прочитанных записей: {pruned}")
@@ -0,0 +1,70 @@
+from django.db import migrations
+
+# (приложение, модель, поле, действие) — то же, что core.deletion.DB_ON_DELETE
+# на момент миграции
+FOREIGN_KEYS = [
+    ('events', 'Event', 'renter', 'CASCADE'),
+    ('venues', 'Venue', 'owner', 'CASCADE'),
+    ('venues', 'VenueImage', 'venue', 'CASCADE'),
+    ('bookings', 'Booking', 'event', 'CASCADE'),
+    ('bookings', 'Booking', 'venue', 'CASCADE'),
+    ('bookings', 'Booking', 'renter', 'CASCADE'),
+    ('hires', 'Hire', 'event', 'CASCADE'),
+    ('payments', 'Payment', 'booking', 'SET NULL'),
+    ('payments', 'Payment', 'hire', 'SET NULL'),
+    ('reviews', 'Review', 'booking', 'CASCADE'),
+    ('reviews', 'Review', 'hire', 'CASCADE'),
+    ('reviews', 'Review', 'author', 'CASCADE'),
+    ('reviews', 'Review', 'owner', 'CASCADE'),
+    ('reviews', 'Review', 'specialist', 'CASCADE'),
+    ('archive', 'ArchivedRow', 'event', 'CASCADE'),
+]
+
+
+def _set_on_delete(apps, schema_editor, reverse=False):
+    connection = schema_editor.connection
+    q = schema_editor.quote_name
+    for app_label, model_name, field_name, action in FOREIGN_KEYS:
+        field = apps.get_model(app_label, model_name)._meta.get_field(field_name)
+        table = field.model._meta.db_table
+        target = (field.related_model._meta.db_table, field.target_field.column)
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, table)
+        name = next(
+            name for name, info in constraints.items()
+            if info['foreign_key'] == target and info['columns'] == [field.column]
+        )
+        # Ограничение пересоздаётся NOT VALID (без проверки строк под
+        # блокировкой) и проверяется отдельной командой
+        schema_editor.execute(
+            f'ALTER TABLE {q(table)} DROP CONSTRAINT {q(name)}, '
+            f'ADD CONSTRAINT {q(name)} FOREIGN KEY ({q(field.column)}) '
+            f'REFERENCES {q(target[0])} ({q(target[1])}) '
+            f'ON DELETE {"NO ACTION" if reverse else action} DEFERRABLE INITIALLY DEFERRED NOT VALID'
+        )
+        schema_editor.execute(f'ALTER TABLE {q(table)} VALIDATE CONSTRAINT {q(name)}')
+
+
+def _reset_on_delete(apps, schema_editor):
+    _set_on_delete(apps, schema_editor, reverse=True)
+
+
+class Migration(migrations.Migration):
+    # Django (5.2) создаёт внешние ключи без ON DELETE и каскадирует сам, в
+    # Python. Действия на стороне БД нужны core/deletion.py. Если поле из
+    # списка позже изменит миграция, пересоздающая FK, действие нужно вернуть
+    atomic = False
+
+    dependencies = [
+        ('archive', '0002_archived_event_id_tail_idx'),
+        ('bookings', '0006_booking_uuid7_ids'),
+        ('events', '0002_event_uuid7_ids'),
+        ('hires', '0002_status_end_datetime_index'),
+        ('payments', '0006_payment_single_target'),
+        ('reviews', '0002_review_uuid7_ids'),
+        ('venues', '0002_venue_uuid7_ids'),
+    ]
+
+    operations = [
+        migrations.RunPython(_set_on_delete, _reset_on_delete),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.9 on 2026-10-19 03:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_db_on_delete'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='City',
+            fields=[
+                ('id', models.SmallAutoField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=150, unique=True, verbose_name='название')),
+                ('key', models.CharField(editable=False, max_length=150, unique=True, verbose_name='ключ')),
+            ],
+            options={
+                'verbose_name': 'город',
+                'verbose_name_plural': 'города',
+                'ordering': ['name'],
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='Specialty',
+            fields=[
+                ('id', models.SmallAutoField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=150, unique=True, verbose_name='название')),
+                ('key', models.CharField(editable=False, max_length=150, unique=True, verbose_name='ключ')),
+            ],
+            options={
+                'verbose_name': 'специализация',
+                'verbose_name_plural': 'специализации',
+                'ordering': ['name'],
+                'abstract': False,
+            },
+        ),
+    ]
@@ -0,0 +1,114 @@
+# Generated by Django 5.2.9 on 2026-10-19 04:01
+
+import django.db.models.functions.datetime
+from django.db import migrations, models
+
+# Таблицы, изменения которых пишутся в журнал (core/outbox.py): (таблица, тема)
+TABLES = [
+    ('bookings_booking', 'bookings.booking'),
+    ('hires_hire', 'hires.hire'),
+    ('payments_payment', 'payments.payment'),
+]
+
+# Один вызов на оператор: строки — из transition-таблиц. Первичный ключ
+# у всех таблиц — id. outbox.capture = off (core.outbox.suppressed) —
+# загрузка без журнала
+CAPTURE_FUNCTION = '''
+CREATE FUNCTION core_outbox_capture() RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    xact bigint;
+BEGIN
+    IF current_setting('outbox.capture', true) = 'off' THEN
+        RETURN NULL;
+    END IF;
+    xact := pg_current_xact_id()::text::bigint;
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO core_outboxentry (txid, topic, op, object_id, payload)
+        SELECT xact, TG_ARGV[0], 'insert', n.id::text, to_jsonb(n) FROM new_rows n;
+    ELSIF TG_OP = 'UPDATE' THEN
+        INSERT INTO core_outboxentry (txid, topic, op, object_id, payload)
+        SELECT xact, TG_ARGV[0], 'update', n.id::text, to_jsonb(n)
+        FROM new_rows n JOIN old_rows o ON o.id = n.id
+        WHERE n IS DISTINCT FROM o;
+    ELSE
+        INSERT INTO core_outboxentry (txid, topic, op, object_id, payload)
+        SELECT xact, TG_ARGV[0], 'delete', o.id::text, to_jsonb(o) FROM old_rows o;
+    END IF;
+    IF FOUND THEN
+        -- одинаковые уведомления транзакции PostgreSQL сливает в одно
+        PERFORM pg_notify('outbox', TG_ARGV[0]);
+    END IF;
+    RETURN NULL;
+END
+$$
+'''
+
+TRIGGERS = [
+    ('insert', 'INSERT', 'NEW TABLE AS new_rows'),
+    ('update', 'UPDATE', 'OLD TABLE AS old_rows NEW TABLE AS new_rows'),
+    ('delete', 'DELETE', 'OLD TABLE AS old_rows'),
+]
+
+
+def create_triggers_sql():
+    return [CAPTURE_FUNCTION] + [
+        f"CREATE TRIGGER {table}_outbox_{name} AFTER {event} ON {table} "
+        f"REFERENCING {transition} FOR EACH STATEMENT "
+        f"EXECUTE FUNCTION core_outbox_capture('{topic}')"
+        for table, topic in TABLES
+        for name, event, transition in TRIGGERS
+    ]
+
+
+def drop_triggers_sql():
+    return [
+        f'DROP TRIGGER {table}_outbox_{name} ON {table}'
+        for table, _topic in TABLES
+        for name, _event, _transition in TRIGGERS
+    ] + ['DROP FUNCTION core_outbox_capture()']
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0006_booking_uuid7_ids'),
+        ('core', '0002_city_specialty'),
+        ('hires', '0002_status_end_datetime_index'),
+        ('payments', '0006_payment_single_target'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxConsumer',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False, verbose_name='имя')),
+                ('txid', models.BigIntegerField(default=0, verbose_name='транзакция')),
+                ('entry_id', models.BigIntegerField(default=0, verbose_name='запись')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='обновлён')),
+            ],
+            options={
+                'verbose_name': 'потребитель журнала',
+                'verbose_name_plural': 'потребители журнала',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='OutboxEntry',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('txid', models.BigIntegerField(verbose_name='транзакция')),
+                ('topic', models.CharField(max_length=50, verbose_name='модель')),
+                ('op', models.CharField(choices=[('insert', 'создание'), ('update', 'изменение'), ('delete', 'удаление')], max_length=6, verbose_name='операция')),
+                ('object_id', models.CharField(max_length=36, verbose_name='id объекта')),
+                ('payload', models.JSONField(verbose_name='строка')),
+                ('created_at', models.DateTimeField(db_default=django.db.models.functions.datetime.Now(), verbose_name='записано')),
+            ],
+            options={
+                'verbose_name': 'запись журнала изменений',
+                'verbose_name_plural': 'журнал изменений',
+                'ordering': ['-txid', '-id'],
+                'indexes': [models.Index(fields=['txid', 'id'], name='outbox_position_idx')],
+            },
+        ),
+        migrations.RunSQL(create_triggers_sql(), drop_triggers_sql()),
+    ]
@@ -0,0 +1,104 @@
+from django.db import models
+from django.db.models.functions import Now
+from django.utils.translation import gettext_lazy as _
+
+
+class Dimension(models.Model):
+    """
+    Справочник с компактным целочисленным ключом (``core/dimensions.py``).
+
+    ``key`` — нормализованное название (регистр, «ё», пробелы): по нему
+    написания «Москва» и « москва » — одна запись; ``name`` — как показывать.
+    """
+    id = models.SmallAutoField(primary_key=True)
+    name = models.CharField(_("название"), max_length=150, unique=True)
+    key = models.CharField(_("ключ"), max_length=150, unique=True, editable=False)
+
+    class Meta:
+        abstract = True
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+    def save(self, *args, **kwargs):
+        from .dimensions import normalize
+
+        self.name = ' '.join(self.name.split())
+        self.key = normalize(self.name)
+        super().save(*args, **kwargs)
+
+
+class City(Dimension):
+    """Город — общий для площадок и специалистов"""
+
+    class Meta(Dimension.Meta):
+        verbose_name = _("город")
+        verbose_name_plural = _("города")
+
+
+class Specialty(Dimension):
+    """Специализация специалиста"""
+
+    class Meta(Dimension.Meta):
+        verbose_name = _("специализация")
+        verbose_name_plural = _("специализации")
+
+
+class OutboxEntry(models.Model):
+    """
+    Запись журнала изменений (``core/outbox.py``) — только на добавление.
+
+    Пишется триггером в той же транзакции, что и изменение брони, найма
+    или платежа. ``txid`` — транзакция-автор: порядок журнала —
+    ``(txid, id)``, потребитель читает только завершённые транзакции.
+    """
+    OP_CHOICES = [
+        ('insert', _("создание")),
+        ('update', _("изменение")),
+        ('delete', _("удаление")),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    txid = models.BigIntegerField(_("транзакция"))
+    topic = models.CharField(_("модель"), max_length=50)
+    op = models.CharField(_("операция"), max_length=6, choices=OP_CHOICES)
+    object_id = models.CharField(_("id объекта"), max_length=36)
+    payload = models.JSONField(_("строка"))
+    created_at = models.DateTimeField(_("записано"), db_default=Now())
+
+    class Meta:
+        verbose_name = _("запись журнала изменений")
+        verbose_name_plural = _("журнал изменений")
+        ordering = ['-txid', '-id']
+        indexes = [
+            # чтение потребителем от позиции; по нему же — очистка
+            models.Index(fields=['txid', 'id'], name='outbox_position_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.topic} {self.object_id}: {self.op}"
+
+    @property
+    def position(self):
+        return (self.txid, self.id)
+
+
+class OutboxConsumer(models.Model):
+    """Потребитель журнала изменений и его позиция — последняя подтверждённая запись."""
+    name = models.CharField(_("имя"), max_length=100, primary_key=True)
+    txid = models.BigIntegerField(_("транзакция"), default=0)
+    entry_id = models.BigIntegerField(_("запись"), default=0)
+    updated_at = models.DateTimeField(_("обновлён"), auto_now=True)
+
+    class Meta:
+        verbose_name = _("потребитель журнала")
+        verbose_name_plural = _("потребители журнала")
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+    @property
+    def position(self):
+        return (self.txid, self.entry_id)
@@ -0,0 +1,235 @@
+# core/outbox.py
+"""
+Журнал изменений броней, наймов и платежей (transactional outbox).
+
+Каждое изменение строк ``bookings_booking``, ``hires_hire`` и
+``payments_payment`` — ``save``, ``QuerySet.update``, ``bulk_create``,
+каскад ``ON DELETE`` на стороне БД (``core/deletion.py``) — попадает в
+``OutboxEntry`` триггером в той же транзакции (миграция
+``core/0003_outbox``). Триггеры уровня оператора читают изменённые строки
+из transition-таблиц: массовый ``UPDATE`` на тысячи строк — один
+``INSERT ... SELECT`` в журнал и одно ``NOTIFY outbox`` при коммите.
+Изменение без разницы в строке записи не порождает.
+
+Порядок журнала — ``(txid, id)``: транзакции, а внутри — записи по
+порядку. Потребитель читает только записи транзакций старше
+``pg_snapshot_xmin`` — все они уже завершены, поэтому транзакция,
+закоммиченная позже соседки с большим ``id``, не будет пропущена
+(долгая транзакция задерживает журнал, но не теряет записи).
+
+* ``read`` / ``acknowledge`` / ``seek`` / ``position`` / ``head`` — API
+  позиций для потребителей, которые забирают записи сами;
+* ``relay`` — одна пачка потребителю-обработчику (``OUTBOX_CONSUMERS``):
+  строка потребителя блокируется ``FOR UPDATE SKIP LOCKED``, обработчик
+  вызывается, позиция сдвигается — всё в одной транзакции. Ошибка
+  обработчика откатывает сдвиг, пачка придёт снова (at-least-once);
+  параллельные процессы делят потребителей, а не записи, поэтому
+  порядок для потребителя сохраняется;
+* ``wait`` — ``LISTEN outbox`` до уведомления или таймаута;
+* ``prune`` — удаление записей, которые прочитали все потребители и
+  которые старше ``OUTBOX_RETENTION``;
+* ``suppressed`` — загрузка без журнала (генератор синтетических данных).
+"""
+import logging
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import BooleanField
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import OutboxConsumer, OutboxEntry
+
+CHANNEL = 'outbox'
+
+logger = logging.getLogger(__name__)
+
+# Транзакции младше этой границы ещё могут быть не завершены
+_COMMITTED = 'txid < pg_snapshot_xmin(pg_current_snapshot())::text::bigint'
+
+
+def _batch_size(batch_size):
+    return batch_size or getattr(settings, 'OUTBOX_BATCH_SIZE', 1000)
+
+
+def _after(position):
+    return RawSQL(
+        f'(txid, id) > (%s, %s) AND {_COMMITTED}', tuple(position), output_field=BooleanField()
+    )
+
+
+def consumers():
+    """``{имя: обработчик пачки}`` из ``settings.OUTBOX_CONSUMERS``."""
+    return {
+        name: import_string(path) if isinstance(path, str) else path
+        for name, path in getattr(settings, 'OUTBOX_CONSUMERS', {}).items()
+    }
+
+
+# ────────────────────────────────────────────────
+# Позиции потребителей
+# ────────────────────────────────────────────────
+
+def fetch(after=(0, 0), limit=None, topics=None):
+    """Завершённые записи после позиции ``after`` в порядке журнала."""
+    qs = OutboxEntry.objects.filter(_after(after))
+    if topics:
+        qs = qs.filter(topic__in=topics)
+    return list(qs.order_by('txid', 'id')[:_batch_size(limit)])
+
+
+def position(name):
+    """Позиция потребителя ``(txid, id)``; новый потребитель читает журнал с начала."""
+    return OutboxConsumer.objects.filter(pk=name).values_list('txid', 'entry_id').first() or (0, 0)
+
+
+def read(name, limit=None, topics=None):
+    """Следующие записи потребителя ``name``; позиция не сдвигается до ``acknowledge``."""
+    return fetch(position(name), limit, topics)
+
+
+def acknowledge(name, entry):
+    """
+    Подтверждает записи до ``entry`` (запись или позиция) включительно.
+    Позиция только растёт: повторное или запоздавшее подтверждение не
+    откатывает её назад.
+    """
+    txid, entry_id = getattr(entry, 'position', entry)
+    OutboxConsumer.objects.bulk_create([OutboxConsumer(name=name)], ignore_conflicts=True)
+    return bool(
+        OutboxConsumer.objects.filter(pk=name)
+        .filter(RawSQL('(txid, entry_id) < (%s, %s)', (txid, entry_id), output_field=BooleanField()))
+        .update(txid=txid, entry_id=entry_id, updated_at=timezone.now())
+    )
+
+
+def head(before=None):
+    """
+    Позиция последней завершённой записи журнала (``before`` — среди
+    записанных раньше этого момента): ``seek`` / ``acknowledge`` к ней
+    пропускают прошлое. Обратный проход по ``(txid, id)``.
+    """
+    qs = OutboxEntry.objects.filter(RawSQL(_COMMITTED, (), output_field=BooleanField()))
+    if before is not None:
+        qs = qs.filter(created_at__lt=before)
+    return qs.order_by('-txid', '-id').values_list('txid', 'id').first() or (0, 0)
+
+
+def seek(name, to=(0, 0)):
+    """Ставит позицию потребителя явно — например, назад, чтобы перечитать журнал."""
+    txid, entry_id = getattr(to, 'position', to)
+    OutboxConsumer.objects.update_or_create(pk=name, defaults={'txid': txid, 'entry_id': entry_id})
+
+
+# ────────────────────────────────────────────────
+# Доставка обработчикам
+# ────────────────────────────────────────────────
+
+def _lock(name):
+    return OutboxConsumer.objects.select_for_update(skip_locked=True).filter(pk=name).first()
+
+
+def relay(name, handler, batch_size=None, topics=None):
+    """
+    Доставляет обработчику ``handler(entries)`` одну пачку потребителя ``name``.
+
+    Возвращает число записей; ``None`` — потребителя обслуживает другой
+    процесс. Исключение обработчика пробрасывается, позиция не сдвигается.
+    """
+    with transaction.atomic():
+        consumer = _lock(name)
+        if consumer is None:
+            if OutboxConsumer.objects.filter(pk=name).exists():
+                return None
+            OutboxConsumer.objects.bulk_create([OutboxConsumer(name=name)], ignore_conflicts=True)
+            consumer = _lock(name)
+            if consumer is None:
+                return None
+        entries = fetch(consumer.position, batch_size, topics)
+        if entries:
+            handler(entries)
+            consumer.txid, consumer.entry_id = entries[-1].position
+            consumer.save(update_fields=['txid', 'entry_id', 'updated_at'])
+    return len(entries)
+
+
+def drain(name, handler, batch_size=None, topics=None):
+    """Доставляет пачки, пока журнал потребителя не кончится; возвращает число записей."""
+    total = 0
+    while True:
+        delivered = relay(name, handler, batch_size, topics)
+        if not delivered:
+            return total
+        total += delivered
+
+
+def listen():
+    connection.ensure_connection()
+    connection.connection.execute(f'LISTEN {CHANNEL}')
+
+
+def wait(timeout):
+    """
+    Ждёт ``NOTIFY outbox`` не дольше ``timeout`` секунд (после ``listen``);
+    True — пришло уведомление. Уведомления, пришедшие за время доставки,
+    тоже будят сразу.
+    """
+    for _notify in connection.connection.notifies(timeout=timeout, stop_after=1):
+        return True
+    return False
+
+
+def log_entries(entries):
+    """Обработчик-пример: пишет пачку в лог ``core.outbox``."""
+    for entry in entries:
+        logger.info('%s %s %s', entry.topic, entry.op, entry.object_id)
+
+
+# ────────────────────────────────────────────────
+# Обслуживание
+# ────────────────────────────────────────────────
+
+def prune(batch_size=None, now=None):
+    """
+    Удаляет пачками записи, которые подтвердили все потребители и которые
+    старше ``OUTBOX_RETENTION`` (секунд). Без потребителей хранится
+    ``OUTBOX_RETENTION``. Возвращает число удалённых записей.
+    """
+    retention = getattr(settings, 'OUTBOX_RETENTION', 7 * 24 * 60 * 60)
+    cutoff = (now or timezone.now()) - timedelta(seconds=retention)
+    batch_size = batch_size or getattr(settings, 'DELETE_BATCH_SIZE', 5000)
+    low = OutboxConsumer.objects.order_by('txid', 'entry_id').values_list('txid', 'entry_id').first()
+    q = connection.ops.quote_name
+    table = q(OutboxEntry._meta.db_table)
+    bound = '' if low is None else 'AND (txid, id) <= (%s, %s)'
+    params = [cutoff, *(low or ())]
+    total = 0
+    while True:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {table} WHERE id IN (SELECT id FROM {table} '
+                f'WHERE created_at < %s {bound} ORDER BY txid, id LIMIT %s)',
+                [*params, batch_size],
+            )
+            deleted = cursor.rowcount
+        total += deleted
+        if deleted < batch_size:
+            return total
+
+
+@contextmanager
+def suppressed():
+    """
+    Изменения внутри блока в журнал не попадают (``SET LOCAL`` — до конца
+    транзакции; вызывать внутри ``transaction.atomic``).
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT set_config('outbox.capture', 'off', true)")
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT set_config('outbox.capture', 'on', true)")
@@ -0,0 +1,363 @@
+# core/recurrence.py
+"""
+Повторяющиеся мероприятия и брони: подмножество RRULE (RFC 5545).
+
+Серия хранится одной строкой: период первого занятия, правило
+(``recurrence``) и отменённые занятия (``recurrence_exdates``). Остальные
+занятия не материализуются — ``occurrences`` разворачивает их генератором
+и только внутри запрошенного окна: начало окна переводится в номер
+периода арифметикой, поэтому проверка месяца у серии на два года — это
+несколько занятий, а не перебор сотни строк. Правка серии — ``UPDATE``
+одной строки.
+
+Поддерживается::
+
+    FREQ=DAILY|WEEKLY|MONTHLY|YEARLY
+    INTERVAL=n
+    BYDAY=MO,TU,...      (только WEEKLY; без BYDAY — день первого занятия)
+    COUNT=n | UNTIL=YYYYMMDD[THHMMSSZ]
+
+Занятия сдвигаются в местном времени (``TIME_ZONE``): еженедельное
+занятие в 19:00 остаётся в 19:00 и после перехода на летнее время.
+MONTHLY / YEARLY повторяют число месяца первого занятия; месяцы без
+такого числа пропускаются, как в RFC 5545.
+
+``RecurringMixin`` — общее поведение моделей с полями ``recurrence``,
+``recurrence_exdates``, ``recurrence_until`` (дата последнего занятия,
+пересчитывается в ``save()``; ``NULL`` — серия бесконечна). По
+``recurrence_until`` PostgreSQL вычисляет ``series_ends_at`` — окончание
+серии для отбора кандидатов по индексу.
+"""
+import calendar
+import heapq
+from dataclasses import dataclass, replace
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from functools import lru_cache
+
+from django.core.exceptions import ValidationError
+from django.db.models import DateTimeField, F, Func, Value
+from django.utils import timezone
+
+FREQUENCIES = ('DAILY', 'WEEKLY', 'MONTHLY', 'YEARLY')
+WEEKDAYS = ('MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU')
+
+
+class RecurrenceError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class Rule:
+    freq: str
+    interval: int = 1
+    byday: tuple = ()       # номера дней недели, 0 — понедельник
+    count: int = None
+    until: object = None    # date или aware datetime (UTC)
+
+    def __str__(self):
+        parts = [f'FREQ={self.freq}']
+        if self.interval != 1:
+            parts.append(f'INTERVAL={self.interval}')
+        if self.byday:
+            parts.append(f"BYDAY={','.join(WEEKDAYS[day] for day in self.byday)}")
+        if self.count is not None:
+            parts.append(f'COUNT={self.count}')
+        if isinstance(self.until, datetime):
+            parts.append(f"UNTIL={self.until.astimezone(dt_timezone.utc):%Y%m%dT%H%M%SZ}")
+        elif self.until is not None:
+            parts.append(f'UNTIL={self.until:%Y%m%d}')
+        return ';'.join(parts)
+
+
+def _until(value):
+    try:
+        if 'T' in value:
+            if not value.endswith('Z'):
+                raise ValueError
+            return datetime.strptime(value, '%Y%m%dT%H%M%SZ').replace(tzinfo=dt_timezone.utc)
+        return datetime.strptime(value, '%Y%m%d').date()
+    except ValueError:
+        raise RecurrenceError(f"UNTIL: ожидается YYYYMMDD или YYYYMMDDTHHMMSSZ, получено {value!r}")
+
+
+def _positive(name, value):
+    if not value.isdigit() or int(value) < 1:
+        raise RecurrenceError(f"{name}: ожидается целое больше нуля, получено {value!r}")
+    return int(value)
+
+
+@lru_cache(maxsize=1024)
+def parse(text):
+    """Строка правила (``FREQ=WEEKLY;BYDAY=MO,WE``, можно с префиксом ``RRULE:``) → ``Rule``."""
+    text = text.strip()
+    if text.upper().startswith('RRULE:'):
+        text = text[6:]
+    parts = {}
+    for part in filter(None, text.split(';')):
+        key, sep, value = part.partition('=')
+        key, value = key.strip().upper(), value.strip().upper()
+        if not sep or not value:
+            raise RecurrenceError(f"Часть правила без значения: {part!r}")
+        if key in parts:
+            raise RecurrenceError(f"{key} указан дважды")
+        parts[key] = value
+    unknown = set(parts) - {'FREQ', 'INTERVAL', 'BYDAY', 'COUNT', 'UNTIL', 'WKST'}
+    if unknown:
+        raise RecurrenceError(f"Не поддерживается: {', '.join(sorted(unknown))}")
+    if parts.get('FREQ') not in FREQUENCIES:
+        raise RecurrenceError(f"FREQ: одно из {', '.join(FREQUENCIES)}")
+    if parts.get('WKST', 'MO') != 'MO':
+        raise RecurrenceError("WKST: поддерживается только MO")
+    if 'COUNT' in parts and 'UNTIL' in parts:
+        raise RecurrenceError("COUNT и UNTIL вместе не допускаются")
+    byday = ()
+    if 'BYDAY' in parts:
+        if parts['FREQ'] != 'WEEKLY':
+            raise RecurrenceError("BYDAY поддерживается только с FREQ=WEEKLY")
+        days = parts['BYDAY'].split(',')
+        if not set(days) <= set(WEEKDAYS):
+            raise RecurrenceError(f"BYDAY: дни {','.join(WEEKDAYS)}")
+        byday = tuple(sorted({WEEKDAYS.index(day) for day in days}))
+    return Rule(
+        freq=parts['FREQ'],
+        interval=_positive('INTERVAL', parts.get('INTERVAL', '1')),
+        byday=byday,
+        count=_positive('COUNT', parts['COUNT']) if 'COUNT' in parts else None,
+        until=_until(parts['UNTIL']) if 'UNTIL' in parts else None,
+    )
+
+
+def validate_rule(value):
+    """Валидатор поля ``recurrence``."""
+    if value:
+        try:
+            parse(value)
+        except RecurrenceError as exc:
+            raise ValidationError(str(exc))
+
+
+# ────────────────────────────────────────────────
+# Развёртывание
+# ────────────────────────────────────────────────
+
+def _months(day):
+    return day.year * 12 + day.month - 1
+
+
+def _dates(rule, first, since):
+    """
+    ``(номер занятия, местная дата)`` по порядку, начиная с периода,
+    в который попадает ``since``; номер считается от первого занятия
+    (нужен для COUNT) без перебора предыдущих периодов.
+    """
+    if rule.freq in ('DAILY', 'WEEKLY'):
+        if rule.freq == 'DAILY':
+            anchor, period, offsets = first, rule.interval, (0,)
+        else:
+            anchor = first - timedelta(days=first.weekday())
+            period, offsets = 7 * rule.interval, rule.byday or (first.weekday(),)
+        # дни первой недели раньше первого занятия в серию не входят
+        skipped = sum(1 for offset in offsets if anchor + timedelta(days=offset) < first)
+        k = max(0, (since - anchor).days // period)
+        while True:
+            base = anchor + timedelta(days=k * period)
+            for j, offset in enumerate(offsets):
+                number = k * len(offsets) + j - skipped
+                if number >= 0:
+                    yield number, base + timedelta(days=offset)
+            k += 1
+    else:
+        step = rule.interval * (12 if rule.freq == 'YEARLY' else 1)
+        start = _months(first)
+        k = max(0, (_months(since) - start) // step)
+        # месяцы без нужного числа пропускаются — номер зависит от них
+        number = sum(1 for i in range(k) if _valid(start + i * step, first.day))
+        while True:
+            if _valid(start + k * step, first.day):
+                year, month = divmod(start + k * step, 12)
+                yield number, date(year, month + 1, first.day)
+                number += 1
+            k += 1
+
+
+def _valid(months, day):
+    year, month = divmod(months, 12)
+    return day <= calendar.monthrange(year, month + 1)[1]
+
+
+def _local(day, at, tz):
+    return datetime.combine(day, at, tzinfo=tz)
+
+
+def _until_bound(rule, tz):
+    if isinstance(rule.until, datetime):
+        return rule.until
+    if rule.until is not None:
+        return _local(rule.until, time.max, tz)
+    return None
+
+
+def occurrences(rule, start, end, window_start=None, window_end=None, exdates=()):
+    """
+    Занятия серии ``(начало, окончание)`` по порядку, которые пересекают
+    окно ``[window_start, window_end)``; первое занятие — ``[start, end)``.
+    Без ``window_end`` бесконечная серия не кончается — генератор ленивый.
+    """
+    if isinstance(rule, str):
+        rule = parse(rule)
+    # серии привязаны к TIME_ZONE, как генерируемые колонки; зона берётся один раз на вызов
+    tz = timezone.get_default_timezone()
+    local = start.astimezone(tz)
+    first, at = local.date(), local.time()
+    duration = end - start
+    until = _until_bound(rule, tz)
+    skip = set(exdates)
+    since = first
+    if window_start is not None:
+        since = max(first, (window_start - duration).astimezone(tz).date() - timedelta(days=1))
+    for number, day in _dates(rule, first, since):
+        if rule.count is not None and number >= rule.count:
+            return
+        begin = _local(day, at, tz)
+        if until is not None and begin > until:
+            return
+        if window_end is not None and begin >= window_end:
+            return
+        if window_start is not None and begin + duration <= window_start:
+            continue
+        if begin not in skip:
+            yield begin, begin + duration
+
+
+def last_date(rule, start):
+    """Местная дата последнего занятия; ``None`` — серия бесконечна."""
+    if isinstance(rule, str):
+        rule = parse(rule)
+    tz = timezone.get_default_timezone()
+    local = start.astimezone(tz)
+    first, at = local.date(), local.time()
+    if rule.count is not None:
+        if rule.freq in ('DAILY', 'WEEKLY'):
+            # номер занятия известен — прыжок сразу к периоду последнего
+            per_period = 1 if rule.freq == 'DAILY' else len(rule.byday or (0,))
+            days = (1 if rule.freq == 'DAILY' else 7) * rule.interval
+            since = first + timedelta(days=days * ((rule.count - 1) // per_period))
+        else:
+            since = first
+        for number, day in _dates(rule, first, since):
+            if number >= rule.count - 1:
+                return day
+    if rule.until is not None:
+        until = _until_bound(rule, tz)
+        # с периода перед UNTIL; если в нём занятий нет (пропущенные месяцы) — с начала
+        back = {'DAILY': 1, 'WEEKLY': 7, 'MONTHLY': 31, 'YEARLY': 366}[rule.freq] * rule.interval
+        for since in (until.astimezone(tz).date() - timedelta(days=back), first):
+            last = None
+            for _number, day in _dates(rule, first, max(first, since)):
+                if _local(day, at, tz) > until:
+                    break
+                last = day
+            if last is not None:
+                return last
+        return first
+    return None
+
+
+def ical(rule, all_day=False):
+    """
+    Строка ``RRULE:`` для iCalendar. UNTIL приводится к типу DTSTART
+    (RFC 5545): у занятий со временем — момент UTC, у занятий на весь
+    день — дата.
+    """
+    if isinstance(rule, str):
+        rule = parse(rule)
+    tz = timezone.get_default_timezone()
+    if all_day and isinstance(rule.until, datetime):
+        rule = replace(rule, until=rule.until.astimezone(tz).date())
+    elif not all_day and rule.until is not None and not isinstance(rule.until, datetime):
+        rule = replace(rule, until=_until_bound(rule, tz).astimezone(dt_timezone.utc).replace(microsecond=0))
+    return f'RRULE:{rule}'
+
+
+def collision(first, second):
+    """
+    Первая пара пересекающихся интервалов двух последовательностей,
+    отсортированных по началу; ``None`` — пересечений нет. Один проход.
+    """
+    first, second = iter(first), iter(second)
+    a, b = next(first, None), next(second, None)
+    while a is not None and b is not None:
+        if a[0] < b[1] and b[0] < a[1]:
+            return a, b
+        if a[1] <= b[1]:
+            a = next(first, None)
+        else:
+            b = next(second, None)
+    return None
+
+
+def merged(*sequences):
+    """Слияние отсортированных по началу последовательностей интервалов (лениво)."""
+    return heapq.merge(*sequences, key=lambda interval: interval[0])
+
+
+# ────────────────────────────────────────────────
+# Модели
+# ────────────────────────────────────────────────
+
+def local_timestamp(expression, tz):
+    """SQL: момент → местное время ``tz`` (``timezone(text, timestamptz)`` неизменяема)."""
+    return Func(Value(tz), expression, function='timezone', output_field=DateTimeField())
+
+
+class RecurringMixin:
+    """
+    Серия в одной строке. Модель объявляет поля ``recurrence``,
+    ``recurrence_exdates``, ``recurrence_until`` и ``first_period()`` —
+    период первого занятия; класс без него не создаётся.
+    """
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # ABCMeta с метаклассом моделей не сочетается — проверка при создании класса
+        if not callable(getattr(cls, 'first_period', None)):
+            raise TypeError(f"{cls.__name__}: RecurringMixin требует метод first_period()")
+
+    @property
+    def is_recurring(self):
+        return bool(self.recurrence)
+
+    def occurrences(self, window_start=None, window_end=None):
+        start, end = self.first_period()
+        if not self.recurrence:
+            if (window_start is None or end > window_start) and (window_end is None or start < window_end):
+                yield start, end
+            return
+        yield from occurrences(self.recurrence, start, end, window_start, window_end, self.recurrence_exdates or ())
+
+    def sync_recurrence(self):
+        """Канонизирует правило и пересчитывает ``recurrence_until``."""
+        if self.recurrence:
+            rule = parse(self.recurrence)
+            self.recurrence = str(rule)
+            self.recurrence_until = last_date(rule, self.first_period()[0])
+        else:
+            self.recurrence_until = None
+            self.recurrence_exdates = []
+
+    def skip_occurrence(self, start):
+        """Отменяет одно занятие серии — одна строка, без пересохранения остальных."""
+        if start in (self.recurrence_exdates or ()):
+            return
+        self.recurrence_exdates = sorted([*(self.recurrence_exdates or ()), start])
+        type(self)._default_manager.filter(pk=self.pk).update(
+            recurrence_exdates=Func(F('recurrence_exdates'), Value(start), function='array_append'),
+            updated_at=timezone.now(),
+        )
+
+    def save(self, *args, **kwargs):
+        self.sync_recurrence()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'recurrence' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'recurrence_until', 'recurrence_exdates'}
+        super().save(*args, **kwargs)
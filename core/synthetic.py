@@ -0,0 +1,563 @@
+# core/synthetic.py
+"""
+Генератор синтетических данных для всей схемы маркетплейса.
+
+Каждая сущность (арендатор, площадка, мероприятие, бронь...) адресуется
+порядковым индексом, а все её атрибуты — и UUID, и ссылки на другие
+сущности — детерминированно выводятся из ``(seed, вид, индекс)``.
+Благодаря этому воркеры генерируют свои диапазоны независимо, не
+обмениваясь id: бронь №i сама «знает» площадку и мероприятие, на которые
+ссылается.
+
+Строки пишутся в PostgreSQL через ``COPY ... FROM STDIN``. Фазы идут по
+порядку зависимостей FK (пользователи → площадки и мероприятия → брони и
+наймы → платежи и отзывы), внутри фазы диапазоны делятся между воркерами.
+Рейтинги профилей после загрузки пересчитываются из отзывов, журнал
+изменений (``core/outbox.py``) при загрузке не пишется.
+"""
+import bisect
+import hashlib
+import itertools
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.db import connection, transaction
+
+from bookings.models import Booking
+from core import dimensions, outbox
+from core.ids import uuid7
+from core.models import City, Specialty
+from events.models import Event
+from hires.models import Hire
+from payments.models import Payment
+from reviews.models import Review
+from users.models import BaseUser, Owner, Renter, Specialist
+from venues.models import Venue, VenueImage
+
+# Доля «горячих» городов — примерно как распределён спрос
+CITY_WEIGHTS = [
+    ('Москва', 35), ('Санкт-Петербург', 20), ('Казань', 8), ('Екатеринбург', 7),
+    ('Новосибирск', 6), ('Нижний Новгород', 5), ('Сочи', 5), ('Краснодар', 5),
+    ('Самара', 3), ('Ростов-на-Дону', 3), ('Калининград', 3),
+]
+SPECIALTIES = ['фотограф', 'видеограф', 'ведущий', 'диджей', 'декоратор', 'кейтеринг', 'флорист']
+
+# Сезонность: корпоративы в декабре, свадьбы летом, провал в январе
+MONTH_WEIGHTS = [4, 5, 6, 7, 8, 10, 10, 9, 8, 7, 7, 12]
+# Пятница и суббота — пиковые дни
+WEEKDAY_WEIGHTS = [5, 5, 6, 7, 12, 14, 8]
+
+THEMES = [code for code, _label in Event.THEME_CHOICES]
+
+# Сколько строк каждого вида приходится на одного арендатора
+RATIOS = {
+    'owners': 0.1,
+    'specialists': 0.15,
+    'venues': 0.3,
+    'events': 1.5,
+    'bookings': 1.35,
+    'hires': 0.9,
+}
+IMAGES_PER_VENUE = 3
+
+# Метка времени UUIDv7 сущности №i — ID_EPOCH + i мс; постоянная, чтобы id
+# не зависели от даты запуска
+ID_EPOCH = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+
+# Степень «перекоса» при выборе популярных сущностей: idx = n * u ** SKEW
+HOT_SKEW = 2.5
+
+
+@dataclass(frozen=True)
+class Plan:
+    """Размеры всех таблиц для одного прогона генератора."""
+    seed: int
+    tag: str
+    renters: int
+    owners: int
+    specialists: int
+    venues: int
+    events: int
+    bookings: int
+    hires: int
+    hire_id_base: int
+    start_date: date
+    days: int
+    # id справочников в порядке CITY_WEIGHTS / SPECIALTIES (dimension_ids)
+    city_ids: tuple = ()
+    specialty_ids: tuple = ()
+
+    @classmethod
+    def for_rows(cls, rows, seed=0, tag=None, hire_id_base=0, start_date=None, days=3 * 365):
+        """Подбирает размеры так, чтобы суммарно вышло примерно ``rows`` строк."""
+        # пользователи + профили + фото + платежи на одного арендатора
+        per_renter = (
+            2 * (1 + RATIOS['owners'] + RATIOS['specialists'])
+            + RATIOS['venues'] * (1 + IMAGES_PER_VENUE)
+            + RATIOS['events']
+            + 2 * (RATIOS['bookings'] + RATIOS['hires'])
+        )
+        renters = max(1, int(rows / per_renter))
+        sizes = {kind: max(1, int(renters * ratio)) for kind, ratio in RATIOS.items()}
+        sizes['bookings'] = min(sizes['bookings'], sizes['events'])
+        return cls(
+            seed=seed,
+            tag=tag or f's{seed}',
+            renters=renters,
+            hire_id_base=hire_id_base,
+            start_date=start_date or date.today() - timedelta(days=2 * 365),
+            days=days,
+            **sizes,
+        )
+
+    @property
+    def payments(self):
+        return self.bookings + self.hires
+
+    @property
+    def images(self):
+        return self.venues * IMAGES_PER_VENUE
+
+    @property
+    def total_rows(self):
+        users = self.renters + self.owners + self.specialists
+        return 2 * users + self.venues + self.images + self.events + self.bookings + self.hires + self.payments
+
+
+# ────────────────────────────────────────────────
+# Детерминированные атрибуты сущностей
+# ────────────────────────────────────────────────
+
+class Draws:
+    """
+    Поток псевдослучайных чисел из blake2b-дайджеста ключа.
+
+    Заменяет ``random.Random(key)``: сидирование Mersenne Twister на каждую
+    строку обходится в десятки микросекунд, хэш — примерно в одну.
+    """
+    __slots__ = ('key', 'block', 'buffer', 'offset')
+
+    def __init__(self, key):
+        self.key = key.encode()
+        self.block = 0
+        self._refill()
+
+    def _refill(self):
+        self.buffer = hashlib.blake2b(self.key + self.block.to_bytes(4, 'little')).digest()
+        self.block += 1
+        self.offset = 0
+
+    def random(self):
+        if self.offset == 64:
+            self._refill()
+        value = int.from_bytes(self.buffer[self.offset:self.offset + 8], 'little')
+        self.offset += 8
+        return value / 18446744073709551616.0
+
+    def randrange(self, n):
+        return int(self.random() * n)
+
+    def randint(self, a, b):
+        return a + int(self.random() * (b - a + 1))
+
+    def choice(self, seq):
+        return seq[int(self.random() * len(seq))]
+
+    def weighted(self, seq, cum_weights):
+        return seq[bisect.bisect(cum_weights, self.random() * cum_weights[-1])]
+
+class Universe:
+    """
+    Детерминированный «мир» для заданного плана.
+
+    Методы ``*_id``, ``event(i)``, ``booking(i)``, ``hire(i)`` — чистые функции индекса:
+    их можно вызывать в любом процессе и в любом порядке.
+    """
+
+    def __init__(self, plan):
+        self.plan = plan
+        self.cities = list(plan.city_ids)
+        self.city_cum = list(itertools.accumulate(w for _c, w in CITY_WEIGHTS))
+        days = [plan.start_date + timedelta(days=n) for n in range(plan.days)]
+        self.days = days
+        self.day_cum = list(itertools.accumulate(
+            MONTH_WEIGHTS[d.month - 1] * WEEKDAY_WEIGHTS[d.weekday()] for d in days
+        ))
+        self.today = date.today()
+
+    # ── идентификаторы ──
+    def uuid(self, kind, index):
+        digest = hashlib.blake2b(
+            f'{self.plan.seed}:{kind}:{index}'.encode(), digest_size=16
+        ).digest()
+        # UUIDv7 (core/ids.py): метка времени растёт с индексом, поэтому
+        # COPY идёт в правый край индекса pk, как и обычные вставки
+        return uuid7(at=ID_EPOCH + timedelta(milliseconds=index), random_bytes=digest[:10])
+
+    def rng(self, kind, index):
+        return Draws(f'{self.plan.seed}:{kind}:{index}')
+
+    @staticmethod
+    def hot(rng, n):
+        """Индекс из [0, n) со степенным перекосом к началу диапазона."""
+        return min(n - 1, int(n * rng.random() ** HOT_SKEW))
+
+    def renter_id(self, i):
+        return self.uuid('renter', i)
+
+    def owner_id(self, i):
+        return self.uuid('owner', i)
+
+    def specialist_id(self, i):
+        return self.uuid('specialist', i)
+
+    def venue_id(self, i):
+        return self.uuid('venue', i)
+
+    def event_id(self, i):
+        return self.uuid('event', i)
+
+    def booking_id(self, i):
+        return self.uuid('booking', i)
+
+    def hire_id(self, i):
+        return self.plan.hire_id_base + i + 1
+
+    # ── атрибуты, нужные другим сущностям ──
+    def venue_owner(self, i):
+        return self.hot(self.rng('venue_owner', i), self.plan.owners)
+
+    def venue_price(self, i):
+        rng = self.rng('venue', i)
+        return Decimal(rng.randint(15, 250) * 100)
+
+    def event(self, i):
+        """(renter_idx, date, start, end, guests, theme, status)"""
+        rng = self.rng('event', i)
+        day = rng.weighted(self.days, self.day_cum)
+        start_hour = rng.choice([10, 12, 14, 16, 18, 18, 19, 20])
+        hours = rng.choice([2, 3, 4, 4, 5, 6, 8])
+        start = datetime.combine(day, time(start_hour), tzinfo=dt_timezone.utc)
+        end = start + timedelta(hours=hours)
+        if day < self.today:
+            status = 'cancelled' if rng.random() < 0.08 else 'completed'
+        else:
+            status = rng.choice(['draft', 'planned', 'planned', 'active'])
+        return (
+            self.hot(rng, self.plan.renters) if rng.random() < 0.3 else rng.randrange(self.plan.renters),
+            day, start, end,
+            rng.randint(10, 300),
+            rng.choice(THEMES),
+            status,
+        )
+
+    def booking(self, i):
+        """(event, venue_idx, total_price, status) — бронь №i привязана к мероприятию №i."""
+        rng = self.rng('booking', i)
+        venue = self.hot(rng, self.plan.venues)
+        event = self.event(i)
+        hours = int((event[3] - event[2]).total_seconds() // 3600)
+        price = self.venue_price(venue) * hours
+        return event, venue, price, self.child_status(rng, event[6])
+
+    def hire(self, i):
+        """(event_idx, event, specialist_idx, total_price, status)"""
+        rng = self.rng('hire', i)
+        event_index = rng.randrange(self.plan.events)
+        event = self.event(event_index)
+        specialist = self.hot(rng, self.plan.specialists)
+        price = Decimal(rng.randint(5, 80) * 1000)
+        return event_index, event, specialist, price, self.child_status(rng, event[6])
+
+    @staticmethod
+    def child_status(rng, event_status):
+        if event_status == 'completed':
+            return 'completed'
+        if event_status == 'cancelled':
+            return 'cancelled'
+        return rng.choice(['pending', 'confirmed', 'confirmed'])
+
+
+# ────────────────────────────────────────────────
+# Построчные генераторы для COPY
+# ────────────────────────────────────────────────
+
+def _columns(model, names):
+    return [model._meta.get_field(name).column for name in names]
+
+
+USER_FIELDS = ['id', 'password', 'last_login', 'is_superuser', 'email', 'is_active', 'is_staff', 'date_joined']
+
+
+def user_rows(u, kind, start, stop):
+    id_func = {'renter': u.renter_id, 'owner': u.owner_id, 'specialist': u.specialist_id}[kind]
+    joined = datetime.combine(u.plan.start_date, time(), tzinfo=dt_timezone.utc)
+    for i in range(start, stop):
+        yield (
+            id_func(i), '!', None, False, f'{kind}-{u.plan.tag}-{i}@example.com',
+            True, False, joined + timedelta(minutes=i % (u.plan.days * 1440)),
+        )
+
+
+def renter_rows(u, start, stop):
+    for i in range(start, stop):
+        yield (u.renter_id(i),)
+
+
+def owner_rows(u, start, stop):
+    for i in range(start, stop):
+        rng = u.rng('owner', i)
+        yield (u.owner_id(i), f'77{rng.randrange(10**8):08d}', rng.random() < 0.6,
+               Decimal(rng.randint(250, 500)) / 100)
+
+
+def specialist_rows(u, start, stop):
+    for i in range(start, stop):
+        rng = u.rng('specialist', i)
+        yield (u.specialist_id(i), rng.choice(u.plan.specialty_ids), '',
+               rng.weighted(u.cities, u.city_cum),
+               Decimal(rng.randint(250, 500)) / 100)
+
+
+VENUE_STATUSES = ['published', 'draft', 'moderation', 'archived']
+VENUE_STATUS_CUM = [80, 88, 95, 100]
+
+VENUE_FIELDS = [
+    'id', 'owner', 'name', 'slug', 'description', 'short_description', 'address', 'city',
+    'postal_code', 'capacity_min', 'capacity_max', 'area_sq_m', 'price_per_hour', 'price_per_day',
+    'min_booking_hours', 'cancellation_policy', 'status', 'is_verified', 'created_at', 'updated_at',
+]
+
+
+def venue_rows(u, start, stop):
+    now = datetime.now(dt_timezone.utc)
+    for i in range(start, stop):
+        rng = u.rng('venue', i)
+        capacity = rng.choice([20, 30, 50, 80, 120, 200, 400])
+        price = u.venue_price(i)
+        yield (
+            u.venue_id(i), u.owner_id(u.venue_owner(i)),
+            f'Площадка {i}', f'{u.plan.tag}-venue-{i}', '', '',
+            f'ул. Синтетическая, {i % 300 + 1}',
+            rng.weighted(u.cities, u.city_cum), '',
+            max(1, capacity // 5), capacity, capacity * rng.randint(2, 4),
+            price, price * 10, rng.choice([1, 2, 3, 4]), '',
+            rng.weighted(VENUE_STATUSES, VENUE_STATUS_CUM),
+            rng.random() < 0.7, now, now,
+        )
+
+
+def image_rows(u, start, stop):
+    now = datetime.now(dt_timezone.utc)
+    for i in range(start, stop):
+        for n in range(IMAGES_PER_VENUE):
+            yield (u.venue_id(i), f'venues/synthetic/{u.plan.tag}-{i}-{n}.jpg', n, '', now)
+
+
+EVENT_FIELDS = [
+    'id', 'renter', 'title', 'date', 'start_time', 'end_time', 'theme', 'short_description',
+    'description', 'expected_guests', 'status', 'created_at', 'updated_at',
+]
+
+
+def event_rows(u, start, stop):
+    for i in range(start, stop):
+        renter, day, begin, end, guests, theme, status = u.event(i)
+        created = begin - timedelta(days=30)
+        yield (
+            u.event_id(i), u.renter_id(renter), f'Мероприятие {i}', day,
+            begin.time(), end.time(), theme, '', '', guests, status, created, created,
+        )
+
+
+SLOT_FIELDS = ['id', 'event', 'renter', 'start_datetime', 'end_datetime', 'total_price', 'status', 'created_at', 'updated_at']
+
+
+def booking_rows(u, start, stop):
+    for i in range(start, stop):
+        event, venue, price, status = u.booking(i)
+        renter, _day, begin, end, *_rest = event
+        created = begin - timedelta(days=21)
+        yield (
+            u.booking_id(i), u.event_id(i), u.renter_id(renter), begin, end,
+            price, status, created, created, u.venue_id(venue),
+        )
+
+
+def hire_rows(u, start, stop):
+    for i in range(start, stop):
+        event_index, event, specialist, price, status = u.hire(i)
+        renter, _day, begin, end, *_rest = event
+        created = begin - timedelta(days=14)
+        yield (
+            u.hire_id(i), u.event_id(event_index), u.renter_id(renter), begin, end,
+            price, status, created, created, u.specialist_id(specialist),
+        )
+
+
+PAYMENT_FIELDS = ['id', 'booking', 'hire', 'payer', 'amount', 'status', 'created_at', 'paid_at']
+
+
+def payment_rows(u, start, stop):
+    for p in range(start, stop):
+        rng = u.rng('payment', p)
+        if p < u.plan.bookings:
+            event, _venue, amount, child_status = u.booking(p)
+            booking, hire = u.booking_id(p), None
+        else:
+            _index, event, _spec, amount, child_status = u.hire(p - u.plan.bookings)
+            booking, hire = None, u.hire_id(p - u.plan.bookings)
+        renter, _day, begin, *_rest = event
+        created = begin - timedelta(days=rng.randint(1, 20))
+        if child_status in ('confirmed', 'completed'):
+            status = 'refunded' if rng.random() < 0.03 else 'succeeded'
+        elif child_status == 'cancelled':
+            status = rng.choice(['cancelled', 'refunded', 'failed'])
+        else:
+            status = 'pending'
+        paid_at = created + timedelta(minutes=rng.randint(1, 600)) if status in ('succeeded', 'refunded') else None
+        yield (u.uuid('payment', p), booking, hire, u.renter_id(renter), amount, status, created, paid_at)
+
+
+REVIEW_FIELDS = ['id', 'booking', 'hire', 'author', 'owner', 'specialist', 'score', 'text', 'created_at', 'updated_at']
+REVIEW_RATE = 0.4
+SCORES = [1, 2, 3, 4, 5]
+SCORE_CUM = [4, 8, 18, 48, 100]
+
+
+def review_rows(u, start, stop):
+    """Отзывы на часть завершённых броней и наймов (индексы как у платежей)."""
+    for p in range(start, stop):
+        if p < u.plan.bookings:
+            event, venue, _amount, status = u.booking(p)
+            booking, hire = u.booking_id(p), None
+            owner, specialist = u.owner_id(u.venue_owner(venue)), None
+        else:
+            _index, event, spec, _amount, status = u.hire(p - u.plan.bookings)
+            booking, hire = None, u.hire_id(p - u.plan.bookings)
+            owner, specialist = None, u.specialist_id(spec)
+        rng = u.rng('review', p)
+        if status != 'completed' or rng.random() >= REVIEW_RATE:
+            continue
+        renter, _day, _begin, end, *_rest = event
+        created = end + timedelta(days=rng.randint(0, 7))
+        yield (u.uuid('review', p), booking, hire, u.renter_id(renter), owner, specialist,
+               rng.weighted(SCORES, SCORE_CUM), '', created, created)
+
+
+# ────────────────────────────────────────────────
+# Фазы и задания
+# ────────────────────────────────────────────────
+
+def _table(model, fields, rows, size, per_item=1):
+    return model._meta.db_table, _columns(model, fields), rows, size, per_item
+
+
+def phases(plan):
+    """
+    Список фаз; каждая фаза — список таблиц ``(table, columns, rows_func, size)``.
+
+    Внутри фазы FK ссылаются только на уже закоммиченные фазы, поэтому
+    воркеры одной фазы могут коммитить в любом порядке.
+    """
+    return [
+        [
+            _table(BaseUser, USER_FIELDS, lambda u, a, b: user_rows(u, 'renter', a, b), plan.renters),
+            _table(BaseUser, USER_FIELDS, lambda u, a, b: user_rows(u, 'owner', a, b), plan.owners),
+            _table(BaseUser, USER_FIELDS, lambda u, a, b: user_rows(u, 'specialist', a, b), plan.specialists),
+        ],
+        [
+            _table(Renter, ['user'], renter_rows, plan.renters),
+            _table(Owner, ['user', 'inn', 'verified', 'rating'], owner_rows, plan.owners),
+            _table(Specialist, ['user', 'specialty', 'license_number', 'city', 'rating'],
+                   specialist_rows, plan.specialists),
+        ],
+        [
+            _table(Venue, VENUE_FIELDS, venue_rows, plan.venues),
+            _table(Event, EVENT_FIELDS, event_rows, plan.events),
+        ],
+        [
+            _table(VenueImage, ['venue', 'image', 'order', 'caption', 'created_at'],
+                   image_rows, plan.venues, IMAGES_PER_VENUE),
+            _table(Booking, SLOT_FIELDS + ['venue'], booking_rows, plan.bookings),
+            _table(Hire, SLOT_FIELDS + ['specialist'], hire_rows, plan.hires),
+        ],
+        [
+            _table(Payment, PAYMENT_FIELDS, payment_rows, plan.payments),
+            _table(Review, REVIEW_FIELDS, review_rows, plan.payments),
+        ],
+    ]
+
+
+def split(size, parts):
+    """Делит [0, size) на ``parts`` почти равных диапазонов."""
+    step, extra = divmod(size, parts)
+    start = 0
+    for n in range(parts):
+        stop = start + step + (1 if n < extra else 0)
+        if stop > start:
+            yield start, stop
+        start = stop
+
+
+def copy_rows(table, columns, rows):
+    """Пишет строки одним COPY; возвращает число строк."""
+    count = 0
+    sql = f'COPY {connection.ops.quote_name(table)} ({", ".join(connection.ops.quote_name(c) for c in columns)}) FROM STDIN'
+    with connection.cursor() as cursor:
+        with cursor.cursor.copy(sql) as copy:
+            for row in rows:
+                copy.write_row(row)
+                count += 1
+    return count
+
+
+def run_task(plan, phase_index, shard, shards):
+    """Один воркер: свои диапазоны всех таблиц фазы, одна транзакция."""
+    u = Universe(plan)
+    written = 0
+    # синтетическая загрузка — не изменения для потребителей журнала
+    with transaction.atomic(), outbox.suppressed():
+        for table, columns, rows, size, _per_item in phases(plan)[phase_index]:
+            ranges = list(split(size, shards))
+            if shard < len(ranges):
+                start, stop = ranges[shard]
+                written += copy_rows(table, columns, rows(u, start, stop))
+    return written
+
+
+def _worker(args):
+    # Воркер запускается в отдельном процессе и открывает собственное подключение
+    from django.db import connections
+    try:
+        return run_task(*args)
+    finally:
+        connections.close_all()
+
+
+def dimension_ids():
+    """id городов и специализаций генератора для ``Plan``; недостающие записи создаются."""
+    # строки пойдут в COPY мимо ORM — id сверяются с БД, а не с кэшем
+    for model in (City, Specialty):
+        dimensions.invalidate(model)
+    cities = dimensions.resolve(City, [city for city, _w in CITY_WEIGHTS])
+    specialties = dimensions.resolve(Specialty, SPECIALTIES)
+    return {
+        'city_ids': tuple(cities[city] for city, _w in CITY_WEIGHTS),
+        'specialty_ids': tuple(specialties[name] for name in SPECIALTIES),
+    }
+
+
+def reserve_hire_ids(count):
+    """Резервирует ``count`` id в последовательности hires_hire; возвращает базу."""
+    table = Hire._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(f'LOCK TABLE {connection.ops.quote_name(table)} IN EXCLUSIVE MODE')
+        cursor.execute(f'SELECT COALESCE(MAX(id), 0) FROM {connection.ops.quote_name(table)}')
+        base = cursor.fetchone()[0]
+        if base + count > 0:
+            cursor.execute(
+                "SELECT setval(pg_get_serial_sequence(%s, 'id'), %s)", [table, base + count]
+            )
+    return base
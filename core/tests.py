@@ -0,0 +1,482 @@
+import json
+import os
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.apps import apps
+from django.contrib.admin.utils import NestedObjects
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.utils import timezone
+
+from bookings.models import Booking
+from events.models import Event
+from EventMarket.testing import build_marketplace, cached_auth
+from hires.models import Hire
+from payments.models import Payment, PaymentEvent
+from reviews import ratings
+from reviews.models import Review
+from users.models import BaseUser, Owner, Renter, Specialist
+from venues.models import Venue, VenueImage
+
+from . import benchmarks, deletion, dimensions, lookup, outbox, recurrence, transitions
+from .ids import uuid7
+from .models import City
+from .synthetic import Draws, Plan, Universe
+
+
+class RecurrenceRuleTests(SimpleTestCase):
+    start = timezone.make_aware(datetime(2027, 1, 6, 19))  # среда
+
+    def test_window_expansion_matches_full_series(self):
+        rules = [
+            'FREQ=DAILY;INTERVAL=3;COUNT=40',
+            'FREQ=WEEKLY;BYDAY=MO,WE,FR;COUNT=30',
+            'FREQ=WEEKLY;INTERVAL=2;UNTIL=20290101',
+            'FREQ=MONTHLY;COUNT=12',
+        ]
+        for start in (self.start, timezone.make_aware(datetime(2027, 1, 31, 10))):
+            end = start + timedelta(hours=2)
+            for rule in rules:
+                full = list(recurrence.occurrences(rule, start, end))
+                with self.subTest(rule=rule, start=start):
+                    if 'COUNT' in rule:
+                        self.assertEqual(len(full), int(rule.rsplit('=', 1)[1]))
+                    self.assertEqual(recurrence.last_date(rule, start), full[-1][0].date())
+                    for days in range(0, 800, 17):
+                        window = (start + timedelta(days=days), start + timedelta(days=days + 30))
+                        self.assertEqual(
+                            list(recurrence.occurrences(rule, start, end, *window)),
+                            [o for o in full if o[0] < window[1] and o[1] > window[0]],
+                        )
+        # 31-е число: месяцы без него пропускаются
+        monthly = recurrence.occurrences('FREQ=MONTHLY;COUNT=3', timezone.make_aware(datetime(2027, 1, 31, 10)),
+                                         timezone.make_aware(datetime(2027, 1, 31, 11)))
+        self.assertEqual([start.month for start, _end in monthly], [1, 3, 5])
+
+    def test_rules_are_validated_and_canonical(self):
+        self.assertEqual(str(recurrence.parse('rrule:byday=fr,mo;freq=weekly')), 'FREQ=WEEKLY;BYDAY=MO,FR')
+        self.assertIsNone(recurrence.last_date('FREQ=WEEKLY', self.start))
+        for bad in ('FREQ=HOURLY', 'FREQ=DAILY;BYDAY=MO', 'FREQ=DAILY;COUNT=0', 'FREQ=DAILY;BYSETPOS=1',
+                    'FREQ=DAILY;COUNT=2;UNTIL=20270101'):
+            with self.subTest(rule=bad), self.assertRaises(recurrence.RecurrenceError):
+                recurrence.parse(bad)
+
+    def test_mixin_requires_first_period(self):
+        with self.assertRaises(TypeError):
+            type('Series', (recurrence.RecurringMixin,), {})
+
+
+class SyntheticUniverseTests(TestCase):
+    def test_entities_are_deterministic(self):
+        plan = Plan.for_rows(10_000, seed=3)
+        a, b = Universe(plan), Universe(plan)
+        self.assertEqual(a.venue_id(5), b.venue_id(5))
+        self.assertEqual(a.event(7), b.event(7))
+        self.assertNotEqual(a.venue_id(5), a.venue_id(6))
+
+    def test_draws_are_uniform_enough(self):
+        rng = Draws('uniform')
+        values = [rng.random() for _ in range(2000)]
+        self.assertTrue(all(0 <= v < 1 for v in values))
+        self.assertAlmostEqual(sum(values) / len(values), 0.5, delta=0.05)
+
+
+class GenerateMarketplaceCommandTests(TestCase):
+    def test_generates_linked_rows(self):
+        out = StringIO()
+        call_command('generate_marketplace', rows=3000, workers=1, seed=7, stdout=out)
+        plan = Plan.for_rows(3000, seed=7)
+
+        self.assertEqual(BaseUser.objects.count(), plan.renters + plan.owners + plan.specialists)
+        self.assertEqual(Venue.objects.count(), plan.venues)
+        self.assertEqual(VenueImage.objects.count(), plan.images)
+        self.assertEqual(Booking.objects.count(), plan.bookings)
+        self.assertEqual(Hire.objects.count(), plan.hires)
+        self.assertEqual(Payment.objects.count(), plan.payments)
+        self.assertFalse(Payment.objects.filter(booking__isnull=True, hire__isnull=True).exists())
+        self.assertFalse(Payment.objects.filter(booking__isnull=False, hire__isnull=False).exists())
+        # бронь и её мероприятие принадлежат одному арендатору
+        self.assertFalse(Booking.objects.exclude(renter=F('event__renter')).exists())
+
+        # следующий обычный INSERT не пересекается с зарезервированными id наймов
+        hire = Hire.objects.first()
+        hire.pk = None
+        hire.save()
+        self.assertGreater(hire.pk, Hire.objects.exclude(pk=hire.pk).order_by('-pk').first().pk)
+
+
+class BenchmarkCommandTests(TestCase):
+    def test_writes_json_results(self):
+        call_command('generate_marketplace', rows=2000, workers=1, stdout=StringIO())
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'bench.json')
+            call_command('benchmark_marketplace', output=path, repeat=2, stdout=StringIO())
+            with open(path, encoding='utf-8') as fh:
+                payload = json.load(fh)
+        self.assertIn('commit', payload['meta'])
+        stats = payload['results']['read.venue_availability_month']
+        self.assertEqual(stats['runs'], 2)
+        self.assertEqual(stats['queries'], 1)
+        # пишущие бенчмарки откатываются
+        self.assertEqual(Booking.objects.count(), Plan.for_rows(2000).bookings)
+
+    def test_explain_reports_plan_nodes(self):
+        build_marketplace(1)
+        ctx = benchmarks.Context.sample()
+        results = benchmarks.run(['read.booking_paid_total'], repeat=1, warmup=0, ctx=ctx, plans=True)
+        plans = results['read.booking_paid_total']['plans']
+        self.assertEqual(len(plans), 1)
+        self.assertEqual(plans[0]['nodes'][0], 'Aggregate')
+
+
+class StatusTransitionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = build_marketplace(2)
+        cls.past = timezone.now() - timedelta(days=3)
+
+    def test_model_graphs_reject_unknown_moves(self):
+        self.assertTrue(transitions.can_transition(Booking, 'confirmed', 'completed'))
+        with self.assertRaises(transitions.InvalidTransition):
+            transitions.check_transition(Booking, 'completed', 'pending')
+
+    def test_bookings_complete_in_batches_with_one_signal_per_batch(self):
+        Booking.objects.update(status='confirmed', start_datetime=self.past, end_datetime=self.past)
+        future = self.data['bookings'][0]
+        Booking.objects.filter(pk=future.pk).update(end_datetime=timezone.now() + timedelta(days=1))
+
+        batches = []
+
+        def receiver(sender, pks, **kwargs):
+            batches.append((sender, kwargs['transition'], len(pks)))
+
+        transitions.status_transitioned.connect(receiver)
+        self.addCleanup(transitions.status_transitioned.disconnect, receiver)
+        only = [t for t in transitions.TIMED_TRANSITIONS if t.name == 'booking.completed']
+        with self.captureOnCommitCallbacks(execute=True):
+            totals = transitions.apply(only, batch_size=5)
+
+        expected = Booking.objects.count() - 1
+        self.assertEqual(totals, {'booking.completed': expected})
+        self.assertEqual(Booking.objects.filter(status='completed').count(), expected)
+        self.assertEqual(sum(n for _s, _t, n in batches), expected)
+        self.assertEqual(len(batches), -(-expected // 5))
+        self.assertEqual(batches[0][:2], (Booking, 'booking.completed'))
+
+    def test_past_planned_event_reaches_completed_in_one_run(self):
+        Event.objects.update(status='planned', date=self.past.date())
+        out = StringIO()
+        call_command('apply_status_transitions', stdout=out)
+        self.assertFalse(Event.objects.exclude(status='completed').exists())
+        self.assertIn('event.finished', out.getvalue())
+
+    def test_abandoned_payments_cancelled(self):
+        Payment.objects.update(status='pending', created_at=self.past, paid_at=None)
+        fresh = self.data['payments'][0]
+        Payment.objects.filter(pk=fresh.pk).update(created_at=timezone.now())
+        transitions.apply([t for t in transitions.TIMED_TRANSITIONS if t.model is Payment])
+        self.assertEqual(
+            set(Payment.objects.values_list('status', flat=True).distinct()), {'pending', 'cancelled'}
+        )
+        self.assertEqual(Payment.objects.get(status='pending').pk, fresh.pk)
+
+
+class UUID7Tests(TestCase):
+    def test_keys_are_time_ordered_version_7(self):
+        keys = [uuid7() for _ in range(1000)]
+        self.assertEqual({key.version for key in keys}, {7})
+        self.assertEqual({key.variant for key in keys}, {uuid.RFC_4122})
+        self.assertEqual(keys, sorted(keys))
+        self.assertEqual(len(set(keys)), len(keys))
+
+        moment = timezone.now()
+        key = uuid7(at=moment, random_bytes=bytes(10))
+        epoch = moment.replace(year=1970, month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
+        self.assertEqual(key.int >> 80, (moment - epoch) // timedelta(milliseconds=1))
+        self.assertLess(key, uuid7(at=moment + timedelta(milliseconds=1), random_bytes=bytes(10)))
+
+    def test_synthetic_keys_follow_the_index(self):
+        u = Universe(Plan.for_rows(1000))
+        keys = [u.booking_id(i) for i in range(100)]
+        self.assertEqual(keys, sorted(keys))
+        self.assertEqual(keys[5], Universe(Plan.for_rows(1000)).booking_id(5))
+
+
+class ShortIdLookupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = build_marketplace(2)
+        cls.admin = BaseUser.objects.create_superuser('staff@example.com', 'password')
+
+    def setUp(self):
+        lookup.slugs.clear()
+        lookup.codes.clear()
+
+    def test_short_id_is_a_primary_key_range_or_tail(self):
+        event = self.data['events'][0]
+        self.assertEqual(event.pk.version, 7)
+        code = lookup.short_id(event.pk)
+        self.assertEqual(code, event.pk.hex[-8:].upper())
+        low, high = lookup.uuid_range(event.pk.hex[:8])
+        self.assertTrue(low <= event.pk <= high)
+        self.assertEqual(lookup.uuid_range(str(event.pk)), (event.pk, event.pk))
+        self.assertIsNone(lookup.uuid_range('Москва'))
+        # у ключей v4 код — по-прежнему префикс
+        legacy = uuid.uuid4()
+        self.assertEqual(lookup.short_id(legacy), str(legacy)[:8].upper())
+        sql = str(Event.objects.filter(lookup.short_id_q(Event, code)).query)
+        self.assertIn('BETWEEN', sql)
+        self.assertIn('RIGHT', sql.upper())
+        self.assertNotIn('RIGHT', str(Event.objects.filter(lookup.short_id_q(Event, str(event.pk))).query).upper())
+        self.assertEqual(lookup.get_by_short_id(Event.objects.all(), code), event)
+        # префикс v7 — время, общее для записей, созданных подряд
+        with self.assertRaises(Event.MultipleObjectsReturned):
+            lookup.get_by_short_id(Event.objects.all(), event.pk.hex[:8])
+
+    def test_cached_lookups_heal_themselves(self):
+        booking = self.data['bookings'][0]
+        code = lookup.short_id(booking.pk).lower()
+        self.assertEqual(lookup.get_by_short_id(Booking.objects.all(), code), booking)
+        with self.assertNumQueries(1):
+            self.assertEqual(lookup.get_by_short_id(Booking.objects.all(), code), booking)
+        self.assertEqual(lookup.codes.hits, 1)
+
+        venue = Venue.objects.first()
+        lookup.get_by_slug(Venue.objects.all(), venue.slug)
+        Venue.objects.filter(pk=venue.pk).update(slug='renamed')
+        with self.assertRaises(Venue.DoesNotExist):
+            lookup.get_by_slug(Venue.objects.all(), venue.slug)
+        self.assertEqual(lookup.get_by_slug(Venue.objects.all(), 'renamed').pk, venue.pk)
+
+    def test_admin_search_accepts_short_ids(self):
+        self.client.force_login(self.admin)
+        for obj, url in [
+            (self.data['events'][0], '/admin/events/event/'),
+            (self.data['bookings'][0], '/admin/bookings/booking/'),
+            (self.data['payments'][0], '/admin/payments/payment/'),
+            (self.data['hires'][0], '/admin/hires/hire/'),
+        ]:
+            with self.subTest(url=url):
+                response = self.client.get(url, {'q': lookup.short_id(obj.pk)})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual([o.pk for o in response.context['cl'].result_list], [obj.pk])
+
+    def test_admin_search_keeps_field_matches(self):
+        self.client.force_login(self.admin)
+        payment = self.data['payments'][0]
+        numbered = PaymentEvent.objects.create(
+            provider_event_id='20250001', event_type='payment.succeeded', payment_id=payment.pk,
+            status='succeeded', occurred_at=timezone.now(), payload={},
+        )
+        other = PaymentEvent.objects.create(
+            provider_event_id='evt_other', event_type='payment.succeeded', payment_id=payment.pk,
+            status='succeeded', occurred_at=timezone.now(), payload={},
+        )
+        # восемь цифр — это и короткий код, и номер события у провайдера
+        response = self.client.get('/admin/payments/paymentevent/', {'q': '20250001'})
+        self.assertEqual([o.pk for o in response.context['cl'].result_list], [numbered.pk])
+        # по номеру pk — только с решёткой
+        response = self.client.get('/admin/payments/paymentevent/', {'q': f'#{other.pk}'})
+        self.assertEqual([o.pk for o in response.context['cl'].result_list], [other.pk])
+        self.assertIsNone(lookup.short_id_q(PaymentEvent, str(other.pk)))
+        # короткий код не отключает поиск по полям
+        event = self.data['events'][0]
+        response = self.client.get('/admin/events/event/', {'q': event.title})
+        self.assertIn(event.pk, [o.pk for o in response.context['cl'].result_list])
+
+
+class DatabaseCascadeDeleteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = build_marketplace(2)
+        cls.admin = BaseUser.objects.create_superuser('staff@example.com', 'password')
+        for kind in ratings.PROFILES:
+            ratings.recompute_shard(kind, 0, 1)
+
+    def test_summary_matches_django_collector(self):
+        for obj in (self.data['bookings'][0].venue.owner, self.data['events'][0]):
+            with self.subTest(model=type(obj).__name__):
+                collector = NestedObjects('default')
+                collector.collect([obj])
+                expected = {model: len(objs) for model, objs in collector.model_objs.items() if objs}
+                summary, _graph = deletion.collect(type(obj).objects.filter(pk=obj.pk))
+                self.assertEqual({model: n for model, n in summary.deleted.items() if n}, expected)
+
+    def test_db_actions_match_registry(self):
+        with connection.cursor() as cursor:
+            for label, action in deletion.DB_ON_DELETE.items():
+                app_label, model_name, field_name = label.split('.')
+                field = apps.get_model(app_label, model_name)._meta.get_field(field_name)
+                cursor.execute('''
+                    SELECT confdeltype FROM pg_constraint
+                    WHERE contype = 'f' AND conrelid = %s::regclass
+                      AND conkey = ARRAY[(SELECT attnum FROM pg_attribute
+                                          WHERE attrelid = %s::regclass AND attname = %s)]
+                ''', [field.model._meta.db_table, field.model._meta.db_table, field.column])
+                self.assertEqual(cursor.fetchone()[0], {'CASCADE': 'c', 'SET NULL': 'n'}[action], label)
+
+    def test_delete_removes_graph_and_detaches_payments(self):
+        event = self.data['events'][0]
+        bookings = list(Booking.objects.filter(event=event).values_list('pk', flat=True))
+        hires = list(Hire.objects.filter(event=event).values_list('pk', flat=True))
+        payments = list(Payment.objects.filter(Q(booking__in=bookings) | Q(hire__in=hires)).values_list('pk', flat=True))
+        self.assertTrue(bookings and hires and payments)
+
+        summary = deletion.delete(Event.objects.filter(pk=event.pk), batch_size=1)
+        self.assertEqual(summary.deleted[Booking], len(bookings))
+        self.assertEqual(summary.detached[Payment], len(payments))
+        self.assertFalse(Event.objects.filter(pk=event.pk).exists())
+        self.assertFalse(Booking.objects.filter(pk__in=bookings).exists())
+        self.assertFalse(Review.objects.filter(Q(booking__in=bookings) | Q(hire__in=hires)).exists())
+        self.assertEqual(
+            Payment.objects.filter(pk__in=payments, booking__isnull=True, hire__isnull=True).count(), len(payments)
+        )
+        for kind in ratings.PROFILES:
+            self.assertEqual(ratings.recompute_shard(kind, 0, 1), 0)
+
+        # PROTECT: у арендатора есть наймы и платежи
+        with self.assertRaises(deletion.DeletionBlocked):
+            deletion.delete(Renter.objects.filter(pk=self.data['renters'][1].pk))
+
+    @cached_auth
+    def test_admin_confirmation_shows_counts(self):
+        self.client.force_login(self.admin)
+        owner = self.data['bookings'][0].venue.owner
+        url = f'/admin/users/owner/{owner.pk}/delete/'
+        self.client.get(url)
+        # сам владелец + по COUNT на модель графа, сколько бы ни было броней
+        # (сессия и пользователь — из кэша)
+        with self.assertNumQueries(10):
+            response = self.client.get(url)
+        bookings = Booking.objects.filter(venue__owner=owner).count()
+        self.assertContains(response, f"бронирования: {bookings}")
+
+        response = self.client.post(url, {'post': 'yes'})
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Owner.objects.filter(pk=owner.pk).exists())
+        self.assertFalse(Booking.objects.filter(venue__owner_id=owner.pk).exists())
+
+
+class DimensionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = build_marketplace(2)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_resolve_normalizes_spelling_and_uses_cache(self):
+        moscow = City.objects.get(name='Москва')
+        dimensions.names(City)
+        with self.assertNumQueries(0):
+            self.assertEqual(dimensions.resolve(City, [' москва', 'МОСКВА']), {' москва': moscow.pk, 'МОСКВА': moscow.pk})
+            self.assertEqual(dimensions.lookup(City, 'москва  '), moscow.pk)
+
+        created = dimensions.resolve(City, ['Великий  Новгород', ''])
+        self.assertEqual(list(created), ['Великий  Новгород'])
+        self.assertEqual(City.objects.get(pk=created['Великий  Новгород']).name, 'Великий Новгород')
+        # запись в обход ORM сбрасывает кэш
+        self.assertIn(created['Великий  Новгород'], dimensions.names(City))
+
+    def test_merge_and_renormalize_move_references(self):
+        spb = City.objects.get(name='Санкт-Петербург')
+        alias = City.objects.create(name='СПб')
+        venues = [venue.pk for venue in self.data['venues'][:3]]
+        Venue.objects.filter(pk__in=venues).update(city=alias)
+        Specialist.objects.filter(pk=self.data['specialists'][0].pk).update(city=alias)
+
+        call_command('normalize_dimensions', 'city', merge=['спб'], into='Санкт-Петербург',
+                     batch_size=2, stdout=StringIO())
+        self.assertFalse(City.objects.filter(pk=alias.pk).exists())
+        self.assertEqual(Venue.objects.filter(pk__in=venues, city=spb).count(), 3)
+        self.assertEqual(Specialist.objects.get(pk=self.data['specialists'][0].pk).city, spb)
+        self.assertNotIn(alias.pk, dimensions.names(City))
+
+        # запись с ключом по старым правилам нормализации — дубль «Казани»
+        kazan = City.objects.get(name='Казань')
+        duplicate = City.objects.bulk_create([City(name='КАЗАНЬ', key='kazan')])[0]
+        Venue.objects.filter(pk=venues[0]).update(city=duplicate)
+        call_command('normalize_dimensions', stdout=StringIO())
+        self.assertFalse(City.objects.filter(pk=duplicate.pk).exists())
+        self.assertEqual(Venue.objects.get(pk=venues[0]).city_id, kazan.pk)
+
+
+class OutboxTests(TransactionTestCase):
+    # журнал читает только завершённые транзакции — тестам нужен настоящий COMMIT
+    def setUp(self):
+        cache.clear()
+        self.data = build_marketplace(1)
+
+    def entries(self, name='test', **kwargs):
+        delivered = []
+        outbox.drain(name, delivered.extend, **kwargs)
+        return delivered
+
+    def test_every_write_path_is_captured_with_its_transaction(self):
+        created = self.entries()
+        self.assertEqual(
+            {(e.topic, e.op) for e in created},
+            {('bookings.booking', 'insert'), ('hires.hire', 'insert'), ('payments.payment', 'insert')},
+        )
+        self.assertEqual(len(created), len(self.data['bookings']) + len(self.data['hires']) + len(self.data['payments']))
+
+        booking = self.data['bookings'][0]
+        with transaction.atomic():
+            Booking.objects.filter(pk=booking.pk).update(total_price=Decimal('1.00'))
+            Booking.objects.filter(pk=booking.pk).update(total_price=Decimal('1.00'))  # без изменений
+            with outbox.suppressed():
+                Hire.objects.update(total_price=Decimal('2.00'))
+        with transaction.atomic():
+            Payment.objects.update(amount=Decimal('3.00'))
+            transaction.set_rollback(True)
+        deletion.delete(Event.objects.filter(pk=booking.event_id))
+
+        entries = self.entries()
+        update, *deletes = entries
+        self.assertEqual((update.topic, update.op, update.object_id), ('bookings.booking', 'update', str(booking.pk)))
+        self.assertEqual(update.payload['total_price'], 1.0)
+        # каскад ON DELETE в БД: брони и наймы мероприятия, ссылки платежей обнулены
+        self.assertEqual({(e.topic, e.op) for e in deletes},
+                         {('bookings.booking', 'delete'), ('hires.hire', 'delete'), ('payments.payment', 'update')})
+        self.assertIn(str(booking.pk), {e.object_id for e in deletes if e.op == 'delete'})
+        self.assertGreater(deletes[0].txid, update.txid)
+
+    def test_relay_is_ordered_at_least_once_and_waits_for_open_transactions(self):
+        first = outbox.read('pull', limit=5)
+        self.assertEqual(len(first), 5)
+        self.assertEqual(first, sorted(first, key=lambda e: e.position))
+
+        # ошибка обработчика — позиция не сдвигается, пачка придёт снова
+        def failing(entries):
+            raise RuntimeError
+        with self.assertRaises(RuntimeError):
+            outbox.relay('pull', failing, batch_size=5)
+        self.assertEqual(outbox.position('pull'), (0, 0))
+
+        self.assertTrue(outbox.acknowledge('pull', first[-1]))
+        self.assertFalse(outbox.acknowledge('pull', first[0]))  # назад не двигается
+        self.assertEqual(outbox.read('pull', limit=1)[0].id, first[-1].id + 1)
+        rest = self.entries('pull')
+
+        # транзакция, начатая раньше, но не закоммиченная, задерживает журнал
+        other = connection.get_new_connection(connection.get_connection_params())
+        try:
+            other.execute('UPDATE payments_payment SET amount = amount + 1 WHERE id = %s',
+                          [self.data['payments'][0].pk])
+            Booking.objects.filter(pk=self.data['bookings'][0].pk).update(total_price=Decimal('5.00'))
+            self.assertEqual(outbox.read('pull'), [])
+            other.commit()
+        finally:
+            other.close()
+        topics = [e.topic for e in outbox.read('pull')]
+        self.assertEqual(topics, ['payments.payment', 'bookings.booking'])
+
+        outbox.seek('pull')
+        self.assertEqual(len(self.entries('pull', batch_size=7)), len(first) + len(rest) + 2)
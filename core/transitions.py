@@ -0,0 +1,164 @@
+# core/transitions.py
+"""
+Движок переходов статусов для Event, Booking, Hire и Payment.
+
+Допустимые переходы объявлены на моделях (``STATUS_TRANSITIONS`` рядом со
+``STATUS_CHOICES``). Здесь — переходы «по времени» (``TimedTransition``):
+мероприятие началось / закончилось, бронь или найм отработаны, платёж
+висит в pending дольше ``PAYMENT_PENDING_TTL``.
+
+Переход применяется пачками: в короткой транзакции берутся id пачки
+(``FOR UPDATE SKIP LOCKED``) и меняются одним UPDATE со сторожевым
+условием на исходный статус. На каждую пачку отправляется один сигнал
+``status_transitioned`` со списком id — вместо ``save()`` и post_save
+на каждую строку. То, что должно попасть в ту же транзакцию (проводки
+леджера по платежам), делает ``after_update``.
+"""
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.dispatch import Signal
+from django.utils import timezone
+
+from bookings.models import Booking
+from events.models import Event
+from hires.models import Hire
+from payments.ledger import record_payments
+from payments.models import Payment
+
+# sender — модель; kwargs: transition, source, target, pks, now
+status_transitioned = Signal()
+
+
+class InvalidTransition(ValueError):
+    pass
+
+
+def can_transition(model, source, target):
+    return target in model.STATUS_TRANSITIONS.get(source, ())
+
+
+def check_transition(model, source, target):
+    if not can_transition(model, source, target):
+        raise InvalidTransition(
+            f"{model._meta.label}: переход {source!r} → {target!r} не разрешён"
+        )
+
+
+@dataclass(frozen=True)
+class TimedTransition:
+    name: str
+    model: type
+    source: str
+    target: str
+    condition: object          # now -> Q
+    extra_updates: object = None  # now -> dict дополнительных полей UPDATE
+    after_update: object = None   # (transition, pks, now) -> None, в транзакции пачки
+
+    def __post_init__(self):
+        check_transition(self.model, self.source, self.target)
+
+    def queryset(self, now):
+        return self.model._default_manager.filter(self.condition(now), status=self.source)
+
+
+# период мероприятия — генерируемые колонки starts_at / ends_at (events/models.py);
+# вместе со статусом это диапазон по индексу (status, starts_at | ends_at).
+# Серия (core/recurrence.py) заканчивается с последним занятием — series_ends_at;
+# у бесконечной серии он NULL, и она не завершается
+def _event_started(now):
+    return Q(starts_at__lte=now)
+
+
+def _event_finished(now):
+    return Q(ends_at__lte=now, series_ends_at__lte=now)
+
+
+def _ended(now):
+    return Q(end_datetime__lt=now)
+
+
+def _booking_ended(now):
+    return Q(end_datetime__lt=now, series_ends_at__lt=now)
+
+
+def _payment_abandoned(now):
+    ttl = getattr(settings, 'PAYMENT_PENDING_TTL', timedelta(hours=24))
+    ttl = ttl if isinstance(ttl, timedelta) else timedelta(seconds=ttl)
+    return Q(created_at__lt=now - ttl)
+
+
+def _touch(now):
+    return {'updated_at': now}
+
+
+def _post_payments(transition, pks, now):
+    record_payments(dict.fromkeys(pks, (transition.source, None)), now)
+
+
+# Порядок важен: мероприятие из прошлого за один прогон проходит planned → ongoing → completed
+TIMED_TRANSITIONS = [
+    TimedTransition('event.planned_started', Event, 'planned', 'ongoing', _event_started, _touch),
+    TimedTransition('event.active_started', Event, 'active', 'ongoing', _event_started, _touch),
+    TimedTransition('event.finished', Event, 'ongoing', 'completed', _event_finished, _touch),
+    TimedTransition('booking.completed', Booking, 'confirmed', 'completed', _booking_ended, _touch),
+    TimedTransition('hire.completed', Hire, 'confirmed', 'completed', _ended, _touch),
+    TimedTransition('payment.abandoned', Payment, 'pending', 'cancelled', _payment_abandoned,
+                    after_update=_post_payments),
+]
+
+
+def apply_batch(transition, now, batch_size):
+    """Одна пачка в своей транзакции; возвращает список id переведённых строк."""
+    model = transition.model
+    with transaction.atomic():
+        pks = list(
+            transition.queryset(now)
+            .order_by()
+            .select_for_update(skip_locked=True)
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not pks:
+            return []
+        updates = {'status': transition.target}
+        if transition.extra_updates:
+            updates.update(transition.extra_updates(now))
+        model._default_manager.filter(pk__in=pks, status=transition.source).update(**updates)
+        if transition.after_update:
+            transition.after_update(transition, pks, now)
+        transaction.on_commit(lambda: status_transitioned.send(
+            sender=model,
+            transition=transition.name,
+            source=transition.source,
+            target=transition.target,
+            pks=pks,
+            now=now,
+        ))
+    return pks
+
+
+def apply(transitions=None, now=None, batch_size=5000, max_batches=None, sleep=0.0):
+    """
+    Применяет переходы по времени; возвращает ``{имя: число строк}``.
+
+    ``now`` фиксируется один раз на весь прогон, чтобы пачки одного
+    перехода были согласованы между собой.
+    """
+    now = now or timezone.now()
+    totals = {}
+    for transition in transitions or TIMED_TRANSITIONS:
+        total = batches = 0
+        while max_batches is None or batches < max_batches:
+            pks = apply_batch(transition, now, batch_size)
+            if not pks:
+                break
+            total += len(pks)
+            batches += 1
+            if sleep:
+                time.sleep(sleep)
+        totals[transition.name] = total
+    return totals
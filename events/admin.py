@@ -4,11 +4,15 @@ from django.utils.html import format_html
 from django.urls import reverse
 from django.utils import timezone
 
+from core import lookup
+from core.admin import DatabaseCascadeDeleteMixin, ShortIdSearchMixin
+from users.filters import ProfileListFilter
+
 from .models import Event
 
 
 @admin.register(Event)
-class EventAdmin(admin.ModelAdmin):
+class EventAdmin(ShortIdSearchMixin, DatabaseCascadeDeleteMixin, admin.ModelAdmin):
     list_display = [
         'short_id',
         'title_truncated',
@@ -27,7 +31,7 @@ class EventAdmin(admin.ModelAdmin):
         'status',
         'theme',
         'date',
-        'renter',
+        ('renter', ProfileListFilter),
         'created_at',
     ]
     
@@ -36,20 +40,27 @@ class EventAdmin(admin.ModelAdmin):
         'short_description',
         'description',
         'renter__user__email',
-        'renter__user__first_name',
-        'renter__user__last_name',
     ]
     
     date_hierarchy = 'date'
     
-    readonly_fields = ['created_at', 'updated_at', 'duration', 'is_upcoming', 'is_today']
+    readonly_fields = [
+        'created_at', 'updated_at', 'starts_at', 'ends_at', 'duration', 'is_upcoming', 'is_today',
+        'recurrence_until', 'series_ends_at',
+    ]
+    
+    autocomplete_fields = ['renter']
     
     fieldsets = (
         (None, {
             'fields': ('renter', 'title', 'theme')
         }),
         ('Дата и время', {
-            'fields': ('date', 'start_time', 'end_time', 'duration')
+            'fields': ('date', 'start_time', 'end_time', ('starts_at', 'ends_at'), 'duration')
+        }),
+        ('Повторение', {
+            'fields': ('recurrence', 'recurrence_exdates', ('recurrence_until', 'series_ends_at')),
+            'classes': ('collapse',)
         }),
         ('Описание и участники', {
             'fields': ('short_description', 'description', 'expected_guests')
@@ -71,7 +82,7 @@ class EventAdmin(admin.ModelAdmin):
     
     @admin.display(description='ID', ordering='id')
     def short_id(self, obj):
-        return str(obj.id)[:8].upper()
+        return lookup.short_id(obj.id)
     
     @admin.display(description='Название', ordering='title')
     def title_truncated(self, obj):
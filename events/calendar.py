@@ -0,0 +1,281 @@
+# events/calendar.py
+"""
+Календарные подписки (iCalendar) на расписание пользователя.
+
+В ленту попадают мероприятия, брони и наймы, где пользователь —
+арендатор-организатор, и наймы, где он — специалист (у Renter и
+Specialist первичный ключ = id пользователя, поэтому фильтр один).
+Все три источника читаются одним запросом ``UNION ALL`` с JOIN к
+мероприятию / площадке / специалисту, серверным курсором, и сразу
+отдаются потоком VEVENT-ов. Серия (core/recurrence.py) — один VEVENT с
+RRULE и EXDATE: занятия разворачивает календарное приложение.
+
+Календарные приложения опрашивают ленту каждые несколько минут, поэтому:
+
+* ETag = число строк + max(updated_at) по тем же строкам (считается
+  агрегатом по индексам FK без JOIN-ов) и кэшируется на
+  ``CALENDAR_FEED_ETAG_TTL`` секунд — повторный опрос с If-None-Match
+  получает 304 без запросов к БД;
+* тело ленты кэшируется по ETag, если не больше
+  ``CALENDAR_FEED_CACHE_MAX_BYTES`` — неизменившаяся лента не
+  перестраивается.
+
+Доступ — по подписанному токену в URL (приложения не умеют логиниться).
+"""
+import uuid
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+
+from bookings.models import Booking
+from core import recurrence as rrule
+from core.models import Specialty
+from hires.models import Hire
+from users.models import Specialist
+from venues.models import Venue
+
+from .models import Event
+
+SALT = 'events.calendar'
+PRODID = '-//EventMarket//Calendar//RU'
+
+SUMMARY_PREFIX = {
+    'event': "Мероприятие",
+    'booking': "Бронь площадки",
+    'hire': "Специалист",
+}
+
+ICAL_STATUS = {
+    'draft': 'TENTATIVE',
+    'pending': 'TENTATIVE',
+    'cancelled': 'CANCELLED',
+}
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+# ────────────────────────────────────────────────
+# Токен
+# ────────────────────────────────────────────────
+
+def feed_token(user):
+    return signing.Signer(salt=SALT).sign(str(user.pk))
+
+
+def user_id_from_token(token):
+    try:
+        return uuid.UUID(signing.Signer(salt=SALT).unsign(token))
+    except (signing.BadSignature, ValueError):
+        return None
+
+
+def feed_url(user):
+    return reverse('events:calendar_feed', args=[feed_token(user)])
+
+
+# ────────────────────────────────────────────────
+# Запросы
+# ────────────────────────────────────────────────
+
+def _window_start():
+    days = _setting('CALENDAR_FEED_PAST_DAYS', 90)
+    return timezone.now() - timedelta(days=days)
+
+
+def _sources(columns, joins=True):
+    """
+    Три части ``UNION ALL``: ``columns`` — функция ``вид -> список SQL-выражений``;
+    JOIN-ы к мероприятию / площадке / специалисту нужны только телу ленты.
+    Возвращает SQL и параметры (кроме id пользователя).
+    """
+    q = connection.ops.quote_name
+    event, booking, hire = q(Event._meta.db_table), q(Booking._meta.db_table), q(Hire._meta.db_table)
+    venue, specialist = q(Venue._meta.db_table), q(Specialist._meta.db_table)
+    specialty = q(Specialty._meta.db_table)
+    booking_joins = f'JOIN {event} e ON e.id = b.event_id JOIN {venue} v ON v.id = b.venue_id' if joins else ''
+    hire_joins = (
+        f'JOIN {event} e ON e.id = h.event_id JOIN {specialist} s ON s.user_id = h.specialist_id '
+        f'LEFT JOIN {specialty} sp ON sp.id = s.specialty_id'
+    ) if joins else ''
+    parts = [
+        f'''SELECT {', '.join(columns('event'))} FROM {event} e
+            WHERE e.renter_id = %(user)s AND (e.ends_at >= %(since)s OR {_running_series('e')})''',
+        f'''SELECT {', '.join(columns('booking'))} FROM {booking} b {booking_joins}
+            WHERE b.renter_id = %(user)s AND (b.end_datetime >= %(since)s OR {_running_series('b')})''',
+        f'''SELECT {', '.join(columns('hire'))} FROM {hire} h {hire_joins}
+            WHERE (h.renter_id = %(user)s OR h.specialist_id = %(user)s) AND h.end_datetime >= %(since)s''',
+    ]
+    since = _window_start()
+    return '\nUNION ALL\n'.join(parts), {'since': since}
+
+
+def _running_series(alias):
+    """Серия, первое занятие которой уже в прошлом, а последнее — нет."""
+    return (
+        f"{alias}.recurrence <> '' AND ({alias}.series_ends_at >= %(since)s OR {alias}.series_ends_at IS NULL)"
+    )
+
+
+def _row_columns(kind):
+    if kind == 'event':
+        return [
+            "'event'", 'e.id::text', 'e.title', "''", 'e.status', 'e.updated_at',
+            'e.date', 'e.start_time', 'e.end_time', 'e.starts_at', 'e.ends_at',
+            'e.recurrence', 'e.recurrence_exdates',
+        ]
+    if kind == 'booking':
+        return [
+            "'booking'", 'b.id::text', 'e.title', "v.name || ', ' || v.address", 'b.status', 'b.updated_at',
+            'NULL::date', 'NULL::time', 'NULL::time', 'b.start_datetime', 'b.end_datetime',
+            'b.recurrence', 'b.recurrence_exdates',
+        ]
+    return [
+        "'hire'", 'h.id::text', 'e.title', "coalesce(sp.name, '')", 'h.status', 'h.updated_at',
+        'NULL::date', 'NULL::time', 'NULL::time', 'h.start_datetime', 'h.end_datetime',
+        "''", 'NULL::timestamptz[]',
+    ]
+
+
+def _etag_columns(kind):
+    alias = kind[0]
+    return [f'{alias}.updated_at']
+
+
+def compute_etag(user_id):
+    """Число строк ленты и max(updated_at) — без JOIN-ов, по индексам FK."""
+    sql, params = _sources(_etag_columns, joins=False)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT count(*), max(updated_at) FROM ({sql}) feed (updated_at)',
+            {**params, 'user': user_id},
+        )
+        count, latest = cursor.fetchone()
+    stamp = latest.timestamp() if latest else 0
+    return f'"{count}-{stamp:.6f}-{params["since"].date().isoformat()}"'
+
+
+def feed_etag(user_id):
+    key = f'calendar:{user_id}:etag'
+    etag = cache.get(key)
+    if etag is None:
+        etag = compute_etag(user_id)
+        cache.set(key, etag, _setting('CALENDAR_FEED_ETAG_TTL', 60))
+    return etag
+
+
+def feed_rows(user_id, fetch_size=500):
+    sql, params = _sources(_row_columns)
+    with connection.chunked_cursor() as cursor:
+        cursor.execute(sql, {**params, 'user': user_id})
+        while rows := cursor.fetchmany(fetch_size):
+            yield from rows
+
+
+# ────────────────────────────────────────────────
+# Формат iCalendar (RFC 5545)
+# ────────────────────────────────────────────────
+
+def escape(text):
+    return (
+        str(text).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+    )
+
+
+def fold(line):
+    """Строки длиннее 75 октетов переносятся (CRLF + пробел), не разрывая UTF-8."""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    parts, current, size, limit = [], [], 0, 75
+    for char in line:
+        width = len(char.encode('utf-8'))
+        if size + width > limit:
+            parts.append(''.join(current))
+            current, size, limit = [], 0, 74
+        current.append(char)
+        size += width
+    parts.append(''.join(current))
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def _utc(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _recurrence_lines(rule, exdates, all_day):
+    lines = [rrule.ical(rule, all_day)]
+    if exdates:
+        if all_day:
+            tz = timezone.get_default_timezone()
+            lines.append(f"EXDATE;VALUE=DATE:{','.join(f'{value.astimezone(tz):%Y%m%d}' for value in exdates)}")
+        else:
+            lines.append(f"EXDATE:{','.join(_utc(value) for value in exdates)}")
+    return lines
+
+
+def vevent(row):
+    kind, pk, title, detail, status, updated_at, day, start_time, end_time, start, end, rule, exdates = row
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:{kind}-{pk}@eventmarket',
+        f'DTSTAMP:{_utc(updated_at)}',
+    ]
+    if kind == 'event':
+        if start_time is None:
+            lines.append(f'DTSTART;VALUE=DATE:{day:%Y%m%d}')
+            lines.append(f'DTEND;VALUE=DATE:{day + timedelta(days=1):%Y%m%d}')
+        else:
+            # starts_at / ends_at учитывают и переход через полночь
+            lines.append(f'DTSTART:{_utc(start)}')
+            if end_time is not None:
+                lines.append(f'DTEND:{_utc(end)}')
+    else:
+        lines.append(f'DTSTART:{_utc(start)}')
+        lines.append(f'DTEND:{_utc(end)}')
+    if rule:
+        lines.extend(_recurrence_lines(rule, exdates, all_day=kind == 'event' and start_time is None))
+    lines.append(f'SUMMARY:{escape(f"{SUMMARY_PREFIX[kind]}: {title}")}')
+    if detail:
+        # у брони — площадка, у найма — специализация
+        lines.append(f'{"DESCRIPTION" if kind == "hire" else "LOCATION"}:{escape(detail)}')
+    lines.append(f'STATUS:{ICAL_STATUS.get(status, "CONFIRMED")}')
+    lines.append('END:VEVENT')
+    return ''.join(fold(line) for line in lines)
+
+
+def render_feed(user_id):
+    """Генератор частей ленты (str)."""
+    yield fold('BEGIN:VCALENDAR') + fold('VERSION:2.0') + fold(f'PRODID:{PRODID}')
+    yield fold('CALSCALE:GREGORIAN') + fold('X-WR-CALNAME:EventMarket')
+    for row in feed_rows(user_id):
+        yield vevent(row)
+    yield fold('END:VCALENDAR')
+
+
+def cached_body(user_id, etag):
+    return cache.get(f'calendar:{user_id}:{etag}')
+
+
+def caching(user_id, etag, chunks):
+    """Отдаёт части как есть и, если лента небольшая, кладёт её в кэш по ETag."""
+    limit = _setting('CALENDAR_FEED_CACHE_MAX_BYTES', 256 * 1024)
+    body, size = [], 0
+    for chunk in chunks:
+        data = chunk.encode('utf-8')
+        if body is not None:
+            size += len(data)
+            if size <= limit:
+                body.append(data)
+            else:
+                body = None
+        yield data
+    if body is not None:
+        cache.set(f'calendar:{user_id}:{etag}', b''.join(body), _setting('CALENDAR_FEED_CACHE_TTL', 3600))
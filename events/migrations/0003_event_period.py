@@ -0,0 +1,53 @@
+# Generated by Django 5.2.9 on 2026-10-19 03:52
+
+import datetime
+import django.contrib.postgres.fields.ranges
+import django.contrib.postgres.indexes
+import django.db.models.functions.comparison
+from django.contrib.postgres.operations import AddIndexConcurrently, RemoveIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Генерируемые колонки STORED — одна перезапись таблицы при добавлении;
+    # индексы строятся CONCURRENTLY, старый индекс по renter удаляется,
+    # когда (renter, ends_at) уже готов
+    atomic = False
+
+    dependencies = [
+        ('events', '0002_event_uuid7_ids'),
+        ('users', '0004_specialist_dimensions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='ends_at',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(end_time__isnull=True, then=models.Func(models.Value('UTC'), models.Func(models.F('date'), models.Value(1), models.Value(datetime.time(0, 0), output_field=models.TimeField()), arg_joiner=' + ', output_field=models.DateTimeField(), template='(%(expressions)s)'), function='timezone', output_field=models.DateTimeField())), models.When(end_time__lte=django.db.models.functions.comparison.Coalesce(models.F('start_time'), models.Value(datetime.time(0, 0), output_field=models.TimeField())), then=models.Func(models.Value('UTC'), models.Func(models.F('date'), models.Value(1), models.F('end_time'), arg_joiner=' + ', output_field=models.DateTimeField(), template='(%(expressions)s)'), function='timezone', output_field=models.DateTimeField())), default=models.Func(models.Value('UTC'), models.Func(models.F('date'), models.Value(0), models.F('end_time'), arg_joiner=' + ', output_field=models.DateTimeField(), template='(%(expressions)s)'), function='timezone', output_field=models.DateTimeField()), output_field=models.DateTimeField()), output_field=models.DateTimeField(verbose_name='окончание')),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='starts_at',
+            field=models.GeneratedField(db_persist=True, expression=models.Func(models.Value('UTC'), models.Func(models.F('date'), models.Value(0), django.db.models.functions.comparison.Coalesce(models.F('start_time'), models.Value(datetime.time(0, 0), output_field=models.TimeField())), arg_joiner=' + ', output_field=models.DateTimeField(), template='(%(expressions)s)'), function='timezone', output_field=models.DateTimeField()), output_field=models.DateTimeField(verbose_name='начало')),
+        ),
+        AddIndexConcurrently(
+            model_name='event',
+            index=models.Index(fields=['renter', 'ends_at'], name='event_renter_ends_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='event',
+            index=models.Index(fields=['status', 'starts_at'], name='event_status_starts_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='event',
+            index=models.Index(fields=['status', 'ends_at'], name='event_status_ends_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='event',
+            index=django.contrib.postgres.indexes.GistIndex(models.Func(models.F('starts_at'), models.F('ends_at'), function='tstzrange', output_field=django.contrib.postgres.fields.ranges.DateTimeRangeField()), name='event_period_gist'),
+        ),
+        RemoveIndexConcurrently(
+            model_name='event',
+            name='events_even_renter__2c91b2_idx',
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.9 on 2026-10-19 04:23
+
+import core.recurrence
+import datetime
+import django.contrib.postgres.fields
+import django.contrib.postgres.fields.ranges
+import django.contrib.postgres.indexes
+import django.db.models.functions.comparison
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Серии мероприятий: правило в строке мероприятия, окончание серии —
+    # генерируемая колонка STORED (одна перезапись таблицы); GiST-индекс
+    # промежутка серий строится CONCURRENTLY
+    atomic = False
+
+    dependencies = [
+        ('events', '0003_event_period'),
+        ('users', '0004_specialist_dimensions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='recurrence',
+            field=models.CharField(blank=True, db_default='', default='', help_text='например FREQ=WEEKLY;BYDAY=SA;UNTIL=20271231', max_length=200, validators=[core.recurrence.validate_rule], verbose_name='повторение (RRULE)'),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='recurrence_exdates',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.DateTimeField(), blank=True, db_default=[], default=list, size=None, verbose_name='отменённые занятия'),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='recurrence_until',
+            field=models.DateField(blank=True, editable=False, null=True, verbose_name='последнее занятие'),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='series_ends_at',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(recurrence='', then=models.Case(models.When(end_time__isnull=True, then=models.Func(models.Value('UTC'), models.Func(models.F('date'), models.Value(1), models.Value(datetime.time(0, 0), output_field=models.TimeField()), arg_joiner=' + ', output_field=models.DateTimeField(), template='(%(expressions)s)'), function='timezone', output_field=models.DateTimeField())), models.When(end_time__lte=django.db.models.functions.comparison.Coalesce(models.F('start_time'), models.Value(datetime.time(0, 0), output_field=models.TimeField())), then=models.Func(models.Value('UTC'), models.Func(models.F('date'), models.Value(1), models.F('end_time'), arg_joiner=' + ', output_field=models.DateTimeField(), template='(%(expressions)s)'), function='timezone', output_field=models.DateTimeField())), default=models.Func(models.Value('UTC'), models.Func(models.F('date'), models.Value(0), models.F('end_time'), arg_joiner=' + ', output_field=models.DateTimeField(), template='(%(expressions)s)'), function='timezone', output_field=models.DateTimeField()), output_field=models.DateTimeField())), default=models.Case(models.When(end_time__isnull=True, then=models.Func(models.Value('UTC'), models.Func(models.F('recurrence_until'), models.Value(1), models.Value(datetime.time(0, 0), output_field=models.TimeField()), arg_joiner=' + ', output_field=models.DateTimeField(), template='(%(expressions)s)'), function='timezone', output_field=models.DateTimeField())), models.When(end_time__lte=django.db.models.functions.comparison.Coalesce(models.F('start_time'), models.Value(datetime.time(0, 0), output_field=models.TimeField())), then=models.Func(models.Value('UTC'), models.Func(models.F('recurrence_until'), models.Value(1), models.F('end_time'), arg_joiner=' + ', output_field=models.DateTimeField(), template='(%(expressions)s)'), function='timezone', output_field=models.DateTimeField())), default=models.Func(models.Value('UTC'), models.Func(models.F('recurrence_until'), models.Value(0), models.F('end_time'), arg_joiner=' + ', output_field=models.DateTimeField(), template='(%(expressions)s)'), function='timezone', output_field=models.DateTimeField()), output_field=models.DateTimeField()), output_field=models.DateTimeField()), output_field=models.DateTimeField(verbose_name='окончание серии')),
+        ),
+        AddIndexConcurrently(
+            model_name='event',
+            index=django.contrib.postgres.indexes.GistIndex(models.Func(models.F('starts_at'), models.F('series_ends_at'), function='tstzrange', output_field=django.contrib.postgres.fields.ranges.DateTimeRangeField()), condition=models.Q(('recurrence', ''), _negated=True), name='event_series_gist'),
+        ),
+    ]
@@ -1,14 +1,110 @@
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.contrib.postgres.fields import ArrayField, DateTimeRangeField
+from django.contrib.postgres.indexes import GistIndex
 from django.db import models
+from django.db.models import Case, F, Func, Q, Value, When
+from django.db.models.functions import Coalesce
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
-import uuid
+
+from core import recurrence as rrule
+from core.ids import tail_index, uuid7
+
+
+# Статусы мероприятий, которые ещё впереди (EventQuerySet.upcoming)
+UPCOMING_STATUSES = ('draft', 'planned', 'active')
+
+
+def _local_datetime(at, days=0, day=F('date')):
+    """
+    SQL: ``day`` (+ ``days`` дней) + время ``at`` как момент в ``TIME_ZONE``.
+    ``timezone(text, timestamp)`` в PostgreSQL неизменяема — годится для
+    генерируемой колонки; зона фиксируется в схеме (смена ``TIME_ZONE``
+    даст миграцию).
+    """
+    local = Func(
+        day, Value(days), at,
+        template='(%(expressions)s)', arg_joiner=' + ', output_field=models.DateTimeField(),
+    )
+    return Func(Value(settings.TIME_ZONE), local, function='timezone', output_field=models.DateTimeField())
+
+
+START_OF_DAY = Value(time(0), output_field=models.TimeField())
+
+# Период мероприятия [starts_at, ends_at): без времени начала — с начала
+# дня, без времени окончания — до конца дня; окончание не позже начала —
+# переход через полночь
+STARTS_AT = _local_datetime(Coalesce(F('start_time'), START_OF_DAY))
+
+
+def _ends_at(day=F('date')):
+    return Case(
+        When(end_time__isnull=True, then=_local_datetime(START_OF_DAY, days=1, day=day)),
+        When(end_time__lte=Coalesce(F('start_time'), START_OF_DAY),
+             then=_local_datetime(F('end_time'), days=1, day=day)),
+        default=_local_datetime(F('end_time'), day=day),
+        output_field=models.DateTimeField(),
+    )
+
+
+ENDS_AT = _ends_at()
+
+# Окончание серии — окончание занятия в день recurrence_until (core/recurrence.py);
+# бесконечная серия (recurrence_until IS NULL) — NULL
+SERIES_ENDS_AT = Case(
+    When(recurrence='', then=ENDS_AT),
+    default=_ends_at(F('recurrence_until')),
+    output_field=models.DateTimeField(),
+)
+
+# То же выражение, что у GiST-индекса event_period_gist
+PERIOD = Func(F('starts_at'), F('ends_at'), function='tstzrange', output_field=DateTimeRangeField())
+# Промежуток серии — event_series_gist; NULL в конце — без верхней границы
+SPAN = Func(F('starts_at'), F('series_ends_at'), function='tstzrange', output_field=DateTimeRangeField())
 
 
-class Event(models.Model):
+class EventQuerySet(models.QuerySet):
+    """Запросы по времени — диапазоны по индексам периода, а не дата + время в Python."""
+
+    def overlapping(self, start, end):
+        """
+        Пересекаются с [start, end) — GiST-индекс периода (``&&``); серии —
+        по промежутку (``event_series_gist``), их занятия в окне отдаёт
+        ``occurrences``.
+        """
+        return self.alias(period=PERIOD, span=SPAN).filter(
+            Q(period__overlap=(start, end)) | (~Q(recurrence='') & Q(span__overlap=(start, end)))
+        )
+
+    def occurrences(self, start, end):
+        """``(мероприятие, начало, окончание)`` занятий в окне [start, end); серии разворачиваются лениво."""
+        for event in self.overlapping(start, end):
+            for occurrence in event.occurrences(start, end):
+                yield event, *occurrence
+
+    def ongoing(self, now=None):
+        """Идут в момент ``now`` (``@>`` по GiST-индексу)."""
+        return self.alias(period=PERIOD).filter(period__contains=now or timezone.now())
+
+    def upcoming(self, now=None):
+        """Ещё не начались; индекс (status, starts_at)."""
+        return self.filter(status__in=UPCOMING_STATUSES, starts_at__gt=now or timezone.now())
+
+    def started(self, now=None):
+        return self.filter(starts_at__lte=now or timezone.now())
+
+    def finished(self, now=None):
+        return self.filter(ends_at__lte=now or timezone.now())
+
+
+class Event(rrule.RecurringMixin, models.Model):
     """
-    Мероприятие / событие, которое создаёт арендатор (Renter)
+    Мероприятие / событие, которое создаёт арендатор (Renter); может
+    повторяться (мастер-классы, еженедельные занятия) — core/recurrence.py
     """
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     
     renter = models.ForeignKey(
         'users.Renter',
@@ -22,6 +118,42 @@ class Event(models.Model):
     date = models.DateField(_("дата проведения"))
     start_time = models.TimeField(_("время начала"), null=True, blank=True)
     end_time = models.TimeField(_("время окончания"), null=True, blank=True)
+    # Вычисляет PostgreSQL из даты и времени — заполнены и при bulk_create / COPY
+    starts_at = models.GeneratedField(
+        expression=STARTS_AT,
+        output_field=models.DateTimeField(_("начало")),
+        db_persist=True,
+    )
+    ends_at = models.GeneratedField(
+        expression=ENDS_AT,
+        output_field=models.DateTimeField(_("окончание")),
+        db_persist=True,
+    )
+
+    # Повторение: строка — первое занятие, остальные разворачиваются из правила на лету
+    recurrence = models.CharField(
+        _("повторение (RRULE)"),
+        max_length=200,
+        blank=True,
+        default='',
+        db_default='',
+        validators=[rrule.validate_rule],
+        help_text="например FREQ=WEEKLY;BYDAY=SA;UNTIL=20271231",
+    )
+    recurrence_exdates = ArrayField(
+        models.DateTimeField(),
+        verbose_name=_("отменённые занятия"),
+        blank=True,
+        default=list,
+        db_default=[],
+    )
+    # Дата последнего занятия (пересчитывается в save()); NULL — серия бесконечна
+    recurrence_until = models.DateField(_("последнее занятие"), null=True, blank=True, editable=False)
+    series_ends_at = models.GeneratedField(
+        expression=SERIES_ENDS_AT,
+        output_field=models.DateTimeField(_("окончание серии")),
+        db_persist=True,
+    )
 
     # Основная тематика / формат
     THEME_CHOICES = [
@@ -71,6 +203,16 @@ class Event(models.Model):
         ('cancelled',  _("отменено")),
     ]
 
+    # Допустимые переходы статусов (см. core/transitions.py)
+    STATUS_TRANSITIONS = {
+        'draft':     ['planned', 'cancelled'],
+        'planned':   ['active', 'ongoing', 'cancelled'],
+        'active':    ['ongoing', 'cancelled'],
+        'ongoing':   ['completed'],
+        'completed': [],
+        'cancelled': [],
+    }
+
     status = models.CharField(
         _("статус"),
         max_length=20,
@@ -82,25 +224,46 @@ class Event(models.Model):
     created_at = models.DateTimeField(_("создано"), auto_now_add=True)
     updated_at = models.DateTimeField(_("обновлено"), auto_now=True)
 
+    objects = EventQuerySet.as_manager()
+
     class Meta:
         verbose_name = _("мероприятие")
         verbose_name_plural = _("мероприятия")
         ordering = ['-date', '-created_at']
         indexes = [
             models.Index(fields=['date', 'status']),
-            models.Index(fields=['renter']),
+            # лента календаря: мероприятия организатора, закончившиеся после начала окна
+            models.Index(fields=['renter', 'ends_at'], name='event_renter_ends_idx'),
+            # переходы статусов по времени и upcoming()
+            models.Index(fields=['status', 'starts_at'], name='event_status_starts_idx'),
+            models.Index(fields=['status', 'ends_at'], name='event_status_ends_idx'),
+            # пересечение с интервалом и «идёт сейчас»
+            GistIndex(PERIOD, name='event_period_gist'),
+            GistIndex(SPAN, condition=~Q(recurrence=''), name='event_series_gist'),
+            # короткий код в админке (core/lookup.py)
+            tail_index('event_id_tail_idx'),
         ]
 
     def __str__(self):
         return f"{self.title} — {self.date.strftime('%d.%m.%Y')}"
 
+    def first_period(self):
+        """Период по дате и времени — как STARTS_AT / ENDS_AT, без чтения генерируемых колонок."""
+        tz = timezone.get_default_timezone()
+        start_time = self.start_time or time(0)
+        start = datetime.combine(self.date, start_time, tzinfo=tz)
+        if self.end_time is None:
+            end = datetime.combine(self.date + timedelta(days=1), time(0), tzinfo=tz)
+        elif self.end_time <= start_time:
+            end = datetime.combine(self.date + timedelta(days=1), self.end_time, tzinfo=tz)
+        else:
+            end = datetime.combine(self.date, self.end_time, tzinfo=tz)
+        return start, end
+
     @property
     def is_upcoming(self):
         """Мероприятие ещё впереди"""
-        if not self.date:
-            return False
-        event_date = timezone.datetime.combine(self.date, self.start_time or timezone.datetime.min.time())
-        return event_date > timezone.now()
+        return self.starts_at > timezone.now()
 
     @property
     def is_today(self):
@@ -111,8 +274,5 @@ class Event(models.Model):
     def duration(self):
         """Примерная продолжительность в часах"""
         if self.start_time and self.end_time:
-            start = timezone.datetime.combine(self.date, self.start_time)
-            end = timezone.datetime.combine(self.date, self.end_time)
-            delta = end - start
-            return round(delta.total_seconds() / 3600, 1)
+            return round((self.ends_at - self.starts_at).total_seconds() / 3600, 1)
         return None
\ No newline at end of file
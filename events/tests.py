@@ -1,3 +1,156 @@
+from datetime import date, datetime, time, timedelta
+
+from django.core.cache import cache
+from django.db.models import Q
 from django.test import TestCase
+from django.utils import timezone
+
+from bookings.models import Booking
+from EventMarket.testing import build_marketplace
+from hires.models import Hire
+
+from . import calendar
+from .models import Event
+
+
+class CalendarFeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = build_marketplace(3)
+        cls.renter = cls.data['events'][0].renter
+        cls.specialist = cls.data['hires'][0].specialist
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, user, **headers):
+        response = self.client.get(calendar.feed_url(user.user), **headers)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, body.decode('utf-8')
+
+    def uids(self, body):
+        return {line[len('UID:'):] for line in body.split('\r\n') if line.startswith('UID:')}
+
+    def test_feed_lists_users_events_bookings_and_hires(self):
+        since = timezone.now() - timedelta(days=90)
+        expected = {f'event-{pk}@eventmarket' for pk in Event.objects.filter(
+            renter=self.renter, ends_at__gte=since).values_list('pk', flat=True)}
+        expected |= {f'booking-{pk}@eventmarket' for pk in Booking.objects.filter(
+            renter=self.renter, end_datetime__gte=since).values_list('pk', flat=True)}
+        expected |= {f'hire-{pk}@eventmarket' for pk in Hire.objects.filter(
+            Q(renter=self.renter) | Q(specialist_id=self.renter.pk), end_datetime__gte=since,
+        ).values_list('pk', flat=True)}
+
+        response, body = self.get(self.renter)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        self.assertTrue(body.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertTrue(body.endswith('END:VCALENDAR\r\n'))
+        self.assertEqual(self.uids(body), expected)
+
+        _response, body = self.get(self.specialist)
+        self.assertTrue(any(uid.startswith('hire-') for uid in self.uids(body)))
+
+    def test_unchanged_feed_is_served_without_rebuilding(self):
+        response, body = self.get(self.renter)
+        etag = response['ETag']
+        with self.assertNumQueries(0):
+            not_modified, _ = self.get(self.renter, HTTP_IF_NONE_MATCH=etag)
+            cached, cached_body = self.get(self.renter)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(cached_body, body)
+
+        # после истечения ETag-кэша изменение видно по новому ETag
+        Event.objects.filter(renter=self.renter).update(
+            title='Новое название', updated_at=timezone.now() + timedelta(seconds=1),
+        )
+        cache.delete(f'calendar:{self.renter.pk}:etag')
+        changed, body = self.get(self.renter, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], etag)
+        self.assertIn('Новое название', body)
+
+    def test_bad_token_is_not_found(self):
+        response = self.client.get('/events/calendar/not-a-token.ics')
+        self.assertEqual(response.status_code, 404)
+
+    def test_long_lines_are_folded_by_octets(self):
+        folded = calendar.fold('SUMMARY:' + 'Ж' * 100)
+        lines = folded[:-2].split('\r\n')
+        self.assertTrue(all(len(line.encode('utf-8')) <= 75 for line in lines))
+        self.assertEqual(''.join(line[1:] if i else line for i, line in enumerate(lines)), 'SUMMARY:' + 'Ж' * 100)
+
+
+class EventPeriodTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.renter = build_marketplace(1)['events'][0].renter
+
+    def make(self, day, start=None, end=None, status='planned'):
+        return Event.objects.create(renter=self.renter, title='Период', date=day,
+                                    start_time=start, end_time=end, status=status)
+
+    def at(self, day, hour):
+        return timezone.make_aware(datetime.combine(day, time(hour)))
+
+    def test_period_is_computed_by_database(self):
+        day = date(2030, 6, 7)
+        evening = self.make(day, time(18), time(23))
+        self.assertEqual((evening.starts_at, evening.ends_at), (self.at(day, 18), self.at(day, 23)))
+        overnight = self.make(day, time(22), time(2))
+        self.assertEqual(overnight.ends_at, self.at(day + timedelta(days=1), 2))
+        self.assertEqual(overnight.duration, 4.0)
+        all_day = self.make(day)
+        self.assertEqual((all_day.starts_at, all_day.ends_at), (self.at(day, 0), self.at(day + timedelta(days=1), 0)))
+
+        evening.start_time = time(20)
+        evening.save()
+        evening.refresh_from_db()
+        self.assertEqual(evening.starts_at, self.at(day, 20))
+
+    def test_overlapping_ongoing_and_upcoming(self):
+        day = date(2030, 6, 7)
+        evening = self.make(day, time(18), time(23))
+        morning = self.make(day, time(9), time(12))
+        overnight = self.make(day - timedelta(days=1), time(22), time(2))
+        cancelled = self.make(day + timedelta(days=1), time(18), time(20), status='cancelled')
+        ours = Event.objects.filter(pk__in=[evening.pk, morning.pk, overnight.pk, cancelled.pk])
+
+        def pks(qs):
+            return set(qs.values_list('pk', flat=True))
+
+        self.assertEqual(pks(ours.overlapping(self.at(day, 11), self.at(day, 19))), {evening.pk, morning.pk})
+        # полуинтервал: окончание в 12:00 не пересекается с началом в 12:00
+        self.assertEqual(pks(ours.overlapping(self.at(day, 12), self.at(day, 13))), set())
+        self.assertEqual(pks(ours.ongoing(self.at(day, 1))), {overnight.pk})
+        self.assertEqual(pks(ours.upcoming(self.at(day, 10))), {evening.pk})
+        self.assertEqual(pks(ours.finished(self.at(day, 12))), {morning.pk, overnight.pk})
+
+
+class EventRecurrenceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.renter = build_marketplace(1)['events'][0].renter
+
+    def test_weekly_series_expands_lazily_and_reaches_the_feed(self):
+        day = date(2030, 6, 1)  # суббота
+        series = Event.objects.create(renter=self.renter, title='Мастер-класс', date=day, start_time=time(11),
+                                      end_time=time(13), status='planned', recurrence='FREQ=WEEKLY;UNTIL=20320529')
+        series.refresh_from_db()
+        self.assertEqual(series.recurrence_until, date(2032, 5, 29))
+        self.assertEqual(series.series_ends_at, timezone.make_aware(datetime(2032, 5, 29, 13)))
+
+        window = (timezone.make_aware(datetime(2031, 9, 1)), timezone.make_aware(datetime(2031, 10, 1)))
+        ours = Event.objects.filter(pk=series.pk)
+        self.assertEqual([start.date() for _event, start, _end in ours.occurrences(*window)],
+                         [date(2031, 9, 6), date(2031, 9, 13), date(2031, 9, 20), date(2031, 9, 27)])
+        series.skip_occurrence(timezone.make_aware(datetime(2031, 9, 13, 11)))
+        self.assertEqual(len(list(ours.occurrences(*window))), 3)
+        self.assertFalse(ours.overlapping(timezone.make_aware(datetime(2033, 1, 1)),
+                                          timezone.make_aware(datetime(2033, 2, 1))).exists())
 
-# Create your tests here.
+        cache.clear()
+        response = self.client.get(calendar.feed_url(self.renter.user))
+        body = b''.join(response.streaming_content).decode('utf-8')
+        self.assertIn('RRULE:FREQ=WEEKLY;UNTIL=20320529T235959Z\r\n', body)
+        self.assertIn('EXDATE:20310913T110000Z\r\n', body)
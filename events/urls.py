@@ -0,0 +1,9 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'events'
+
+urlpatterns = [
+    path('calendar/<str:token>.ics', views.calendar_feed, name='calendar_feed'),
+]
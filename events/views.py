@@ -1,3 +1,35 @@
-from django.shortcuts import render
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.views.decorators.http import condition, require_GET
 
-# Create your views here.
+from . import calendar
+
+CONTENT_TYPE = 'text/calendar; charset=utf-8'
+
+
+def _feed_etag(request, token):
+    user_id = calendar.user_id_from_token(token)
+    return calendar.feed_etag(user_id) if user_id else None
+
+
+@require_GET
+@condition(etag_func=_feed_etag)
+def calendar_feed(request, token):
+    """
+    iCalendar-лента пользователя. 304 по If-None-Match отдаёт ``condition``;
+    неизменившаяся лента берётся из кэша, иначе строится потоком.
+    """
+    user_id = calendar.user_id_from_token(token)
+    if user_id is None:
+        raise Http404
+    etag = calendar.feed_etag(user_id)
+    body = calendar.cached_body(user_id, etag)
+    if body is not None:
+        response = HttpResponse(body, content_type=CONTENT_TYPE)
+    else:
+        response = StreamingHttpResponse(
+            calendar.caching(user_id, etag, calendar.render_feed(user_id)),
+            content_type=CONTENT_TYPE,
+        )
+    response['Content-Disposition'] = 'inline; filename="eventmarket.ics"'
+    response['Cache-Control'] = 'private, max-age=60'
+    return response
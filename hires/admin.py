@@ -2,11 +2,15 @@ from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
 
+from core import lookup
+from core.admin import DatabaseCascadeDeleteMixin, ShortIdSearchMixin
+from users.filters import ProfileListFilter
+
 from .models import Hire
 
 
 @admin.register(Hire)
-class HireAdmin(admin.ModelAdmin):
+class HireAdmin(ShortIdSearchMixin, DatabaseCascadeDeleteMixin, admin.ModelAdmin):
     list_display = [
         'short_id',
         'event_title',
@@ -24,15 +28,13 @@ class HireAdmin(admin.ModelAdmin):
     list_filter = [
         'status',
         'created_at',
-        'specialist',
-        'renter',
+        ('specialist', ProfileListFilter),
+        ('renter', ProfileListFilter),
     ]
     
     search_fields = [
         'event__title',
         'specialist__user__email',
-        'specialist__user__first_name',
-        'specialist__user__last_name',
         'renter__user__email',
     ]
     
@@ -40,6 +42,8 @@ class HireAdmin(admin.ModelAdmin):
     
     readonly_fields = ['created_at', 'updated_at', 'duration_hours']
     
+    autocomplete_fields = ['event', 'specialist', 'renter']
+    
     fieldsets = (
         (None, {
             'fields': ('event', 'specialist', 'renter')
@@ -64,7 +68,7 @@ class HireAdmin(admin.ModelAdmin):
     
     @admin.display(description='ID', ordering='id')
     def short_id(self, obj):
-        return str(obj.id)[:8].upper()
+        return lookup.short_id(obj.id)
     
     @admin.display(description='Мероприятие')
     def event_title(self, obj):
@@ -76,8 +80,7 @@ class HireAdmin(admin.ModelAdmin):
     @admin.display(description='Специалист')
     def specialist_name(self, obj):
         if obj.specialist and obj.specialist.user:
-            full_name = f"{obj.specialist.user.first_name or ''} {obj.specialist.user.last_name or ''}".strip()
-            return full_name or obj.specialist.user.email
+            return obj.specialist.user.email
         return '—'
     
     @admin.display(description='Заказчик')
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.9 on 2026-10-19 02:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0001_initial'),
+        ('hires', '0001_initial'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='hire',
+            index=models.Index(fields=['status', 'end_datetime'], name='hires_hire_status_6ef4cf_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.9 on 2026-10-19 04:14
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Частичный индекс занятости специалиста строится CONCURRENTLY — таблица не блокируется на запись
+    atomic = False
+
+    dependencies = [
+        ('events', '0003_event_period'),
+        ('hires', '0002_status_end_datetime_index'),
+        ('users', '0004_specialist_dimensions'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='hire',
+            index=models.Index(condition=models.Q(('status__in', ('pending', 'confirmed'))), fields=['specialist', 'start_datetime', 'end_datetime'], name='hire_specialist_slot_idx'),
+        ),
+    ]
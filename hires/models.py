@@ -1,9 +1,14 @@
 # hires/models.py
 from django.db import models
+from django.db.models import Q
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 
 
+# Статусы, которые занимают время специалиста
+BLOCKING_STATUSES = ('pending', 'confirmed')
+
+
 class Hire(models.Model):
     """
     Найм специалиста на конкретное мероприятие
@@ -50,6 +55,14 @@ class Hire(models.Model):
         ('completed', _("выполнено")),
     ]
 
+    # Допустимые переходы статусов (см. core/transitions.py)
+    STATUS_TRANSITIONS = {
+        'pending':   ['confirmed', 'cancelled'],
+        'confirmed': ['completed', 'cancelled'],
+        'cancelled': [],
+        'completed': [],
+    }
+
     status = models.CharField(
         _("статус"),
         max_length=20,
@@ -67,7 +80,14 @@ class Hire(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['status']),
+            models.Index(fields=['status', 'end_datetime']),
             models.Index(fields=['event', 'specialist']),
+            # занятость специалиста (пакетное бронирование, bookings/batch.py)
+            models.Index(
+                fields=['specialist', 'start_datetime', 'end_datetime'],
+                condition=Q(status__in=BLOCKING_STATUSES),
+                name='hire_specialist_slot_idx',
+            ),
         ]
 
     def __str__(self):
@@ -5,11 +5,14 @@ from django.http import HttpResponse
 from django.utils.html import format_html
 from django.utils import timezone
 
-from .models import Payment
+from core import lookup
+from core.admin import ShortIdSearchMixin
+
+from .models import LedgerAccount, LedgerEntry, Payment, PaymentEvent
 
 
 @admin.register(Payment)
-class PaymentAdmin(admin.ModelAdmin):
+class PaymentAdmin(ShortIdSearchMixin, admin.ModelAdmin):
     list_display = [
         'short_id',
         'target_display',
@@ -30,25 +33,29 @@ class PaymentAdmin(admin.ModelAdmin):
     
     search_fields = [
         'payer__user__email',
-        'payer__user__first_name',
-        'payer__user__last_name',
         'booking__event__title',
         'hire__event__title',
     ]
     
     date_hierarchy = 'created_at'
     
-    readonly_fields = ['created_at', 'paid_at']
+    readonly_fields = ['created_at', 'paid_at', 'provider_payment_id', 'provider_updated_at', 'target_deleted_at']
+    
+    autocomplete_fields = ['payer', 'booking', 'hire']
     
     actions = ['export_as_csv']
     
     fieldsets = (
         (None, {
-            'fields': ('payer', 'booking', 'hire')
+            'fields': ('payer', 'booking', 'hire', 'target_deleted_at')
         }),
         ('Сумма и статус', {
             'fields': ('amount', 'status', 'paid_at')
         }),
+        ('Провайдер', {
+            'fields': ('provider_payment_id', 'provider_updated_at'),
+            'classes': ('collapse',)
+        }),
         ('Служебная информация', {
             'fields': ('created_at',),
             'classes': ('collapse',)
@@ -63,7 +70,7 @@ class PaymentAdmin(admin.ModelAdmin):
     
     @admin.display(description='ID', ordering='id')
     def short_id(self, obj):
-        return str(obj.id)[:8].upper()
+        return lookup.short_id(obj.id)
     
     @admin.display(description='Связанный объект')
     def target_display(self, obj):
@@ -133,7 +140,7 @@ class PaymentAdmin(admin.ModelAdmin):
             )
             
             writer.writerow([
-                str(obj.id)[:8].upper(),
+                lookup.short_id(obj.id),
                 obj.payer.user.email if obj.payer and obj.payer.user else '—',
                 target_type,
                 target_id,
@@ -152,4 +159,78 @@ class PaymentAdmin(admin.ModelAdmin):
             'payer__user',
             'booking__event',
             'hire__event'
-        )
\ No newline at end of file
+        )
+
+
+@admin.register(PaymentEvent)
+class PaymentEventAdmin(ShortIdSearchMixin, admin.ModelAdmin):
+    """
+    Журнал событий провайдера — только просмотр
+    """
+    list_display = [
+        'provider_event_id',
+        'event_type',
+        'status',
+        'occurred_at',
+        'received_at',
+        'result',
+        'attempts',
+    ]
+    
+    list_filter = ['result', 'status', 'received_at']
+    search_fields = ['provider_event_id', 'provider_payment_id']
+    
+    ordering = ['-received_at']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(LedgerAccount)
+class LedgerAccountAdmin(ShortIdSearchMixin, admin.ModelAdmin):
+    """
+    Счета леджера — только просмотр, обороты меняются проводками
+    """
+    list_display = ['key', 'kind', 'debit', 'credit', 'balance', 'updated_at']
+    list_filter = ['kind']
+    search_fields = ['=key']
+    ordering = ['key']
+
+    @admin.display(description='Баланс')
+    def balance(self, obj):
+        return obj.balance
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(LedgerEntry)
+class LedgerEntryAdmin(ShortIdSearchMixin, admin.ModelAdmin):
+    """
+    Проводки — только просмотр
+    """
+    list_display = ['id', 'account', 'debit', 'credit', 'from_status', 'to_status', 'payment_id', 'created_at']
+    search_fields = ['=account', '=payment_id', '=posting']
+    show_full_result_count = False
+    ordering = ['-id']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
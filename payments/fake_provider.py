@@ -0,0 +1,71 @@
+# payments/fake_provider.py
+"""
+Локальный «провайдер» для нагрузочной проверки вебхуков.
+
+Для каждого платежа строит жизненный цикл (pending → succeeded / failed,
+иногда → refunded), затем перемешивает события в пределах окна и
+дублирует часть из них — как это делает реальный провайдер при ретраях.
+``expected`` хранит итоговый статус, к которому должен прийти платёж.
+"""
+import json
+import random
+import time
+
+from .webhooks import sign
+
+
+class FakeProvider:
+    def __init__(self, payment_ids, seed=0, duplicate_rate=0.1, shuffle_window=50, secret=None):
+        self.rng = random.Random(seed)
+        self.payment_ids = list(payment_ids)
+        self.duplicate_rate = duplicate_rate
+        self.shuffle_window = shuffle_window
+        self.secret = secret
+        self.expected = {}
+
+    @staticmethod
+    def _event(payment_id, status, created):
+        return {
+            'id': f'evt_{payment_id.hex}_{status}',
+            'type': f'payment.{status}',
+            'created': created,
+            'data': {
+                'payment_id': str(payment_id),
+                'provider_payment_id': f'pay_{str(payment_id).replace("-", "")[:20]}',
+                'status': status,
+            },
+        }
+
+    def lifecycle(self, payment_id, started):
+        roll = self.rng.random()
+        statuses = ['pending', 'succeeded'] if roll < 0.85 else ['pending', 'failed']
+        if statuses[-1] == 'succeeded' and self.rng.random() < 0.05:
+            statuses.append('refunded')
+        self.expected[payment_id] = statuses[-1]
+        events, created = [], started
+        for status in statuses:
+            events.append(self._event(payment_id, status, created))
+            created += self.rng.uniform(0.5, 30)
+        return events
+
+    def events(self):
+        """Поток событий: в порядке доставки, с перестановками и дублями."""
+        started = time.time() - 3600
+        stream = []
+        for n, payment_id in enumerate(self.payment_ids):
+            stream.extend(self.lifecycle(payment_id, started + n * 0.01))
+        # перестановки внутри скользящего окна
+        for i in range(0, len(stream), self.shuffle_window):
+            window = stream[i:i + self.shuffle_window]
+            self.rng.shuffle(window)
+            stream[i:i + self.shuffle_window] = window
+        for event in stream:
+            yield event
+            if self.rng.random() < self.duplicate_rate:
+                yield event
+
+    def requests(self):
+        """Пары ``(body, signature)`` — готовые HTTP-запросы."""
+        for event in self.events():
+            body = json.dumps(event).encode()
+            yield body, sign(body, self.secret)
@@ -0,0 +1,269 @@
+# payments/ledger.py
+"""
+Двойная запись по платежам.
+
+Каждое «состояние» платежа имеет проводку:
+
+* ``pending``   — дебет ``renter_due:<арендатор>`` / кредит ``clearing``
+  (долг арендатора);
+* ``succeeded`` — дебет ``renter:<арендатор>`` / кредит получателя —
+  ``owner:<владелец площадки>``, ``specialist:<специалист>`` или
+  ``platform``, если платёж ни к чему не привязан;
+* остальные статусы проводок не имеют.
+
+Смена статуса сторнирует проводку старого состояния и проводит новое;
+смена одной суммы проводит разницу. Так ``renter`` копит в дебете
+оплаченное, в кредите — возвращённое; ``renter_due`` — текущий долг;
+счёт получателя — выручку за вычетом возвратов.
+
+Сторно строится из уже записанных проводок платежа (остаток по каждому
+счёту с обратным знаком), а не из текущих связей: бронь или найм могли
+быть удалены (SET NULL), площадка — сменить владельца. По той же причине
+получатель платежа фиксируется первой проводкой на его счёт.
+
+Вызывающий код должен держать транзакцию: проводки и обороты счетов
+пишутся вместе с изменением платежа. Строки счетов обновляются в порядке
+ключей — параллельные пачки не взаимоблокируются. Системные счета не
+материализуются: иначе каждая проводка ждала бы блокировку одной строки.
+"""
+import uuid
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef, Sum
+from django.utils import timezone
+
+from .models import LedgerAccount, LedgerEntry, Payment
+
+ZERO = Decimal('0.00')
+CLEARING = 'clearing'
+PLATFORM = 'platform'
+
+
+def account_key(kind, holder_id):
+    return f'{kind}:{holder_id}'
+
+
+def _legs(status, amount, payer_id, payee):
+    """Проводка состояния: список ``(счёт, дебет, кредит)``."""
+    if not amount:
+        return []
+    if status == 'pending':
+        legs = [(account_key('renter_due', payer_id), amount, ZERO), (CLEARING, ZERO, amount)]
+    elif status == 'succeeded':
+        legs = [(account_key('renter', payer_id), amount, ZERO), (payee, ZERO, amount)]
+    else:
+        return []
+    if amount < 0:
+        legs = [(account, -credit, -debit) for account, debit, credit in legs]
+    return legs
+
+
+def _reverse(legs):
+    return [(account, credit, debit) for account, debit, credit in legs]
+
+
+def _payee(accounts, owner_id, specialist_id):
+    """Счёт получателя: уже проведённый по платежу, иначе — по текущей брони / найму."""
+    for account in sorted(accounts):
+        if account == PLATFORM or account.startswith(('owner:', 'specialist:')):
+            return account
+    if owner_id:
+        return account_key('owner', owner_id)
+    if specialist_id:
+        return account_key('specialist', specialist_id)
+    return PLATFORM
+
+
+def _posted(pks):
+    """Проводки платежей по счетам: ``{pk: {счёт: (дебет, кредит)}}`` — одна выборка."""
+    posted = defaultdict(dict)
+    rows = (
+        LedgerEntry.objects.filter(payment_id__in=pks).order_by()
+        .values_list('payment_id', 'account').annotate(debit=Sum('debit'), credit=Sum('credit'))
+    )
+    for pk, account, debit, credit in rows:
+        posted[pk][account] = (debit, credit)
+    return posted
+
+
+def record_payments(before, now=None):
+    """
+    Проводит изменения платежей. ``before`` — ``{pk: (статус, сумма)}`` до
+    изменения; ``None`` — платёж новый, сумма ``None`` — не менялась.
+    Текущее состояние и прежние проводки читаются двумя запросами.
+    Возвращает число проводок.
+    """
+    if not before:
+        return 0
+    now = now or timezone.now()
+    current = Payment.objects.filter(pk__in=list(before)).values_list(
+        'pk', 'status', 'amount', 'payer_id', 'booking__venue__owner_id', 'hire__specialist_id',
+    )
+    posted = _posted([pk for pk, state in before.items() if state is not None])
+    entries = []
+    turnover = defaultdict(lambda: [ZERO, ZERO])
+    for pk, status, amount, payer_id, owner_id, specialist_id in current:
+        old_status, old_amount = before[pk] or (None, ZERO)
+        if old_amount is None:
+            old_amount = amount
+        accounts = posted.get(pk, {})
+        payee = _payee(accounts, owner_id, specialist_id)
+
+        if old_status == status:
+            legs = _legs(status, amount - old_amount, payer_id, payee)
+        else:
+            # сторно — остаток каждого счёта платежа с обратным знаком
+            legs = [
+                (account, max(credit - debit, ZERO), max(debit - credit, ZERO))
+                for account, (debit, credit) in sorted(accounts.items()) if debit != credit
+            ]
+            if status == 'refunded' and old_status != 'succeeded':
+                # возврат без проведённой оплаты: сначала проводим саму оплату
+                legs += _legs('succeeded', amount, payer_id, payee)
+                legs += _reverse(_legs('succeeded', amount, payer_id, payee))
+            else:
+                legs += _legs(status, amount, payer_id, payee)
+        if not legs:
+            continue
+        posting = uuid.uuid4()
+        for account, debit, credit in legs:
+            entries.append(LedgerEntry(
+                posting=posting, payment_id=pk, account=account, debit=debit, credit=credit,
+                from_status=old_status or '', to_status=status, created_at=now,
+            ))
+            if ':' in account:
+                turnover[account][0] += debit
+                turnover[account][1] += credit
+
+    if turnover:
+        _add_turnover(turnover, now)
+    LedgerEntry.objects.bulk_create(entries)
+    return len({entry.posting for entry in entries})
+
+
+def _add_turnover(turnover, now):
+    table = connection.ops.quote_name(LedgerAccount._meta.db_table)
+    rows, params = [], []
+    for key in sorted(turnover):
+        kind, holder_id = key.split(':', 1)
+        debit, credit = turnover[key]
+        rows.append('(%s, %s, %s::uuid, %s, %s, %s)')
+        params += [key, kind, holder_id, debit, credit, now]
+    with connection.cursor() as cursor:
+        cursor.execute(f'''
+            INSERT INTO {table} (key, kind, holder_id, debit, credit, updated_at)
+            VALUES {', '.join(rows)}
+            ON CONFLICT (key) DO UPDATE SET
+                debit = {table}.debit + EXCLUDED.debit,
+                credit = {table}.credit + EXCLUDED.credit,
+                updated_at = EXCLUDED.updated_at
+        ''', params)
+
+
+# ────────────────────────────────────────────────
+# Чтение
+# ────────────────────────────────────────────────
+
+def renter_summary(renter_id):
+    """Оплачено / возвращено / к оплате — одна выборка по первичным ключам."""
+    paid_key, due_key = account_key('renter', renter_id), account_key('renter_due', renter_id)
+    accounts = LedgerAccount.objects.in_bulk([paid_key, due_key])
+    paid, due = accounts.get(paid_key), accounts.get(due_key)
+    return {
+        'paid': paid.debit if paid else ZERO,
+        'refunded': paid.credit if paid else ZERO,
+        'net': paid.balance if paid else ZERO,
+        'outstanding': due.balance if due else ZERO,
+    }
+
+
+def earnings(kind, holder_id):
+    """Выручка владельца или специалиста за вычетом возвратов."""
+    account = LedgerAccount.objects.filter(pk=account_key(kind, holder_id)).first()
+    return -account.balance if account else ZERO
+
+
+# ────────────────────────────────────────────────
+# Заполнение и проверка
+# ────────────────────────────────────────────────
+
+def backfill(batch_size=5000):
+    """
+    Проводит начальное состояние платежей, у которых ещё нет проводок
+    (загруженных ``bulk_create`` / COPY). Пачки по pk, каждая в своей транзакции.
+    """
+    unposted = Payment.objects.filter(
+        ~Exists(LedgerEntry.objects.filter(payment_id=OuterRef('pk')))
+    ).order_by('pk')
+    total, last = 0, None
+    while True:
+        page = unposted if last is None else unposted.filter(pk__gt=last)
+        pks = list(page.values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return total
+        with transaction.atomic():
+            record_payments(dict.fromkeys(pks))
+        total += len(pks)
+        last = pks[-1]
+
+
+def verify_shard(shard, shards):
+    """
+    Пересчитывает обороты счетов своей доли (по хешу ключа) из проводок
+    и сравнивает с LedgerAccount; проверяет, что операции сбалансированы.
+    Возвращает ``(расхождения счетов, несбалансированные операции)``.
+    """
+    accounts = connection.ops.quote_name(LedgerAccount._meta.db_table)
+    entries = connection.ops.quote_name(LedgerEntry._meta.db_table)
+    outermost = not connection.in_atomic_block
+    with transaction.atomic(), connection.cursor() as cursor:
+        if outermost:
+            # общий снимок для обоих запросов
+            cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ')
+        cursor.execute(f'''
+            WITH e AS (
+                SELECT account, sum(debit) AS debit, sum(credit) AS credit
+                FROM {entries}
+                WHERE position(':' in account) > 0 AND mod(abs(hashtext(account)::bigint), %s) = %s
+                GROUP BY account
+            ), a AS (
+                SELECT key, debit, credit FROM {accounts}
+                WHERE mod(abs(hashtext(key)::bigint), %s) = %s
+            )
+            SELECT coalesce(e.account, a.key), e.debit, e.credit, a.debit, a.credit
+            FROM e FULL JOIN a ON a.key = e.account
+            WHERE coalesce(e.debit, 0) <> coalesce(a.debit, 0)
+               OR coalesce(e.credit, 0) <> coalesce(a.credit, 0)
+        ''', [shards, shard, shards, shard])
+        mismatches = cursor.fetchall()
+        cursor.execute(f'''
+            SELECT posting FROM {entries}
+            WHERE mod(abs(hashtext(posting::text)::bigint), %s) = %s
+            GROUP BY posting HAVING sum(debit) <> sum(credit)
+        ''', [shards, shard])
+        unbalanced = [row[0] for row in cursor.fetchall()]
+    return mismatches, unbalanced
+
+
+def _verify_worker(args):
+    # Воркер запускается в отдельном процессе и открывает собственное подключение
+    from django.db import connections
+    try:
+        return verify_shard(*args)
+    finally:
+        connections.close_all()
+
+
+def repair(mismatches):
+    """Выставляет обороты счетов по пересчитанным из проводок значениям."""
+    now = timezone.now()
+    with transaction.atomic():
+        for key, debit, credit, _old_debit, _old_credit in sorted(mismatches):
+            kind, holder_id = key.split(':', 1)
+            LedgerAccount.objects.update_or_create(
+                key=key,
+                defaults={'kind': kind, 'holder_id': holder_id,
+                          'debit': debit or ZERO, 'credit': credit or ZERO, 'updated_at': now},
+            )
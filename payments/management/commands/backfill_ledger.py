@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from payments.ledger import backfill
+
+
+class Command(BaseCommand):
+    help = "Проводит в леджер платежи без проводок (загруженные bulk_create / COPY)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        total = backfill(options['batch_size'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Проведено платежей: {total:,} за {elapsed:.1f} с "
+            f"({total / max(elapsed, 1e-9):,.0f} платежей/с)"
+        ))
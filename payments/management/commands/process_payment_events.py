@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from payments.webhooks import process_pending
+
+
+class Command(BaseCommand):
+    help = "Применяет накопленные события провайдера к платежам пачками"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--every', type=float, default=None,
+                            help="работать постоянно, опрашивая очередь каждые N секунд")
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.perf_counter()
+            processed = process_pending(options['batch_size'])
+            if processed:
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"Обработано событий: {processed} за {elapsed:.2f} с "
+                    f"({processed / max(elapsed, 1e-9):,.0f} событий/с)"
+                )
+            if options['every'] is None:
+                break
+            time.sleep(options['every'])
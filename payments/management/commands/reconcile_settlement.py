@@ -0,0 +1,77 @@
+import csv
+import time
+from collections import Counter
+from datetime import datetime, time as dtime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from payments.reconciliation import KINDS, REPORT_COLUMNS, Reconciliation, ReconciliationError
+
+
+class Command(BaseCommand):
+    help = "Сверяет платежи с CSV-файлом взаиморасчётов провайдера и (опционально) исправляет статусы"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV-файл взаиморасчётов")
+        parser.add_argument('--key', default='payment_id', choices=['payment_id', 'provider_payment_id'])
+        parser.add_argument('--delimiter', default=',')
+        parser.add_argument('--encoding', default='utf-8')
+        parser.add_argument('--report', default=None, help="куда записать CSV с расхождениями")
+        parser.add_argument('--date', default=None,
+                            help="день взаиморасчётов YYYY-MM-DD: включает проверку missing_in_file "
+                                 "для платежей, оплаченных в этот день")
+        parser.add_argument('--apply', action='store_true', help="перенести статусы из файла в платежи")
+        parser.add_argument('--fix-amounts', action='store_true', help="перенести и суммы")
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        window = None
+        if options['date']:
+            day = datetime.strptime(options['date'], '%Y-%m-%d').date()
+            start = timezone.make_aware(datetime.combine(day, dtime.min))
+            window = (start, start + timedelta(days=1))
+
+        try:
+            recon = Reconciliation(options['key'], options['delimiter'], options['encoding'])
+        except ReconciliationError as exc:
+            raise CommandError(exc)
+
+        with recon, open(options['path'], 'rb') as fh:
+            started = time.perf_counter()
+            try:
+                lines = recon.load(fh)
+            except ReconciliationError as exc:
+                raise CommandError(exc)
+            self.stdout.write(f"Загружено строк: {lines:,} за {time.perf_counter() - started:.1f} с")
+
+            started = time.perf_counter()
+            counts = Counter()
+            report = open(options['report'], 'w', newline='', encoding='utf-8') if options['report'] else None
+            try:
+                writer = csv.writer(report) if report else None
+                if writer:
+                    writer.writerow(REPORT_COLUMNS)
+                for row in recon.discrepancies(window):
+                    counts[row[0]] += 1
+                    if writer:
+                        writer.writerow(row)
+            finally:
+                if report:
+                    report.close()
+            self.stdout.write(f"Сверка за {time.perf_counter() - started:.1f} с:")
+            for kind in KINDS:
+                if kind == 'missing_in_file' and window is None:
+                    continue
+                self.stdout.write(f"  {kind:20} {counts[kind]:,}")
+
+            if options['apply'] or options['fix_amounts']:
+                started = time.perf_counter()
+                updated = recon.apply(
+                    fix_status=options['apply'],
+                    fix_amounts=options['fix_amounts'],
+                    batch_size=options['batch_size'],
+                )
+                self.stdout.write(self.style.SUCCESS(
+                    f"Исправлено платежей: {updated:,} за {time.perf_counter() - started:.1f} с"
+                ))
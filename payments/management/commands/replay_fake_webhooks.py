@@ -0,0 +1,89 @@
+import statistics
+import time
+import urllib.request
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+
+from payments.fake_provider import FakeProvider
+from payments.models import Payment
+from payments.views import provider_webhook
+from payments.webhooks import process_pending
+
+
+class Command(BaseCommand):
+    help = (
+        "Локальный фейковый провайдер: шлёт вебхуки по существующим pending-платежам "
+        "с дублями и перестановками, затем сверяет итоговые статусы"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--payments', type=int, default=1000, help="сколько платежей взять")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--duplicates', type=float, default=0.1, help="доля повторных доставок")
+        parser.add_argument('--url', default=None,
+                            help="слать по HTTP на этот URL; по умолчанию — вызывать view в процессе")
+        parser.add_argument('--no-process', action='store_true',
+                            help="только отправить, не запускать обработчик и сверку")
+
+    def handle(self, *args, **options):
+        payment_ids = list(
+            Payment.objects.filter(status='pending').order_by('pk')
+            .values_list('pk', flat=True)[:options['payments']]
+        )
+        if not payment_ids:
+            raise CommandError("Нет pending-платежей — сначала запустите generate_marketplace")
+
+        provider = FakeProvider(payment_ids, seed=options['seed'], duplicate_rate=options['duplicates'])
+        send = self.http_sender(options['url']) if options['url'] else self.local_sender()
+
+        latencies = []
+        started = time.perf_counter()
+        for body, signature in provider.requests():
+            t0 = time.perf_counter()
+            status = send(body, signature)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            if status != 204:
+                raise CommandError(f"Вебхук отклонён: HTTP {status}")
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        self.stdout.write(
+            f"Отправлено событий: {len(latencies)} за {elapsed:.2f} с "
+            f"({len(latencies) / elapsed:,.0f} событий/с); подтверждение: "
+            f"p50 {statistics.median(latencies):.2f} мс, p99 {latencies[int(len(latencies) * 0.99)]:.2f} мс"
+        )
+        if options['no_process']:
+            return
+
+        started = time.perf_counter()
+        processed = process_pending()
+        self.stdout.write(f"Обработано событий: {processed} за {time.perf_counter() - started:.2f} с")
+
+        actual = dict(Payment.objects.filter(pk__in=payment_ids).values_list('pk', 'status'))
+        mismatched = [pk for pk, status in provider.expected.items() if actual.get(pk) != status]
+        if mismatched:
+            raise CommandError(f"Статус не сошёлся у {len(mismatched)} платежей, например {mismatched[0]}")
+        self.stdout.write(self.style.SUCCESS(f"Все {len(payment_ids)} платежей пришли к ожидаемому статусу"))
+
+    @staticmethod
+    def local_sender():
+        factory = RequestFactory()
+
+        def send(body, signature):
+            request = factory.post(
+                '/payments/webhook/', body, content_type='application/json', HTTP_X_SIGNATURE=signature
+            )
+            return provider_webhook(request).status_code
+        return send
+
+    @staticmethod
+    def http_sender(url):
+        def send(body, signature):
+            request = urllib.request.Request(
+                url, data=body, method='POST',
+                headers={'Content-Type': 'application/json', 'X-Signature': signature},
+            )
+            with urllib.request.urlopen(request) as response:
+                return response.status
+        return send
@@ -0,0 +1,54 @@
+import multiprocessing
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from payments.ledger import _verify_worker, repair, verify_shard
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает обороты счетов леджера из проводок (параллельно, по долям ключей) "
+        "и сравнивает с сохранёнными"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help="число параллельных процессов")
+        parser.add_argument('--fix', action='store_true',
+                            help="выставить обороты расходящихся счетов по проводкам")
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        tasks = [(shard, workers) for shard in range(workers)]
+        started = time.perf_counter()
+        if workers == 1:
+            results = [verify_shard(*tasks[0])]
+        else:
+            # дочерние процессы не должны делить сокет с родителем
+            connections.close_all()
+            with multiprocessing.get_context('fork').Pool(workers) as pool:
+                results = pool.map(_verify_worker, tasks)
+        mismatches = [row for shard_mismatches, _ in results for row in shard_mismatches]
+        unbalanced = [posting for _, shard_unbalanced in results for posting in shard_unbalanced]
+        elapsed = time.perf_counter() - started
+
+        for key, debit, credit, stored_debit, stored_credit in mismatches[:20]:
+            self.stdout.write(
+                f"  {key}: по проводкам {debit or 0}/{credit or 0}, "
+                f"в счёте {stored_debit or 0}/{stored_credit or 0}"
+            )
+        for posting in unbalanced[:20]:
+            self.stdout.write(f"  несбалансированная операция {posting}")
+        self.stdout.write(
+            f"Проверено за {elapsed:.1f} с: расхождений счетов {len(mismatches):,}, "
+            f"несбалансированных операций {len(unbalanced):,}"
+        )
+
+        if mismatches and options['fix']:
+            repair(mismatches)
+            self.stdout.write(self.style.SUCCESS(f"Исправлено счетов: {len(mismatches):,}"))
+        elif mismatches or unbalanced:
+            raise CommandError("Леджер расходится с проводками")
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.9 on 2026-10-19 02:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='provider_payment_id',
+            field=models.CharField(blank=True, max_length=100, null=True, unique=True, verbose_name='id платежа у провайдера'),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='provider_updated_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='время последнего события провайдера'),
+        ),
+        migrations.CreateModel(
+            name='PaymentEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider_event_id', models.CharField(max_length=100, unique=True, verbose_name='id события у провайдера')),
+                ('event_type', models.CharField(max_length=50, verbose_name='тип события')),
+                ('payment_id', models.UUIDField(blank=True, null=True, verbose_name='id платежа')),
+                ('provider_payment_id', models.CharField(blank=True, max_length=100, verbose_name='id платежа у провайдера')),
+                ('status', models.CharField(choices=[('pending', 'ожидает оплаты'), ('succeeded', 'оплачено'), ('failed', 'не удалось'), ('cancelled', 'отменён'), ('refunded', 'возвращён')], max_length=20, verbose_name='статус платежа')),
+                ('occurred_at', models.DateTimeField(verbose_name='время события у провайдера')),
+                ('payload', models.JSONField(verbose_name='тело запроса')),
+                ('received_at', models.DateTimeField(auto_now_add=True, verbose_name='получено')),
+                ('processed_at', models.DateTimeField(blank=True, null=True, verbose_name='обработано')),
+                ('result', models.CharField(blank=True, choices=[('applied', 'применено'), ('stale', 'устарело'), ('unknown_payment', 'платёж не найден')], max_length=20, verbose_name='результат')),
+            ],
+            options={
+                'verbose_name': 'событие провайдера',
+                'verbose_name_plural': 'события провайдера',
+                'ordering': ['-received_at'],
+                'indexes': [models.Index(condition=models.Q(('processed_at__isnull', True)), fields=['received_at'], name='paymentevent_queue_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.9 on 2026-10-19 02:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0002_provider_webhooks'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerAccount',
+            fields=[
+                ('key', models.CharField(max_length=64, primary_key=True, serialize=False, verbose_name='ключ')),
+                ('kind', models.CharField(choices=[('renter', 'оплачено арендатором'), ('renter_due', 'к оплате арендатором'), ('owner', 'выручка владельца'), ('specialist', 'выручка специалиста')], max_length=20, verbose_name='вид')),
+                ('holder_id', models.UUIDField(verbose_name='id владельца счёта')),
+                ('debit', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='дебет')),
+                ('credit', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='кредит')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='обновлён')),
+            ],
+            options={
+                'verbose_name': 'счёт леджера',
+                'verbose_name_plural': 'счета леджера',
+                'ordering': ['key'],
+            },
+        ),
+        migrations.CreateModel(
+            name='LedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('posting', models.UUIDField(verbose_name='операция')),
+                ('payment_id', models.UUIDField(db_index=True, verbose_name='id платежа')),
+                ('account', models.CharField(max_length=64, verbose_name='счёт')),
+                ('debit', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='дебет')),
+                ('credit', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='кредит')),
+                ('from_status', models.CharField(blank=True, max_length=20, verbose_name='из статуса')),
+                ('to_status', models.CharField(blank=True, max_length=20, verbose_name='в статус')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='создана')),
+            ],
+            options={
+                'verbose_name': 'проводка',
+                'verbose_name_plural': 'проводки',
+                'ordering': ['-id'],
+            },
+        ),
+    ]
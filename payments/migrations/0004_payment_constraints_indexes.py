@@ -0,0 +1,75 @@
+# Generated by Django 5.2.9 on 2026-10-19 02:44
+
+import django.db.models.deletion
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Индексы строятся CONCURRENTLY, CHECK добавляется NOT VALID и проверяется
+    # отдельно — таблица платежей не блокируется на запись на время сборки
+    atomic = False
+
+    dependencies = [
+        ('bookings', '0005_status_end_datetime_index'),
+        ('hires', '0002_status_end_datetime_index'),
+        ('payments', '0003_ledger'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='payment',
+            index=models.Index(fields=['status', '-created_at'], name='payment_status_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='payment',
+            index=models.Index(condition=models.Q(('paid_at__isnull', False)), fields=['-paid_at'], name='payment_paid_at_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='payment',
+            index=models.Index(condition=models.Q(('booking__isnull', False)), fields=['booking', 'status'], include=('amount',), name='payment_booking_total_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='payment',
+            index=models.Index(condition=models.Q(('hire__isnull', False)), fields=['hire', 'status'], include=('amount',), name='payment_hire_total_idx'),
+        ),
+        migrations.AlterField(
+            model_name='payment',
+            name='booking',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='payments', to='bookings.booking', verbose_name='бронирование'),
+        ),
+        migrations.AlterField(
+            model_name='payment',
+            name='hire',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='payments', to='hires.hire', verbose_name='найм специалиста'),
+        ),
+        migrations.AlterField(
+            model_name='payment',
+            name='status',
+            field=models.CharField(choices=[('pending', 'ожидает оплаты'), ('succeeded', 'оплачено'), ('failed', 'не удалось'), ('cancelled', 'отменён'), ('refunded', 'возвращён')], default='pending', max_length=20, verbose_name='статус'),
+        ),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    '''
+                    ALTER TABLE payments_payment ADD CONSTRAINT payment_booking_xor_hire CHECK (
+                        (booking_id IS NOT NULL AND hire_id IS NULL)
+                        OR (booking_id IS NULL AND hire_id IS NOT NULL)
+                    ) NOT VALID
+                    ''',
+                    reverse_sql='ALTER TABLE payments_payment DROP CONSTRAINT payment_booking_xor_hire',
+                ),
+                migrations.RunSQL(
+                    'ALTER TABLE payments_payment VALIDATE CONSTRAINT payment_booking_xor_hire',
+                    reverse_sql=migrations.RunSQL.noop,
+                ),
+            ],
+            state_operations=[
+                migrations.AddConstraint(
+                    model_name='payment',
+                    constraint=models.CheckConstraint(condition=models.Q(models.Q(('booking__isnull', False), ('hire__isnull', True)), models.Q(('booking__isnull', True), ('hire__isnull', False)), _connector='OR'), name='payment_booking_xor_hire', violation_error_message='Платёж должен быть привязан либо к бронированию, либо к найму (ровно к одному)'),
+                ),
+            ],
+        ),
+    ]
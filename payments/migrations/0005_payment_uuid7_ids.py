@@ -0,0 +1,33 @@
+# Generated by Django 5.2.9 on 2026-10-19 03:07
+
+import core.ids
+import django.db.models.functions.comparison
+import django.db.models.functions.text
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Новые ключи — UUIDv7 (default на стороне Python, схема не меняется);
+    # существующие v4 не переписываются. Индекс по «хвосту» id строится
+    # CONCURRENTLY — таблица не блокируется на запись
+    atomic = False
+
+    dependencies = [
+        ('bookings', '0006_booking_uuid7_ids'),
+        ('hires', '0002_status_end_datetime_index'),
+        ('payments', '0004_payment_constraints_indexes'),
+        ('users', '0003_user_uuid7_ids'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='payment',
+            name='id',
+            field=models.UUIDField(default=core.ids.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+        AddIndexConcurrently(
+            model_name='payment',
+            index=models.Index(django.db.models.functions.text.Right(django.db.models.functions.comparison.Cast('id', models.TextField()), 8), name='payment_id_tail_idx'),
+        ),
+    ]
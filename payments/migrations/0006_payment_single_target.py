@@ -0,0 +1,49 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Новый CHECK добавляется NOT VALID и проверяется отдельно, старый
+    # снимается после — таблица платежей не блокируется на время проверки
+    atomic = False
+
+    dependencies = [
+        ('payments', '0005_payment_uuid7_ids'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    '''
+                    ALTER TABLE payments_payment ADD CONSTRAINT payment_single_target CHECK (
+                        NOT (booking_id IS NOT NULL AND hire_id IS NOT NULL)
+                    ) NOT VALID
+                    ''',
+                    reverse_sql='ALTER TABLE payments_payment DROP CONSTRAINT payment_single_target',
+                ),
+                migrations.RunSQL(
+                    'ALTER TABLE payments_payment VALIDATE CONSTRAINT payment_single_target',
+                    reverse_sql=migrations.RunSQL.noop,
+                ),
+                migrations.RunSQL(
+                    'ALTER TABLE payments_payment DROP CONSTRAINT payment_booking_xor_hire',
+                    reverse_sql='''
+                    ALTER TABLE payments_payment ADD CONSTRAINT payment_booking_xor_hire CHECK (
+                        (booking_id IS NOT NULL AND hire_id IS NULL)
+                        OR (booking_id IS NULL AND hire_id IS NOT NULL)
+                    ) NOT VALID
+                    ''',
+                ),
+            ],
+            state_operations=[
+                migrations.RemoveConstraint(
+                    model_name='payment',
+                    name='payment_booking_xor_hire',
+                ),
+                migrations.AddConstraint(
+                    model_name='payment',
+                    constraint=models.CheckConstraint(condition=models.Q(('booking__isnull', False), ('hire__isnull', False), _negated=True), name='payment_single_target', violation_error_message='Платёж привязан либо к бронированию, либо к найму, не к обоим'),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.9 on 2026-10-19 04:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0006_payment_single_target'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='paymentevent',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='попыток'),
+        ),
+        migrations.AddField(
+            model_name='paymentevent',
+            name='retry_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='повторить после'),
+        ),
+    ]
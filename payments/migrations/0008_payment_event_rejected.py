@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-19 04:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0007_payment_event_retry'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='paymentevent',
+            name='result',
+            field=models.CharField(blank=True, choices=[('applied', 'применено'), ('stale', 'устарело'), ('rejected', 'недопустимый переход'), ('unknown_payment', 'платёж не найден')], max_length=20, verbose_name='результат'),
+        ),
+    ]
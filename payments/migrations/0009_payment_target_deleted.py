@@ -0,0 +1,85 @@
+from django.db import migrations, models
+
+TRIGGER = '''
+CREATE FUNCTION payment_target_deleted() RETURNS trigger AS $$
+BEGIN
+    NEW.target_deleted_at := coalesce(OLD.target_deleted_at, now());
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+-- срабатывает и на UPDATE из ON DELETE SET NULL, и на обнуление ссылки
+-- Collector-ом Django, и на сохранение устаревшего экземпляра платежа
+CREATE TRIGGER payment_target_deleted
+    BEFORE UPDATE ON payments_payment
+    FOR EACH ROW
+    WHEN (NEW.booking_id IS NULL AND NEW.hire_id IS NULL AND NEW.target_deleted_at IS NULL)
+    EXECUTE FUNCTION payment_target_deleted();
+'''
+
+DROP_TRIGGER = '''
+DROP TRIGGER payment_target_deleted ON payments_payment;
+DROP FUNCTION payment_target_deleted();
+'''
+
+
+class Migration(migrations.Migration):
+    # CHECK добавляется NOT VALID и проверяется отдельно, как в 0006
+    atomic = False
+
+    dependencies = [
+        ('payments', '0008_payment_event_rejected'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='target_deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='цель удалена'),
+        ),
+        migrations.RunSQL(TRIGGER, reverse_sql=DROP_TRIGGER),
+        # платежи, уже потерявшие цель
+        migrations.RunSQL(
+            '''
+            UPDATE payments_payment SET target_deleted_at = now()
+            WHERE booking_id IS NULL AND hire_id IS NULL AND target_deleted_at IS NULL
+            ''',
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    '''
+                    ALTER TABLE payments_payment ADD CONSTRAINT payment_booking_xor_hire CHECK (
+                        (booking_id IS NOT NULL AND hire_id IS NULL)
+                        OR (booking_id IS NULL AND hire_id IS NOT NULL)
+                        OR (booking_id IS NULL AND hire_id IS NULL AND target_deleted_at IS NOT NULL)
+                    ) NOT VALID
+                    ''',
+                    reverse_sql='ALTER TABLE payments_payment DROP CONSTRAINT payment_booking_xor_hire',
+                ),
+                migrations.RunSQL(
+                    'ALTER TABLE payments_payment VALIDATE CONSTRAINT payment_booking_xor_hire',
+                    reverse_sql=migrations.RunSQL.noop,
+                ),
+                migrations.RunSQL(
+                    'ALTER TABLE payments_payment DROP CONSTRAINT payment_single_target',
+                    reverse_sql='''
+                    ALTER TABLE payments_payment ADD CONSTRAINT payment_single_target CHECK (
+                        NOT (booking_id IS NOT NULL AND hire_id IS NOT NULL)
+                    ) NOT VALID
+                    ''',
+                ),
+            ],
+            state_operations=[
+                migrations.RemoveConstraint(
+                    model_name='payment',
+                    name='payment_single_target',
+                ),
+                migrations.AddConstraint(
+                    model_name='payment',
+                    constraint=models.CheckConstraint(condition=models.Q(models.Q(('booking__isnull', False), ('hire__isnull', True)), models.Q(('booking__isnull', True), ('hire__isnull', False)), models.Q(('booking__isnull', True), ('hire__isnull', True), ('target_deleted_at__isnull', False)), _connector='OR'), name='payment_booking_xor_hire', violation_error_message='Платёж должен быть привязан либо к бронированию, либо к найму (ровно к одному)'),
+                ),
+            ],
+        ),
+    ]
@@ -1,13 +1,28 @@
-from django.db import models
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import models, router, transaction
+from django.db.models import Q, Sum
+from django.db.models.functions import Coalesce
 from django.utils.translation import gettext_lazy as _
-import uuid
+
+from core.ids import tail_index, uuid7
+
+
+class PaymentQuerySet(models.QuerySet):
+    def succeeded(self):
+        return self.filter(status='succeeded')
+
+    def total(self):
+        """Сумма платежей выборки; для ``booking.payments.succeeded()`` — index-only scan."""
+        return self.aggregate(total=Coalesce(Sum('amount'), Decimal('0.00')))['total']
 
 
 class Payment(models.Model):
     """
     Платёж (одна запись = один платёж)
     """
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     
     booking = models.ForeignKey(
         'bookings.Booking',
@@ -15,7 +30,8 @@ class Payment(models.Model):
         null=True,
         blank=True,
         related_name='payments',
-        verbose_name="бронирование"
+        verbose_name="бронирование",
+        db_index=False,  # покрыт payment_booking_total_idx
     )
 
     hire = models.ForeignKey(
@@ -24,9 +40,14 @@ class Payment(models.Model):
         null=True,
         blank=True,
         related_name='payments',
-        verbose_name="найм специалиста"
+        verbose_name="найм специалиста",
+        db_index=False,  # покрыт payment_hire_total_idx
     )
 
+    # Когда платёж лишился брони / найма (ON DELETE SET NULL, core/deletion.py);
+    # ставит триггер БД payment_target_deleted
+    target_deleted_at = models.DateTimeField(_("цель удалена"), null=True, blank=True, editable=False)
+
     # Кто заплатил
     payer = models.ForeignKey(
         'users.Renter',
@@ -50,30 +71,222 @@ class Payment(models.Model):
         ('refunded',  _("возвращён")),
     ]
 
+    # Допустимые переходы статусов (см. core/transitions.py)
+    STATUS_TRANSITIONS = {
+        'pending':   ['succeeded', 'failed', 'cancelled'],
+        'succeeded': ['refunded'],
+        'failed':    ['pending'],
+        'cancelled': [],
+        'refunded':  [],
+    }
+
     status = models.CharField(
         _("статус"),
         max_length=20,
         choices=STATUS_CHOICES,
         default='pending',
-        db_index=True
     )
 
     created_at = models.DateTimeField(_("создан"), auto_now_add=True)
     paid_at = models.DateTimeField(_("оплачен"), null=True, blank=True)
 
+    # Данные платёжного провайдера (заполняются из вебхуков, см. payments/webhooks.py)
+    provider_payment_id = models.CharField(
+        _("id платежа у провайдера"), max_length=100, unique=True, null=True, blank=True
+    )
+    provider_updated_at = models.DateTimeField(
+        _("время последнего события провайдера"), null=True, blank=True
+    )
+
+    objects = PaymentQuerySet.as_manager()
+
     class Meta:
         verbose_name = _("платёж")
         verbose_name_plural = _("платежи")
         ordering = ['-created_at']
+        constraints = [
+            # Ровно одна цель; оба NULL — только у платежа, чья бронь / найм
+            # удалены: тогда триггер payment_target_deleted ставит target_deleted_at
+            models.CheckConstraint(
+                condition=(
+                    Q(booking__isnull=False, hire__isnull=True)
+                    | Q(booking__isnull=True, hire__isnull=False)
+                    | Q(booking__isnull=True, hire__isnull=True, target_deleted_at__isnull=False)
+                ),
+                name='payment_booking_xor_hire',
+                violation_error_message=_("Платёж должен быть привязан либо к бронированию, либо к найму (ровно к одному)"),
+            ),
+        ]
+        indexes = [
+            # фильтр по статусу + сортировка по дате (админка, переход payment.abandoned)
+            models.Index(fields=['status', '-created_at'], name='payment_status_created_idx'),
+            models.Index(
+                fields=['-paid_at'],
+                condition=Q(paid_at__isnull=False),
+                name='payment_paid_at_idx',
+            ),
+            # суммы по цели платежа — index-only scan; заодно индекс внешнего ключа.
+            # NULL (платёж другой цели) в индекс не попадает — он вдвое меньше
+            models.Index(
+                fields=['booking', 'status'],
+                include=['amount'],
+                condition=Q(booking__isnull=False),
+                name='payment_booking_total_idx',
+            ),
+            models.Index(
+                fields=['hire', 'status'],
+                include=['amount'],
+                condition=Q(hire__isnull=False),
+                name='payment_hire_total_idx',
+            ),
+            # короткий код в админке (core/lookup.py)
+            tail_index('payment_id_tail_idx'),
+        ]
 
     def __str__(self):
-        target = self.booking or self.hire or "—"
+        # Только *_id — без ленивой загрузки booking / hire на каждую строку
+        if self.booking_id:
+            target = f"бронь {self.booking_id}"
+        elif self.hire_id:
+            target = f"найм {self.hire_id}"
+        else:
+            target = "—"
         return f"Платёж {self.id} — {self.amount} ₽ — {target}"
-    
-    # def clean(self):
-    #     if (self.booking is None) == (self.hire is None):
-    #         raise ValidationError("Платёж должен быть привязан либо к Booking, либо к Hire (ровно один)")
 
     @property
     def is_paid(self):
-        return self.status == 'succeeded'
\ No newline at end of file
+        return self.status == 'succeeded'
+
+    def clean(self):
+        super().clean()
+        if self._state.adding and self.booking_id is None and self.hire_id is None:
+            raise ValidationError(_("Платёж должен быть привязан к бронированию или к найму"))
+
+    def save(self, *args, **kwargs):
+        # Смена статуса или суммы проводится в леджер в той же транзакции
+        from .ledger import record_payments
+
+        with transaction.atomic(using=kwargs.get('using') or router.db_for_write(Payment, instance=self)):
+            before = None
+            if not self._state.adding:
+                before = (
+                    Payment.objects.select_for_update()
+                    .filter(pk=self.pk)
+                    .values_list('status', 'amount')
+                    .first()
+                )
+            super().save(*args, **kwargs)
+            if before != (self.status, self.amount):
+                record_payments({self.pk: before})
+
+
+class PaymentEvent(models.Model):
+    """
+    Сырое событие вебхука платёжного провайдера.
+
+    Журнал только на добавление: поля события не меняются после записи,
+    обработчик проставляет лишь processed_at и result. Повтор события
+    с тем же provider_event_id отбрасывается уникальным индексом.
+    """
+    provider_event_id = models.CharField(_("id события у провайдера"), max_length=100, unique=True)
+    event_type = models.CharField(_("тип события"), max_length=50)
+
+    # Ссылки на платёж — без FK: событие может прийти раньше, чем платёж появится у нас
+    payment_id = models.UUIDField(_("id платежа"), null=True, blank=True)
+    provider_payment_id = models.CharField(_("id платежа у провайдера"), max_length=100, blank=True)
+
+    status = models.CharField(_("статус платежа"), max_length=20, choices=Payment.STATUS_CHOICES)
+    occurred_at = models.DateTimeField(_("время события у провайдера"))
+    payload = models.JSONField(_("тело запроса"))
+    received_at = models.DateTimeField(_("получено"), auto_now_add=True)
+
+    RESULT_CHOICES = [
+        ('applied',         _("применено")),
+        ('stale',           _("устарело")),
+        ('rejected',        _("недопустимый переход")),
+        ('unknown_payment', _("платёж не найден")),     # после PAYMENT_EVENT_RETRY_MAX_AGE
+    ]
+    processed_at = models.DateTimeField(_("обработано"), null=True, blank=True)
+    result = models.CharField(_("результат"), max_length=20, choices=RESULT_CHOICES, blank=True)
+
+    # Платёж ещё не появился у нас — событие откладывается с растущей паузой (webhooks.py)
+    attempts = models.PositiveSmallIntegerField(_("попыток"), default=0)
+    retry_at = models.DateTimeField(_("повторить после"), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _("событие провайдера")
+        verbose_name_plural = _("события провайдера")
+        ordering = ['-received_at']
+        indexes = [
+            # очередь обработчика — только необработанные события
+            models.Index(
+                fields=['received_at'],
+                condition=models.Q(processed_at__isnull=True),
+                name='paymentevent_queue_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.provider_event_id} — {self.event_type}"
+
+
+class LedgerAccount(models.Model):
+    """
+    Счёт леджера с текущим оборотом (одна строка = один счёт).
+
+    Обороты ``debit`` / ``credit`` обновляются в той же транзакции, что и
+    проводки, поэтому баланс читается одной выборкой по первичному ключу.
+    Ключ — ``<вид>:<id владельца счёта>``, см. ``payments/ledger.py``.
+    """
+    KIND_CHOICES = [
+        ('renter',     _("оплачено арендатором")),
+        ('renter_due', _("к оплате арендатором")),
+        ('owner',      _("выручка владельца")),
+        ('specialist', _("выручка специалиста")),
+    ]
+
+    key = models.CharField(_("ключ"), max_length=64, primary_key=True)
+    kind = models.CharField(_("вид"), max_length=20, choices=KIND_CHOICES)
+    holder_id = models.UUIDField(_("id владельца счёта"))
+    debit = models.DecimalField(_("дебет"), max_digits=14, decimal_places=2, default=0)
+    credit = models.DecimalField(_("кредит"), max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(_("обновлён"), auto_now=True)
+
+    class Meta:
+        verbose_name = _("счёт леджера")
+        verbose_name_plural = _("счета леджера")
+        ordering = ['key']
+
+    def __str__(self):
+        return self.key
+
+    @property
+    def balance(self):
+        return self.debit - self.credit
+
+
+class LedgerEntry(models.Model):
+    """
+    Проводка леджера — только на добавление.
+
+    Одна смена статуса (или суммы) платежа = одна операция ``posting`` из
+    нескольких строк, сумма дебета которых равна сумме кредита. Счёт и
+    платёж — без FK: записи переживают удаление платежа, а системные
+    счета (``clearing``, ``platform``) не материализуются в LedgerAccount.
+    """
+    posting = models.UUIDField(_("операция"))
+    payment_id = models.UUIDField(_("id платежа"), db_index=True)
+    account = models.CharField(_("счёт"), max_length=64)
+    debit = models.DecimalField(_("дебет"), max_digits=12, decimal_places=2, default=0)
+    credit = models.DecimalField(_("кредит"), max_digits=12, decimal_places=2, default=0)
+    from_status = models.CharField(_("из статуса"), max_length=20, blank=True)
+    to_status = models.CharField(_("в статус"), max_length=20, blank=True)
+    created_at = models.DateTimeField(_("создана"), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("проводка")
+        verbose_name_plural = _("проводки")
+        ordering = ['-id']
+
+    def __str__(self):
+        return f"{self.account}: +{self.debit} / -{self.credit}"
@@ -0,0 +1,216 @@
+# payments/reconciliation.py
+"""
+Сверка платежей с файлом взаиморасчётов провайдера.
+
+Файл не разбирается в Python: его байты потоком уходят в
+``COPY ... FROM STDIN (FORMAT csv)`` во временную таблицу, а сопоставление
+с ``payments_payment`` делают JOIN / anti-JOIN в PostgreSQL (hash или merge
+join — на выбор планировщика). Память процесса не зависит от размера файла,
+отчёт читается серверным курсором порциями.
+
+Ожидаемые колонки (заголовок обязателен): ключ (``payment_id`` или
+``provider_payment_id``), ``amount``, ``status``; остальные игнорируются.
+Строка, которую нельзя разобрать или привести к типам колонок, —
+``ReconciliationError`` с её номером и значением.
+"""
+import re
+
+from django.db import DataError, connection, transaction
+
+from .ledger import record_payments
+from .models import Payment
+
+CHUNK_SIZE = 1024 * 1024
+
+KINDS = ['duplicate_in_file', 'missing_in_db', 'missing_in_file', 'amount_mismatch', 'status_mismatch']
+
+REPORT_COLUMNS = ['kind', 'key', 'payment_id', 'file_amount', 'db_amount', 'file_status', 'db_status']
+
+# Статусы, которые должны попасть в файл взаиморасчётов
+SETTLED_STATUSES = ('succeeded', 'refunded')
+
+
+class ReconciliationError(ValueError):
+    pass
+
+
+def _identifier(name):
+    name = name.strip().lower()
+    if not re.fullmatch(r'[a-z_][a-z0-9_]*', name):
+        raise ReconciliationError(f"Недопустимое имя колонки: {name!r}")
+    return name
+
+
+class Reconciliation:
+    """
+    Одна сверка. Временные таблицы живут в сессии до ``close()``
+    (или выхода из ``with``), поэтому исправления можно коммитить пачками.
+    """
+
+    def __init__(self, key='payment_id', delimiter=',', encoding='utf-8'):
+        if key not in ('payment_id', 'provider_payment_id'):
+            raise ReconciliationError("Ключ сверки — payment_id или provider_payment_id")
+        if len(delimiter) != 1 or delimiter in "'\"\r\n":
+            raise ReconciliationError(f"Недопустимый разделитель: {delimiter!r}")
+        self.key = key
+        self.delimiter = delimiter
+        self.encoding = encoding
+        self.table = Payment._meta.db_table
+        self.db_key = 'id' if key == 'payment_id' else 'provider_payment_id'
+        self.lines = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TABLE IF EXISTS settlement_raw, settlement, settlement_dup')
+
+    # ── загрузка ──
+    def load(self, fh):
+        """Загружает открытый в бинарном режиме файл; возвращает число строк."""
+        header = fh.readline().decode(self.encoding).lstrip('\ufeff').rstrip('\r\n')
+        columns = [_identifier(c) for c in header.split(self.delimiter)]
+        missing = {self.key, 'amount', 'status'} - set(columns)
+        if missing:
+            raise ReconciliationError(f"В файле нет колонок: {', '.join(sorted(missing))}")
+
+        key_type = 'uuid' if self.key == 'payment_id' else 'text'
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMP TABLE settlement_raw (%s)'
+                % ', '.join(f'{c} text' for c in columns)
+            )
+            copy_sql = (
+                f'COPY settlement_raw ({", ".join(columns)}) FROM STDIN '
+                f"WITH (FORMAT csv, DELIMITER '{self.delimiter}', ENCODING '{self.encoding.upper()}')"
+            )
+            # точки сохранения: ошибка разбора не должна оборвать внешнюю транзакцию
+            try:
+                with transaction.atomic(), cursor.cursor.copy(copy_sql) as copy:
+                    while chunk := fh.read(CHUNK_SIZE):
+                        copy.write(chunk)
+            except connection.Database.DataError as exc:
+                raise ReconciliationError(f"Файл не разобран: {exc}") from None
+
+            # типизированная копия + номер строки для пачечных исправлений
+            try:
+                with transaction.atomic():
+                    cursor.execute(f'''
+                        CREATE TEMP TABLE settlement AS
+                        SELECT row_number() OVER () AS n,
+                               trim({self.key})::{key_type} AS key,
+                               replace(trim(amount), ' ', '')::numeric(12, 2) AS amount,
+                               lower(trim(status)) AS status
+                        FROM settlement_raw
+                    ''')
+            except DataError:
+                raise ReconciliationError(self._bad_value(cursor, key_type)) from None
+            self.lines = cursor.rowcount
+            cursor.execute('DROP TABLE settlement_raw')
+            cursor.execute(f'''
+                CREATE TEMP TABLE settlement_dup AS
+                SELECT key FROM settlement GROUP BY key HAVING count(*) > 1
+            ''')
+            cursor.execute('CREATE INDEX ON settlement (n)')
+            cursor.execute('ANALYZE settlement')
+        return self.lines
+
+    def _bad_value(self, cursor, key_type):
+        """Первое значение ``settlement_raw``, которое не приводится к типу колонки."""
+        cursor.execute(f'''
+            SELECT n, column_name, value FROM (
+                SELECT row_number() OVER () AS n,
+                       trim({self.key}) AS key,
+                       replace(trim(amount), ' ', '') AS amount
+                FROM settlement_raw
+            ) r
+            CROSS JOIN LATERAL (VALUES ('{self.key}', key, '{key_type}'), ('amount', amount, 'numeric(12, 2)'))
+                AS v (column_name, value, type)
+            WHERE NOT pg_input_is_valid(value, type)
+            ORDER BY n LIMIT 1
+        ''')
+        row = cursor.fetchone()
+        if row is None:
+            return "Файл не разобран: значения не приводятся к типам колонок"
+        n, column, value = row
+        # n — номер строки данных, первая строка файла — заголовок
+        return f"Строка {n + 1}: недопустимое значение {column} {value!r}"
+
+    # ── отчёт ──
+    def _sql(self, window):
+        t, k = connection.ops.quote_name(self.table), self.db_key
+        unique = 'NOT EXISTS (SELECT 1 FROM settlement_dup d WHERE d.key = s.key)'
+        parts = [
+            f'''SELECT 'duplicate_in_file', s.key::text, NULL::uuid, s.amount, NULL::numeric, s.status, NULL
+                FROM settlement s WHERE NOT {unique}''',
+            f'''SELECT 'missing_in_db', s.key::text, NULL::uuid, s.amount, NULL::numeric, s.status, NULL
+                FROM settlement s WHERE {unique}
+                AND NOT EXISTS (SELECT 1 FROM {t} p WHERE p.{k} = s.key)''',
+            f'''SELECT 'amount_mismatch', s.key::text, p.id, s.amount, p.amount, s.status, p.status
+                FROM settlement s JOIN {t} p ON p.{k} = s.key
+                WHERE {unique} AND p.amount <> s.amount''',
+            f'''SELECT 'status_mismatch', s.key::text, p.id, s.amount, p.amount, s.status, p.status
+                FROM settlement s JOIN {t} p ON p.{k} = s.key
+                WHERE {unique} AND p.status <> s.status''',
+        ]
+        params = []
+        if window:
+            parts.append(f'''SELECT 'missing_in_file', p.{k}::text, p.id, NULL::numeric, p.amount, NULL, p.status
+                FROM {t} p
+                WHERE p.paid_at >= %s AND p.paid_at < %s AND p.status = ANY(%s)
+                AND NOT EXISTS (SELECT 1 FROM settlement s WHERE s.key = p.{k})''')
+            params = [window[0], window[1], list(SETTLED_STATUSES)]
+        return '\nUNION ALL\n'.join(parts), params
+
+    def discrepancies(self, window=None, fetch_size=10000):
+        """Генератор строк отчёта (см. ``REPORT_COLUMNS``); читает серверным курсором."""
+        sql, params = self._sql(window)
+        with connection.chunked_cursor() as cursor:
+            cursor.execute(sql, params)
+            while rows := cursor.fetchmany(fetch_size):
+                yield from rows
+
+    # ── исправления ──
+    def apply(self, fix_status=True, fix_amounts=False, batch_size=10000):
+        """
+        Переносит статус (и, по флагу, сумму) из файла в ``Payment`` пачками
+        по номерам строк файла, с проводками в леджер. Возвращает число
+        изменённых платежей.
+        """
+        if not (fix_status or fix_amounts):
+            return 0
+        t, k = connection.ops.quote_name(self.table), self.db_key
+        sets, differs = [], []
+        if fix_status:
+            sets += [
+                'status = s.status',
+                "paid_at = CASE WHEN s.status = 'succeeded' THEN COALESCE(p.paid_at, now()) ELSE p.paid_at END",
+            ]
+            differs.append('p.status <> s.status')
+        if fix_amounts:
+            sets.append('amount = s.amount')
+            differs.append('p.amount <> s.amount')
+        # old — снимок строки до UPDATE: старые статус и сумма нужны леджеру
+        sql = f'''
+            UPDATE {t} p SET {', '.join(sets)}
+            FROM settlement s, {t} old
+            WHERE p.{k} = s.key AND old.id = p.id AND s.n > %s AND s.n <= %s
+              AND ({' OR '.join(differs)})
+              AND s.status = ANY(%s)
+              AND NOT EXISTS (SELECT 1 FROM settlement_dup d WHERE d.key = s.key)
+            RETURNING p.id, old.status, old.amount
+        '''
+        statuses = [code for code, _label in Payment.STATUS_CHOICES]
+        updated = 0
+        with connection.cursor() as cursor:
+            for start in range(0, self.lines, batch_size):
+                with transaction.atomic():
+                    cursor.execute(sql, [start, start + batch_size, statuses])
+                    before = {pk: (status, amount) for pk, status, amount in cursor.fetchall()}
+                    record_payments(before)
+                updated += len(before)
+        return updated
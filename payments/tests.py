@@ -1,3 +1,347 @@
+import csv
+import io
+import json
+import os
+import tempfile
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, transaction
+from django.db.models import Q, Sum
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from bookings.models import Booking
+from EventMarket.testing import build_marketplace
+from users.models import Owner
+
+from . import ledger
+from .fake_provider import FakeProvider
+from .models import LedgerAccount, LedgerEntry, Payment, PaymentEvent
+from .webhooks import process_pending, sign
+
+
+class PaymentWebhookTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        build_marketplace(2)
+        Payment.objects.update(status='pending', paid_at=None)
+        cls.payment = Payment.objects.order_by('pk').first()
+
+    def post(self, status, created, event_id=None):
+        body = json.dumps({
+            'id': event_id or f'evt_{status}_{created}',
+            'type': f'payment.{status}',
+            'created': created,
+            'data': {'payment_id': str(self.payment.pk), 'status': status},
+        }).encode()
+        return self.client.post(
+            reverse('payments:provider_webhook'), body,
+            content_type='application/json', HTTP_X_SIGNATURE=sign(body),
+        )
+
+    def test_rejects_bad_signature(self):
+        response = self.client.post(
+            reverse('payments:provider_webhook'), b'{}',
+            content_type='application/json', HTTP_X_SIGNATURE='0' * 64,
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(PaymentEvent.objects.exists())
+
+    def test_duplicates_are_acknowledged_once(self):
+        for _ in range(3):
+            self.assertEqual(self.post('succeeded', 100, event_id='evt_1').status_code, 204)
+        self.assertEqual(PaymentEvent.objects.count(), 1)
+        # применение — не в HTTP-обработчике
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, 'pending')
+
+    def test_out_of_order_events_resolve_to_latest(self):
+        now = time.time()
+        self.post('refunded', now + 20)
+        process_pending()
+        self.post('succeeded', now + 10)
+        self.post('pending', now)
+        process_pending()
+
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, 'refunded')
+        self.assertEqual(
+            dict(PaymentEvent.objects.values_list('status', 'result')),
+            {'refunded': 'applied', 'succeeded': 'stale', 'pending': 'stale'},
+        )
+
+    def test_illegal_transition_is_rejected(self):
+        # брошенный платёж отменён у нас (payment.abandoned) — поздняя оплата его не оживляет
+        Payment.objects.filter(pk=self.payment.pk).update(status='cancelled')
+        entries = LedgerEntry.objects.filter(payment_id=self.payment.pk).count()
+        self.post('succeeded', time.time())
+        process_pending()
+
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, 'cancelled')
+        self.assertIsNone(self.payment.provider_updated_at)
+        self.assertEqual(PaymentEvent.objects.get().result, 'rejected')
+        self.assertEqual(LedgerEntry.objects.filter(payment_id=self.payment.pk).count(), entries)
+
+    def test_event_for_unknown_payment_is_retried_until_payment_appears(self):
+        body = json.dumps({
+            'id': 'evt_early', 'type': 'payment.succeeded', 'created': time.time(),
+            'data': {'provider_payment_id': 'pp_early', 'status': 'succeeded'},
+        }).encode()
+        self.client.post(
+            reverse('payments:provider_webhook'), body,
+            content_type='application/json', HTTP_X_SIGNATURE=sign(body),
+        )
+        process_pending()
+        event = PaymentEvent.objects.get()
+        self.assertIsNone(event.processed_at)
+        self.assertEqual(event.attempts, 1)
+        self.assertGreater(event.retry_at, timezone.now())
+        # до retry_at событие не берётся
+        process_pending()
+        self.assertEqual(PaymentEvent.objects.get().attempts, 1)
+
+        Payment.objects.filter(pk=self.payment.pk).update(provider_payment_id='pp_early')
+        PaymentEvent.objects.update(retry_at=timezone.now())
+        process_pending()
+        self.assertEqual(PaymentEvent.objects.get().result, 'applied')
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, 'succeeded')
+
+    def test_event_for_unknown_payment_gives_up_after_max_age(self):
+        body = json.dumps({
+            'id': 'evt_orphan', 'type': 'payment.succeeded', 'created': time.time(),
+            'data': {'provider_payment_id': 'pp_orphan', 'status': 'succeeded'},
+        }).encode()
+        self.client.post(
+            reverse('payments:provider_webhook'), body,
+            content_type='application/json', HTTP_X_SIGNATURE=sign(body),
+        )
+        PaymentEvent.objects.update(received_at=timezone.now() - timedelta(days=30))
+        process_pending()
+        event = PaymentEvent.objects.get()
+        self.assertIsNotNone(event.processed_at)
+        self.assertEqual(event.result, 'unknown_payment')
+
+    def test_fake_provider_replay_converges(self):
+        ids = list(Payment.objects.values_list('pk', flat=True))
+        provider = FakeProvider(ids, seed=3, duplicate_rate=0.3, shuffle_window=7)
+        for body, signature in provider.requests():
+            self.client.post(
+                reverse('payments:provider_webhook'), body,
+                content_type='application/json', HTTP_X_SIGNATURE=signature,
+            )
+        process_pending(batch_size=5)
+
+        self.assertEqual(dict(Payment.objects.values_list('pk', 'status')), provider.expected)
+        self.assertFalse(PaymentEvent.objects.filter(processed_at__isnull=True).exists())
+        self.assertFalse(
+            Payment.objects.filter(status='succeeded', paid_at__isnull=True).exists()
+        )
+
+
+class SettlementReconciliationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        build_marketplace(2)
+        Payment.objects.update(status='succeeded')
+        payments = list(Payment.objects.order_by('pk'))
+        cls.amount_off, cls.refunded, cls.duplicated, cls.absent = payments[:4]
+        cls.unknown = uuid.uuid4()
+        rows = [['payment_id', 'amount', 'status', 'currency']]
+        for payment in payments:
+            if payment == cls.absent:
+                continue
+            amount, status = payment.amount, payment.status
+            if payment == cls.amount_off:
+                amount += Decimal('1.00')
+            if payment == cls.refunded:
+                status = 'refunded'
+            rows.append([payment.pk, amount, status, 'RUB'])
+            if payment == cls.duplicated:
+                rows.append([payment.pk, amount, status, 'RUB'])
+        rows.append([cls.unknown, '10.00', 'succeeded', 'RUB'])
+        buffer = io.StringIO()
+        csv.writer(buffer, delimiter=';').writerows(rows)
+        cls.content = buffer.getvalue().encode('utf-8-sig')
+
+    def reconcile(self, *args):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'settlement.csv')
+            report = os.path.join(tmp, 'report.csv')
+            with open(path, 'wb') as fh:
+                fh.write(self.content)
+            call_command(
+                'reconcile_settlement', path, '--delimiter', ';', '--report', report,
+                *args, stdout=io.StringIO(),
+            )
+            with open(report, newline='', encoding='utf-8') as fh:
+                return {(row['kind'], row['key']) for row in csv.DictReader(fh)}
+
+    def test_report_lists_every_discrepancy(self):
+        Payment.objects.update(paid_at=None)
+        Payment.objects.filter(pk=self.absent.pk).update(paid_at=timezone.now())
+        found = self.reconcile('--date', timezone.localdate().isoformat())
+        self.assertEqual(found, {
+            ('amount_mismatch', str(self.amount_off.pk)),
+            ('status_mismatch', str(self.refunded.pk)),
+            ('duplicate_in_file', str(self.duplicated.pk)),
+            ('missing_in_db', str(self.unknown)),
+            ('missing_in_file', str(self.absent.pk)),
+        })
+
+    def test_apply_takes_status_from_file(self):
+        self.reconcile('--apply')
+        self.refunded.refresh_from_db()
+        self.amount_off.refresh_from_db()
+        self.assertEqual(self.refunded.status, 'refunded')
+        self.assertNotIn(
+            ('status_mismatch', str(self.refunded.pk)), self.reconcile(),
+        )
+        # суммы без --fix-amounts не трогаются
+        self.assertIn(('amount_mismatch', str(self.amount_off.pk)), self.reconcile())
+
+
+    def test_malformed_values_name_the_line(self):
+        header = b'payment_id;amount;status\n'
+        payment = Payment.objects.first()
+        for body, message in [
+            (f'{payment.pk};10.00;succeeded\nnot-a-uuid;10.00;succeeded\n', "Строка 3: недопустимое значение payment_id 'not-a-uuid'"),
+            (f'{payment.pk};1e20;succeeded\n', "Строка 2: недопустимое значение amount '1e20'"),
+            (f'{payment.pk};"10.00;succeeded\n', "Файл не разобран"),
+        ]:
+            with self.subTest(body=body):
+                self.content = header + body.encode()
+                with self.assertRaisesMessage(CommandError, message):
+                    self.reconcile()
+
+
+class LedgerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        build_marketplace(2)
+        Payment.objects.filter(status='pending').update(status='refunded')
+        ledger.backfill()
+
+    def total(self, **filters):
+        return Payment.objects.filter(**filters).aggregate(total=Sum('amount'))['total'] or Decimal('0')
+
+    def assertVerified(self):
+        self.assertEqual(ledger.verify_shard(0, 1), ([], []))
+
+    def test_backfill_matches_payments(self):
+        payment = Payment.objects.filter(status='refunded').first()
+        renter_id = payment.payer_id
+        summary = ledger.renter_summary(renter_id)
+        self.assertEqual(summary['paid'], self.total(payer_id=renter_id, status__in=['succeeded', 'refunded']))
+        self.assertEqual(summary['refunded'], self.total(payer_id=renter_id, status='refunded'))
+        self.assertEqual(summary['outstanding'], 0)
+
+        owner_id = Payment.objects.filter(booking__isnull=False).values_list(
+            'booking__venue__owner_id', flat=True).first()
+        self.assertEqual(
+            ledger.earnings('owner', owner_id),
+            self.total(booking__venue__owner_id=owner_id, status='succeeded'),
+        )
+        self.assertVerified()
+
+    def test_status_changes_are_posted(self):
+        payment = Payment.objects.filter(status='succeeded').first()
+        before = ledger.renter_summary(payment.payer_id)
+        payment.status = 'refunded'
+        payment.save()
+        after = ledger.renter_summary(payment.payer_id)
+        self.assertEqual(after['refunded'] - before['refunded'], payment.amount)
+        self.assertEqual(after['paid'], before['paid'])
+
+        pending = Payment.objects.create(
+            payer_id=payment.payer_id, booking_id=payment.booking_id,
+            hire_id=payment.hire_id, amount=Decimal('150.00'),
+        )
+        self.assertEqual(ledger.renter_summary(payment.payer_id)['outstanding'], Decimal('150.00'))
+        pending.amount = Decimal('100.00')
+        pending.save()
+        self.assertEqual(ledger.renter_summary(payment.payer_id)['outstanding'], Decimal('100.00'))
+        pending.status = 'succeeded'
+        pending.save()
+        summary = ledger.renter_summary(payment.payer_id)
+        self.assertEqual(summary['outstanding'], 0)
+        self.assertEqual(summary['paid'], after['paid'] + Decimal('100.00'))
+        self.assertVerified()
+
+    def test_reversal_goes_to_the_account_originally_credited(self):
+        payment = Payment.objects.filter(status='succeeded', booking__isnull=False).select_related(
+            'booking__venue').first()
+        venue = payment.booking.venue
+        owner_id = venue.owner_id
+        earned = ledger.earnings('owner', owner_id)
+        # площадка сменила владельца, бронь удалена — возврат всё равно списывается с прежнего
+        venue.owner = Owner.objects.exclude(pk=owner_id).first()
+        venue.save(update_fields=['owner'])
+        Payment.objects.filter(pk=payment.pk).update(booking=None)
+        payment.refresh_from_db()
+        payment.status = 'refunded'
+        payment.save()
+
+        self.assertEqual(ledger.earnings('owner', owner_id), earned - payment.amount)
+        self.assertFalse(LedgerAccount.objects.filter(key=ledger.PLATFORM).exists())
+        self.assertFalse(
+            LedgerEntry.objects.filter(payment_id=payment.pk, account=ledger.PLATFORM).exists()
+        )
+        self.assertVerified()
+
+    def test_verify_command_detects_and_repairs_drift(self):
+        account = LedgerAccount.objects.filter(Q(kind='owner') | Q(kind='specialist')).first()
+        LedgerAccount.objects.filter(pk=account.pk).update(credit=account.credit + 1)
+        with self.assertRaises(CommandError):
+            call_command('verify_ledger', '--workers', '1', stdout=io.StringIO())
+        call_command('verify_ledger', '--workers', '1', '--fix', stdout=io.StringIO())
+        self.assertVerified()
+
+
+class PaymentInvariantTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        build_marketplace(1)
+        cls.payment = Payment.objects.filter(booking__isnull=False).first()
+
+    def test_payment_targets_at_most_one_of_booking_or_hire(self):
+        hire_id = Payment.objects.filter(hire__isnull=False).values_list('hire_id', flat=True).first()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Payment.objects.filter(pk=self.payment.pk).update(booking_id=self.payment.booking_id, hire_id=hire_id)
+        # новый платёж без цели не проходит ни валидацию, ни CHECK
+        with self.assertRaises(ValidationError):
+            Payment(payer=self.payment.payer, amount=Decimal('100.00')).full_clean()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Payment.objects.bulk_create([Payment(payer=self.payment.payer, amount=Decimal('100.00'))])
+
+    def test_deleting_target_marks_payment(self):
+        stale = Payment.objects.get(pk=self.payment.pk)
+        # ON DELETE SET NULL в БД (core/deletion.py) и Collector Django
+        Booking.objects.filter(pk=self.payment.booking_id)._raw_delete(Booking.objects.db)
+        hire_payment = Payment.objects.filter(hire__isnull=False).first()
+        hire_payment.hire.delete()
+        for payment in (self.payment, hire_payment):
+            payment.refresh_from_db()
+            self.assertIsNone(payment.booking_id)
+            self.assertIsNone(payment.hire_id)
+            self.assertIsNotNone(payment.target_deleted_at)
+        # сохранение устаревшего экземпляра не снимает отметку
+        stale.booking_id = None
+        stale.save()
+        stale.refresh_from_db()
+        self.assertEqual(stale.target_deleted_at, self.payment.target_deleted_at)
 
-# Create your tests here.
+    def test_target_total_counts_succeeded_only(self):
+        payments = Payment.objects.filter(booking_id=self.payment.booking_id)
+        payments.update(status='succeeded')
+        expected = sum(p.amount for p in payments)
+        self.assertEqual(self.payment.booking.payments.succeeded().total(), expected)
+        payments.update(status='refunded')
+        self.assertEqual(self.payment.booking.payments.succeeded().total(), Decimal('0.00'))
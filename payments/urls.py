@@ -0,0 +1,9 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'payments'
+
+urlpatterns = [
+    path('webhook/', views.provider_webhook, name='provider_webhook'),
+]
@@ -1,3 +1,20 @@
-from django.shortcuts import render
+from django.http import HttpResponse, HttpResponseBadRequest
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 
-# Create your views here.
+from .webhooks import SIGNATURE_HEADER, WebhookError, ingest
+
+
+@csrf_exempt
+@require_POST
+def provider_webhook(request):
+    """
+    Приём вебхука провайдера: подпись + одна вставка в журнал событий.
+
+    Применение к Payment — в process_payment_events, не здесь.
+    """
+    try:
+        ingest(request.body, request.META.get(SIGNATURE_HEADER, ''))
+    except WebhookError as exc:
+        return HttpResponseBadRequest(str(exc))
+    return HttpResponse(status=204)
@@ -0,0 +1,226 @@
+# payments/webhooks.py
+"""
+Приём и обработка вебхуков платёжного провайдера.
+
+HTTP-обработчик только проверяет подпись и пишет событие в журнал
+``PaymentEvent`` одним ``INSERT ... ON CONFLICT DO NOTHING`` — повторы
+провайдера отбрасываются уникальным индексом, ответ уходит сразу.
+
+Применение к ``Payment`` — отдельно, пачками (``process_batch``, команда
+``process_payment_events``). Порядок событий одного платежа определяется
+ключом ``(occurred_at, приоритет статуса, provider_event_id)``: побеждает
+самое позднее событие, при равном времени — более «финальный» статус.
+Событие старше уже применённого помечается ``stale``. Поэтому повторы
+и перестановки при доставке дают один и тот же итог. Статус, в который
+платёж не может прийти из текущего по ``Payment.STATUS_TRANSITIONS``
+(например, succeeded после локальной отмены брошенного платежа), не
+применяется — событие помечается ``rejected``.
+
+Вебхук может обогнать создание платежа у нас. Такое событие не
+закрывается, а откладывается (``retry_at``) с удваивающейся паузой
+``PAYMENT_EVENT_RETRY_BASE``…``PAYMENT_EVENT_RETRY_MAX``; закрывается
+как ``unknown_payment`` только событие старше ``PAYMENT_EVENT_RETRY_MAX_AGE``.
+"""
+import hashlib
+import hmac
+import json
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .ledger import record_payments
+from .models import Payment, PaymentEvent
+
+SIGNATURE_HEADER = 'HTTP_X_SIGNATURE'
+
+# При одинаковом времени события побеждает статус с большим приоритетом
+STATUS_PRECEDENCE = {
+    'pending': 0,
+    'cancelled': 1,
+    'failed': 2,
+    'succeeded': 3,
+    'refunded': 4,
+}
+
+
+class WebhookError(ValueError):
+    pass
+
+
+def sign(body, secret=None):
+    secret = secret if secret is not None else settings.PAYMENT_WEBHOOK_SECRET
+    return hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def verify(body, signature):
+    return bool(signature) and hmac.compare_digest(sign(body), signature)
+
+
+def parse(body):
+    """
+    Тело вебхука → несохранённый ``PaymentEvent``.
+
+    Формат: ``{"id", "type", "created" (unix-время), "data": {"payment_id",
+    "provider_payment_id", "status", ...}}``.
+    """
+    try:
+        payload = json.loads(body)
+        data = payload['data']
+        status = data['status']
+        payment_id = data.get('payment_id')
+        event = PaymentEvent(
+            provider_event_id=str(payload['id']),
+            event_type=str(payload['type'])[:50],
+            payment_id=uuid.UUID(payment_id) if payment_id else None,
+            provider_payment_id=str(data.get('provider_payment_id') or ''),
+            status=status,
+            occurred_at=datetime.fromtimestamp(float(payload['created']), tz=dt_timezone.utc),
+            payload=payload,
+        )
+    except (KeyError, TypeError, ValueError) as exc:
+        raise WebhookError(f"Некорректное тело вебхука: {exc}") from exc
+    if status not in STATUS_PRECEDENCE:
+        raise WebhookError(f"Неизвестный статус: {status!r}")
+    return event
+
+
+def ingest(body, signature):
+    """Проверяет подпись и пишет событие; повтор — не ошибка. Возвращает событие."""
+    if not verify(body, signature):
+        raise WebhookError("Неверная подпись")
+    event = parse(body)
+    PaymentEvent.objects.bulk_create([event], ignore_conflicts=True)
+    return event
+
+
+# ────────────────────────────────────────────────
+# Обработчик
+# ────────────────────────────────────────────────
+
+def _reachable(source):
+    """Статусы, в которые платёж может прийти из ``source`` по ``Payment.STATUS_TRANSITIONS``."""
+    seen, queue = {source}, [source]
+    while queue:
+        for target in Payment.STATUS_TRANSITIONS[queue.pop()]:
+            if target not in seen:
+                seen.add(target)
+                queue.append(target)
+    return seen
+
+
+# Промежуточные события провайдера могут прийти позже или потеряться
+# (refunded раньше succeeded), поэтому проверяется достижимость, а не один
+# шаг; но из cancelled / refunded платёж уже никуда не уходит
+REACHABLE = {status: _reachable(status) for status in Payment.STATUS_TRANSITIONS}
+
+
+def event_key(event):
+    return (event.occurred_at, STATUS_PRECEDENCE[event.status], event.provider_event_id)
+
+
+def payment_key(payment):
+    if payment.provider_updated_at is None:
+        return None
+    return (payment.provider_updated_at, STATUS_PRECEDENCE.get(payment.status, 0))
+
+
+def retry_delay(attempts):
+    """Пауза перед ``attempts``-й повторной попыткой: BASE, 2·BASE, 4·BASE… не больше MAX."""
+    base = getattr(settings, 'PAYMENT_EVENT_RETRY_BASE', 30)
+    cap = getattr(settings, 'PAYMENT_EVENT_RETRY_MAX', 60 * 60)
+    return timedelta(seconds=min(base * 2 ** min(attempts - 1, 32), cap))
+
+
+def process_batch(batch_size=500):
+    """
+    Применяет одну пачку необработанных событий; возвращает число событий.
+
+    Несколько обработчиков могут работать параллельно: события берутся
+    через SKIP LOCKED, платежи блокируются в порядке pk. Отложенные
+    события (платёж ещё не найден) ждут своего ``retry_at``.
+    """
+    now = timezone.now()
+    expired = now - timedelta(seconds=getattr(settings, 'PAYMENT_EVENT_RETRY_MAX_AGE', 7 * 24 * 60 * 60))
+    with transaction.atomic():
+        events = list(
+            PaymentEvent.objects.filter(processed_at__isnull=True)
+            .filter(Q(retry_at__isnull=True) | Q(retry_at__lte=now))
+            .order_by('received_at')
+            .select_for_update(skip_locked=True)[:batch_size]
+        )
+        if not events:
+            return 0
+
+        payment_ids = {e.payment_id for e in events if e.payment_id}
+        provider_ids = {e.provider_payment_id for e in events if not e.payment_id and e.provider_payment_id}
+        payments = list(
+            Payment.objects.filter(Q(pk__in=payment_ids) | Q(provider_payment_id__in=provider_ids))
+            .order_by('pk')
+            .select_for_update()
+        )
+        by_id = {p.pk: p for p in payments}
+        by_provider = {p.provider_payment_id: p for p in payments if p.provider_payment_id}
+
+        grouped, deferred = {}, []
+        results = {'applied': [], 'stale': [], 'rejected': [], 'unknown_payment': []}
+        for event in events:
+            payment = by_id.get(event.payment_id) or by_provider.get(event.provider_payment_id)
+            if payment is None and event.received_at <= expired:
+                results['unknown_payment'].append(event.pk)
+            elif payment is None:
+                event.attempts += 1
+                event.retry_at = now + retry_delay(event.attempts)
+                deferred.append(event)
+            else:
+                grouped.setdefault(payment.pk, (payment, []))[1].append(event)
+
+        changed, before = [], {}
+        for payment, payment_events in grouped.values():
+            current = payment_key(payment)
+            latest = None
+            for event in sorted(payment_events, key=event_key, reverse=True):
+                if latest is not None or (current is not None and event_key(event)[:2] <= current):
+                    results['stale'].append(event.pk)
+                elif event.status in REACHABLE[payment.status]:
+                    latest = event
+                else:
+                    results['rejected'].append(event.pk)
+            if latest is None:
+                continue
+            before[payment.pk] = (payment.status, None)
+            payment.status = latest.status
+            payment.provider_updated_at = latest.occurred_at
+            if latest.provider_payment_id and not payment.provider_payment_id:
+                payment.provider_payment_id = latest.provider_payment_id
+            if latest.status == 'succeeded' and payment.paid_at is None:
+                payment.paid_at = latest.occurred_at
+            changed.append(payment)
+            results['applied'].append(latest.pk)
+
+        if changed:
+            Payment.objects.bulk_update(
+                changed, ['status', 'paid_at', 'provider_payment_id', 'provider_updated_at']
+            )
+            record_payments(before, now)
+        if deferred:
+            PaymentEvent.objects.bulk_update(deferred, ['attempts', 'retry_at'])
+        for result, pks in results.items():
+            if pks:
+                PaymentEvent.objects.filter(pk__in=pks).update(processed_at=now, result=result)
+    return len(events)
+
+
+def process_pending(batch_size=500, max_batches=None):
+    """Обрабатывает очередь до конца (или ``max_batches`` пачек); возвращает число событий."""
+    total = batches = 0
+    while max_batches is None or batches < max_batches:
+        processed = process_batch(batch_size)
+        if not processed:
+            break
+        total += processed
+        batches += 1
+    return total
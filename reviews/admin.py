@@ -0,0 +1,41 @@
+# reviews/admin.py
+from django.contrib import admin
+
+from core import lookup
+from core.admin import ShortIdSearchMixin
+
+from .models import Review
+
+
+@admin.register(Review)
+class ReviewAdmin(ShortIdSearchMixin, admin.ModelAdmin):
+    list_display = [
+        'score',
+        'target_display',
+        'author_email',
+        'created_at',
+    ]
+
+    list_filter = ['score', 'created_at']
+    search_fields = ['author__user__email', 'text']
+
+    autocomplete_fields = ['booking', 'hire', 'author']
+    # кого оценивают — выводится из брони / найма
+    readonly_fields = ['owner', 'specialist', 'created_at', 'updated_at']
+
+    date_hierarchy = 'created_at'
+    ordering = ['-created_at']
+
+    @admin.display(description='Отзыв на')
+    def target_display(self, obj):
+        if obj.booking_id:
+            return f"Бронь {lookup.short_id(obj.booking_id)}"
+        return f"Найм {obj.hire_id}"
+
+    @admin.display(description='Автор', ordering='author__user__email')
+    def author_email(self, obj):
+        return obj.author.user.email
+
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        return qs.select_related('author__user', 'owner__user', 'specialist__user')
@@ -0,0 +1,36 @@
+import multiprocessing
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from reviews.ratings import PROFILES, _recompute_worker, recompute_shard
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает рейтинги владельцев и специалистов из отзывов "
+        "(параллельно, по долям профилей)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help="число параллельных процессов")
+        parser.add_argument('--only', choices=sorted(PROFILES), default=None)
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        for kind in [options['only']] if options['only'] else PROFILES:
+            started = time.perf_counter()
+            tasks = [(kind, shard, workers) for shard in range(workers)]
+            if workers == 1:
+                changed = recompute_shard(*tasks[0])
+            else:
+                # дочерние процессы не должны делить сокет с родителем
+                connections.close_all()
+                with multiprocessing.get_context('fork').Pool(workers) as pool:
+                    changed = sum(pool.map(_recompute_worker, tasks))
+            self.stdout.write(
+                f"{kind:12} изменено профилей: {changed:,} за {time.perf_counter() - started:.1f} с"
+            )
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.9 on 2026-10-19 02:51
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('bookings', '0005_status_end_datetime_index'),
+        ('hires', '0002_status_end_datetime_index'),
+        ('users', '0002_profile_ratings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Review',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('score', models.PositiveSmallIntegerField(help_text='от 1 до 5', verbose_name='оценка')),
+                ('text', models.TextField(blank=True, verbose_name='текст отзыва')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='создан')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='обновлён')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reviews', to='users.renter', verbose_name='автор')),
+                ('booking', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='review', to='bookings.booking', verbose_name='бронирование')),
+                ('hire', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='review', to='hires.hire', verbose_name='найм специалиста')),
+                ('owner', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='reviews', to='users.owner', verbose_name='владелец')),
+                ('specialist', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='reviews', to='users.specialist', verbose_name='специалист')),
+            ],
+            options={
+                'verbose_name': 'отзыв',
+                'verbose_name_plural': 'отзывы',
+                'ordering': ['-created_at'],
+                'constraints': [models.CheckConstraint(condition=models.Q(('score__gte', 1), ('score__lte', 5)), name='review_score_range', violation_error_message='Оценка — от 1 до 5'), models.CheckConstraint(condition=models.Q(models.Q(('booking__isnull', False), ('hire__isnull', True), ('owner__isnull', False), ('specialist__isnull', True)), models.Q(('booking__isnull', True), ('hire__isnull', False), ('owner__isnull', True), ('specialist__isnull', False)), _connector='OR'), name='review_booking_xor_hire', violation_error_message='Отзыв относится либо к брони (владелец), либо к найму (специалист)')],
+            },
+        ),
+    ]
@@ -0,0 +1,152 @@
+from django.db import models, router, transaction
+from django.db.models import Q
+from django.utils.translation import gettext_lazy as _
+
+from core.ids import uuid7
+
+
+class ReviewNotAllowed(ValueError):
+    """Отзыв можно оставить только на завершённую бронь или найм, и только один"""
+
+
+class ReviewManager(models.Manager):
+    def leave(self, target, score, text=''):
+        """
+        Отзыв арендатора на завершённую бронь (→ владелец площадки)
+        или найм (→ специалист). Рейтинг обновляется в той же транзакции.
+        """
+        from bookings.models import Booking
+
+        if target.status != 'completed':
+            raise ReviewNotAllowed(_("Отзыв можно оставить только после завершения"))
+        review = self.model(author_id=target.renter_id, score=score, text=text)
+        if isinstance(target, Booking):
+            review.booking = target
+            review.owner_id = target.venue.owner_id
+        else:
+            review.hire = target
+            review.specialist_id = target.specialist_id
+        if self.filter(Q(booking_id=review.booking_id) if review.booking_id else Q(hire_id=review.hire_id)).exists():
+            raise ReviewNotAllowed(_("Отзыв уже оставлен"))
+        review.save()
+        return review
+
+
+class Review(models.Model):
+    """
+    Отзыв арендатора (одна запись = одна бронь или один найм)
+    """
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
+
+    booking = models.OneToOneField(
+        'bookings.Booking',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='review',
+        verbose_name=_("бронирование")
+    )
+
+    hire = models.OneToOneField(
+        'hires.Hire',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='review',
+        verbose_name=_("найм специалиста")
+    )
+
+    author = models.ForeignKey(
+        'users.Renter',
+        on_delete=models.CASCADE,
+        related_name='reviews',
+        verbose_name=_("автор")
+    )
+
+    # Кого оценивают — копия из брони / найма, чтобы пересчёт не делал JOIN-ов
+    owner = models.ForeignKey(
+        'users.Owner',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='reviews',
+        verbose_name=_("владелец")
+    )
+
+    specialist = models.ForeignKey(
+        'users.Specialist',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='reviews',
+        verbose_name=_("специалист")
+    )
+
+    score = models.PositiveSmallIntegerField(_("оценка"), help_text="от 1 до 5")
+    text = models.TextField(_("текст отзыва"), blank=True)
+
+    created_at = models.DateTimeField(_("создан"), auto_now_add=True)
+    updated_at = models.DateTimeField(_("обновлён"), auto_now=True)
+
+    objects = ReviewManager()
+
+    class Meta:
+        verbose_name = _("отзыв")
+        verbose_name_plural = _("отзывы")
+        ordering = ['-created_at']
+        constraints = [
+            models.CheckConstraint(
+                condition=Q(score__gte=1, score__lte=5),
+                name='review_score_range',
+                violation_error_message=_("Оценка — от 1 до 5"),
+            ),
+            models.CheckConstraint(
+                condition=Q(booking__isnull=False, hire__isnull=True, owner__isnull=False, specialist__isnull=True)
+                | Q(booking__isnull=True, hire__isnull=False, owner__isnull=True, specialist__isnull=False),
+                name='review_booking_xor_hire',
+                violation_error_message=_("Отзыв относится либо к брони (владелец), либо к найму (специалист)"),
+            ),
+        ]
+
+    def __str__(self):
+        target = f"бронь {self.booking_id}" if self.booking_id else f"найм {self.hire_id}"
+        return f"{self.score}★ — {target}"
+
+    @property
+    def subject(self):
+        """``(модель профиля, pk)`` — кого оценивает отзыв"""
+        from users.models import Owner, Specialist
+
+        if self.owner_id:
+            return Owner, self.owner_id
+        return Specialist, self.specialist_id
+
+    def save(self, *args, **kwargs):
+        # Изменение оценки сразу отражается в счётчиках рейтинга
+        from .ratings import add_score
+
+        with transaction.atomic(using=kwargs.get('using') or router.db_for_write(Review, instance=self)):
+            before = None
+            if not self._state.adding:
+                before = (
+                    Review.objects.select_for_update()
+                    .filter(pk=self.pk)
+                    .values_list('score', 'owner_id', 'specialist_id')
+                    .first()
+                )
+            super().save(*args, **kwargs)
+            if before is not None:
+                score, owner_id, specialist_id = before
+                old = Review(score=score, owner_id=owner_id, specialist_id=specialist_id)
+                if old.subject == self.subject and score == self.score:
+                    return
+                add_score(*old.subject, -score, -1)
+            add_score(*self.subject, self.score, 1)
+
+    def delete(self, *args, **kwargs):
+        from .ratings import add_score
+
+        with transaction.atomic(using=kwargs.get('using') or router.db_for_write(Review, instance=self)):
+            result = super().delete(*args, **kwargs)
+            add_score(*self.subject, -self.score, -1)
+        return result
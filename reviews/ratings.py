@@ -0,0 +1,123 @@
+# reviews/ratings.py
+"""
+Рейтинги владельцев и специалистов по отзывам.
+
+На профиле хранятся ``rating_count`` и ``rating_sum``, а ``rating`` —
+сглаженная байесовская оценка::
+
+    rating = (C * m + rating_sum) / (C + rating_count)
+
+где ``m`` — ``RATING_PRIOR_MEAN``, ``C`` — ``RATING_PRIOR_WEIGHT``: у
+профиля с парой отзывов оценка тянется к ``m``, с сотней — почти равна
+среднему. Без отзывов ``rating`` = 0, такие профили идут в конце списка.
+
+Каждый отзыв меняет счётчики одним UPDATE по первичному ключу (O(1)) в
+транзакции отзыва. Списки сортируются по индексу ``(-rating, user)`` —
+без агрегации отзывов в момент запроса. ``recompute_ratings`` пересчитывает
+всё из отзывов (включая архивные, ``archive/archiver.py``) — параллельно,
+по долям профилей; нужен после смены ``m`` / ``C`` или массовой загрузки.
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, DecimalField, ExpressionWrapper, F, Value, When
+from django.db.models.functions import Round
+
+from archive.models import ArchivedRow
+from users.models import Owner, Specialist
+
+from .models import Review
+
+PROFILES = {
+    'owner': Owner,
+    'specialist': Specialist,
+}
+
+
+def prior():
+    mean = Decimal(str(getattr(settings, 'RATING_PRIOR_MEAN', 4.0)))
+    weight = int(getattr(settings, 'RATING_PRIOR_WEIGHT', 5))
+    return mean, weight
+
+
+def add_score(model, pk, score_delta, count_delta):
+    """Сдвигает счётчики профиля и пересчитывает сглаженную оценку одним UPDATE."""
+    mean, weight = prior()
+    count = F('rating_count') + count_delta
+    total = F('rating_sum') + score_delta
+    smoothed = ExpressionWrapper(
+        (Value(mean * weight) + total) / (Value(weight) + count),
+        output_field=DecimalField(max_digits=6, decimal_places=4),
+    )
+    model.objects.filter(pk=pk).update(
+        rating_count=count,
+        rating_sum=total,
+        rating=Case(When(**{'rating_count': -count_delta}, then=Value(Decimal('0.00'))),
+                    default=Round(smoothed, 2)),
+    )
+
+
+# ────────────────────────────────────────────────
+# Полный пересчёт
+# ────────────────────────────────────────────────
+
+def _recompute(kind, condition, params):
+    model = PROFILES[kind]
+    mean, weight = prior()
+    q = connection.ops.quote_name
+    profiles, reviews = q(model._meta.db_table), q(Review._meta.db_table)
+    archived = q(ArchivedRow._meta.db_table)
+    column = f'{kind}_id'
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'''
+            UPDATE {profiles} p
+            SET rating_count = r.count, rating_sum = r.total, rating = r.rating
+            FROM (
+                SELECT user_id, count, total,
+                       CASE WHEN count = 0 THEN 0
+                            ELSE round((%(prior)s + total)::numeric / (%(weight)s + count), 2) END AS rating
+                FROM (
+                    SELECT p.user_id, count(v.score) AS count, coalesce(sum(v.score), 0) AS total
+                    FROM {profiles} p LEFT JOIN (
+                        SELECT {column}, score FROM {reviews}
+                        UNION ALL
+                        -- отзывы архивных мероприятий по-прежнему входят в рейтинг
+                        SELECT (data ->> '{column}')::uuid, (data ->> 'score')::int
+                        FROM {archived} WHERE table_name = %(review_table)s
+                    ) v ON v.{column} = p.user_id
+                    WHERE {condition}
+                    GROUP BY p.user_id
+                ) totals
+            ) r
+            WHERE p.user_id = r.user_id
+              AND (p.rating_count, p.rating_sum, p.rating) IS DISTINCT FROM (r.count, r.total, r.rating)
+        ''', {
+            'prior': mean * weight, 'weight': weight, 'review_table': Review._meta.db_table, **params,
+        })
+        return cursor.rowcount
+
+
+def recompute_shard(kind, shard, shards):
+    """
+    Пересчитывает профили своей доли (по хешу id) из отзывов одним UPDATE;
+    трогает только строки, где что-то изменилось. Возвращает их число.
+    """
+    return _recompute(
+        kind, 'mod(abs(hashtext(p.user_id::text)::bigint), %(shards)s) = %(shard)s',
+        {'shards': shards, 'shard': shard},
+    )
+
+
+def recompute_profiles(kind, pks):
+    """То же для перечисленных профилей — после удаления отзывов в обход ``Review.delete``."""
+    return _recompute(kind, 'p.user_id = ANY(%(pks)s)', {'pks': list(pks)})
+
+
+def _recompute_worker(args):
+    # Воркер запускается в отдельном процессе и открывает собственное подключение
+    from django.db import connections
+    try:
+        return recompute_shard(*args)
+    finally:
+        connections.close_all()
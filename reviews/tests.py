@@ -0,0 +1,69 @@
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from EventMarket.testing import build_marketplace
+from users.models import Owner, Specialist
+
+from .models import Review, ReviewNotAllowed
+
+
+class RatingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        data = build_marketplace(2)
+        Review.objects.all().delete()
+        cls.booking = data['bookings'][0]
+        cls.hire = data['hires'][0]
+        for target in (cls.booking, cls.hire):
+            target.status = 'completed'
+            target.save()
+        Owner.objects.update(rating=0)
+        Specialist.objects.update(rating=0)
+        cls.owner_id = cls.booking.venue.owner_id
+
+    def owner(self):
+        return Owner.objects.get(pk=self.owner_id)
+
+    def test_review_updates_counters_and_smoothed_score(self):
+        Review.objects.leave(self.booking, 5)
+        owner = self.owner()
+        self.assertEqual((owner.rating_count, owner.rating_sum), (1, 5))
+        # (5 * 4.0 + 5) / (5 + 1)
+        self.assertEqual(owner.rating, Decimal('4.17'))
+
+        Review.objects.leave(self.hire, 2)
+        specialist = Specialist.objects.get(pk=self.hire.specialist_id)
+        self.assertEqual((specialist.rating_count, specialist.rating), (1, Decimal('3.67')))
+
+    def test_changing_and_deleting_review_adjusts_rating(self):
+        review = Review.objects.leave(self.booking, 5)
+        review.score = 1
+        review.save()
+        self.assertEqual((self.owner().rating_count, self.owner().rating_sum), (1, 1))
+        review.delete()
+        owner = self.owner()
+        self.assertEqual((owner.rating_count, owner.rating_sum, owner.rating), (0, 0, Decimal('0.00')))
+
+    def test_only_completed_targets_can_be_reviewed_once(self):
+        Review.objects.leave(self.booking, 4)
+        with self.assertRaises(ReviewNotAllowed):
+            Review.objects.leave(self.booking, 4)
+        pending = self.hire.__class__.objects.exclude(status='completed').first()
+        with self.assertRaises(ReviewNotAllowed):
+            Review.objects.leave(pending, 4)
+
+    def test_recompute_restores_drifted_counters(self):
+        Review.objects.leave(self.booking, 5)
+        expected = self.owner()
+        Owner.objects.filter(pk=self.owner_id).update(rating_count=7, rating_sum=3, rating=1)
+        out = StringIO()
+        call_command('recompute_ratings', workers=1, only='owner', stdout=out)
+        owner = self.owner()
+        self.assertEqual(
+            (owner.rating_count, owner.rating_sum, owner.rating),
+            (expected.rating_count, expected.rating_sum, expected.rating),
+        )
+        self.assertIn('изменено профилей: 1', out.getvalue())
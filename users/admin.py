@@ -4,11 +4,14 @@ from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.html import format_html
 from django.urls import reverse
 
+from core import lookup
+from core.admin import DatabaseCascadeDeleteMixin, DimensionListFilter, ShortIdSearchMixin
+
 from .models import BaseUser, Renter, Owner, Specialist
 
 
 @admin.register(BaseUser)
-class BaseUserAdmin(BaseUserAdmin):
+class BaseUserAdmin(ShortIdSearchMixin, BaseUserAdmin):
     list_display = [
         'short_id',
         'email',
@@ -52,7 +55,7 @@ class BaseUserAdmin(BaseUserAdmin):
     # Методы для list_display
     @admin.display(description='ID', ordering='id')
     def short_id(self, obj):
-        return str(obj.id)[:8].upper()
+        return lookup.short_id(obj.id)
     
     @admin.display(description='Роль')
     def role_badge(self, obj):
@@ -73,6 +76,11 @@ class BaseUserAdmin(BaseUserAdmin):
     def is_active_colored(self, obj):
         return obj.is_active
     
+    # role_badge проверяет все три профиля — подтягиваем их одним запросом
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        return qs.select_related('renter', 'owner', 'specialist')
+    
     # Метод специально для формы (readonly)
     @admin.display(description='Роль пользователя')
     def role_readonly(self, obj):
@@ -98,7 +106,7 @@ class BaseUserAdmin(BaseUserAdmin):
     def make_specialist(self, request, queryset):
         for user in queryset:
             if not hasattr(user, 'specialist'):
-                Specialist.objects.create(user=user, specialty="", license_number="", city="", rating=0.00)
+                Specialist.objects.create(user=user, license_number="", rating=0.00)
         self.message_user(request, f"Сделано специалистами: {queryset.count()} пользователей")
 
 
@@ -107,7 +115,7 @@ class BaseUserAdmin(BaseUserAdmin):
 # ────────────────────────────────────────────────
 
 @admin.register(Renter)
-class RenterAdmin(admin.ModelAdmin):
+class RenterAdmin(ShortIdSearchMixin, DatabaseCascadeDeleteMixin, admin.ModelAdmin):
     list_display = [
         'user_email',
         'user_date_joined',
@@ -122,20 +130,28 @@ class RenterAdmin(admin.ModelAdmin):
     @admin.display(description='Дата регистрации', ordering='user__date_joined')
     def user_date_joined(self, obj):
         return obj.user.date_joined if obj.user else '—'
+    
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        return qs.select_related('user')
 
 
 @admin.register(Owner)
-class OwnerAdmin(admin.ModelAdmin):
+class OwnerAdmin(ShortIdSearchMixin, DatabaseCascadeDeleteMixin, admin.ModelAdmin):
     list_display = [
         'user_email',
         'inn',
         'verified',
         'rating',
+        'rating_count',
         'user_date_joined',
     ]
     list_filter = ['verified']
     search_fields = ['user__email', 'inn']
-    readonly_fields = ['user']
+    # рейтинг считается по отзывам (reviews/ratings.py)
+    readonly_fields = ['user', 'rating', 'rating_count', 'rating_sum']
+    # по индексу (-rating, user)
+    ordering = ['-rating', 'pk']
     
     @admin.display(description='Email', ordering='user__email')
     def user_email(self, obj):
@@ -144,20 +160,29 @@ class OwnerAdmin(admin.ModelAdmin):
     @admin.display(description='Дата регистрации', ordering='user__date_joined')
     def user_date_joined(self, obj):
         return obj.user.date_joined if obj.user else '—'
+    
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        return qs.select_related('user')
 
 
 @admin.register(Specialist)
-class SpecialistAdmin(admin.ModelAdmin):
+class SpecialistAdmin(ShortIdSearchMixin, DatabaseCascadeDeleteMixin, admin.ModelAdmin):
     list_display = [
         'user_email',
         'specialty',
         'city',
         'rating',
+        'rating_count',
         'user_date_joined',
     ]
-    list_filter = ['city', 'specialty']
-    search_fields = ['user__email', 'specialty', 'city']
-    readonly_fields = ['user']
+    list_filter = [('city', DimensionListFilter), ('specialty', DimensionListFilter)]
+    search_fields = ['user__email', 'specialty__name', 'city__name']
+    autocomplete_fields = ['specialty', 'city']
+    # рейтинг считается по отзывам (reviews/ratings.py)
+    readonly_fields = ['user', 'rating', 'rating_count', 'rating_sum']
+    # по индексу (-rating, user)
+    ordering = ['-rating', 'pk']
     
     @admin.display(description='Email', ordering='user__email')
     def user_email(self, obj):
@@ -167,6 +192,10 @@ class SpecialistAdmin(admin.ModelAdmin):
     def user_date_joined(self, obj):
         return obj.user.date_joined if obj.user else '—'
     
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        return qs.select_related('user', 'city', 'specialty')
+    
     
     
     
@@ -190,7 +219,7 @@ class SpecialistAdmin(admin.ModelAdmin):
     def make_specialist(self, request, queryset):
         for user in queryset:
             if not hasattr(user, 'specialist'):
-                Specialist.objects.create(user=user, specialty="", license_number="", city="", rating=0.00)
+                Specialist.objects.create(user=user, license_number="", rating=0.00)
         self.message_user(request, f"Сделано специалистами: {queryset.count()} пользователей")
 
 
@@ -210,6 +239,7 @@ class OwnerInline(admin.StackedInline):
     verbose_name_plural = 'Профиль Владельца'
     extra = 0
     fields = ('inn', 'verified', 'rating')
+    readonly_fields = ('rating',)
 
 
 class SpecialistInline(admin.StackedInline):
@@ -217,4 +247,5 @@ class SpecialistInline(admin.StackedInline):
     can_delete = False
     verbose_name_plural = 'Профиль Специалиста'
     extra = 0
-    fields = ('specialty', 'license_number', 'city', 'rating')
\ No newline at end of file
+    fields = ('specialty', 'license_number', 'city', 'rating')
+    autocomplete_fields = ('specialty', 'city')
\ No newline at end of file
@@ -1,6 +1,27 @@
 from django.apps import AppConfig
+from django.db.models.signals import m2m_changed, post_delete, post_save
 
 
 class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'users'
+
+    def ready(self):
+        from django.contrib.auth.models import Group, Permission
+
+        from . import backends
+        from .models import BaseUser
+
+        # кэш пользователя и прав (users/backends.py) сбрасывается сменой версии
+        post_save.connect(backends.user_changed, sender=BaseUser, dispatch_uid='users.auth_cache.user_saved')
+        post_delete.connect(backends.user_changed, sender=BaseUser, dispatch_uid='users.auth_cache.user_deleted')
+        for through in (BaseUser.groups.through, BaseUser.user_permissions.through):
+            m2m_changed.connect(backends.user_relations_changed, sender=through,
+                                dispatch_uid=f'users.auth_cache.{through.__name__}')
+        for model in (Group, Permission):
+            post_save.connect(backends.permissions_changed, sender=model,
+                              dispatch_uid=f'users.auth_cache.{model.__name__}_saved')
+            post_delete.connect(backends.permissions_changed, sender=model,
+                                dispatch_uid=f'users.auth_cache.{model.__name__}_deleted')
+        m2m_changed.connect(backends.permissions_changed, sender=Group.permissions.through,
+                            dispatch_uid='users.auth_cache.group_permissions')
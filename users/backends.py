@@ -0,0 +1,105 @@
+# users/backends.py
+"""
+Бэкенд аутентификации с кэшем пользователя и его прав.
+
+На каждом запросе ``AuthenticationMiddleware`` загружает пользователя
+по id из сессии, а первая проверка ``has_perm`` — ещё и права из групп и
+личные (для суперпользователя — все ``Permission``). Здесь пользователь
+кладётся в кэш (``django.core.cache``) вместе с уже вычисленными
+``_perm_cache`` / ``_user_perm_cache`` / ``_group_perm_cache``, и
+последующие запросы обходятся без SQL; сессии при этом читаются из кэша
+движком ``cached_db``.
+
+Ключ записи включает две версии: версию пользователя (меняется при
+сохранении и удалении пользователя — смена пароля, ``is_active``,
+``is_staff``, ``is_superuser`` — и при изменении его групп и личных прав)
+и общую версию прав (меняется при изменении групп, их прав и самих
+``Permission``). Версия — случайная строка, а не счётчик: если кэш
+вытеснит ключ версии, новая не совпадёт ни с одной старой записью.
+Изменения в обход сигналов (``QuerySet.update``) видны не позже чем через
+``AUTH_CACHE_TTL`` секунд.
+
+Сброс версий работает, только если кэш общий для всех процессов, поэтому
+settings включают бэкенд и ``cached_db`` лишь при ``CACHES['default']``
+не из ``PROCESS_LOCAL_CACHES``; иначе — обычные ``ModelBackend`` и ``db``.
+"""
+import uuid
+
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+GLOBAL_VERSION_KEY = 'auth:version'
+
+
+def _ttl():
+    return getattr(settings, 'AUTH_CACHE_TTL', 300)
+
+
+def _user_version_key(user_id):
+    return f'auth:version:{user_id}'
+
+
+def _versions(user_id):
+    keys = [GLOBAL_VERSION_KEY, _user_version_key(user_id)]
+    found = cache.get_many(keys)
+    missing = {key: uuid.uuid4().hex for key in keys if key not in found}
+    for key, version in missing.items():
+        # add: параллельный процесс мог уже выставить свою версию
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+        found[key] = version
+    return found[GLOBAL_VERSION_KEY], found[keys[1]]
+
+
+def user_cache_key(user_id):
+    global_version, user_version = _versions(user_id)
+    return f'auth:user:{user_id}:{global_version}:{user_version}'
+
+
+def invalidate_user(user_id):
+    cache.set(_user_version_key(user_id), uuid.uuid4().hex, timeout=None)
+
+
+def invalidate_all():
+    cache.set(GLOBAL_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+
+
+class CachedModelBackend(ModelBackend):
+    def get_user(self, user_id):
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            # права вычисляются сразу и попадают в кэш вместе с объектом
+            self.get_all_permissions(user)
+            cache.set(key, user, _ttl())
+        return user if self.user_can_authenticate(user) else None
+
+
+# ────────────────────────────────────────────────
+# Сброс по сигналам
+# ────────────────────────────────────────────────
+
+def user_changed(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
+
+
+def permissions_changed(sender, **kwargs):
+    invalidate_all()
+
+
+def user_relations_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """``m2m_changed`` у ``groups`` / ``user_permissions``: с любой стороны связи."""
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        invalidate_user(instance.pk)
+    elif pk_set:
+        for pk in pk_set:
+            invalidate_user(pk)
+    else:
+        # clear() со стороны группы / права — затронутые пользователи неизвестны
+        invalidate_all()
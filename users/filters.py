@@ -0,0 +1,19 @@
+# users/filters.py
+from django.contrib import admin
+
+
+class ProfileListFilter(admin.RelatedFieldListFilter):
+    """
+    Фильтр по FK на профиль (Renter / Owner / Specialist).
+
+    Стандартный RelatedFieldListFilter строит список через ``str(profile)``,
+    а ``__str__`` профиля обращается к ``user`` — это по запросу на каждую
+    строку боковой панели. Здесь пользователи подтягиваются одним JOIN.
+    """
+
+    def field_choices(self, field, request, model_admin):
+        ordering = self.field_admin_ordering(field, request, model_admin)
+        qs = field.related_model._default_manager.select_related('user')
+        if ordering:
+            qs = qs.order_by(*ordering)
+        return [(profile.pk, str(profile)) for profile in qs]
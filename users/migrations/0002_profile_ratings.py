@@ -0,0 +1,41 @@
+# Generated by Django 5.2.9 on 2026-10-19 02:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='owner',
+            name='rating_count',
+            field=models.PositiveIntegerField(db_default=0, default=0, verbose_name='число отзывов'),
+        ),
+        migrations.AddField(
+            model_name='owner',
+            name='rating_sum',
+            field=models.PositiveIntegerField(db_default=0, default=0, verbose_name='сумма оценок'),
+        ),
+        migrations.AddField(
+            model_name='specialist',
+            name='rating_count',
+            field=models.PositiveIntegerField(db_default=0, default=0, verbose_name='число отзывов'),
+        ),
+        migrations.AddField(
+            model_name='specialist',
+            name='rating_sum',
+            field=models.PositiveIntegerField(db_default=0, default=0, verbose_name='сумма оценок'),
+        ),
+        migrations.AddIndex(
+            model_name='owner',
+            index=models.Index(fields=['-rating', 'user'], name='owner_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='specialist',
+            index=models.Index(fields=['-rating', 'user'], name='specialist_rating_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.9 on 2026-10-19 03:07
+
+import core.ids
+import django.db.models.functions.comparison
+import django.db.models.functions.text
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Новые ключи — UUIDv7 (default на стороне Python, схема не меняется);
+    # существующие v4 не переписываются. Индекс по «хвосту» id строится
+    # CONCURRENTLY — таблица не блокируется на запись
+    atomic = False
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0002_profile_ratings'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='baseuser',
+            name='id',
+            field=models.UUIDField(default=core.ids.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+        AddIndexConcurrently(
+            model_name='baseuser',
+            index=models.Index(django.db.models.functions.text.Right(django.db.models.functions.comparison.Cast('id', models.TextField()), 8), name='user_id_tail_idx'),
+        ),
+    ]
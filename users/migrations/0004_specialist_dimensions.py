@@ -0,0 +1,73 @@
+# Generated by Django 5.2.9 on 2026-10-19 03:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_dimensions(apps, schema_editor):
+    from core import dimensions
+
+    dimensions.backfill('users_specialist', 'user_id', 'city', 'city_ref_id', 'core_city')
+    dimensions.backfill('users_specialist', 'user_id', 'specialty', 'specialty_ref_id', 'core_specialty')
+
+
+def restore_dimensions(apps, schema_editor):
+    schema_editor.execute(
+        'UPDATE users_specialist s SET city = c.name FROM core_city c WHERE c.id = s.city_ref_id'
+    )
+    schema_editor.execute(
+        'UPDATE users_specialist s SET specialty = d.name FROM core_specialty d WHERE d.id = s.specialty_ref_id'
+    )
+
+
+class Migration(migrations.Migration):
+    # Город и специализация — ссылки на core.City / core.Specialty;
+    # перенос пачками по pk (core/dimensions.py)
+    atomic = False
+
+    dependencies = [
+        ('core', '0002_city_specialty'),
+        ('users', '0003_user_uuid7_ids'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='specialist',
+            name='city_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.city'),
+        ),
+        migrations.AddField(
+            model_name='specialist',
+            name='specialty_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.specialty'),
+        ),
+        migrations.RunPython(backfill_dimensions, restore_dimensions),
+        migrations.RemoveField(
+            model_name='specialist',
+            name='city',
+        ),
+        migrations.RemoveField(
+            model_name='specialist',
+            name='specialty',
+        ),
+        migrations.RenameField(
+            model_name='specialist',
+            old_name='city_ref',
+            new_name='city',
+        ),
+        migrations.RenameField(
+            model_name='specialist',
+            old_name='specialty_ref',
+            new_name='specialty',
+        ),
+        migrations.AlterField(
+            model_name='specialist',
+            name='city',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='specialists', to='core.city', verbose_name='город работы'),
+        ),
+        migrations.AlterField(
+            model_name='specialist',
+            name='specialty',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='specialists', to='core.specialty', verbose_name='специализация'),
+        ),
+    ]
@@ -1,7 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.utils.translation import gettext_lazy as _
-import uuid
+
+from core.ids import tail_index, uuid7
 
 class BaseUserManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
@@ -30,7 +31,7 @@ class BaseUser(AbstractBaseUser, PermissionsMixin):
     """
     Базовая модель пользователя (без username, логин по email)
     """
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     email = models.EmailField(_("email адрес"), unique=True, db_index=True)
     is_active = models.BooleanField(_("активен"), default=True)
     is_staff = models.BooleanField(_("доступ в админку"), default=False)
@@ -45,6 +46,10 @@ class BaseUser(AbstractBaseUser, PermissionsMixin):
         verbose_name = _("пользователь")
         verbose_name_plural = _("пользователи")
         ordering = ["-date_joined"]
+        indexes = [
+            # короткий код в админке (core/lookup.py)
+            tail_index('user_id_tail_idx'),
+        ]
 
     def __str__(self):
         return self.email
@@ -101,10 +106,17 @@ class Owner(models.Model):
     
     inn = models.CharField(_("ИНН / ЕГРН"), max_length=20, blank=True)
     verified = models.BooleanField(_("проверен"), default=False)
+    # Рейтинг по отзывам на завершённые брони — обновляется инкрементально (reviews/ratings.py)
     rating = models.DecimalField(_("рейтинг"), max_digits=3, decimal_places=2, default=0.00)
+    rating_count = models.PositiveIntegerField(_("число отзывов"), default=0, db_default=0)
+    rating_sum = models.PositiveIntegerField(_("сумма оценок"), default=0, db_default=0)
+
     class Meta:
         verbose_name = _("владелец")
         verbose_name_plural = _("владельцы")
+        indexes = [
+            models.Index(fields=['-rating', 'user'], name='owner_rating_idx'),
+        ]
 
     def __str__(self):
         return f"Владелец: {self.user.email}"
@@ -121,14 +133,35 @@ class Specialist(models.Model):
         verbose_name="пользователь"
     )
     # Примеры полей
-    specialty = models.CharField(_("специализация"), max_length=150, blank=True)
+    # справочники core.Specialty / core.City (core/dimensions.py)
+    specialty = models.ForeignKey(
+        'core.Specialty',
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='specialists',
+        verbose_name=_("специализация")
+    )
     license_number = models.CharField(_("номер лицензии"), max_length=50, blank=True)
-    city = models.CharField(_("город работы"), max_length=100, blank=True)
-    rating = models.DecimalField(_("рейтинг"), max_digits=3, decimal_places=2, default=0.00)    
+    city = models.ForeignKey(
+        'core.City',
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='specialists',
+        verbose_name=_("город работы")
+    )
+    # Рейтинг по отзывам на завершённые наймы — обновляется инкрементально (reviews/ratings.py)
+    rating = models.DecimalField(_("рейтинг"), max_digits=3, decimal_places=2, default=0.00)
+    rating_count = models.PositiveIntegerField(_("число отзывов"), default=0, db_default=0)
+    rating_sum = models.PositiveIntegerField(_("сумма оценок"), default=0, db_default=0)
 
     class Meta:
         verbose_name = _("специалист")
         verbose_name_plural = _("специалисты")
+        indexes = [
+            models.Index(fields=['-rating', 'user'], name='specialist_rating_idx'),
+        ]
 
     def __str__(self):
-        return f"Специалист: {self.user.full_name}"
\ No newline at end of file
+        return f"Специалист: {self.user.email}"
\ No newline at end of file
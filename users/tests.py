@@ -1,3 +1,65 @@
+from django.contrib.auth.models import Group, Permission
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
-# Create your tests here.
+from EventMarket.testing import cached_auth
+
+from .models import BaseUser
+
+
+@cached_auth
+class AuthCacheTests(TestCase):
+    URL = '/admin/events/event/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.group = Group.objects.create(name='Поддержка')
+        cls.permission = Permission.objects.get(codename='view_event')
+        cls.group.permissions.add(cls.permission)
+        cls.staff = BaseUser.objects.create_user('support@example.com', 'password', is_staff=True)
+        cls.staff.groups.add(cls.group)
+
+    def setUp(self):
+        # откат транзакции теста не сбрасывает версии в кэше
+        cache.clear()
+        self.client.force_login(self.staff)
+
+    def auth_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.URL)
+        return response, [
+            q['sql'] for q in ctx.captured_queries
+            if 'django_session' in q['sql'] or '"auth_' in q['sql']
+            or q['sql'].startswith('SELECT "users_baseuser"."password"')
+        ]
+
+    def test_admin_page_needs_no_auth_queries_after_first_request(self):
+        response, first = self.auth_queries()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(first)
+        response, second = self.auth_queries()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(second, [])
+
+    def test_permission_and_flag_changes_invalidate_cache(self):
+        self.assertEqual(self.client.get(self.URL).status_code, 200)
+
+        self.group.permissions.remove(self.permission)
+        self.assertEqual(self.client.get(self.URL).status_code, 403)
+        self.permission.group_set.add(self.group)
+        self.assertEqual(self.client.get(self.URL).status_code, 200)
+
+        self.staff.groups.clear()
+        self.assertEqual(self.client.get(self.URL).status_code, 403)
+        self.group.user_set.add(self.staff)
+        self.assertEqual(self.client.get(self.URL).status_code, 200)
+
+        self.staff.is_staff = False
+        self.staff.save(update_fields=['is_staff'])
+        self.assertEqual(self.client.get(self.URL).status_code, 302)
+        self.staff.is_staff = True
+        self.staff.is_active = False
+        self.staff.save(update_fields=['is_staff', 'is_active'])
+        self.assertEqual(self.client.get(self.URL).status_code, 302)
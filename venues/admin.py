@@ -4,7 +4,10 @@ from django.utils.html import format_html
 from django.urls import reverse
 from django import forms
 
-from .models import Venue, VenueImage
+from core.admin import DatabaseCascadeDeleteMixin, DimensionListFilter, ShortIdSearchMixin
+from users.filters import ProfileListFilter
+
+from .models import Venue, VenueImage, VenuePricingRule
 
 
 class VenueImageInline(admin.TabularInline):
@@ -26,8 +29,18 @@ class VenueImageInline(admin.TabularInline):
         return "—"
 
 
+class VenuePricingRuleInline(admin.TabularInline):
+    """
+    Сезонные, праздничные и недельные правила цены площадки
+    """
+    model = VenuePricingRule
+    extra = 0
+    fields = ['name', 'date_from', 'date_to', 'weekdays', 'time_from', 'time_to', 'kind', 'value',
+              'priority', 'is_active']
+
+
 @admin.register(Venue)
-class VenueAdmin(admin.ModelAdmin):
+class VenueAdmin(ShortIdSearchMixin, DatabaseCascadeDeleteMixin, admin.ModelAdmin):
     list_display = [
         'name',
         'city',
@@ -44,8 +57,8 @@ class VenueAdmin(admin.ModelAdmin):
     list_filter = [
         'status',
         'is_verified',
-        'city',
-        'owner',
+        ('city', DimensionListFilter),
+        ('owner', ProfileListFilter),
         'created_at',
     ]
     
@@ -53,7 +66,7 @@ class VenueAdmin(admin.ModelAdmin):
         'name',
         'slug',
         'address',
-        'city',
+        'city__name',
         'owner__user__email',
         'description',
     ]
@@ -62,7 +75,9 @@ class VenueAdmin(admin.ModelAdmin):
     
     readonly_fields = ['created_at', 'updated_at', 'slug']
     
-    inlines = [VenueImageInline]
+    autocomplete_fields = ['owner', 'city']
+    
+    inlines = [VenueImageInline, VenuePricingRuleInline]
     
     fieldsets = (
         (None, {
@@ -141,11 +156,11 @@ class VenueAdmin(admin.ModelAdmin):
     # Оптимизация запросов
     def get_queryset(self, request):
         qs = super().get_queryset(request)
-        return qs.select_related('owner__user')
+        return qs.select_related('owner__user', 'city')
 
 
 @admin.register(VenueImage)
-class VenueImageAdmin(admin.ModelAdmin):
+class VenueImageAdmin(ShortIdSearchMixin, admin.ModelAdmin):
     list_display = [
         'venue_name',
         'preview_thumbnail',
@@ -159,6 +174,8 @@ class VenueImageAdmin(admin.ModelAdmin):
     
     readonly_fields = ['created_at', 'preview_full']
     
+    autocomplete_fields = ['venue']
+    
     fields = ['venue', 'image', 'preview_full', 'order', 'caption', 'created_at']
     
     @admin.display(description='Площадка')
@@ -1,6 +1,21 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class VenuesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'venues'
+
+    def ready(self):
+        from . import facets, pricing
+        from .models import Venue, VenuePricingRule
+
+        # индекс фасетов в памяти обновляется после коммита
+        post_save.connect(facets.venue_saved, sender=Venue, dispatch_uid='venues.facets.saved')
+        post_delete.connect(facets.venue_deleted, sender=Venue, dispatch_uid='venues.facets.deleted')
+
+        # скомпилированные правила цены сбрасываются после коммита
+        post_save.connect(pricing.venue_changed, sender=Venue, dispatch_uid='venues.pricing.venue_saved')
+        post_delete.connect(pricing.venue_changed, sender=Venue, dispatch_uid='venues.pricing.venue_deleted')
+        post_save.connect(pricing.rule_changed, sender=VenuePricingRule, dispatch_uid='venues.pricing.rule_saved')
+        post_delete.connect(pricing.rule_changed, sender=VenuePricingRule, dispatch_uid='venues.pricing.rule_deleted')
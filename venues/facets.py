@@ -0,0 +1,368 @@
+# venues/facets.py
+"""
+Фасетный поиск по опубликованным площадкам.
+
+Фасеты: город (id справочника ``core.City``), вместимость (корзины по
+``capacity_max``), цена за час, площадь и отметка о проверке. Внутри фасета выбранные значения
+объединяются по ИЛИ, между фасетами — по И; счётчики каждого фасета
+считаются с учётом фильтров по всем *остальным* фасетам (обычная схема
+«дизъюнктивных» фасетов — выбранный город не обнуляет остальные города).
+
+Основной движок — колоночный индекс в памяти процесса: площадке выдаётся
+слот, каждому значению фасета — битовое множество слотов (целое число
+Python). Счётчики — это ``AND`` масок и ``int.bit_count()``, все фасеты
+за один проход, без запросов к БД. Индекс строится при первом обращении,
+обновляется по сигналам ``Venue`` после коммита и целиком
+перечитывается раз в ``VENUE_FACETS_TTL`` секунд — так подхватываются
+изменения из других процессов и массовые ``UPDATE``/``COPY`` в обход сигналов.
+
+Запасной путь (``VENUE_FACETS_IN_MEMORY = False``) — один запрос
+``GROUPING SETS`` с ``count(*) FILTER (...)`` на каждый фасет.
+"""
+import threading
+import time
+from bisect import bisect_right
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+
+from core import dimensions
+from core.models import City
+
+from .models import Venue
+
+FACETS = ('city', 'capacity', 'price', 'area', 'verified')
+
+# Нижние границы корзин; номер корзины = число границ <= значения
+# (``bisect_right`` в Python, ``width_bucket`` в PostgreSQL)
+BUCKETS = {
+    'capacity': (21, 51, 101, 201, 501),     # человек, по capacity_max
+    'price': (2000, 5000, 10000, 20000),     # ₽ за час
+    'area': (50, 100, 200, 500),             # м²
+}
+
+BUCKET_FIELDS = {
+    'capacity': 'capacity_max',
+    'price': 'price_per_hour',
+    'area': 'area_sq_m',
+}
+
+COLUMNS = ['id', 'city_id', 'capacity_max', 'price_per_hour', 'area_sq_m', 'is_verified']
+
+
+class FacetError(ValueError):
+    pass
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def bucket(facet, value):
+    return None if value is None else bisect_right(BUCKETS[facet], value)
+
+
+def bucket_label(facet, n):
+    """Подпись корзины: «до 20», «21–50», «501+»; ``None`` — «не указано»."""
+    if n is None:
+        return "не указано"
+    edges = BUCKETS[facet]
+    if n == 0:
+        return f"до {edges[0] - 1}" if facet == 'capacity' else f"до {edges[0]}"
+    if n == len(edges):
+        return f"{edges[-1]}+"
+    return f"{edges[n - 1]}–{edges[n] - 1}" if facet == 'capacity' else f"{edges[n - 1]}–{edges[n]}"
+
+
+def facet_values(city, capacity_max, price_per_hour, area_sq_m, is_verified):
+    """Значения фасетов одной площадки в порядке ``FACETS``."""
+    return (
+        city,
+        bucket('capacity', capacity_max),
+        bucket('price', price_per_hour),
+        bucket('area', area_sq_m),
+        is_verified,
+    )
+
+
+def parse_filters(params):
+    """
+    Состояние фильтров из ``QueryDict`` (``?city=Москва&city=3&price=1&area=none&verified=1``)
+    → ``{фасет: frozenset значений}``; незнакомые параметры игнорируются.
+    Город — id или название в любом написании (по справочнику из кэша);
+    неизвестный город ничего не добавляет, и фильтр по нему пуст.
+    """
+    filters = {}
+    for facet in FACETS:
+        raw = [value for value in params.getlist(facet) if value != '']
+        if not raw:
+            continue
+        values = set()
+        for value in raw:
+            if facet == 'city':
+                city = int(value) if value.isdigit() else dimensions.lookup(City, value)
+                if city is not None:
+                    values.add(city)
+            elif facet == 'verified':
+                if value not in ('0', '1', 'true', 'false'):
+                    raise FacetError(f"Недопустимое значение verified: {value!r}")
+                values.add(value in ('1', 'true'))
+            elif value == 'none':
+                values.add(None)
+            else:
+                try:
+                    n = int(value)
+                except ValueError:
+                    raise FacetError(f"Недопустимая корзина {facet}: {value!r}") from None
+                if not 0 <= n <= len(BUCKETS[facet]):
+                    raise FacetError(f"Недопустимая корзина {facet}: {value!r}")
+                values.add(n)
+        filters[facet] = frozenset(values)
+    return filters
+
+
+def filter_q(filters):
+    """То же состояние фильтров как ``Q`` — для выборки самих площадок."""
+    q = Q(status='published')
+    for facet, values in filters.items():
+        if facet == 'city':
+            q &= Q(city_id__in=values)
+        elif facet == 'verified':
+            q &= Q(is_verified__in=values)
+        else:
+            field, edges = BUCKET_FIELDS[facet], BUCKETS[facet]
+            any_of = Q(pk__in=[])
+            for n in values:
+                if n is None:
+                    any_of |= Q(**{f'{field}__isnull': True})
+                    continue
+                part = Q()
+                if n > 0:
+                    part &= Q(**{f'{field}__gte': edges[n - 1]})
+                if n < len(edges):
+                    part &= Q(**{f'{field}__lt': edges[n]})
+                any_of |= part & Q(**{f'{field}__isnull': False})
+            q &= any_of
+    return q
+
+
+@dataclass
+class FacetCounts:
+    total: int
+    facets: dict    # {фасет: {значение: число площадок}}, без нулевых
+
+
+# ────────────────────────────────────────────────
+# Индекс в памяти
+# ────────────────────────────────────────────────
+
+class FacetIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.loaded_at = None
+        self._reset()
+
+    def _reset(self):
+        self.slots = {}         # pk → слот
+        self.values = []        # слот → значения фасетов (или None — свободен)
+        self.free = []
+        self.occupied = 0
+        self.bits = {facet: {} for facet in FACETS}
+
+    @property
+    def stale(self):
+        return self.loaded_at is None or time.monotonic() - self.loaded_at > _setting('VENUE_FACETS_TTL', 300)
+
+    def load(self, chunk_size=5000):
+        """Полная перестройка: битовые множества собираются в ``bytearray`` и переводятся в int разом."""
+        rows = Venue.objects.filter(status='published').values_list(*COLUMNS).iterator(chunk_size=chunk_size)
+        slots, values = {}, []
+        for pk, *columns in rows:
+            slots[pk] = len(values)
+            values.append(facet_values(*columns))
+        size = (len(values) + 7) // 8
+        bits = {facet: {} for facet in FACETS}
+        for slot, row in enumerate(values):
+            byte, mask = slot >> 3, 1 << (slot & 7)
+            for facet, value in zip(FACETS, row):
+                array = bits[facet].get(value)
+                if array is None:
+                    array = bits[facet][value] = bytearray(size)
+                array[byte] |= mask
+        with self.lock:
+            self._reset()
+            self.slots, self.values = slots, values
+            self.occupied = (1 << len(values)) - 1
+            self.bits = {
+                facet: {value: int.from_bytes(array, 'little') for value, array in by_value.items()}
+                for facet, by_value in bits.items()
+            }
+            self.loaded_at = time.monotonic()
+        return len(values)
+
+    def ensure_fresh(self):
+        if self.stale:
+            self.load()
+
+    def put(self, pk, row):
+        with self.lock:
+            self._discard(pk)
+            slot = self.free.pop() if self.free else len(self.values)
+            if slot == len(self.values):
+                self.values.append(row)
+            else:
+                self.values[slot] = row
+            self.slots[pk] = slot
+            bit = 1 << slot
+            self.occupied |= bit
+            for facet, value in zip(FACETS, row):
+                self.bits[facet][value] = self.bits[facet].get(value, 0) | bit
+
+    def discard(self, pk):
+        with self.lock:
+            self._discard(pk)
+
+    def _discard(self, pk):
+        slot = self.slots.pop(pk, None)
+        if slot is None:
+            return
+        bit = 1 << slot
+        self.occupied &= ~bit
+        for facet, value in zip(FACETS, self.values[slot]):
+            remaining = self.bits[facet][value] & ~bit
+            if remaining:
+                self.bits[facet][value] = remaining
+            else:
+                del self.bits[facet][value]
+        self.values[slot] = None
+        self.free.append(slot)
+
+    def _mask(self, facet, values):
+        by_value, mask = self.bits[facet], 0
+        for value in values:
+            mask |= by_value.get(value, 0)
+        return mask
+
+    def counts(self, filters):
+        with self.lock:
+            masks = {facet: self._mask(facet, values) for facet, values in filters.items()}
+            matched = self.occupied
+            for mask in masks.values():
+                matched &= mask
+            facets = {}
+            for facet in FACETS:
+                base = self.occupied
+                for other, mask in masks.items():
+                    if other != facet:
+                        base &= mask
+                counts = {}
+                for value, bits in self.bits[facet].items():
+                    count = (base & bits).bit_count()
+                    if count:
+                        counts[value] = count
+                facets[facet] = counts
+            return FacetCounts(matched.bit_count(), facets)
+
+
+index = FacetIndex()
+
+
+# ────────────────────────────────────────────────
+# Запасной путь: один запрос к БД
+# ────────────────────────────────────────────────
+
+def _condition(facet, values):
+    """SQL-условие фасета по колонкам CTE ``v`` и его параметры."""
+    parts, params = [], []
+    present = [value for value in values if value is not None]
+    if present:
+        parts.append(f'{facet} = ANY(%s)')
+        params.append(present)
+    if None in values:
+        parts.append(f'{facet} IS NULL')
+    return '(' + (' OR '.join(parts) or 'false') + ')', params
+
+
+def db_counts(filters):
+    """Все счётчики одним проходом: ``GROUPING SETS`` по фасетам + пустой набор для итога."""
+    conditions = {facet: _condition(facet, values) for facet, values in filters.items()}
+
+    def where(exclude=None):
+        sql = [cond for facet, (cond, _p) in conditions.items() if facet != exclude]
+        params = [p for facet, (_c, ps) in conditions.items() if facet != exclude for p in ps]
+        return ' AND '.join(sql) or 'true', params
+
+    aggregates, agg_params = [], []
+    for facet in (*FACETS, None):
+        sql, params = where(facet)
+        aggregates.append(f'count(*) FILTER (WHERE {sql})')
+        agg_params += params
+
+    table = connection.ops.quote_name(Venue._meta.db_table)
+    sql = f'''
+        WITH v AS (
+            SELECT city_id AS city,
+                   width_bucket(capacity_max, %s::integer[]) AS capacity,
+                   width_bucket(price_per_hour, %s::numeric[]) AS price,
+                   width_bucket(area_sq_m, %s::integer[]) AS area,
+                   is_verified AS verified
+            FROM {table} WHERE status = 'published'
+        )
+        SELECT GROUPING({', '.join(FACETS)}), {', '.join(FACETS)}, {', '.join(aggregates)}
+        FROM v
+        GROUP BY GROUPING SETS ({', '.join(f'({facet})' for facet in FACETS)}, ())
+    '''
+    params = [list(BUCKETS['capacity']), list(BUCKETS['price']), list(BUCKETS['area']), *agg_params]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    total, facets = 0, {facet: {} for facet in FACETS}
+    width = len(FACETS)
+    for grouping, *rest in rows:
+        keys, counts = rest[:width], rest[width:]
+        if grouping == (1 << width) - 1:
+            total = counts[width]
+            continue
+        # бит GROUPING = 0 у колонки, по которой сгруппирована строка
+        i = next(i for i in range(width) if not grouping >> (width - 1 - i) & 1)
+        if counts[i]:
+            facets[FACETS[i]][keys[i]] = counts[i]
+    return FacetCounts(total, facets)
+
+
+def facet_counts(filters):
+    if _setting('VENUE_FACETS_IN_MEMORY', True):
+        index.ensure_fresh()
+        return index.counts(filters)
+    return db_counts(filters)
+
+
+# ────────────────────────────────────────────────
+# Обновление по сигналам
+# ────────────────────────────────────────────────
+
+def _refresh(pk, row):
+    if index.loaded_at is None:
+        return
+    if row is None:
+        index.discard(pk)
+    else:
+        index.put(pk, row)
+
+
+def venue_saved(sender, instance, **kwargs):
+    row = None
+    if instance.status == 'published':
+        row = facet_values(
+            instance.city_id, instance.capacity_max, instance.price_per_hour,
+            instance.area_sq_m, instance.is_verified,
+        )
+    transaction.on_commit(lambda: _refresh(instance.pk, row))
+
+
+def venue_deleted(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: _refresh(pk, None))
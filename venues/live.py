@@ -0,0 +1,394 @@
+# venues/live.py
+"""
+Занятость площадки в реальном времени: Server-Sent Events поверх ASGI.
+
+``GET /venues/<slug>/availability/stream/`` отдаёт поток ``text/event-stream``:
+сначала событие ``snapshot`` — занятые слоты на ``VENUE_LIVE_DAYS`` вперёд,
+затем событие ``booking`` на каждое создание, изменение или отмену брони
+этой площадки. Клиент календаря держит одно соединение вместо опроса.
+
+Поток обслуживает ``stream`` — ASGI-приложение, которое
+``EventMarket/asgi.py`` вызывает мимо Django: у соединения нет запроса,
+middleware и потока синхронного обработчика, только корутина, очередь и
+задача, ждущая ``http.disconnect``. Поэтому один процесс держит тысячи
+простаивающих соединений; пинг — одна задача на процесс, а не таймер на
+соединение.
+
+Источник изменений — журнал ``core/outbox.py`` (тема ``bookings.booking``):
+в него попадает любая запись брони — ``save``, ``update``, снятие
+удержаний, каскадное удаление. Процесс читает журнал как потребитель
+``venue_availability`` (``VENUE_LIVE_RELAY``), просыпаясь по
+``NOTIFY outbox``, и рассылает дельты через ``VENUE_LIVE_BACKEND``:
+
+* ``LocalBroadcast`` — внутри процесса; для одного воркера;
+* ``PostgresBroadcast`` — через ``NOTIFY venue_availability``: пачку
+  журнала забирает один из воркеров (``SKIP LOCKED``), а рассылку
+  получают все — каждый отдаёт её своим соединениям.
+
+При старте процесса потребитель переносится к голове журнала: дельты,
+записанные раньше последнего пинга, устарели (подключившийся клиент
+получает снимок), а каждый живой воркер успел бы их разослать сам.
+Снимки отдаются только после этого переноса — изменение между снимком и
+позицией не теряется.
+
+Синхронная работа с БД идёт в общем потоке ``sync_to_async`` мимо цикла
+запроса Django, поэтому ``_sync`` сам вызывает ``close_old_connections``
+до и после: после рестарта БД или обрыва сети соединение переоткрывается,
+а не падает до перезапуска процесса.
+
+Соединение, которое не успевает читать (очередь ``VENUE_LIVE_QUEUE``
+переполнена), получает вместо хвоста дельт новый снимок. Новый снимок
+получают и при изменении серии броней (core/recurrence.py): в снимке её
+занятия уже развёрнуты на окно, а дельта одной строки их не передаст.
+"""
+import asyncio
+import json
+import logging
+import re
+from collections import defaultdict
+from datetime import timedelta
+
+import psycopg
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections, connection
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from bookings.models import BLOCKING_STATUSES, Booking
+from core import lookup, outbox
+
+from .models import Venue
+
+PATH = re.compile(r'^/venues/(?P<slug>[-\w]+)/availability/stream/$')
+
+CONSUMER = 'venue_availability'
+CHANNEL = 'venue_availability'
+TOPIC = 'bookings.booking'
+
+PING = object()
+RESYNC = object()
+CLOSED = object()
+
+# Полезная нагрузка NOTIFY ограничена 8000 байт
+NOTIFY_PAYLOAD_BYTES = 7500
+
+logger = logging.getLogger(__name__)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _json(data):
+    return json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(',', ':'))
+
+
+def _sync(func):
+    """``func`` в потоке Django с проверкой соединения до и после — как в цикле запроса."""
+    def run(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return sync_to_async(run, thread_sensitive=True)
+
+
+# ────────────────────────────────────────────────
+# Сообщения
+# ────────────────────────────────────────────────
+
+def booking_message(entry):
+    """Запись журнала о брони → ``(id площадки, дельта)``."""
+    row = entry.payload
+    busy = entry.op != 'delete' and row['status'] in BLOCKING_STATUSES
+    return row['venue_id'], {
+        'booking': row['id'],
+        'start': row['start_datetime'],
+        'end': row['end_datetime'],
+        'status': 'deleted' if entry.op == 'delete' else row['status'],
+        'busy': busy,
+        # удержание освобождает слот само, без записи в БД — срок знает клиент
+        'hold_until': row['hold_expires_at'] if busy else None,
+        'series': bool(row.get('recurrence')),
+    }
+
+
+def snapshot(venue_id, now=None):
+    """Занятые слоты площадки от ``now`` на ``VENUE_LIVE_DAYS`` дней."""
+    now = now or timezone.now()
+    end = now + timedelta(days=_setting('VENUE_LIVE_DAYS', 60))
+    slots = sorted(
+        Booking.objects.filter(venue_id=venue_id).blocking(now).order_by().only(
+            'start_datetime', 'end_datetime', 'status', 'hold_expires_at', 'recurrence', 'recurrence_exdates',
+        ).occurrences(now, end),
+        key=lambda slot: slot[1],
+    )
+    return {
+        'venue': venue_id,
+        'from': now,
+        'to': end,
+        'busy': [
+            {'booking': booking.pk, 'start': start, 'end': finish, 'status': booking.status,
+             'hold_until': booking.hold_expires_at}
+            for booking, start, finish in slots
+        ],
+    }
+
+
+def skip_backlog(now=None):
+    """Переносит потребителя к голове журнала, оставляя записи последнего пинга."""
+    now = now or timezone.now()
+    outbox.acknowledge(CONSUMER, outbox.head(before=now - timedelta(seconds=_setting('VENUE_LIVE_KEEPALIVE', 25))))
+
+
+def publish_entries(entries):
+    """
+    Обработчик пачки журнала: дельты броней — в ``broadcast()``. Для
+    ``relay_outbox`` в отдельном процессе (``OUTBOX_CONSUMERS``) при
+    ``PostgresBroadcast`` и ``VENUE_LIVE_RELAY = False``.
+    """
+    broadcast().publish_entries(entries)
+
+
+# ────────────────────────────────────────────────
+# Рассылка
+# ────────────────────────────────────────────────
+
+class Subscription:
+    """Соединение-подписчик: очередь сообщений одной площадки."""
+    __slots__ = ('venue_id', 'queue')
+
+    def __init__(self, venue_id, size):
+        self.venue_id = venue_id
+        self.queue = asyncio.Queue(size)
+
+    def put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # клиент не успевает — вместо хвоста дельт он получит новый снимок
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+
+    def close(self):
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(CLOSED)
+
+
+class LocalBroadcast:
+    """
+    Рассылка внутри процесса. Фоновые задачи (пинг, чтение журнала)
+    запускаются в цикле событий первой подпиской.
+    """
+    channels = [outbox.CHANNEL]
+
+    def __init__(self):
+        self.subscribers = defaultdict(set)
+        self.loop = None
+        self.tasks = []
+        self.ready = None    # asyncio.Event: потребитель перенесён к голове журнала
+
+    def subscribe(self, venue_id):
+        self.start()
+        subscription = Subscription(venue_id, _setting('VENUE_LIVE_QUEUE', 64))
+        self.subscribers[venue_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        subscribers = self.subscribers.get(subscription.venue_id)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self.subscribers[subscription.venue_id]
+
+    def deliver(self, messages):
+        """``[(id площадки, сообщение)]`` — подписчикам этого процесса."""
+        for venue_id, message in messages:
+            for subscription in tuple(self.subscribers.get(str(venue_id), ())):
+                # занятия серии в окне клиента — только в новом снимке
+                subscription.put(RESYNC if message.get('series') else message)
+
+    def publish_entries(self, entries):
+        self.publish([booking_message(entry) for entry in entries if entry.topic == TOPIC])
+
+    def publish(self, messages):
+        """Рассылает сообщения; можно вызывать из любого потока."""
+        if messages and self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.deliver, messages)
+
+    # фоновые задачи
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        if self.loop is loop:
+            return
+        self.loop = loop
+        self.ready = asyncio.Event()
+        self.tasks = [loop.create_task(self.keepalive()), loop.create_task(self.listen())]
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.loop, self.tasks, self.ready = None, [], None
+
+    async def keepalive(self):
+        while True:
+            await asyncio.sleep(_setting('VENUE_LIVE_KEEPALIVE', 25))
+            for subscribers in self.subscribers.values():
+                for subscription in subscribers:
+                    if subscription.queue.empty():
+                        subscription.put(PING)
+
+    async def listen(self):
+        """``LISTEN`` на своём соединении; журнал дочитывается по уведомлению и раз в пинг."""
+        while True:
+            try:
+                if not self.ready.is_set():
+                    if _setting('VENUE_LIVE_RELAY', True):
+                        await _sync(skip_backlog)()
+                    self.ready.set()
+                async with await psycopg.AsyncConnection.connect(**_connection_params(), autocommit=True) as conn:
+                    for channel in self.channels:
+                        await conn.execute(f'LISTEN {channel}')
+                    wake = True
+                    while True:
+                        if wake:
+                            await self.relay()
+                        wake = True  # без уведомлений — раз в пинг
+                        async for notify in conn.notifies(timeout=_setting('VENUE_LIVE_KEEPALIVE', 25), stop_after=1):
+                            self.notified(notify)
+                            wake = notify.channel == outbox.CHANNEL
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Поток занятости площадок: соединение с БД потеряно")
+                await asyncio.sleep(1)
+
+    def notified(self, notify):
+        pass
+
+    async def relay(self):
+        if _setting('VENUE_LIVE_RELAY', True):
+            await _sync(outbox.drain)(CONSUMER, self.publish_entries, topics=[TOPIC])
+
+
+class PostgresBroadcast(LocalBroadcast):
+    """
+    Рассылка между воркерами через ``NOTIFY venue_availability``. Сообщения
+    уходят при коммите пачки журнала — вместе со сдвигом позиции.
+    """
+    channels = [outbox.CHANNEL, CHANNEL]
+
+    def publish(self, messages):
+        if not messages:
+            return
+        payloads, chunk, size = [], [], 0
+        for venue_id, message in messages:
+            item = _json([venue_id, message])
+            if chunk and size + len(item.encode()) > NOTIFY_PAYLOAD_BYTES:
+                payloads.append(f"[{','.join(chunk)}]")
+                chunk, size = [], 0
+            chunk.append(item)
+            size += len(item.encode()) + 1
+        payloads.append(f"[{','.join(chunk)}]")
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, p) FROM unnest(%s::text[]) p', [CHANNEL, payloads])
+
+    def notified(self, notify):
+        if notify.channel == CHANNEL:
+            self.deliver(json.loads(notify.payload))
+
+
+def _connection_params():
+    params = connection.settings_dict
+    keys = {'NAME': 'dbname', 'USER': 'user', 'PASSWORD': 'password', 'HOST': 'host', 'PORT': 'port'}
+    return {arg: params[key] for key, arg in keys.items() if params.get(key)}
+
+
+_broadcast = None
+
+
+def broadcast():
+    """Рассылка процесса (``VENUE_LIVE_BACKEND``)."""
+    global _broadcast
+    if _broadcast is None:
+        _broadcast = import_string(_setting('VENUE_LIVE_BACKEND', 'venues.live.LocalBroadcast'))()
+    return _broadcast
+
+
+# ────────────────────────────────────────────────
+# ASGI
+# ────────────────────────────────────────────────
+
+def match(scope):
+    return scope['type'] == 'http' and PATH.match(scope['path'])
+
+
+def _find_venue(slug):
+    try:
+        return str(lookup.get_by_slug(Venue.objects.filter(status='published'), slug).pk)
+    except Venue.DoesNotExist:
+        return None
+
+
+def _event(name, data):
+    return f'event: {name}\ndata: {_json(data)}\n\n'.encode()
+
+
+async def _plain(send, status, text):
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'text/plain; charset=utf-8')]})
+    await send({'type': 'http.response.body', 'body': text.encode()})
+
+
+async def stream(scope, receive, send):
+    """ASGI-приложение потока занятости одной площадки."""
+    if scope['method'] != 'GET':
+        return await _plain(send, 405, 'Method Not Allowed')
+    venue_id = await _sync(_find_venue)(match(scope)['slug'])
+    if venue_id is None:
+        return await _plain(send, 404, 'Not Found')
+
+    hub = broadcast()
+    # подписка раньше снимка: бронь, изменённая между ними, придёт дельтой
+    subscription = hub.subscribe(venue_id)
+
+    async def watch_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        subscription.close()
+
+    watcher = asyncio.create_task(watch_disconnect())
+    try:
+        try:
+            # снимок — только после переноса потребителя к голове журнала
+            await asyncio.wait_for(hub.ready.wait(), _setting('VENUE_LIVE_KEEPALIVE', 25))
+        except TimeoutError:
+            pass  # БД недоступна — снимок ниже сообщит об ошибке сам
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [
+            (b'content-type', b'text/event-stream; charset=utf-8'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),
+        ]})
+        message = RESYNC
+        while message is not CLOSED:
+            if message is RESYNC:
+                chunk = b'retry: 5000\n' + _event('snapshot', await _sync(snapshot)(venue_id))
+            elif message is PING:
+                chunk = b': ping\n\n'
+            else:
+                chunk = _event('booking', message)
+            await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            message = await subscription.queue.get()
+        await send({'type': 'http.response.body', 'body': b''})
+    except OSError:
+        pass  # клиент ушёл посреди отправки
+    finally:
+        hub.unsubscribe(subscription)
+        watcher.cancel()
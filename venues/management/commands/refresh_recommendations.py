@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from venues import recommendations
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает рекомендации площадок (соседи по совместным бронированиям и "
+        "площадки для тематик); по умолчанию — только изменившееся по журналу броней, раз в сутки"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help="перестроить соседей всех площадок (например, раз в неделю)")
+        parser.add_argument('--batch-size', type=int, default=None, help="записей журнала в пачке")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        result = recommendations.refresh(options['full'], options['batch_size'])
+        elapsed = time.perf_counter() - started
+        venues = "все" if result.venues is None else result.venues
+        self.stdout.write(
+            f"Записей журнала: {result.entries}; площадок пересчитано: {venues}; "
+            f"соседей: {result.neighbors}; площадок для тематик: {result.themes}"
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{'Полная перестройка' if result.full else 'Обновление'} за {elapsed:.2f} с"
+        ))
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.9 on 2026-10-19 03:50
+
+import django.db.models.deletion
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+def backfill_city(apps, schema_editor):
+    from core import dimensions
+
+    dimensions.backfill('venues_venue', 'id', 'city', 'city_ref_id', 'core_city')
+
+
+def restore_city(apps, schema_editor):
+    schema_editor.execute(
+        'UPDATE venues_venue v SET city = c.name FROM core_city c WHERE c.id = v.city_ref_id'
+    )
+
+
+class Migration(migrations.Migration):
+    # Текстовый город → ссылка на core.City. Ссылка заполняется пачками по
+    # pk (core/dimensions.py), каждая пачка — своя транзакция; индекс
+    # (city, status) по новой колонке строится CONCURRENTLY
+    atomic = False
+
+    dependencies = [
+        ('core', '0002_city_specialty'),
+        ('venues', '0002_venue_uuid7_ids'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='venue',
+            name='city_ref',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.city'),
+        ),
+        # старая колонка — NULL-допустимая, чтобы откат мог вернуть её до заполнения
+        migrations.AlterField(
+            model_name='venue',
+            name='city',
+            field=models.CharField(max_length=100, null=True, verbose_name='город'),
+        ),
+        migrations.RunPython(backfill_city, restore_city),
+        migrations.RemoveIndex(
+            model_name='venue',
+            name='venues_venu_city_085ce0_idx',
+        ),
+        migrations.RemoveField(
+            model_name='venue',
+            name='city',
+        ),
+        migrations.RenameField(
+            model_name='venue',
+            old_name='city_ref',
+            new_name='city',
+        ),
+        migrations.AlterField(
+            model_name='venue',
+            name='city',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='venues', to='core.city', verbose_name='город'),
+        ),
+        AddIndexConcurrently(
+            model_name='venue',
+            index=models.Index(fields=['city', 'status'], name='venues_venu_city_id_75e1d9_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.9 on 2026-10-19 04:29
+
+import django.contrib.postgres.fields
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('venues', '0003_venue_city_dimension'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VenuePricingRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='например: выходные, лето, Новый год', max_length=100, verbose_name='название')),
+                ('date_from', models.DateField(blank=True, null=True, verbose_name='с даты')),
+                ('date_to', models.DateField(blank=True, null=True, verbose_name='по дату (включительно)')),
+                ('weekdays', django.contrib.postgres.fields.ArrayField(base_field=models.PositiveSmallIntegerField(choices=[(0, 'пн'), (1, 'вт'), (2, 'ср'), (3, 'чт'), (4, 'пт'), (5, 'сб'), (6, 'вс')]), blank=True, default=list, help_text='0 — понедельник … 6 — воскресенье; пусто — все дни', size=None, verbose_name='дни недели')),
+                ('time_from', models.TimeField(blank=True, null=True, verbose_name='с часа')),
+                ('time_to', models.TimeField(blank=True, help_text='пусто — до конца суток', null=True, verbose_name='до часа')),
+                ('kind', models.CharField(choices=[('multiplier', 'множитель к цене за час'), ('override', 'своя цена за час')], default='multiplier', max_length=20, verbose_name='тип')),
+                ('value', models.DecimalField(decimal_places=2, help_text='множитель (1.50) или цена за час в ₽', max_digits=10, verbose_name='значение')),
+                ('priority', models.SmallIntegerField(default=0, help_text='при пересечении действует больший', verbose_name='приоритет')),
+                ('is_active', models.BooleanField(default=True, verbose_name='действует')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='создано')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='обновлено')),
+                ('venue', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pricing_rules', to='venues.venue', verbose_name='площадка')),
+            ],
+            options={
+                'verbose_name': 'правило цены',
+                'verbose_name_plural': 'правила цены',
+                'ordering': ['venue', '-priority', 'pk'],
+                'constraints': [models.CheckConstraint(condition=models.Q(('value__gt', 0)), name='pricing_rule_value_positive', violation_error_message='Значение правила должно быть больше нуля'), models.CheckConstraint(condition=models.Q(('date_from__isnull', True), ('date_to__isnull', True), ('date_to__gte', models.F('date_from')), _connector='OR'), name='pricing_rule_date_range', violation_error_message='Дата окончания раньше даты начала')],
+            },
+        ),
+    ]
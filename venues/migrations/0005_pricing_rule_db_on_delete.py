@@ -0,0 +1,36 @@
+from django.db import migrations
+
+
+def _cascade_in_db(apps, schema_editor, action='CASCADE'):
+    # как в core/0001_db_on_delete: ON DELETE на стороне БД для core/deletion.py;
+    # таблица только что создана и пуста, поэтому без NOT VALID
+    field = apps.get_model('venues', 'VenuePricingRule')._meta.get_field('venue')
+    table, q = field.model._meta.db_table, schema_editor.quote_name
+    target = (field.related_model._meta.db_table, field.target_field.column)
+    with schema_editor.connection.cursor() as cursor:
+        constraints = schema_editor.connection.introspection.get_constraints(cursor, table)
+    name = next(
+        name for name, info in constraints.items()
+        if info['foreign_key'] == target and info['columns'] == [field.column]
+    )
+    schema_editor.execute(
+        f'ALTER TABLE {q(table)} DROP CONSTRAINT {q(name)}, '
+        f'ADD CONSTRAINT {q(name)} FOREIGN KEY ({q(field.column)}) '
+        f'REFERENCES {q(target[0])} ({q(target[1])}) ON DELETE {action} DEFERRABLE INITIALLY DEFERRED'
+    )
+
+
+def _no_action_in_db(apps, schema_editor):
+    _cascade_in_db(apps, schema_editor, action='NO ACTION')
+
+
+class Migration(migrations.Migration):
+    # отдельно от 0004: внешний ключ создаётся отложенным SQL в конце миграции
+
+    dependencies = [
+        ('venues', '0004_venue_pricing_rule'),
+    ]
+
+    operations = [
+        migrations.RunPython(_cascade_in_db, _no_action_in_db),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.9 on 2026-10-19 04:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('venues', '0005_pricing_rule_db_on_delete'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ThemeVenue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('theme', models.CharField(max_length=40, verbose_name='тематика')),
+                ('guests', models.PositiveSmallIntegerField(verbose_name='корзина числа гостей')),
+                ('rank', models.PositiveSmallIntegerField(verbose_name='место')),
+                ('score', models.FloatField(verbose_name='соответствие')),
+                ('events', models.PositiveIntegerField(verbose_name='мероприятий')),
+                ('venue', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='theme_ranks', to='venues.venue', verbose_name='площадка')),
+            ],
+            options={
+                'verbose_name': 'площадка для тематики',
+                'verbose_name_plural': 'площадки для тематик',
+                'ordering': ['theme', 'guests', 'rank'],
+                'constraints': [models.UniqueConstraint(fields=('theme', 'guests', 'rank'), name='theme_venue_rank')],
+            },
+        ),
+        migrations.CreateModel(
+            name='VenueNeighbor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField(verbose_name='место')),
+                ('score', models.FloatField(verbose_name='сходство')),
+                ('renters', models.PositiveIntegerField(verbose_name='общих арендаторов')),
+                ('neighbor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='neighbor_of', to='venues.venue', verbose_name='соседняя площадка')),
+                ('venue', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='neighbors', to='venues.venue', verbose_name='площадка')),
+            ],
+            options={
+                'verbose_name': 'соседняя площадка',
+                'verbose_name_plural': 'соседние площадки',
+                'ordering': ['venue', 'rank'],
+                'constraints': [models.UniqueConstraint(fields=('venue', 'rank'), name='venue_neighbor_rank')],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+from django.db import migrations
+
+# (модель, поле) — ON DELETE CASCADE, как в core.deletion.DB_ON_DELETE
+FOREIGN_KEYS = [
+    ('VenueNeighbor', 'venue'),
+    ('VenueNeighbor', 'neighbor'),
+    ('ThemeVenue', 'venue'),
+]
+
+
+def _cascade_in_db(apps, schema_editor, action='CASCADE'):
+    # как в 0005: таблицы только что созданы и пусты, поэтому без NOT VALID
+    q = schema_editor.quote_name
+    for model_name, field_name in FOREIGN_KEYS:
+        field = apps.get_model('venues', model_name)._meta.get_field(field_name)
+        table = field.model._meta.db_table
+        target = (field.related_model._meta.db_table, field.target_field.column)
+        with schema_editor.connection.cursor() as cursor:
+            constraints = schema_editor.connection.introspection.get_constraints(cursor, table)
+        name = next(
+            name for name, info in constraints.items()
+            if info['foreign_key'] == target and info['columns'] == [field.column]
+        )
+        schema_editor.execute(
+            f'ALTER TABLE {q(table)} DROP CONSTRAINT {q(name)}, '
+            f'ADD CONSTRAINT {q(name)} FOREIGN KEY ({q(field.column)}) '
+            f'REFERENCES {q(target[0])} ({q(target[1])}) ON DELETE {action} DEFERRABLE INITIALLY DEFERRED'
+        )
+
+
+def _no_action_in_db(apps, schema_editor):
+    _cascade_in_db(apps, schema_editor, action='NO ACTION')
+
+
+class Migration(migrations.Migration):
+    # отдельно от 0006: внешние ключи создаются отложенным SQL в конце миграции
+
+    dependencies = [
+        ('venues', '0006_venue_recommendations'),
+    ]
+
+    operations = [
+        migrations.RunPython(_cascade_in_db, _no_action_in_db),
+    ]
@@ -1,15 +1,20 @@
+from django.contrib.postgres.fields import ArrayField
 from django.db import models
+from django.db.models import F, Q
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.conf import settings
-import uuid
+
+from core import dimensions
+from core.ids import uuid7
+from core.models import City
 
 
 class Venue(models.Model):
     """
     Площадка / Venue — место, которое сдаёт Owner
     """
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     owner = models.ForeignKey(
         'users.Owner',
         on_delete=models.CASCADE,
@@ -25,7 +30,14 @@ class Venue(models.Model):
     
     # Адрес и геолокация
     address = models.CharField(_("адрес"), max_length=300)
-    city = models.CharField(_("город"), max_length=100, db_index=True)
+    # справочник core.City; отдельный индекс не нужен — city первая в (city, status)
+    city = models.ForeignKey(
+        'core.City',
+        on_delete=models.PROTECT,
+        db_index=False,
+        related_name='venues',
+        verbose_name=_("город")
+    )
     postal_code = models.CharField(_("почтовый индекс"), max_length=20, blank=True)
     latitude = models.DecimalField(
         _("широта"), 
@@ -140,7 +152,8 @@ class Venue(models.Model):
         ]
 
     def __str__(self):
-        return f"{self.name} ({self.city})"
+        # название города — из кэша справочника, без запроса на каждую площадку
+        return f"{self.name} ({dimensions.names(City).get(self.city_id)})"
 
     def get_absolute_url(self):
         # пример — если используешь slug
@@ -161,4 +174,141 @@ class VenueImage(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
-        ordering = ['order', 'created_at']
\ No newline at end of file
+        ordering = ['order', 'created_at']
+
+
+class VenuePricingRule(models.Model):
+    """
+    Правило цены площадки: сезон, выходные, праздник, вечерние часы.
+
+    Условия (даты, дни недели, часы) проверяются по местному времени и
+    объединяются по И; пустое условие — без ограничения. Часы «с 22:00 до
+    06:00» переходят через полночь. Если час подходит под несколько правил,
+    действует правило с большим приоритетом. Скомпилированные правила
+    держатся в памяти процесса (``venues/pricing.py``).
+    """
+    KIND_CHOICES = [
+        ('multiplier', _("множитель к цене за час")),
+        ('override',   _("своя цена за час")),
+    ]
+    WEEKDAY_CHOICES = [
+        (0, _("пн")), (1, _("вт")), (2, _("ср")), (3, _("чт")), (4, _("пт")), (5, _("сб")), (6, _("вс")),
+    ]
+
+    venue = models.ForeignKey(
+        Venue,
+        on_delete=models.CASCADE,
+        related_name='pricing_rules',
+        verbose_name=_("площадка")
+    )
+    name = models.CharField(_("название"), max_length=100, help_text="например: выходные, лето, Новый год")
+
+    date_from = models.DateField(_("с даты"), null=True, blank=True)
+    date_to = models.DateField(_("по дату (включительно)"), null=True, blank=True)
+    weekdays = ArrayField(
+        models.PositiveSmallIntegerField(choices=WEEKDAY_CHOICES),
+        verbose_name=_("дни недели"),
+        default=list,
+        blank=True,
+        help_text="0 — понедельник … 6 — воскресенье; пусто — все дни"
+    )
+    time_from = models.TimeField(_("с часа"), null=True, blank=True)
+    time_to = models.TimeField(_("до часа"), null=True, blank=True, help_text="пусто — до конца суток")
+
+    kind = models.CharField(_("тип"), max_length=20, choices=KIND_CHOICES, default='multiplier')
+    value = models.DecimalField(
+        _("значение"),
+        max_digits=10,
+        decimal_places=2,
+        help_text="множитель (1.50) или цена за час в ₽"
+    )
+    priority = models.SmallIntegerField(_("приоритет"), default=0, help_text="при пересечении действует больший")
+    is_active = models.BooleanField(_("действует"), default=True)
+
+    created_at = models.DateTimeField(_("создано"), auto_now_add=True)
+    updated_at = models.DateTimeField(_("обновлено"), auto_now=True)
+
+    class Meta:
+        verbose_name = _("правило цены")
+        verbose_name_plural = _("правила цены")
+        ordering = ['venue', '-priority', 'pk']
+        constraints = [
+            models.CheckConstraint(
+                condition=Q(value__gt=0),
+                name='pricing_rule_value_positive',
+                violation_error_message=_("Значение правила должно быть больше нуля"),
+            ),
+            models.CheckConstraint(
+                condition=Q(date_from__isnull=True) | Q(date_to__isnull=True) | Q(date_to__gte=F('date_from')),
+                name='pricing_rule_date_range',
+                violation_error_message=_("Дата окончания раньше даты начала"),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.get_kind_display()} {self.value})"
+
+
+class VenueNeighbor(models.Model):
+    """
+    «Кто бронировал эту площадку, бронировал и…» — готовый топ-N соседей
+    площадки по совместным бронированиям (``venues/recommendations.py``).
+    Показ — один проход по уникальному индексу ``(venue, rank)``.
+    """
+    venue = models.ForeignKey(
+        Venue,
+        on_delete=models.CASCADE,
+        db_index=False,     # первая колонка в (venue, rank)
+        related_name='neighbors',
+        verbose_name=_("площадка")
+    )
+    neighbor = models.ForeignKey(
+        Venue,
+        on_delete=models.CASCADE,
+        related_name='neighbor_of',
+        verbose_name=_("соседняя площадка")
+    )
+    rank = models.PositiveSmallIntegerField(_("место"))
+    score = models.FloatField(_("сходство"))
+    renters = models.PositiveIntegerField(_("общих арендаторов"))
+
+    class Meta:
+        verbose_name = _("соседняя площадка")
+        verbose_name_plural = _("соседние площадки")
+        ordering = ['venue', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['venue', 'rank'], name='venue_neighbor_rank'),
+        ]
+
+    def __str__(self):
+        return f"{self.venue_id} → {self.neighbor_id} (#{self.rank})"
+
+
+class ThemeVenue(models.Model):
+    """
+    Площадки, которые чаще выбирают для мероприятий данной тематики и
+    размера: топ-N на пару «тематика, корзина числа гостей» (корзины —
+    ``facets.BUCKETS['capacity']``), ``venues/recommendations.py``.
+    """
+    theme = models.CharField(_("тематика"), max_length=40)
+    guests = models.PositiveSmallIntegerField(_("корзина числа гостей"))
+    rank = models.PositiveSmallIntegerField(_("место"))
+    venue = models.ForeignKey(
+        Venue,
+        on_delete=models.CASCADE,
+        related_name='theme_ranks',
+        verbose_name=_("площадка")
+    )
+    score = models.FloatField(_("соответствие"))
+    events = models.PositiveIntegerField(_("мероприятий"))
+
+    class Meta:
+        verbose_name = _("площадка для тематики")
+        verbose_name_plural = _("площадки для тематик")
+        ordering = ['theme', 'guests', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['theme', 'guests', 'rank'], name='theme_venue_rank'),
+        ]
+
+    def __str__(self):
+        return f"{self.theme}/{self.guests}: {self.venue_id} (#{self.rank})"
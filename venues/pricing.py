@@ -0,0 +1,271 @@
+# venues/pricing.py
+"""
+Цена площадки за период с учётом правил (``VenuePricingRule``).
+
+Правила площадки компилируются в кусочно-постоянную функцию «ставка за
+час от местного времени» (``Tariff``) — два уровня отсортированных
+массивов:
+
+* границы дат — дни, с которых меняется набор действующих правил
+  (``date_from`` и день после ``date_to``); между соседними границами
+  набор постоянен;
+* у каждого набора — недельный профиль: смещения от начала недели
+  (понедельник 00:00, в секундах), на которых меняется ставка, и ставка
+  до следующего смещения. Соседние куски с равной ставкой слиты, так что
+  каждая граница профиля — настоящая смена цены; одинаковые наборы
+  правил делят один профиль.
+
+Расчёт периода: начало находится двумя ``bisect`` (O(log n)), дальше
+граница за границей по порядку — O(1) на границу; целые недели внутри
+одного набора правил добавляются умножением. Ставки — в копейках за час,
+длительности — в секундах: сумма считается в целых числах и округляется
+до копейки один раз.
+
+Скомпилированные правила держатся в LRU-кэше процесса
+(``VENUE_PRICING_CACHE_SIZE`` площадок), сбрасываются по сигналам
+``VenuePricingRule`` и ``Venue`` после коммита и устаревают через
+``VENUE_PRICING_TTL`` секунд — так подхватываются изменения из других
+процессов. ``tariffs`` компилирует недостающие площадки пачки двумя
+запросами — на страницу результатов поиска или на пакетную заявку.
+
+Время — местное (``TIME_ZONE``), длительность — по часам на стене: в ночь
+перевода часов сутки считаются за 24 часа.
+"""
+import time
+from bisect import bisect_right
+from dataclasses import dataclass
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from core.lookup import LRUCache
+
+from .models import Venue, VenuePricingRule
+
+DAY = 24 * 60 * 60
+WEEK = 7 * DAY
+HOUR = 60 * 60
+
+# Местное время → секунды от 0001-01-01 (``date.toordinal``); день 1 —
+# понедельник, поэтому недели начинаются с ``DAY``
+_MONDAY = DAY
+
+_KOPECK = Decimal('0.01')
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _kopecks(amount):
+    return None if amount is None else int((amount * 100).to_integral_value(ROUND_HALF_UP))
+
+
+def _seconds(at, tz):
+    at = timezone.localtime(at, tz) if timezone.is_aware(at) else at
+    return at.toordinal() * DAY + at.hour * HOUR + at.minute * 60 + at.second
+
+
+def _time(value, default):
+    return default if value is None else value.hour * HOUR + value.minute * 60 + value.second
+
+
+@dataclass(frozen=True)
+class Rule:
+    """Правило в виде для компиляции: даты — порядковые номера дней, часы — секунды суток."""
+    priority: int
+    pk: int
+    rate: object            # копеек за час; None — у площадки нет базовой цены для множителя
+    day_from: int = None
+    day_to: int = None      # включительно
+    weekdays: frozenset = frozenset(range(7))
+    time_from: int = 0
+    time_to: int = DAY
+
+    @classmethod
+    def from_row(cls, base, pk, priority, kind, value, date_from, date_to, weekdays, time_from, time_to):
+        if kind == 'override':
+            rate = _kopecks(value)
+        else:
+            rate = None if base is None else int((Decimal(base) * value).to_integral_value(ROUND_HALF_UP))
+        return cls(
+            priority, pk, rate,
+            date_from and date_from.toordinal(), date_to and date_to.toordinal(),
+            frozenset(weekdays or range(7)), _time(time_from, 0), _time(time_to, DAY),
+        )
+
+    def covers(self, day):
+        return (self.day_from is None or self.day_from <= day) and (self.day_to is None or day <= self.day_to)
+
+    def pieces(self):
+        """Интервалы недели ``[от, до)``, где правило действует; «22:00–06:00» — два куска на день."""
+        for weekday in sorted(self.weekdays):
+            offset = weekday * DAY
+            if self.time_from < self.time_to:
+                yield offset + self.time_from, offset + self.time_to
+            else:
+                yield offset, offset + self.time_to
+                yield offset + self.time_from, offset + DAY
+
+
+@dataclass(frozen=True)
+class Profile:
+    edges: tuple    # смещения от начала недели, edges[0] == 0
+    rates: tuple    # копеек за час от edges[i] до edges[i + 1] (последняя — до конца недели)
+    week: object    # стоимость целой недели в копейко-секундах; None — где-то нет цены
+
+
+def _profile(base, rules):
+    """Недельный профиль набора правил: поверх базовой цены правила кладутся по возрастанию приоритета."""
+    edges = sorted({0, *(edge for rule in rules for piece in rule.pieces() for edge in piece if edge < WEEK)})
+    rates = [base] * len(edges)
+    for rule in sorted(rules, key=lambda rule: (rule.priority, rule.pk)):
+        for start, end in rule.pieces():
+            for i in range(bisect_right(edges, start) - 1, bisect_right(edges, end - 1)):
+                rates[i] = rule.rate
+    merged_edges, merged_rates = [], []
+    for edge, rate in zip(edges, rates):
+        if not merged_rates or merged_rates[-1] != rate:
+            merged_edges.append(edge)
+            merged_rates.append(rate)
+    week = 0
+    for i, rate in enumerate(merged_rates):
+        if rate is None:
+            week = None
+            break
+        end = merged_edges[i + 1] if i + 1 < len(merged_edges) else WEEK
+        week += rate * (end - merged_edges[i])
+    return Profile(tuple(merged_edges), tuple(merged_rates), week)
+
+
+class Tariff:
+    """Скомпилированные правила одной площадки."""
+
+    def __init__(self, base, rules=()):
+        self.base = base
+        self.loaded_at = time.monotonic()
+        boundaries = sorted({
+            day for rule in rules
+            for day in (rule.day_from, None if rule.day_to is None else rule.day_to + 1) if day is not None
+        })
+        self.days = [0] + [day * DAY for day in boundaries]
+        self.profiles, shared = [], {}
+        for start in [0, *boundaries]:
+            active = tuple(rule for rule in rules if rule.covers(start))
+            key = tuple(rule.pk for rule in active)
+            if key not in shared:
+                shared[key] = _profile(base, active)
+            self.profiles.append(shared[key])
+
+    @property
+    def stale(self):
+        return time.monotonic() - self.loaded_at > _setting('VENUE_PRICING_TTL', 300)
+
+    def amount(self, start, end):
+        """Стоимость ``[start, end)`` (секунды местного времени) в копейко-секундах; None — цены нет."""
+        i = bisect_right(self.days, start) - 1
+        t, total = start, 0
+        while t < end:
+            profile = self.profiles[i]
+            limit = min(end, self.days[i + 1]) if i + 1 < len(self.days) else end
+            week_start = t - (t - _MONDAY) % WEEK
+            edges, rates = profile.edges, profile.rates
+            j = bisect_right(edges, t - week_start) - 1
+            # неделя с любого смещения проходит каждое смещение ровно раз
+            if profile.week is not None and limit - t >= WEEK:
+                weeks = (limit - t) // WEEK
+                total += weeks * profile.week
+                t += weeks * WEEK
+                week_start += weeks * WEEK
+            while t < limit:
+                boundary = week_start + (edges[j + 1] if j + 1 < len(edges) else WEEK)
+                stop = min(boundary, limit)
+                if rates[j] is None:
+                    return None
+                total += rates[j] * (stop - t)
+                t = stop
+                if t == boundary:
+                    j += 1
+                    if j == len(edges):
+                        j, week_start = 0, week_start + WEEK
+            i += 1
+        return total
+
+    def quote(self, start, end, tz=None):
+        """Стоимость периода (aware datetime) в рублях; None — у площадки нет цены на часть периода."""
+        tz = tz or timezone.get_default_timezone()
+        total = self.amount(_seconds(start, tz), _seconds(end, tz))
+        if total is None:
+            return None
+        kopecks = (total * 2 + HOUR) // (2 * HOUR)      # округление половины вверх
+        return (Decimal(kopecks) / 100).quantize(_KOPECK)
+
+
+# ────────────────────────────────────────────────
+# Кэш процесса
+# ────────────────────────────────────────────────
+
+cache = LRUCache(_setting('VENUE_PRICING_CACHE_SIZE', 20000))
+
+RULE_COLUMNS = ['venue_id', 'pk', 'priority', 'kind', 'value', 'date_from', 'date_to', 'weekdays',
+                'time_from', 'time_to']
+
+
+def load(venue_ids):
+    """Компиляция правил площадок двумя запросами: ``{id: Tariff}``; нет площадки — нет ключа."""
+    bases = {pk: _kopecks(price) for pk, price in
+             Venue.objects.filter(pk__in=venue_ids).order_by().values_list('pk', 'price_per_hour')}
+    rules = {pk: [] for pk in bases}
+    rows = (VenuePricingRule.objects.filter(venue_id__in=list(bases), is_active=True)
+            .order_by().values_list(*RULE_COLUMNS))
+    for venue_id, *row in rows:
+        rules[venue_id].append(Rule.from_row(bases[venue_id], *row))
+    return {pk: Tariff(base, rules[pk]) for pk, base in bases.items()}
+
+
+def tariffs(venue_ids):
+    """``{id: Tariff}`` для пачки площадок; из кэша, недостающие и устаревшие — одной загрузкой."""
+    found, missing = {}, []
+    for pk in dict.fromkeys(venue_ids):
+        tariff = cache.get(pk)
+        if tariff is None or tariff.stale:
+            missing.append(pk)
+        else:
+            found[pk] = tariff
+    if missing:
+        for pk, tariff in load(missing).items():
+            cache.put(pk, tariff)
+            found[pk] = tariff
+    return found
+
+
+def quote(venue_id, start, end):
+    """Стоимость брони площадки на ``[start, end)``; None — цены нет или площадки нет."""
+    tariff = tariffs([venue_id]).get(venue_id)
+    return None if tariff is None else tariff.quote(start, end)
+
+
+def quote_many(venue_ids, start, end):
+    """``{id: стоимость}`` одного периода для пачки площадок (страница поиска)."""
+    tz = timezone.get_default_timezone()
+    found = tariffs(venue_ids)
+    return {pk: found[pk].quote(start, end, tz) if pk in found else None for pk in venue_ids}
+
+
+# ────────────────────────────────────────────────
+# Сброс по сигналам
+# ────────────────────────────────────────────────
+
+def _discard(venue_id):
+    transaction.on_commit(lambda: cache.discard(venue_id))
+
+
+def rule_changed(sender, instance, **kwargs):
+    _discard(instance.venue_id)
+
+
+def venue_changed(sender, instance, **kwargs):
+    # базовая цена — часть скомпилированного профиля
+    _discard(instance.pk)
@@ -0,0 +1,241 @@
+# venues/recommendations.py
+"""
+Рекомендации площадок по истории бронирований.
+
+Две готовые выдачи, которые пересчитываются офлайн (команда
+``refresh_recommendations``, раз в сутки) и показываются одним запросом
+по уникальному индексу, без агрегатов на лету:
+
+* ``VenueNeighbor`` — «кто бронировал эту площадку, бронировал и…»:
+  разреженная матрица совместных бронирований «площадка × площадка»
+  (число арендаторов, бронировавших обе), нормированная на популярность
+  обеих площадок (косинус), топ-N соседей на площадку;
+* ``ThemeVenue`` — «площадки для такой тематики»: матрица «(тематика,
+  корзина числа гостей) × площадка» по мероприятиям с бронями, тоже
+  нормированная на общее число мероприятий площадки, топ-N на пару.
+
+Матрицы не выгружаются в Python: каждая — один ``INSERT ... SELECT`` с
+``GROUP BY`` по ненулевым клеткам и ``row_number()`` для топ-N. Учитываются
+подтверждённые и завершённые брони; арендаторы с числом площадок больше
+``VENUE_RECOMMENDATIONS_MAX_RENTER_VENUES`` (агентства) дают квадратичное
+число пар и почти не несут сигнала — они не учитываются.
+
+Ежедневное обновление инкрементное: изменения броней читаются из журнала
+``core/outbox.py`` (потребитель ``CONSUMER``), и соседи пересчитываются
+только у площадок арендаторов, чьи брони изменились. Нормировка
+остальных площадок при этом немного отстаёт — её выравнивает полная
+перестройка (``--full``, например раз в неделю; первый запуск — всегда
+полный). Тематики пересчитываются целиком: это один проход по броням.
+Позиция в журнале сдвигается в той же транзакции, что и запись выдачи,
+поэтому упавший пересчёт повторится со следующим запуском.
+"""
+import uuid
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from bookings.models import Booking
+from core import outbox
+from core.models import OutboxConsumer
+from events.models import Event
+
+from . import facets
+from .models import ThemeVenue, Venue, VenueNeighbor
+
+CONSUMER = 'venue_recommendations'
+TOPIC = 'bookings.booking'
+
+# Брони, которые считаются выбором арендатора
+STATUSES = ('confirmed', 'completed')
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+@dataclass
+class RefreshResult:
+    full: bool
+    entries: int        # прочитано записей журнала
+    venues: int         # площадок с пересчитанными соседями; None — все (полная перестройка)
+    neighbors: int      # записано строк VenueNeighbor
+    themes: int         # записано строк ThemeVenue
+
+
+# ────────────────────────────────────────────────
+# Пересчёт
+# ────────────────────────────────────────────────
+
+def _tables():
+    q = connection.ops.quote_name
+    return {
+        'bookings': q(Booking._meta.db_table),
+        'events': q(Event._meta.db_table),
+        'venues': q(Venue._meta.db_table),
+        'neighbors': q(VenueNeighbor._meta.db_table),
+        'themes': q(ThemeVenue._meta.db_table),
+    }
+
+
+def rebuild_neighbors(venue_ids=None):
+    """
+    Соседи площадок ``venue_ids`` (None — всех) по совместным бронированиям;
+    старые строки этих площадок заменяются. Возвращает число строк.
+    """
+    t = _tables()
+    only = '' if venue_ids is None else 'WHERE a.venue_id = ANY(%(venues)s)'
+    params = {
+        'statuses': list(STATUSES),
+        'max_venues': _setting('VENUE_RECOMMENDATIONS_MAX_RENTER_VENUES', 200),
+        'top_n': _setting('VENUE_RECOMMENDATIONS_TOP_N', 20),
+        'venues': list(venue_ids or ()),
+    }
+    with connection.cursor() as cursor:
+        if venue_ids is None:
+            cursor.execute(f'DELETE FROM {t["neighbors"]}')
+        else:
+            cursor.execute(f'DELETE FROM {t["neighbors"]} WHERE venue_id = ANY(%(venues)s)', params)
+        cursor.execute(f'''
+            WITH choices AS (
+                SELECT DISTINCT renter_id, venue_id FROM {t["bookings"]} WHERE status = ANY(%(statuses)s)
+            ),
+            renters AS (
+                SELECT renter_id FROM choices GROUP BY renter_id
+                HAVING count(*) BETWEEN 2 AND %(max_venues)s
+            ),
+            history AS (
+                SELECT c.renter_id, c.venue_id FROM choices c JOIN renters USING (renter_id)
+            ),
+            popularity AS (
+                SELECT venue_id, count(*)::float8 AS renters FROM history GROUP BY venue_id
+            ),
+            pairs AS (
+                SELECT a.venue_id, b.venue_id AS neighbor_id, count(*) AS shared
+                FROM history a JOIN history b ON b.renter_id = a.renter_id AND b.venue_id <> a.venue_id
+                {only}
+                GROUP BY a.venue_id, b.venue_id
+            ),
+            scored AS (
+                SELECT p.venue_id, p.neighbor_id, p.shared,
+                       p.shared / sqrt(pa.renters * pb.renters) AS score
+                FROM pairs p
+                JOIN popularity pa ON pa.venue_id = p.venue_id
+                JOIN popularity pb ON pb.venue_id = p.neighbor_id
+                JOIN {t["venues"]} v ON v.id = p.neighbor_id AND v.status = 'published'
+            )
+            INSERT INTO {t["neighbors"]} (venue_id, neighbor_id, rank, score, renters)
+            SELECT venue_id, neighbor_id, rank, score, shared FROM (
+                SELECT s.*, row_number() OVER (
+                    PARTITION BY venue_id ORDER BY score DESC, shared DESC, neighbor_id
+                ) AS rank
+                FROM scored s
+            ) ranked
+            WHERE rank <= %(top_n)s
+        ''', params)
+        return cursor.rowcount
+
+
+def rebuild_themes():
+    """Площадки для тематик целиком заново; возвращает число строк."""
+    t = _tables()
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {t["themes"]}')
+        # корзина гостей — как у фасета вместимости (width_bucket = bisect_right)
+        cursor.execute(f'''
+            WITH picks AS (
+                SELECT DISTINCT e.theme, width_bucket(e.expected_guests, %(edges)s::integer[]) AS guests,
+                       b.venue_id, b.event_id
+                FROM {t["bookings"]} b JOIN {t["events"]} e ON e.id = b.event_id
+                WHERE b.status = ANY(%(statuses)s)
+            ),
+            cells AS (
+                SELECT theme, guests, venue_id, count(*) AS events FROM picks GROUP BY theme, guests, venue_id
+            ),
+            totals AS (
+                SELECT venue_id, sum(events)::float8 AS events FROM cells GROUP BY venue_id
+            ),
+            scored AS (
+                SELECT c.theme, c.guests, c.venue_id, c.events, c.events / sqrt(n.events) AS score
+                FROM cells c
+                JOIN totals n USING (venue_id)
+                JOIN {t["venues"]} v ON v.id = c.venue_id AND v.status = 'published'
+            )
+            INSERT INTO {t["themes"]} (theme, guests, rank, venue_id, score, events)
+            SELECT theme, guests, rank, venue_id, score, events FROM (
+                SELECT s.*, row_number() OVER (
+                    PARTITION BY theme, guests ORDER BY score DESC, events DESC, venue_id
+                ) AS rank
+                FROM scored s
+            ) ranked
+            WHERE rank <= %(top_n)s
+        ''', {
+            'edges': list(facets.BUCKETS['capacity']),
+            'statuses': list(STATUSES),
+            'top_n': _setting('VENUE_RECOMMENDATIONS_TOP_N', 20),
+        })
+        return cursor.rowcount
+
+
+def refresh(full=False, batch_size=None):
+    """
+    Ежедневное обновление: изменения броней из журнала → площадки, чьих
+    соседей пересчитать; затем тематики. Всё — одна транзакция.
+    """
+    renters, venues = set(), set()
+
+    def collect(entries):
+        for entry in entries:
+            renters.add(uuid.UUID(entry.payload['renter_id']))
+            venues.add(uuid.UUID(entry.payload['venue_id']))
+
+    with transaction.atomic():
+        full = full or not OutboxConsumer.objects.filter(pk=CONSUMER).exists()
+        if full:
+            # полная перестройка читает сами брони: журнал до последней
+            # завершённой записи не разбирается, а только отмечается прочитанным
+            outbox.acknowledge(CONSUMER, outbox.head())
+            entries, affected = 0, None
+        else:
+            # журнал читается до пересчёта: всё прочитанное уже закоммичено и
+            # попадёт в запросы ниже, а записанное позже дождётся следующего запуска
+            entries = outbox.drain(CONSUMER, collect, batch_size, topics=[TOPIC])
+            affected = venues | set(
+                Booking.objects.filter(renter_id__in=renters).order_by()
+                .values_list('venue_id', flat=True).distinct()
+            )
+        neighbors = rebuild_neighbors(affected) if full or affected else 0
+        themes = rebuild_themes()
+    return RefreshResult(full, entries, None if full else len(affected), neighbors, themes)
+
+
+# ────────────────────────────────────────────────
+# Показ
+# ────────────────────────────────────────────────
+
+def similar(venue_id, limit=None):
+    """Опубликованные соседи площадки по порядку; один запрос по ``(venue, rank)``."""
+    rows = (
+        VenueNeighbor.objects.filter(venue_id=venue_id, neighbor__status='published')
+        .select_related('neighbor').order_by('rank')[:limit or _setting('VENUE_RECOMMENDATIONS_TOP_N', 20)]
+    )
+    return [row.neighbor for row in rows]
+
+
+def for_theme(theme, guests, limit=None):
+    """
+    Опубликованные площадки для тематики и числа гостей, которые их
+    вмещают; один запрос по ``(theme, guests, rank)``.
+    """
+    rows = (
+        ThemeVenue.objects.filter(
+            theme=theme, guests=facets.bucket('capacity', guests),
+            venue__status='published', venue__capacity_max__gte=guests,
+        )
+        .select_related('venue').order_by('rank')[:limit or _setting('VENUE_RECOMMENDATIONS_TOP_N', 20)]
+    )
+    return [row.venue for row in rows]
+
+
+def for_event(event, limit=None):
+    return for_theme(event.theme, event.expected_guests, limit)
@@ -1,3 +1,344 @@
-from django.test import TestCase
+import asyncio
+import json
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.core.cache import cache
+from django.db import connection
+from django.http import QueryDict
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from bookings.models import Booking
+from events.models import Event
+from core import dimensions, outbox
+from core.models import City
+from EventMarket.asgi import application
+from EventMarket.testing import build_marketplace
+
+from . import facets, live, pricing, recommendations
+from .models import Venue, VenuePricingRule
+
+
+class FacetSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = build_marketplace(6)
+        # площадка без цены и площади — корзина «не указано»
+        Venue.objects.filter(pk=cls.data['venues'][0].pk).update(
+            status='published', price_per_hour=None, area_sq_m=None,
+        )
+
+    def setUp(self):
+        facets.index.load()
+
+    def filters(self, query):
+        return facets.parse_filters(QueryDict(query))
+
+    def test_index_matches_database(self):
+        states = ['', 'city=Москва', 'city=Москва&city=Казань&verified=1', 'price=none&area=none',
+                  'capacity=1&capacity=3&price=2&price=3', 'area=2&area=3&verified=0']
+        for query in states:
+            with self.subTest(query=query):
+                filters = self.filters(query)
+                with self.assertNumQueries(0):
+                    in_memory = facets.index.counts(filters)
+                self.assertEqual(in_memory, facets.db_counts(filters))
+                self.assertEqual(in_memory.total, Venue.objects.filter(facets.filter_q(filters)).count())
+
+    def test_facet_counts_ignore_own_filter(self):
+        everything = facets.index.counts({})
+        counts = facets.index.counts(self.filters('city=Москва'))
+        self.assertEqual(counts.facets['city'], everything.facets['city'])
+        self.assertEqual(counts.total, everything.facets['city'].get(dimensions.lookup(City, 'Москва'), 0))
+        self.assertEqual(sum(counts.facets['verified'].values()), counts.total)
+
+    def test_signals_update_index_after_commit(self):
+        before = facets.index.counts({}).total
+        with self.captureOnCommitCallbacks(execute=True):
+            venue = Venue.objects.create(
+                owner=self.data['venues'][0].owner, name='Новая', slug='novaya', address='ул. Новая, 1',
+                city=City.objects.create(name='Тверь'), capacity_max=20, price_per_hour=Decimal('25000'),
+            )
+        self.assertEqual(facets.index.counts({}).total, before)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            venue.status = 'published'
+            venue.save()
+        counts = facets.index.counts(self.filters('city=Тверь'))
+        self.assertEqual(counts.total, 1)
+        self.assertEqual(counts.facets['capacity'], {0: 1})
+        self.assertEqual(counts.facets['price'], {len(facets.BUCKETS['price']): 1})
+        self.assertEqual(facets.index.counts({}).total, before + 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            venue.delete()
+        self.assertEqual(facets.index.counts(self.filters('city=Тверь')).total, 0)
+        self.assertNotIn(venue.city_id, facets.index.counts({}).facets['city'])
+        self.assertEqual(facets.index.counts({}), facets.db_counts({}))
+
+    def test_city_filter_by_any_spelling_or_id(self):
+        moscow = dimensions.lookup(City, 'Москва')
+        self.assertEqual(self.filters('city= москва '), {'city': frozenset({moscow})})
+        self.assertEqual(self.filters(f'city={moscow}'), {'city': frozenset({moscow})})
+        # неизвестный город — пустой фильтр, а не «без фильтра»
+        unknown = self.filters('city=Атлантида')
+        self.assertEqual(facets.index.counts(unknown).total, 0)
+        self.assertEqual(facets.index.counts(unknown), facets.db_counts(unknown))
+
+    def test_bucket_edges(self):
+        for facet, edges in facets.BUCKETS.items():
+            for n, edge in enumerate(edges, start=1):
+                self.assertEqual(facets.bucket(facet, edge - 1), n - 1)
+                self.assertEqual(facets.bucket(facet, edge), n)
+        self.assertEqual(facets.bucket_label('capacity', 0), 'до 20')
+        self.assertEqual(facets.bucket_label('capacity', 1), '21–50')
+        self.assertIsNone(facets.bucket('area', None))
+
+    def test_search_view(self):
+        response = self.client.get('/venues/search/', {'city': 'Москва'})
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['total'], len(body['results']))
+        self.assertTrue(all(venue['city'] == 'Москва' for venue in body['results']))
+        self.assertEqual({item['value'] for item in body['facets']['city']},
+                         set(facets.index.counts({}).facets['city']))
+
+        self.assertEqual(self.client.get('/venues/search/', {'capacity': '99'}).status_code, 400)
+
+    def test_search_pages_follow_db_when_index_is_stale(self):
+        moscow = dimensions.lookup(City, 'Москва')
+        indexed = facets.index.counts(self.filters('city=Москва')).total
+        # on_commit не выполнен — индекс ещё не знает о новой площадке
+        Venue.objects.create(
+            owner=self.data['venues'][0].owner, name='Свежая', slug='svezhaya', address='ул. Новая, 2',
+            city_id=moscow, capacity_max=20, status='published',
+        )
+        body = self.client.get('/venues/search/', {'city': 'Москва'}).json()
+        self.assertEqual(body['total'], indexed + 1)
+        self.assertEqual(len(body['results']), indexed + 1)
+        self.assertEqual(facets.index.counts(self.filters('city=Москва')).total, indexed)
+
+
+class PricingRuleTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.venue, cls.other = build_marketplace(2)['venues'][:2]
+        Venue.objects.filter(pk__in=[cls.venue.pk, cls.other.pk]).update(
+            status='published', price_per_hour=Decimal('1000'),
+        )
+        rules = [
+            ('Выходные', dict(weekdays=[5, 6], value=Decimal('1.50'))),
+            ('Ночь', dict(time_from=time(22), time_to=time(6), value=Decimal('0.80'), priority=1)),
+            ('Лето', dict(date_from=date(2031, 6, 1), date_to=date(2031, 8, 31), kind='override',
+                          value=Decimal('1200'))),
+            ('Летние выходные', dict(date_from=date(2031, 6, 1), date_to=date(2031, 8, 31), weekdays=[5, 6],
+                                     kind='override', value=Decimal('2000'), priority=2)),
+            ('Праздник', dict(date_from=date(2031, 6, 12), date_to=date(2031, 6, 12), value=Decimal('3'),
+                              priority=5)),
+            ('Выключено', dict(value=Decimal('100'), is_active=False, priority=9)),
+        ]
+        cls.rules = VenuePricingRule.objects.bulk_create(
+            VenuePricingRule(venue_id=cls.venue.pk, name=name, **fields) for name, fields in rules
+        )
+
+    def setUp(self):
+        pricing.cache.clear()
+
+    def hourly(self, at):
+        """Ставка в момент ``at`` прямо по определению правил — для сверки."""
+        base, best = Decimal('1000'), None
+        for rule in self.rules:
+            start, end = rule.time_from or time(0), rule.time_to
+            in_hours = (start <= at.time() < end if end and start < end
+                        else at.time() >= start or (end is not None and at.time() < end))
+            if (rule.is_active and (not rule.weekdays or at.weekday() in rule.weekdays) and in_hours
+                    and (rule.date_from is None or rule.date_from <= at.date())
+                    and (rule.date_to is None or at.date() <= rule.date_to)
+                    and (best is None or (rule.priority, rule.pk) > (best.priority, best.pk))):
+                best = rule
+        if best is None:
+            return base
+        return best.value if best.kind == 'override' else base * best.value
+
+    def test_quote_matches_rate_by_quarter_hour(self):
+        tz = timezone.get_default_timezone()
+        for start, days in [(datetime(2031, 5, 20, 9, 15), 60), (datetime(2031, 6, 11, 20), 2),
+                            (datetime(2031, 9, 5, 23, 45), 30), (datetime(2031, 6, 14, 10), 0)]:
+            end = start + timedelta(days=days, hours=5, minutes=30)
+            with self.subTest(start=start, days=days):
+                expected, at = Decimal(0), start
+                while at < end:
+                    expected += self.hourly(at) / 4
+                    at += timedelta(minutes=15)
+                quote = pricing.quote(self.venue.pk, timezone.make_aware(start, tz), timezone.make_aware(end, tz))
+                self.assertEqual(quote, expected.quantize(Decimal('0.01')))
+
+    def test_batch_quote_cached_until_rules_change(self):
+        start = timezone.make_aware(datetime(2031, 6, 12, 10))
+        end = start + timedelta(hours=2)
+        with self.assertNumQueries(2):
+            quotes = pricing.quote_many([self.venue.pk, self.other.pk], start, end)
+        self.assertEqual(quotes, {self.venue.pk: Decimal('6000.00'), self.other.pk: Decimal('2000.00')})
+        with self.assertNumQueries(0):
+            pricing.quote_many([self.venue.pk, self.other.pk], start, end)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            VenuePricingRule.objects.create(venue=self.other, name='Июнь', date_from=date(2031, 6, 1),
+                                            kind='override', value=Decimal('1500'))
+        self.assertEqual(pricing.quote(self.other.pk, start, end), Decimal('3000.00'))
+        self.assertIn(self.venue.pk, pricing.cache.data)
+
+        response = self.client.get('/venues/search/', {'start': start.isoformat(), 'end': end.isoformat()})
+        quotes = {row['id']: row['quote'] for row in response.json()['results']}
+        self.assertEqual(quotes[str(self.other.pk)], '3000.00')
+        response = self.client.get(f'/venues/{self.venue.slug}/', {'start': start.isoformat(), 'end': 'завтра'})
+        self.assertEqual(response.status_code, 400)
+
+
+class LiveAvailabilityTests(TransactionTestCase):
+    # дельты идут из журнала изменений — нужен настоящий COMMIT
+    def setUp(self):
+        cache.clear()
+        self.data = build_marketplace(1)
+        self.venue = self.data['venues'][0]
+        Venue.objects.filter(pk=self.venue.pk).update(status='published')
+        self.booking = self.data['bookings'][0]
+        # журнал, накопленный до подключения, клиенту не нужен
+        outbox.drain(live.CONSUMER, lambda entries: None)
+
+    def scope(self, slug):
+        return {'type': 'http', 'method': 'GET', 'path': f'/venues/{slug}/availability/stream/',
+                'headers': [], 'query_string': b''}
+
+    async def next_event(self, communicator):
+        while True:
+            message = await communicator.receive_output(timeout=5)
+            fields = dict(line.split(': ', 1) for line in message['body'].decode().splitlines() if line)
+            if 'event' in fields:
+                return fields['event'], json.loads(fields['data'])
+
+    def shift_booking(self, **fields):
+        Booking.objects.filter(pk=self.booking.pk).update(**fields)
+
+    async def test_stream_sends_snapshot_then_deltas_of_every_write_path(self):
+        missing = ApplicationCommunicator(application, self.scope('no-such-venue'))
+        await missing.send_input({'type': 'http.request'})
+        self.assertEqual((await missing.receive_output())['status'], 404)
+
+        communicator = ApplicationCommunicator(application, self.scope(self.venue.slug))
+        await communicator.send_input({'type': 'http.request'})
+        try:
+            start = await communicator.receive_output(timeout=5)
+            self.assertEqual(start['status'], 200)
+            self.assertIn((b'content-type', b'text/event-stream; charset=utf-8'), start['headers'])
+            name, data = await self.next_event(communicator)
+            self.assertEqual((name, data['venue']), ('snapshot', str(self.venue.pk)))
+
+            # массовый UPDATE мимо save() — дельта всё равно приходит
+            await sync_to_async(self.shift_booking)(status='cancelled')
+            name, data = await self.next_event(communicator)
+            self.assertEqual((name, data['booking'], data['status'], data['busy']),
+                             ('booking', str(self.booking.pk), 'cancelled', False))
+
+            await communicator.send_input({'type': 'http.disconnect'})
+            await communicator.wait(timeout=5)
+            self.assertEqual(dict(live.broadcast().subscribers), {})
+        finally:
+            await live.broadcast().stop()
+
+    async def test_postgres_backend_fans_out_to_every_worker(self):
+        workers = [live.PostgresBroadcast(), live.PostgresBroadcast()]
+        subscriptions = [worker.subscribe(str(self.venue.pk)) for worker in workers]
+        try:
+            await asyncio.sleep(0.5)  # LISTEN
+            await sync_to_async(self.shift_booking)(status='confirmed', hold_expires_at=None)
+            # пачку журнала забирает один воркер, рассылку получают оба
+            for subscription in subscriptions:
+                message = await asyncio.wait_for(subscription.queue.get(), timeout=5)
+                self.assertEqual((message['booking'], message['busy']), (str(self.booking.pk), True))
+        finally:
+            for worker in workers:
+                await worker.stop()
+
+        slow = live.Subscription(str(self.venue.pk), 2)
+        for message in ({}, {}, {}):
+            slow.put(message)
+        self.assertIs(slow.queue.get_nowait(), live.RESYNC)
+
+    def test_startup_skips_backlog_older_than_a_ping(self):
+        self.shift_booking(status='confirmed', hold_expires_at=None)
+        self.assertTrue(outbox.read(live.CONSUMER, topics=[live.TOPIC]))
+        # свежие записи остаются живым воркерам
+        live.skip_backlog()
+        self.assertTrue(outbox.read(live.CONSUMER, topics=[live.TOPIC]))
+        live.skip_backlog(now=timezone.now() + timedelta(minutes=1))
+        self.assertEqual(outbox.read(live.CONSUMER), [])
+        self.assertEqual(outbox.position(live.CONSUMER), outbox.head())
+
+    async def test_sync_work_survives_dropped_connection(self):
+        def drop():
+            connection.ensure_connection()
+            connection.connection.close()   # рестарт БД / обрыв сети
+
+        await live._sync(drop)()
+        data = await live._sync(live.snapshot)(str(self.venue.pk))
+        self.assertEqual(data['venue'], str(self.venue.pk))
+
+
+class RecommendationTests(TransactionTestCase):
+    # инкрементное обновление читает журнал изменений — нужен настоящий COMMIT
+    def setUp(self):
+        cache.clear()
+        data = build_marketplace(2)
+        self.renters, self.venues = data['renters'], data['venues']
+        Venue.objects.update(status='published', capacity_max=100)
+        Booking.objects.all().delete()
+        # r0: v0 v1, r1: v0 v1, r2: v0 v2, r3: v3, r4 — отменённые v0 v4
+        for renter, venue, theme in [(0, 0, 'wedding'), (0, 1, 'wedding'), (1, 0, 'party'), (1, 1, 'wedding'),
+                                     (2, 0, 'party'), (2, 2, 'party'), (3, 3, 'party')]:
+            self.book(renter, venue, theme)
+        for venue in (0, 4):
+            self.book(4, venue, 'wedding', status='cancelled')
+
+    def book(self, renter, venue, theme, status='confirmed'):
+        renter = self.renters[renter]
+        event = Event.objects.create(renter=renter, title='Мероприятие', date=date(2031, 6, 1), start_time=time(18),
+                                     end_time=time(23), theme=theme, expected_guests=80)
+        start = timezone.make_aware(datetime(2031, 6, 1, 18))
+        Booking.objects.create(event=event, venue=self.venues[venue], renter=renter, start_datetime=start,
+                               end_datetime=start + timedelta(hours=5), status=status)
+
+    def similar(self, venue):
+        return [self.venues.index(neighbor) for neighbor in recommendations.similar(self.venues[venue].pk)]
+
+    def test_full_then_incremental_refresh(self):
+        result = recommendations.refresh()
+        self.assertTrue(result.full)
+        # журнал с начала не разбирается — потребитель сразу на его конце
+        self.assertEqual(result.entries, 0)
+        self.assertEqual(outbox.position(recommendations.CONSUMER), outbox.head())
+        with self.assertNumQueries(1):
+            self.assertEqual(self.similar(0), [1, 2])      # 2/√(3·2) > 1/√(3·1)
+        self.assertEqual(self.similar(3), [])
+        self.assertEqual(self.similar(4), [])              # отменённые брони не в счёт
+        # свадьба на 80 гостей: v1 — обе брони свадебные, v0 — одна из трёх
+        suited = recommendations.for_theme('wedding', 80)
+        self.assertEqual([self.venues.index(venue) for venue in suited], [1, 0])
+        self.assertEqual(recommendations.for_theme('wedding', 150), [])
+
+        self.book(3, 2, 'party')
+        result = recommendations.refresh()
+        self.assertFalse(result.full)
+        self.assertEqual((result.entries, result.venues), (1, 2))   # площадки арендатора r3: v2, v3
+        self.assertEqual(self.similar(3), [2])
+        self.assertEqual(self.similar(2), [3, 0])      # 1/√(2·1) > 1/√(2·3)
+        self.assertEqual(recommendations.refresh().venues, 0)
+
+        response = self.client.get(f'/venues/{self.venues[3].slug}/similar/')
+        self.assertEqual([row['slug'] for row in response.json()['results']], [self.venues[2].slug])
+        response = self.client.get('/venues/suggest/', {'theme': 'wedding', 'guests': '80'})
+        self.assertEqual(len(response.json()['results']), 2)
+        self.assertEqual(self.client.get('/venues/suggest/', {'theme': 'rave', 'guests': '80'}).status_code, 400)
@@ -0,0 +1,12 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'venues'
+
+urlpatterns = [
+    path('search/', views.search, name='search'),
+    path('suggest/', views.suggest, name='suggest'),
+    path('<slug:slug>/', views.detail, name='detail'),
+    path('<slug:slug>/similar/', views.similar, name='similar'),
+]
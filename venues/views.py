@@ -1,3 +1,141 @@
-from django.shortcuts import render
+from django.core.paginator import InvalidPage, Paginator
+from django.http import Http404, HttpResponseBadRequest, JsonResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.views.decorators.http import require_GET
 
-# Create your views here.
+from core import dimensions, lookup
+from core.models import City
+from events.models import Event
+
+from . import facets, pricing, recommendations
+from .models import Venue
+
+PAGE_SIZE = 20
+
+RESULT_FIELDS = ['id', 'slug', 'name', 'city', 'capacity_max', 'price_per_hour', 'area_sq_m', 'is_verified']
+
+
+def _with_city_names(rows):
+    """``city`` в выдаче — название; id → название из кэша справочника, без JOIN."""
+    names = dimensions.names(City)
+    return [{**row, 'city': names.get(row['city'])} for row in rows]
+
+
+def _venue_json(venue):
+    row = {field: getattr(venue, Venue._meta.get_field(field).attname) for field in RESULT_FIELDS}
+    return _with_city_names([row])[0]
+
+
+def _period(params):
+    """``?start=…&end=…`` (ISO 8601) → ``(start, end)``; без параметров — None."""
+    if not params.get('start') and not params.get('end'):
+        return None
+    bounds = []
+    for name in ('start', 'end'):
+        value = parse_datetime(params.get(name, ''))
+        if value is None:
+            raise ValueError(f"{name} — дата и время ISO 8601")
+        bounds.append(timezone.make_aware(value) if timezone.is_naive(value) else value)
+    if bounds[1] <= bounds[0]:
+        raise ValueError("окончание раньше начала")
+    return tuple(bounds)
+
+
+def _facet_json(facet, counts):
+    names = dimensions.names(City) if facet == 'city' else None
+    items = []
+    for value, count in counts.items():
+        if facet == 'city':
+            label = names.get(value)
+        elif facet == 'verified':
+            label = value
+        else:
+            label = facets.bucket_label(facet, value)
+        items.append({'value': 'none' if value is None else value, 'label': label, 'count': count})
+    items.sort(key=lambda item: -item['count'])
+    return items
+
+
+@require_GET
+def search(request):
+    """
+    Поиск площадок с фасетами: счётчики — из индекса в памяти
+    (``venues/facets.py``), сама страница площадок и её пагинация — из БД:
+    индекс может отставать на ``VENUE_FACETS_TTL``, а число страниц должно
+    сходиться с самими результатами. С ``start`` и
+    ``end`` у каждой площадки страницы есть ``quote`` — цена периода по
+    правилам (``venues/pricing.py``), одной пачкой на страницу.
+    """
+    try:
+        filters = facets.parse_filters(request.GET)
+        period = _period(request.GET)
+    except (facets.FacetError, ValueError) as exc:
+        return HttpResponseBadRequest(str(exc))
+    counts = facets.facet_counts(filters)
+    queryset = Venue.objects.filter(facets.filter_q(filters)).order_by('-created_at', 'pk').values(*RESULT_FIELDS)
+    paginator = Paginator(queryset, PAGE_SIZE)
+    try:
+        page = paginator.page(request.GET.get('page', 1))
+    except InvalidPage:
+        raise Http404
+    results = _with_city_names(page.object_list)
+    if period:
+        quotes = pricing.quote_many([row['id'] for row in results], *period)
+        for row in results:
+            row['quote'] = quotes[row['id']]
+    return JsonResponse({
+        'total': paginator.count,
+        'page': page.number,
+        'pages': paginator.num_pages,
+        'results': results,
+        'facets': {facet: _facet_json(facet, counts.facets[facet]) for facet in facets.FACETS},
+    })
+
+
+@require_GET
+def detail(request, slug):
+    """
+    Площадка по slug (``Venue.get_absolute_url``); slug → pk берётся из
+    LRU-кэша. С ``start`` и ``end`` — ещё и ``quote``, цена периода.
+    """
+    try:
+        period = _period(request.GET)
+    except ValueError as exc:
+        return HttpResponseBadRequest(str(exc))
+    try:
+        venue = lookup.get_by_slug(Venue.objects.filter(status='published'), slug)
+    except Venue.DoesNotExist:
+        raise Http404
+    body = {
+        **_venue_json(venue),
+        'description': venue.description,
+        'address': venue.address,
+        'price_per_day': venue.price_per_day,
+    }
+    if period:
+        body['quote'] = pricing.quote(venue.pk, *period)
+    return JsonResponse(body)
+
+
+@require_GET
+def similar(request, slug):
+    """«Кто бронировал эту площадку, бронировал и…» — готовый список (``venues/recommendations.py``)."""
+    try:
+        venue = lookup.get_by_slug(Venue.objects.filter(status='published'), slug)
+    except Venue.DoesNotExist:
+        raise Http404
+    return JsonResponse({'results': [_venue_json(neighbor) for neighbor in recommendations.similar(venue.pk)]})
+
+
+@require_GET
+def suggest(request):
+    """Площадки для тематики и числа гостей: ``?theme=wedding&guests=80``."""
+    theme = request.GET.get('theme', '')
+    if theme not in dict(Event.THEME_CHOICES):
+        return HttpResponseBadRequest(f"Неизвестная тематика: {theme!r}")
+    guests = request.GET.get('guests', '')
+    if not guests.isdigit() or not int(guests):
+        return HttpResponseBadRequest("guests — число гостей")
+    venues = recommendations.for_theme(theme, int(guests))
+    return JsonResponse({'results': [_venue_json(venue) for venue in venues]})